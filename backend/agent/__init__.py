@@ -1,6 +1,16 @@
 """Agent module package."""
 
-from .factory import AgentFactory
 from .tools import ToolRegistry
 
+
+def __getattr__(name: str):
+    # The factory pulls in LangChain agents and the chat model client, so it
+    # is imported on first use rather than by every ``backend.agent`` import
+    if name == "AgentFactory":
+        from .factory import AgentFactory
+
+        return AgentFactory
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = ["AgentFactory", "ToolRegistry"]
@@ -0,0 +1,102 @@
+"""Turn-level time budget for agent runs.
+
+``MAX_ITERATIONS`` bounds how many times the agent loops, but not how long a
+turn takes. A ``TurnBudget`` carries a wall-clock deadline for one chat turn.
+The agent executor checks it between iterations: once the remaining time drops
+below the finalize reserve, the agent is asked to answer with what it already
+has instead of calling more tools.
+
+The active budget is stored in a context variable, the same way the session ID
+is tracked for logging, so concurrent requests never see each other's deadline.
+"""
+
+import contextvars
+import time
+from typing import Any, Dict, Optional
+
+
+class TurnBudget:
+    """Wall-clock budget for a single chat turn.
+
+    Example:
+        budget = TurnBudget(timeout_seconds=60, reserve_seconds=10)
+        set_turn_budget(budget)
+        try:
+            ...  # run the agent
+        finally:
+            clear_turn_budget()
+    """
+
+    def __init__(self, timeout_seconds: float, reserve_seconds: float = 0.0) -> None:
+        """Start the budget clock.
+
+        Args:
+            timeout_seconds: Total wall time allowed for the turn.
+            reserve_seconds: Time kept back for the final LLM call. When less
+                than this remains, the agent stops calling tools. Capped at
+                half of ``timeout_seconds``.
+        """
+        self.timeout_seconds = timeout_seconds
+        self.reserve_seconds = min(reserve_seconds, timeout_seconds / 2)
+        self.started_at = time.monotonic()
+        self.deadline = self.started_at + timeout_seconds
+        self.finalized = False
+
+    def elapsed(self) -> float:
+        """Seconds spent since the turn started."""
+        return time.monotonic() - self.started_at
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline, never negative."""
+        return max(0.0, self.deadline - time.monotonic())
+
+    def should_finalize(self) -> bool:
+        """Whether the agent should stop calling tools and answer now."""
+        return self.remaining() <= self.reserve_seconds
+
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return self.remaining() <= 0.0
+
+    def mark_finalized(self) -> None:
+        """Record that the agent was forced to produce a final answer."""
+        self.finalized = True
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Serializable view of the budget for SSE events and persistence.
+
+        Returns:
+            Dictionary with 'budget_ms', 'elapsed_ms', 'remaining_ms',
+            'finalized' and 'expired'.
+        """
+        return {
+            "budget_ms": int(self.timeout_seconds * 1000),
+            "elapsed_ms": int(self.elapsed() * 1000),
+            "remaining_ms": int(self.remaining() * 1000),
+            "finalized": self.finalized,
+            "expired": self.expired(),
+        }
+
+
+_current_turn_budget: contextvars.ContextVar[Optional[TurnBudget]] = (
+    contextvars.ContextVar("_current_turn_budget", default=None)
+)
+
+
+def set_turn_budget(budget: Optional[TurnBudget]) -> None:
+    """Make ``budget`` the active budget for the current request context.
+
+    Args:
+        budget: Budget to activate, or None to disable the deadline.
+    """
+    _current_turn_budget.set(budget)
+
+
+def get_turn_budget() -> Optional[TurnBudget]:
+    """Get the budget of the current request context, if any."""
+    return _current_turn_budget.get()
+
+
+def clear_turn_budget() -> None:
+    """Clear the budget after the turn completes."""
+    _current_turn_budget.set(None)
@@ -3,46 +3,100 @@ Logging configuration and custom LangChain callback handlers.
 
 This module sets up structured logging for the backend application and
 provides custom callbacks to capture detailed LLM invocation information.
+
+Each callback event is logged as one record whose message is the event name
+(``llm_start``, ``tool_end``, ...) and whose payload is in structured fields.
+Prompt and response bodies are included for a sampled share of runs and cut
+to a maximum size; see ``LOG_BODY_SAMPLE_RATE`` and ``LOG_BODY_MAX_CHARS``.
+Records carry the session, request and trace IDs of the current request.
+
+``TracingCallbackHandler`` records LLM and tool calls as spans of the
+request's trace.
 """
 
 import contextvars
 import logging
-import sys
+import random
+import time
 from typing import Any, Dict, List, Optional, Union
+from uuid import UUID
 
 from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.outputs import LLMResult
 
-# Configure root logger
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-    handlers=[logging.StreamHandler(sys.stdout)],
-)
+from backend.config import settings
+from backend.utils import metrics, tracing
+from backend.utils.log_pipeline import log_pipeline
+from backend.utils.tracing import SPAN_KIND_CLIENT, SPAN_KIND_INTERNAL, Span
+
+from .token_usage import extract_token_usage
 
 # Create logger for this module
 logger = logging.getLogger(__name__)
 
 # Context variables for thread-safe, request-scoped state
-# These allow concurrent requests to have separate session_id and token_usage
+# These allow concurrent requests to have separate session_id
 _current_session_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
     "_current_session_id", default=None
 )
 
+_SAMPLE_SCALE = 1_000_000
+
+
+def configure_logging(level: str = "DEBUG") -> None:
+    """Configure the root logger for the application.
+
+    Called once at application startup rather than on import, so importing
+    backend modules (tests, worker processes, tools) leaves logging alone.
+    Records go through the queue-based pipeline, so logging never blocks
+    the event loop on output.
+
+    Args:
+        level: Root log level name, e.g. "INFO"
+    """
+    log_pipeline.start(
+        level=level,
+        routes=settings.LOG_ROUTES,
+        fmt=settings.LOG_FORMAT,
+        queue_size=settings.LOG_QUEUE_SIZE,
+    )
+
+
+def shutdown_logging() -> None:
+    """Write out queued log records. Called on shutdown."""
+    log_pipeline.stop()
+
 
 class LLMDetailedCallbackHandler(BaseCallbackHandler):
     """
     Custom callback handler to capture detailed LLM invocation logs.
 
     Logs prompts, model responses, and metadata for both streaming and
-    non-streaming calls.
+    non-streaming calls, and records LLM call metrics.
+
+    Args:
+        logger_name: Logger the events are written to
+        body_sample_rate: Share of runs whose prompt and response bodies are
+            logged, from 0.0 to 1.0
+        body_max_chars: Longest body logged before it is cut; 0 for no limit
     """
 
-    def __init__(self, logger_name: str = "langchain.llm"):
+    # Logging only enqueues records, so run on the event loop instead of
+    # being dispatched to a thread for every event
+    run_inline = True
+
+    def __init__(
+        self,
+        logger_name: str = "langchain.llm",
+        body_sample_rate: float = 1.0,
+        body_max_chars: int = 2000,
+    ):
         super().__init__()
         self.logger = logging.getLogger(logger_name)
-        self.last_token_usage = None
+        self.body_sample_rate = body_sample_rate
+        self.body_max_chars = body_max_chars
+        # run_id -> [start time, model, first token seen]
+        self._llm_runs: Dict[UUID, list] = {}
 
     def set_session_id(self, session_id: str):
         """Set current session ID for logging context using contextvar."""
@@ -52,217 +106,380 @@ class LLMDetailedCallbackHandler(BaseCallbackHandler):
         """Clear current session ID using contextvar."""
         _current_session_id.set(None)
 
-    def _get_log_prefix(self) -> str:
-        """Get log prefix with session ID if available."""
-        session_id = _current_session_id.get()
-        if session_id:
-            return f"[Session: {session_id}] "
-        return ""
+    def _sampled(self, run_id: Optional[UUID]) -> bool:
+        """Whether bodies of this run are logged.
+
+        Decided from the run id, so the start and end events of a run agree.
+        """
+        if self.body_sample_rate >= 1:
+            return True
+        if self.body_sample_rate <= 0:
+            return False
+        value = run_id.int if run_id is not None else random.getrandbits(64)
+        return value % _SAMPLE_SCALE < self.body_sample_rate * _SAMPLE_SCALE
+
+    def _clip(self, value: Any) -> Any:
+        if isinstance(value, list):
+            return [self._clip(item) for item in value]
+        text = value if isinstance(value, str) else str(value)
+        if self.body_max_chars and len(text) > self.body_max_chars:
+            cut = len(text) - self.body_max_chars
+            return text[: self.body_max_chars] + f"... [{cut} chars truncated]"
+        return text
+
+    def _log(
+        self,
+        level: int,
+        event: str,
+        run_id: Optional[UUID] = None,
+        bodies: Optional[Dict[str, Any]] = None,
+        exc_info: Any = None,
+        **fields: Any,
+    ) -> None:
+        """Log one event with its fields and, if sampled, its bodies."""
+        if not self.logger.isEnabledFor(level):
+            return
+        fields["session_id"] = _current_session_id.get()
+        fields["request_id"] = tracing.current_request_id()
+        span = tracing.current_span()
+        if span is not None:
+            fields["trace_id"] = f"{span.trace_id:032x}"
+        fields["run_id"] = str(run_id) if run_id is not None else None
+        if bodies and self._sampled(run_id):
+            for name, value in bodies.items():
+                if value is not None:
+                    fields[name] = self._clip(value)
+        self.logger.log(level, event, extra={"fields": fields}, exc_info=exc_info)
 
     def on_llm_start(
         self,
         serialized: Dict[str, Any],
         prompts: List[str],
+        *,
+        run_id: Optional[UUID] = None,
         **kwargs: Any,
     ) -> None:
         """Run when LLM starts running."""
-        prefix = self._get_log_prefix()
-        self.logger.info(prefix + "=" * 80)
-        self.logger.info(prefix + "LLM Start")
-        self.logger.info(prefix + "=" * 80)
-        self.logger.debug(prefix + f"Serialized: {serialized}")
-
-        for i, prompt in enumerate(prompts, 1):
-            self.logger.info(prefix + f"Prompt {i}:")
-            self.logger.info(prefix + "-" * 40)
-            self.logger.info(prefix + prompt)
-            self.logger.info(prefix + "-" * 40)
-
-    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
-        """Run on new LLM token. Only visible when log level is DEBUG."""
-        # prefix = self._get_log_prefix()
-        # self.logger.debug(prefix + f"Token: {token}")
-        pass
-
-    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name")
+        if run_id is not None:
+            self._llm_runs[run_id] = [time.perf_counter(), model or "unknown", False]
+        self._log(
+            logging.INFO,
+            "llm_start",
+            run_id,
+            bodies={"prompts": prompts},
+            model=model,
+            prompt_chars=sum(len(prompt) for prompt in prompts),
+        )
+
+    def on_llm_new_token(
+        self, token: str, *, run_id: Optional[UUID] = None, **kwargs: Any
+    ) -> None:
+        """Run on new LLM token. Tokens are not logged."""
+        run = self._llm_runs.get(run_id)
+        if run is not None and not run[2]:
+            run[2] = True
+            metrics.llm_ttft_seconds.observe(
+                time.perf_counter() - run[0], model=run[1]
+            )
+
+    def on_llm_end(
+        self, response: LLMResult, *, run_id: Optional[UUID] = None, **kwargs: Any
+    ) -> None:
         """Run when LLM ends running."""
-        prefix = self._get_log_prefix()
-        self.logger.info(prefix + "=" * 80)
-        self.logger.info(prefix + "LLM End")
-        self.logger.info(prefix + "=" * 80)
-
-        for i, generations in enumerate(response.generations, 1):
-            for j, generation in enumerate(generations, 1):
-                self.logger.info(prefix + f"Generation {i}-{j}:")
-                self.logger.info(prefix + "-" * 40)
-                self.logger.info(prefix + f"Text: {generation.text}")
-                if generation.generation_info:
-                    self.logger.info(prefix + f"Info: {generation.generation_info}")
-                self.logger.info(prefix + "-" * 40)
-
-        token_usage = None
-
-        for generations in response.generations:
-            for generation in generations:
-                if (
-                    generation.generation_info
-                    and "token_usage" in generation.generation_info
-                ):
-                    token_usage = generation.generation_info["token_usage"]
-                    self.logger.info(
-                        prefix
-                        + f"[FOUND] Token usage in generation_info: {token_usage}"
-                    )
-                    break
-
-        if not token_usage and response.llm_output:
-            if "token_usage" in response.llm_output:
-                token_usage = response.llm_output["token_usage"]
-                self.logger.info(
-                    prefix + f"[FOUND] Token usage in llm_output: {token_usage}"
-                )
-            elif (
-                "prompt_tokens" in response.llm_output
-                or "completion_tokens" in response.llm_output
-            ):
-                token_usage = {
-                    "prompt_tokens": response.llm_output.get("prompt_tokens", 0),
-                    "completion_tokens": response.llm_output.get(
-                        "completion_tokens", 0
-                    ),
-                    "total_tokens": response.llm_output.get("total_tokens", 0),
-                }
-                self.logger.info(
-                    prefix + f"[CONSTRUCTED] Token usage from llm_output: {token_usage}"
+        texts = [
+            generation.text
+            for generations in response.generations
+            for generation in generations
+        ]
+        # Per-turn accounting is done by the turn's TokenLedger
+        token_usage = extract_token_usage(response)
+        run = self._llm_runs.pop(run_id, None)
+        metrics.llm_calls.inc(status="ok")
+        if run is not None:
+            duration = time.perf_counter() - run[0]
+            metrics.llm_call_seconds.observe(duration, model=run[1])
+            if token_usage and token_usage["completion_tokens"] and duration > 0:
+                metrics.llm_tokens_per_second.observe(
+                    token_usage["completion_tokens"] / duration, model=run[1]
                 )
-
-        if token_usage:
-            self.logger.info(prefix + f"Token usage: {token_usage}")
-            self.last_token_usage = token_usage
-
-        if response.llm_output:
-            self.logger.info(prefix + f"LLM output: {response.llm_output}")
-
-    def get_last_token_usage(self) -> Optional[Dict[str, int]]:
-        """Get token usage from last LLM invocation.
-
-        Returns:
-            Dictionary with 'prompt_tokens', 'completion_tokens', 'total_tokens' or None.
-        """
-        return self.last_token_usage
+        self._log(
+            logging.INFO,
+            "llm_end",
+            run_id,
+            bodies={"generations": texts},
+            token_usage=token_usage,
+            response_chars=sum(len(text) for text in texts),
+        )
 
     def on_llm_error(
         self,
         error: Union[Exception, KeyboardInterrupt],
+        *,
+        run_id: Optional[UUID] = None,
         **kwargs: Any,
     ) -> None:
         """Run when LLM errors."""
-        prefix = self._get_log_prefix()
-        self.logger.error(prefix + "=" * 80)
-        self.logger.error(prefix + "LLM Error")
-        self.logger.error(prefix + "=" * 80)
-        self.logger.error(prefix + f"Error: {error}", exc_info=True)
+        self._llm_runs.pop(run_id, None)
+        metrics.llm_calls.inc(status="error")
+        self._log(logging.ERROR, "llm_error", run_id, exc_info=error, error=str(error))
 
     def on_chain_start(
         self,
         serialized: Dict[str, Any],
         inputs: Dict[str, Any],
+        *,
+        run_id: Optional[UUID] = None,
         **kwargs: Any,
     ) -> None:
         """Run when chain starts running."""
-        prefix = self._get_log_prefix()
-        self.logger.info(prefix + "=" * 80)
-        self.logger.info(prefix + f"Chain Start: {serialized.get('name', 'unknown')}")
-        self.logger.info(prefix + "=" * 80)
-        self.logger.debug(prefix + f"Inputs: {inputs}")
-
-    def on_chain_end(self, outputs: Dict[str, Any], **kwargs: Any) -> None:
+        self._log(
+            logging.DEBUG,
+            "chain_start",
+            run_id,
+            bodies={"inputs": inputs},
+            chain=(serialized or {}).get("name") or kwargs.get("name", "unknown"),
+        )
+
+    def on_chain_end(
+        self,
+        outputs: Dict[str, Any],
+        *,
+        run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
         """Run when chain ends running."""
-        prefix = self._get_log_prefix()
-        self.logger.info(prefix + "=" * 80)
-        self.logger.info(prefix + "Chain End")
-        self.logger.info(prefix + "=" * 80)
-        self.logger.debug(prefix + f"Outputs: {outputs}")
+        self._log(logging.DEBUG, "chain_end", run_id, bodies={"outputs": outputs})
 
     def on_chain_error(
         self,
         error: Union[Exception, KeyboardInterrupt],
+        *,
+        run_id: Optional[UUID] = None,
         **kwargs: Any,
     ) -> None:
         """Run when chain errors."""
-        prefix = self._get_log_prefix()
-        self.logger.error(prefix + "=" * 80)
-        self.logger.error(prefix + "Chain Error")
-        self.logger.error(prefix + "=" * 80)
-        self.logger.error(prefix + f"Error: {error}", exc_info=True)
+        self._log(
+            logging.ERROR, "chain_error", run_id, exc_info=error, error=str(error)
+        )
 
     def on_tool_start(
         self,
         serialized: Dict[str, Any],
         input_str: str,
+        *,
+        run_id: Optional[UUID] = None,
         **kwargs: Any,
     ) -> None:
         """Run when tool starts running."""
-        prefix = self._get_log_prefix()
-        self.logger.info(prefix + "=" * 80)
-        self.logger.info(prefix + f"Tool Start: {serialized.get('name', 'unknown')}")
-        self.logger.info(prefix + "=" * 80)
-        self.logger.info(prefix + f"Input: {input_str}")
+        self._log(
+            logging.INFO,
+            "tool_start",
+            run_id,
+            bodies={"input": input_str},
+            tool=(serialized or {}).get("name", "unknown"),
+        )
 
     def on_tool_end(
         self,
         output: str,
-        observation_prefix: str = "",
-        llm_prefix: str = "",
+        *,
+        run_id: Optional[UUID] = None,
         **kwargs: Any,
     ) -> None:
         """Run when tool ends running."""
-        prefix = self._get_log_prefix()
-        self.logger.info(prefix + "=" * 80)
-        self.logger.info(prefix + "Tool End")
-        self.logger.info(prefix + "=" * 80)
-        self.logger.info(prefix + f"Output: {output}")
+        self._log(
+            logging.INFO,
+            "tool_end",
+            run_id,
+            bodies={"output": output},
+            output_chars=len(str(output)),
+        )
 
     def on_tool_error(
         self,
         error: Union[Exception, KeyboardInterrupt],
+        *,
+        run_id: Optional[UUID] = None,
         **kwargs: Any,
     ) -> None:
         """Run when tool errors."""
-        prefix = self._get_log_prefix()
-        self.logger.error(prefix + "=" * 80)
-        self.logger.error(prefix + "Tool Error")
-        self.logger.error(prefix + "=" * 80)
-        self.logger.error(prefix + f"Error: {error}", exc_info=True)
+        self._log(logging.ERROR, "tool_error", run_id, exc_info=error, error=str(error))
 
     def on_agent_action(
         self,
         action: Any,
-        color: Optional[str] = None,
+        *,
+        run_id: Optional[UUID] = None,
         **kwargs: Any,
     ) -> Any:
         """Run on agent action."""
-        prefix = self._get_log_prefix()
-        self.logger.info(prefix + "=" * 80)
-        self.logger.info(prefix + "Agent Action")
-        self.logger.info(prefix + "=" * 80)
-        self.logger.info(prefix + f"Tool: {action.tool}")
-        self.logger.info(prefix + f"Input: {action.tool_input}")
-        self.logger.info(prefix + f"Log: {action.log}")
+        self._log(
+            logging.INFO,
+            "agent_action",
+            run_id,
+            bodies={"tool_input": action.tool_input, "log": action.log},
+            tool=action.tool,
+        )
 
     def on_agent_finish(
         self,
         finish: Any,
-        color: Optional[str] = None,
+        *,
+        run_id: Optional[UUID] = None,
         **kwargs: Any,
     ) -> None:
         """Run on agent end."""
-        prefix = self._get_log_prefix()
-        self.logger.info(prefix + "=" * 80)
-        self.logger.info(prefix + "Agent Finish")
-        self.logger.info(prefix + "=" * 80)
-        self.logger.info(prefix + f"Output: {finish.return_values}")
-        self.logger.info(prefix + f"Log: {finish.log}")
+        self._log(
+            logging.INFO,
+            "agent_finish",
+            run_id,
+            bodies={"output": finish.return_values, "log": finish.log},
+        )
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Records each LLM and tool call of a turn as a span.
+
+    Spans are children of the span current when the call starts (the API
+    request), or of the enclosing tool call when a tool calls a model.
+    Created per turn by ``get_tracing_callbacks``.
+    """
+
+    run_inline = True
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._spans: Dict[UUID, Span] = {}
+
+    def _start(
+        self,
+        run_id: Optional[UUID],
+        parent_run_id: Optional[UUID],
+        name: str,
+        kind: int,
+        attributes: Dict[str, Any],
+    ) -> None:
+        if run_id is None:
+            return
+        span = tracing.tracer.start_span(
+            name, kind, attributes, parent=self._spans.get(parent_run_id)
+        )
+        if span is not None:
+            self._spans[run_id] = span
+
+    def _end(
+        self, run_id: Optional[UUID], error: Optional[BaseException] = None
+    ) -> Optional[Span]:
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            if error is not None:
+                span.record_error(error)
+            span.end()
+        return span
+
+    def on_llm_start(
+        self,
+        serialized: Dict[str, Any],
+        prompts: List[str],
+        *,
+        run_id: Optional[UUID] = None,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or "unknown"
+        self._start(
+            run_id,
+            parent_run_id,
+            f"chat {model}",
+            SPAN_KIND_CLIENT,
+            {
+                "gen_ai.operation.name": "chat",
+                "gen_ai.request.model": model,
+                "llm.prompt_chars": sum(len(prompt) for prompt in prompts),
+            },
+        )
+
+    def on_llm_new_token(
+        self, token: str, *, run_id: Optional[UUID] = None, **kwargs: Any
+    ) -> None:
+        span = self._spans.get(run_id)
+        if span is not None and "llm.time_to_first_token_ms" not in span.attributes:
+            span.attributes["llm.time_to_first_token_ms"] = round(
+                (time.time_ns() - span.start_ns) / 1e6, 1
+            )
+
+    def on_llm_end(
+        self, response: LLMResult, *, run_id: Optional[UUID] = None, **kwargs: Any
+    ) -> None:
+        span = self._spans.get(run_id)
+        if span is not None:
+            token_usage = extract_token_usage(response)
+            if token_usage:
+                span.set_attribute(
+                    "gen_ai.usage.input_tokens", token_usage["prompt_tokens"]
+                )
+                span.set_attribute(
+                    "gen_ai.usage.output_tokens", token_usage["completion_tokens"]
+                )
+        self._end(run_id)
+
+    def on_llm_error(
+        self,
+        error: Union[Exception, KeyboardInterrupt],
+        *,
+        run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._end(run_id, error)
+
+    def on_tool_start(
+        self,
+        serialized: Dict[str, Any],
+        input_str: str,
+        *,
+        run_id: Optional[UUID] = None,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        tool = (serialized or {}).get("name", "unknown")
+        self._start(
+            run_id,
+            parent_run_id,
+            f"execute_tool {tool}",
+            SPAN_KIND_INTERNAL,
+            {"gen_ai.operation.name": "execute_tool", "gen_ai.tool.name": tool},
+        )
+
+    def on_tool_end(
+        self, output: Any, *, run_id: Optional[UUID] = None, **kwargs: Any
+    ) -> None:
+        span = self._spans.get(run_id)
+        if span is not None:
+            span.set_attribute("tool.output_chars", len(str(output)))
+        self._end(run_id)
+
+    def on_tool_error(
+        self,
+        error: Union[Exception, KeyboardInterrupt],
+        *,
+        run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._end(run_id, error)
+
+
+def get_tracing_callbacks() -> List[TracingCallbackHandler]:
+    """Callbacks recording a turn's LLM and tool calls as spans.
+
+    Empty unless the current request is traced, so untraced turns pay
+    nothing per callback event.
+    """
+    if tracing.current_span() is None:
+        return []
+    return [TracingCallbackHandler()]
 
 
 _llm_callback_handler_instance = None
@@ -277,31 +494,26 @@ def get_llm_callback_handler() -> LLMDetailedCallbackHandler:
     """
     global _llm_callback_handler_instance
     if _llm_callback_handler_instance is None:
-        _llm_callback_handler_instance = LLMDetailedCallbackHandler()
+        _llm_callback_handler_instance = LLMDetailedCallbackHandler(
+            body_sample_rate=settings.LOG_BODY_SAMPLE_RATE,
+            body_max_chars=settings.LOG_BODY_MAX_CHARS,
+        )
     return _llm_callback_handler_instance
 
 
-def get_last_token_usage() -> Optional[Dict[str, int]]:
-    """
-    Get token usage from last LLM invocation.
-
-    Returns:
-        Dictionary with 'prompt_tokens', 'completion_tokens', 'total_tokens' or None.
-    """
-    handler = get_llm_callback_handler()
-    return handler.get_last_token_usage()
-
-
 def set_session_id_for_logging(session_id: str):
     """
     Set session ID for the current request context.
 
     This should be called before invoking the agent and cleared after completion.
 
+    Also tags the request's trace spans with the session.
+
     Args:
         session_id: Current session ID to include in logs.
     """
     _current_session_id.set(session_id)
+    tracing.set_session_id(session_id)
 
 
 def clear_session_id_for_logging():
@@ -311,3 +523,4 @@ def clear_session_id_for_logging():
     This should be called after agent invocation completes.
     """
     _current_session_id.set(None)
+    tracing.set_session_id(None)
@@ -1,8 +1,10 @@
 import asyncio
 from typing import List, Optional
 
+from backend.agent.budget import TurnBudget, clear_turn_budget, set_turn_budget
 from backend.agent.callback_handler import get_llm_callback_handler
-from backend.agent.factory import AgentFactory
+from backend.agent.streaming import FinalAnswerStreamHandler
+from langchain_core.callbacks import BaseCallbackHandler
 from langchain_core.messages import BaseMessage
 
 llm_callback_handler = get_llm_callback_handler()
@@ -14,7 +16,12 @@ async def chat_async(
     enable_memory: bool = False,
     chat_history: Optional[List[BaseMessage]] = None,
     stop_event=None,
+    budget: Optional[TurnBudget] = None,
+    callbacks: Optional[List[BaseCallbackHandler]] = None,
 ):
+    # Imported on first use: the factory pulls in the agent and model stack
+    from backend.agent.factory import AgentFactory
+
     agent_executor = AgentFactory.get_executor(
         streaming=False,
         enable_tools=enable_tools,
@@ -23,26 +30,31 @@ async def chat_async(
     inputs = {"input": question}
     if enable_memory:
         inputs["chat_history"] = chat_history
+    config = {"callbacks": callbacks or []}
 
-    if stop_event is not None:
-        invoke_task = asyncio.create_task(agent_executor.ainvoke(inputs))
+    set_turn_budget(budget)
+    try:
+        if stop_event is not None:
+            invoke_task = asyncio.create_task(agent_executor.ainvoke(inputs, config))
 
-        done, pending = await asyncio.wait(
-            [invoke_task, asyncio.create_task(stop_event.wait())],
-            return_when=asyncio.FIRST_COMPLETED,
-        )
+            done, pending = await asyncio.wait(
+                [invoke_task, asyncio.create_task(stop_event.wait())],
+                return_when=asyncio.FIRST_COMPLETED,
+            )
 
-        for task in pending:
-            task.cancel()
+            for task in pending:
+                task.cancel()
 
-        if stop_event.is_set():
-            if not invoke_task.done():
-                invoke_task.cancel()
-            raise asyncio.CancelledError("Chat generation cancelled by user")
+            if stop_event.is_set():
+                if not invoke_task.done():
+                    invoke_task.cancel()
+                raise asyncio.CancelledError("Chat generation cancelled by user")
 
-        result = await invoke_task
-    else:
-        result = await agent_executor.ainvoke(inputs)
+            result = await invoke_task
+        else:
+            result = await agent_executor.ainvoke(inputs, config)
+    finally:
+        clear_turn_budget()
 
     return result
 
@@ -52,7 +64,11 @@ async def chat_async_stream(
     enable_tools: bool = True,
     enable_memory: bool = False,
     chat_history: Optional[List[BaseMessage]] = None,
+    budget: Optional[TurnBudget] = None,
+    callbacks: Optional[List[BaseCallbackHandler]] = None,
 ):
+    from backend.agent.factory import AgentFactory
+
     agent_executor = AgentFactory.get_executor(
         streaming=True,
         enable_tools=enable_tools,
@@ -62,5 +78,66 @@ async def chat_async_stream(
     if enable_memory:
         inputs["chat_history"] = chat_history
 
-    async for chunk in agent_executor.astream(inputs):
-        yield chunk
+    set_turn_budget(budget)
+    try:
+        if enable_tools:
+            async for chunk in _astream_with_final_answer(
+                agent_executor, inputs, callbacks
+            ):
+                yield chunk
+        else:
+            async for chunk in agent_executor.astream(
+                inputs, config={"callbacks": callbacks or []}
+            ):
+                yield chunk
+    finally:
+        clear_turn_budget()
+
+
+_STREAM_DONE = object()
+
+
+async def _astream_with_final_answer(agent_executor, inputs, callbacks=None):
+    """Merge executor chunks with tokens parsed by FinalAnswerStreamHandler.
+
+    Yields the executor's own chunks plus ``{"thought": ...}`` and
+    ``{"answer_delta": ...}`` chunks as soon as the LLM produces them.
+    Answer text is only confirmed by the ``output`` chunk: if the LLM call
+    that streamed it turns out to be a tool call or a parse failure instead,
+    ``{"answer_reset": True}`` is yielded before its chunk to take the text
+    back.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    handler = FinalAnswerStreamHandler(queue)
+
+    async def produce():
+        try:
+            async for chunk in agent_executor.astream(
+                inputs, config={"callbacks": [handler, *(callbacks or [])]}
+            ):
+                queue.put_nowait(chunk)
+        except Exception as exc:
+            queue.put_nowait(exc)
+        finally:
+            queue.put_nowait(_STREAM_DONE)
+
+    producer = asyncio.create_task(produce())
+    answer_pending = False
+    try:
+        while True:
+            item = await queue.get()
+            if item is _STREAM_DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            if "answer_delta" in item:
+                answer_pending = True
+            elif answer_pending and ("actions" in item or "steps" in item):
+                answer_pending = False
+                yield {"answer_reset": True}
+            elif "output" in item:
+                answer_pending = False
+            yield item
+    finally:
+        if not producer.done():
+            producer.cancel()
@@ -0,0 +1,241 @@
+"""Agent executor used by AgentFactory.
+
+``ChatAgentExecutor`` extends LangChain's ``AgentExecutor`` with behaviour the
+stock loop does not have. The executors are cached and shared across requests,
+so per-turn state (such as the time budget) is read from context variables
+rather than stored on the instance.
+"""
+
+import asyncio
+import contextvars
+from contextlib import aclosing
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Tuple,
+)
+
+from backend.agent.budget import TurnBudget, get_turn_budget
+from backend.agent.loop_guard import action_key, get_loop_stats, scan_steps
+from backend.agent.observations import compact_observations
+from backend.agent.scratchpad import compact_scratchpad
+from backend.agent.tool_pool import TOOL_ERROR_PREFIX
+from backend.agent.tool_timing import set_current_action
+from langchain_classic.agents import AgentExecutor
+from langchain_core.agents import AgentAction, AgentFinish, AgentStep
+from langchain_core.callbacks import AsyncCallbackManagerForChainRun
+from langchain_core.tools import BaseTool
+
+BUDGET_NOTICE = (
+    "The time budget for this question is almost used up. "
+    "Do not call any more tools. "
+    "Give your final answer now, using only the information gathered above."
+)
+
+LOOP_NOTICE = (
+    "You are repeating tool calls that were already answered above. "
+    "Do not call any more tools. "
+    "Give your final answer now, using only the information gathered above."
+)
+
+# Answers given when the model still asks for a tool after a notice; the
+# observations are not shown to the user raw
+BUDGET_FALLBACK = (
+    "抱歉，这个问题的处理时间已用完，未能整理出最终答案。"
+    "请稍后重试，或把问题问得更具体一些。"
+)
+
+LOOP_FALLBACK = (
+    "抱歉，我一直在重复相同的查询，未能整理出最终答案。"
+    "请换一种问法，或补充更多细节后重试。"
+)
+
+REPEAT_NOTICE = (
+    "(This is the same call as an earlier step, so its result was reused. "
+    "Use it, try something different, or give your final answer.)"
+)
+
+# Tool results of the current turn, set around each step so that
+# _aperform_agent_action can answer repeated calls
+_turn_memo: contextvars.ContextVar[Optional[Dict[Hashable, Any]]] = (
+    contextvars.ContextVar("_turn_memo", default=None)
+)
+
+
+class ChatAgentExecutor(AgentExecutor):
+    """AgentExecutor that honours the per-turn time budget.
+
+    When the active ``TurnBudget`` runs into its finalize reserve, the next
+    planning call gets a notice appended to the latest observation. If the
+    model still asks for a tool, the tool is not executed and the turn ends
+    with ``BUDGET_FALLBACK``. The loop stops outright once the deadline has
+    passed.
+
+    Each planning call is also cut off at the deadline, and each tool call
+    where the finalize reserve begins, so one slow call cannot overrun the
+    budget. A tool cut off this way returns an error observation and the
+    agent is asked to answer; a planning call cut off ends the turn with
+    ``BUDGET_FALLBACK``.
+
+    Repeated tool calls are answered from a per-turn memo, and after
+    ``loop_max_repeats`` repeats the agent is forced to answer the same way
+    (see ``backend.agent.loop_guard``).
+
+    Observations are fitted into ``observation_token_budget`` tokens (per
+    tool, see ``backend.agent.observations``) before each planning call, and
+    older steps are digested once the scratchpad passes
+    ``scratchpad_token_threshold`` (see ``backend.agent.scratchpad``). The
+    yielded steps keep the full observations.
+    """
+
+    observation_token_budget: int = 0
+    """Default token budget per observation in the prompt; 0 disables it."""
+
+    scratchpad_token_threshold: int = 0
+    """Scratchpad size that triggers compaction of older steps; 0 disables it."""
+
+    loop_max_repeats: int = 0
+    """Repeated calls after which a final answer is forced; 0 disables it."""
+
+    def _should_continue(self, iterations: int, time_elapsed: float) -> bool:
+        budget = get_turn_budget()
+        if budget is not None and (budget.expired() or budget.finalized):
+            return False
+        return super()._should_continue(iterations, time_elapsed)
+
+    async def _aiter_next_step(
+        self,
+        name_to_tool_map: Dict[str, BaseTool],
+        color_mapping: Dict[str, str],
+        inputs: Dict[str, str],
+        intermediate_steps: List[Tuple[AgentAction, str]],
+        run_manager: AsyncCallbackManagerForChainRun | None = None,
+    ) -> AsyncIterator[AgentFinish | AgentAction | AgentStep]:
+        prompt_steps = compact_observations(
+            intermediate_steps, name_to_tool_map, self.observation_token_budget
+        )
+        prompt_steps = compact_scratchpad(
+            prompt_steps, self.scratchpad_token_threshold
+        )
+        memo, repeats = scan_steps(intermediate_steps)
+
+        notice = None
+        budget = get_turn_budget()
+        if intermediate_steps and budget is not None and budget.should_finalize():
+            budget.mark_finalized()
+            notice = BUDGET_NOTICE
+            fallback = BUDGET_FALLBACK
+        elif self.loop_max_repeats and repeats >= self.loop_max_repeats:
+            loop_stats = get_loop_stats()
+            if loop_stats is not None:
+                loop_stats.record_forced_final()
+            notice = LOOP_NOTICE
+            fallback = LOOP_FALLBACK
+
+        if notice is not None:
+            prompt_steps = _with_notice(prompt_steps, notice)
+
+        _turn_memo.set(memo)
+        try:
+            async with aclosing(
+                super()._aiter_next_step(
+                    name_to_tool_map,
+                    color_mapping,
+                    inputs,
+                    prompt_steps,
+                    run_manager,
+                )
+            ) as steps:
+                try:
+                    # The first step comes out of the planning call
+                    step = await _within_deadline(anext(steps), budget)
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    if budget is None or not budget.expired():
+                        raise
+                    budget.mark_finalized()
+                    yield self._forced_finish(BUDGET_FALLBACK)
+                    return
+                if notice is not None and isinstance(step, AgentAction):
+                    # The model still wants a tool; answer from what we have.
+                    yield self._forced_finish(fallback)
+                    return
+                yield step
+                async for step in steps:
+                    yield step
+        finally:
+            _turn_memo.set(None)
+
+    async def _aperform_agent_action(
+        self,
+        name_to_tool_map: Dict[str, BaseTool],
+        color_mapping: Dict[str, str],
+        agent_action: AgentAction,
+        run_manager: AsyncCallbackManagerForChainRun | None = None,
+    ) -> AgentStep:
+        memo = _turn_memo.get()
+        key = action_key(agent_action)
+        if memo is None or key not in memo:
+            # Lets ToolTimingHandler match the tool run to this action; each
+            # action runs in its own task, so the value does not leak
+            set_current_action(agent_action)
+            perform = super()._aperform_agent_action(
+                name_to_tool_map, color_mapping, agent_action, run_manager
+            )
+            budget = get_turn_budget()
+            if budget is None:
+                return await perform
+            # The finalize reserve is kept for the final answer
+            timeout = max(0.0, budget.remaining() - budget.reserve_seconds)
+            try:
+                return await asyncio.wait_for(perform, timeout)
+            except asyncio.TimeoutError:
+                return AgentStep(
+                    action=agent_action,
+                    observation=(
+                        f"{TOOL_ERROR_PREFIX}{agent_action.tool} did not finish "
+                        "within the time budget for this question"
+                    ),
+                )
+
+        if run_manager:
+            await run_manager.on_agent_action(
+                agent_action, verbose=self.verbose, color="green"
+            )
+        loop_stats = get_loop_stats()
+        if loop_stats is not None:
+            loop_stats.record_repeat()
+        return AgentStep(
+            action=agent_action, observation=f"{memo[key]}\n\n{REPEAT_NOTICE}"
+        )
+
+    def _forced_finish(self, output: str) -> AgentFinish:
+        """Finish the turn with ``output`` in place of the model's answer."""
+        return_value_key = "output"
+        if len(self._action_agent.return_values) > 0:
+            return_value_key = self._action_agent.return_values[0]
+        return AgentFinish({return_value_key: output}, output)
+
+
+async def _within_deadline(step: Awaitable[Any], budget: Optional[TurnBudget]) -> Any:
+    """Await ``step``, cut off at the budget's deadline if there is one."""
+    if budget is None:
+        return await step
+    return await asyncio.wait_for(step, budget.remaining())
+
+
+def _with_notice(
+    intermediate_steps: List[Tuple[AgentAction, Any]], notice: str
+) -> List[Tuple[AgentAction, str]]:
+    """Append ``notice`` to the latest observation."""
+    action, observation = intermediate_steps[-1]
+    return [
+        *intermediate_steps[:-1],
+        (action, f"{observation}\n\n{notice}"),
+    ]
@@ -9,6 +9,8 @@ Uses a class-based cache to avoid re-initializing agents on each request.
 import os
 
 from backend.agent.callback_handler import get_llm_callback_handler
+from backend.agent.executor import ChatAgentExecutor
+from backend.agent.tool_selection import bind_tool_selection
 from backend.agent.tools import ToolRegistry
 from backend.config import settings
 from backend.prompts import (
@@ -16,16 +18,16 @@ from backend.prompts import (
     custom_json_prompt_with_memory,
     custom_no_tools_prompt,
     custom_no_tools_prompt_with_memory,
-    react_prompt,
 )
+from backend.prompts.bundle import REACT_PROMPT, get_prompt
 from langchain_classic.agents import (
     AgentExecutor,
     create_json_chat_agent,
     create_react_agent,
 )
 from langchain_community.chat_models.zhipuai import ChatZhipuAI
-from langchain_core.callbacks import StreamingStdOutCallbackHandler
-from langchain_core.runnables import RunnableLambda
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 
 os.environ["ZHIPUAI_API_KEY"] = settings.ZHIPUAI_API_KEY
 os.environ["TAVILY_API_KEY"] = settings.TAVILY_API_KEY
@@ -74,26 +76,16 @@ class AgentFactory:
         )
         agent = None
 
+        llm = AgentFactory.create_llm(streaming)
         if streaming:
-            llm = ChatZhipuAI(
-                model=settings.MODEL_NAME,
-                temperature=settings.TEMPERATURE,
-                streaming=True,
-                callbacks=[
-                    StreamingStdOutCallbackHandler(),
-                    get_llm_callback_handler(),
-                ],
-            )
             if enable_tools:
-                agent = create_react_agent(llm=llm, tools=tools, prompt=react_prompt)
+                agent = create_react_agent(
+                    llm=llm, tools=tools, prompt=get_prompt(REACT_PROMPT)
+                )
+                agent = bind_tool_selection(agent, tools)
             else:
                 agent = default_prompt_template | llm
         else:
-            llm = ChatZhipuAI(
-                model=settings.MODEL_NAME,
-                temperature=settings.TEMPERATURE,
-                callbacks=[get_llm_callback_handler()],
-            )
             if enable_tools:
                 prompt_template = (
                     custom_json_prompt_with_memory
@@ -101,23 +93,27 @@ class AgentFactory:
                     else custom_json_prompt
                 )
                 agent = create_json_chat_agent(llm, tools, prompt_template)
+                agent = bind_tool_selection(agent, tools)
             else:
                 agent = default_prompt_template | llm
 
         if enable_tools:
-            agent_executor = AgentExecutor(
+            agent_executor = ChatAgentExecutor(
                 agent=agent,
                 tools=tools,
-                verbose=True,
                 handle_parsing_errors=True,
                 max_iterations=settings.MAX_ITERATIONS,
+                observation_token_budget=settings.OBSERVATION_TOKEN_BUDGET,
+                scratchpad_token_threshold=settings.SCRATCHPAD_COMPACTION_THRESHOLD,
+                loop_max_repeats=settings.LOOP_MAX_REPEATS,
                 return_intermediate_steps=True,
                 callbacks=[get_llm_callback_handler()],
             )
         else:
 
-            async def simple_executor(inputs):
-                result = await agent.ainvoke(inputs)
+            async def simple_executor(inputs, config: RunnableConfig):
+                # Pass the run config on so per-turn callbacks see the LLM call
+                result = await agent.ainvoke(inputs, config)
                 return {
                     "input": inputs.get("input", ""),
                     "output": result,
@@ -128,3 +124,50 @@ class AgentFactory:
 
         AgentFactory._cache[key] = agent_executor
         return agent_executor
+
+    @staticmethod
+    def create_llm(streaming: bool = False) -> BaseChatModel:
+        """Create the chat model of the configured ``LLM_PROVIDER``.
+
+        "zhipuai" is the real model; "fake" is the scripted stand-in of
+        ``backend.agent.fake_llm``, for load tests without network, and
+        "replay" plays back recorded cassettes (``backend.agent.replay_llm``).
+
+        Raises:
+            ValueError: If LLM_PROVIDER is none of these
+        """
+        if settings.LLM_PROVIDER == "fake":
+            from backend.agent.fake_llm import FakeChatModel
+
+            return FakeChatModel.from_settings(
+                temperature=settings.TEMPERATURE,
+                streaming=streaming,
+                callbacks=[get_llm_callback_handler()],
+            )
+        if settings.LLM_PROVIDER == "replay":
+            from backend.agent.replay_llm import ReplayChatModel
+
+            return ReplayChatModel.from_settings(
+                temperature=settings.TEMPERATURE,
+                streaming=streaming,
+                callbacks=[get_llm_callback_handler()],
+            )
+        if settings.LLM_PROVIDER != "zhipuai":
+            raise ValueError(
+                f"Unknown LLM provider {settings.LLM_PROVIDER!r}; "
+                "use 'zhipuai', 'fake' or 'replay'"
+            )
+        return ChatZhipuAI(
+            model=settings.MODEL_NAME,
+            temperature=settings.TEMPERATURE,
+            streaming=streaming,
+            callbacks=[get_llm_callback_handler()],
+        )
+
+    @staticmethod
+    def clear_cache() -> None:
+        """Drop cached executors so the next request rebuilds them.
+
+        Used after prompts are refreshed, since executors hold their prompt.
+        """
+        AgentFactory._cache.clear()
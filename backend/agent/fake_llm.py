@@ -0,0 +1,363 @@
+"""Deterministic stand-in for ChatZhipuAI, for load tests without network.
+
+Selected with ``LLM_PROVIDER=fake``. The fake answers from a script instead
+of a model, in whichever format the prompt asks for:
+
+- ReAct prompts (streaming agent): ``Action:`` / ``Action Input:`` lines,
+  then ``Final Answer:``
+- JSON chat prompts (non-streaming agent): a fenced ``{"action": ...}`` blob
+- anything else (tools disabled): the answer text
+
+A script is a list of turns. Each turn names the tool calls to make, one per
+agent iteration, and the final answer; ``{question}`` in an input or answer
+is replaced by the user's question. A turn with a ``match`` regex is used
+for questions it matches; other questions get one of the turns without
+``match``, picked by a hash of the question, so the same question always
+plays the same turn::
+
+    [
+      {"match": "weather|天气",
+       "steps": [{"tool": "tavily_search_results_json", "input": "{question}"}],
+       "answer": "It will be sunny."},
+      {"steps": [], "answer": "Hello!"}
+    ]
+
+Output is streamed at ``tokens_per_second`` after a first-token latency
+drawn from ``latency``, and token usage is reported like the real model's.
+Errors and throttling are injected as the HTTP errors ChatZhipuAI raises.
+"""
+
+import asyncio
+import json
+import random
+import re
+import time
+import zlib
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from backend.agent.observations import estimate_tokens
+from backend.config import settings
+from backend.utils.simulation import Latency, injected_fault
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    HumanMessage,
+)
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import ConfigDict, Field, PrivateAttr
+
+FAKE_API_URL = "https://open.bigmodel.cn/api/paas/v4/chat/completions"
+
+# Streamed pieces: one per CJK character, up to 4 other characters, the
+# same granularity as estimate_tokens
+_CJK = r"\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af"
+_TOKEN_RE = re.compile(rf"[{_CJK}]|[^{_CJK}]{{1,4}}")
+
+DEFAULT_SCRIPT: List[Dict[str, Any]] = [
+    {
+        "match": r"\d+\s*[-+*/^]\s*\d+|计算|calculate",
+        "steps": [{"tool": "calculator", "input": "(1234 + 5678) * 3 / 7"}],
+        "answer": "The result is 2962.29. I calculated (1234 + 5678) * 3 / 7 "
+        "with the calculator tool.",
+    },
+    {
+        "steps": [],
+        "answer": "Here is a direct answer to your question. No tool was "
+        "needed: the question can be answered from general knowledge, so I "
+        "summarised the key points in a few sentences and kept it short.",
+    },
+    {
+        "steps": [{"tool": "tavily_search_results_json", "input": "{question}"}],
+        "answer": "According to the search results, the answer depends on a "
+        "few recent developments. The sources agree on the main points, and "
+        "I have summarised them with their links for further reading.",
+    },
+    {
+        "steps": [
+            {"tool": "tavily_search_results_json", "input": "{question}"},
+            {"tool": "tavily_search_results_json", "input": "{question} latest"},
+        ],
+        "answer": "I compared two searches: the first gave the background and "
+        "the second the latest news. Both point to the same conclusion, which "
+        "I have summarised below with the relevant sources.",
+    },
+]
+
+
+class ScriptedTurn:
+    """Tool calls and final answer of one scripted turn."""
+
+    def __init__(
+        self,
+        answer: str,
+        steps: Optional[List[Dict[str, str]]] = None,
+        match: Optional[str] = None,
+        thought: str = "I should use a tool to answer this.",
+    ) -> None:
+        self.answer = answer
+        self.steps = [
+            (step["tool"], step.get("input", "{question}")) for step in steps or []
+        ]
+        self.match = re.compile(match, re.IGNORECASE) if match else None
+        self.thought = thought
+
+
+def load_script(path: str = "") -> List[ScriptedTurn]:
+    """Read a script file, or the built-in script when ``path`` is empty.
+
+    Raises:
+        ValueError: If the script is empty or a turn has no answer
+    """
+    if path:
+        with open(path, encoding="utf-8") as f:
+            turns = json.load(f)
+    else:
+        turns = DEFAULT_SCRIPT
+    if not isinstance(turns, list) or not turns:
+        raise ValueError(f"LLM script {path or '<built-in>'} has no turns")
+    try:
+        return [ScriptedTurn(**turn) for turn in turns]
+    except TypeError as e:
+        raise ValueError(f"Invalid turn in LLM script {path}: {e}") from None
+
+
+def read_prompt(messages: List[BaseMessage]) -> Tuple[str, str, int]:
+    """The answer format a prompt asks for, the question and finished steps.
+
+    Returns:
+        (format, question, steps), format being "react", "json" or "text"
+    """
+    human = [
+        index
+        for index, message in enumerate(messages)
+        if isinstance(message, HumanMessage)
+    ]
+    if not human:
+        return "text", "", 0
+    content = str(messages[human[-1]].content)
+    if "Action Input:" in content and "\nQuestion: " in content:
+        # ReAct: the scratchpad follows the question in the same message
+        tail = content.rsplit("\nQuestion: ", 1)[1]
+        question = tail.split("\nThought:", 1)[0].strip()
+        return "react", question, tail.count("\nObservation:")
+    for index in reversed(human):
+        content = str(messages[index].content)
+        if '"action": "Final Answer"' in content:
+            # JSON chat: each step adds an AI message after the user's input
+            question = content.rsplit("NOTHING else):", 1)[-1].strip()
+            steps = sum(isinstance(m, AIMessage) for m in messages[index + 1 :])
+            return "json", question, steps
+    return "text", content.strip(), 0
+
+
+def _json_blob(action: str, action_input: str) -> str:
+    blob = json.dumps(
+        {"action": action, "action_input": action_input}, ensure_ascii=False, indent=2
+    )
+    return f"```json\n{blob}\n```"
+
+
+class PlaybackChatModel(BaseChatModel):
+    """Chat model that plays back planned output with planned delays.
+
+    Subclasses implement ``_plan``; this class serves the plan through the
+    sync and async, streaming and non-streaming paths alike.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    model: str = "fake"
+    temperature: float = 0.0
+    streaming: bool = False
+
+    def _plan(
+        self, messages: List[BaseMessage], stop: Optional[List[str]]
+    ) -> Tuple[List[Tuple[float, str]], Dict[str, int], Optional[Exception]]:
+        """Output pieces with the delay before each, usage and error to raise.
+
+        A failing call waits out its pieces' delays before the error, as a
+        real request takes a round trip before its error comes back.
+        """
+        raise NotImplementedError
+
+    def _result(
+        self, pieces: List[Tuple[float, str]], usage: Dict[str, int]
+    ) -> ChatResult:
+        message = AIMessage(
+            content="".join(text for _, text in pieces), usage_metadata=usage or None
+        )
+        return ChatResult(
+            generations=[ChatGeneration(message=message)],
+            llm_output={"model_name": self.model},
+        )
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        pieces, usage, error = self._plan(messages, stop)
+        time.sleep(sum(delay for delay, _ in pieces))
+        if error is not None:
+            raise error
+        return self._result(pieces, usage)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        pieces, usage, error = self._plan(messages, stop)
+        await asyncio.sleep(sum(delay for delay, _ in pieces))
+        if error is not None:
+            raise error
+        return self._result(pieces, usage)
+
+    def _chunks(
+        self, pieces: List[Tuple[float, str]], usage: Dict[str, int]
+    ) -> Iterator[Tuple[float, ChatGenerationChunk]]:
+        for index, (delay, text) in enumerate(pieces):
+            last = index == len(pieces) - 1
+            chunk = ChatGenerationChunk(
+                message=AIMessageChunk(
+                    content=text, usage_metadata=usage if last and usage else None
+                )
+            )
+            yield delay, chunk
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        pieces, usage, error = self._plan(messages, stop)
+        if error is not None:
+            time.sleep(sum(delay for delay, _ in pieces))
+            raise error
+        for delay, chunk in self._chunks(pieces, usage):
+            time.sleep(delay)
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        pieces, usage, error = self._plan(messages, stop)
+        if error is not None:
+            await asyncio.sleep(sum(delay for delay, _ in pieces))
+            raise error
+        for delay, chunk in self._chunks(pieces, usage):
+            await asyncio.sleep(delay)
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+class FakeChatModel(PlaybackChatModel):
+    """Scripted chat model with simulated latency, token rate and faults."""
+
+    script: List[ScriptedTurn] = Field(default_factory=load_script)
+    tokens_per_second: float = 50.0
+    latency: Latency = Field(default_factory=lambda: Latency("fixed", 0))
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    seed: int = 0
+
+    _rng: random.Random = PrivateAttr()
+
+    def model_post_init(self, context: Any) -> None:
+        self._rng = random.Random(self.seed)
+
+    @classmethod
+    def from_settings(cls, **kwargs: Any) -> "FakeChatModel":
+        """A fake configured by the ``FAKE_LLM_*`` settings."""
+        return cls(
+            model=settings.MODEL_NAME,
+            script=load_script(settings.FAKE_LLM_SCRIPT),
+            tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND,
+            latency=Latency.parse(settings.FAKE_LLM_LATENCY),
+            error_rate=settings.FAKE_LLM_ERROR_RATE,
+            throttle_rate=settings.FAKE_LLM_THROTTLE_RATE,
+            seed=settings.FAKE_SEED,
+            **kwargs,
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model, "seed": self.seed}
+
+    def choose_turn(self, question: str) -> ScriptedTurn:
+        for turn in self.script:
+            if turn.match and turn.match.search(question):
+                return turn
+        pool = [turn for turn in self.script if not turn.match] or self.script
+        return pool[zlib.crc32(question.encode("utf-8")) % len(pool)]
+
+    def respond(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None
+    ) -> str:
+        """The scripted output for this point of the turn."""
+        answer_format, question, steps = read_prompt(messages)
+        turn = self.choose_turn(question)
+        if answer_format == "text":
+            text = turn.answer
+        elif steps < len(turn.steps):
+            tool, tool_input = turn.steps[steps]
+            tool_input = tool_input.replace("{question}", question)
+            if answer_format == "react":
+                text = f" {turn.thought}\nAction: {tool}\nAction Input: {tool_input}"
+            else:
+                text = _json_blob(tool, tool_input)
+        elif answer_format == "react":
+            text = f" I now know the final answer.\nFinal Answer: {turn.answer}"
+        else:
+            text = _json_blob("Final Answer", turn.answer)
+        text = text.replace("{question}", question)
+        for token in stop or []:
+            text = text.split(token, 1)[0]
+        return text
+
+    def _plan(
+        self, messages: List[BaseMessage], stop: Optional[List[str]]
+    ) -> Tuple[List[Tuple[float, str]], Dict[str, int], Optional[Exception]]:
+        # Drawn in a fixed order so a run is repeatable for a seed
+        first_token = self.latency.sample(self._rng)
+        fault = injected_fault(
+            self._rng, FAKE_API_URL, self.error_rate, self.throttle_rate
+        )
+        if fault is not None:
+            return [(first_token, "")], {}, fault
+        text = self.respond(messages, stop)
+        prompt_tokens = sum(estimate_tokens(str(m.content)) for m in messages)
+        completion_tokens = estimate_tokens(text)
+        usage = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        interval = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        tokens = _TOKEN_RE.findall(text) or [""]
+        pieces = [(first_token, tokens[0])]
+        pieces += [(interval, token) for token in tokens[1:]]
+        return pieces, usage, fault
@@ -0,0 +1,133 @@
+"""Loop detection for the agent executor.
+
+The agent sometimes calls the same tool with the same input again, or
+alternates between two calls, until it runs out of iterations. This is
+common when the ZhipuAI ReAct output fails to parse. Within a turn the
+executor therefore:
+
+- memoizes tool results by (tool, normalized input) and answers repeated
+  calls from the memo instead of running the tool again; failed calls are
+  not memoized, so a retry after a transient failure runs the tool
+- counts repeats, including oscillation (A, B, A, B...) and identical parse
+  failures, and forces a final answer once the count reaches the limit
+
+Loops caught are collected per turn in a ``LoopStats`` held in a context
+variable, the same way as the turn budget and observation stats, and
+counted in the ``agent_loops_total`` metric.
+"""
+
+import contextvars
+import json
+import re
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from backend.agent.tool_pool import TOOL_ERROR_PREFIX
+from backend.utils import metrics
+from langchain_core.agents import AgentAction
+
+PARSE_ERROR_TOOL = "_Exception"
+
+# Failures returned as observations: pool and calculator errors, and the
+# ``repr`` of the exception the search tools return
+_ERROR_OBSERVATION = re.compile(
+    rf"^(?:{re.escape(TOOL_ERROR_PREFIX)}|\w*(?:Error|Exception|Timeout)\()"
+)
+
+
+def is_error_observation(observation: Any) -> bool:
+    """Whether ``observation`` reports a failed tool call."""
+    return isinstance(observation, str) and bool(_ERROR_OBSERVATION.match(observation))
+
+
+def action_key(action: AgentAction) -> Hashable:
+    """Memo key of an action; whitespace and case in inputs are ignored."""
+    tool_input = action.tool_input
+    if isinstance(tool_input, dict):
+        normalized = json.dumps(tool_input, sort_keys=True, ensure_ascii=False)
+    else:
+        normalized = str(tool_input)
+    if action.tool == PARSE_ERROR_TOOL:
+        # Parse failures repeat when the model sends the same broken output
+        normalized = action.log
+    return action.tool, " ".join(normalized.split()).casefold()
+
+
+def scan_steps(
+    intermediate_steps: List[Tuple[AgentAction, Any]],
+) -> Tuple[Dict[Hashable, Any], int]:
+    """Build the tool result memo and count repeated calls so far.
+
+    Returns:
+        Tuple of the memo (key -> first successful observation) and the
+        number of steps whose key already appeared earlier in the turn
+    """
+    memo: Dict[Hashable, Any] = {}
+    seen = set()
+    repeats = 0
+    for action, observation in intermediate_steps:
+        key = action_key(action)
+        if key in seen:
+            repeats += 1
+        seen.add(key)
+        if action.tool != PARSE_ERROR_TOOL and not is_error_observation(observation):
+            memo.setdefault(key, observation)
+    return memo, repeats
+
+
+class LoopStats:
+    """Per-turn record of loops caught by the executor.
+
+    Args:
+        labels: Turn labels (see ``metrics.turn_labels``) loops are counted
+            under in ``agent_loops_total``; not counted when omitted
+    """
+
+    def __init__(self, labels: Optional[Dict[str, str]] = None) -> None:
+        self.repeated_calls = 0
+        self.forced_final = False
+        self.labels = labels
+
+    def record_repeat(self) -> None:
+        """Record a repeated tool call answered from the memo."""
+        self.repeated_calls += 1
+        self._count("repeat")
+
+    def record_forced_final(self) -> None:
+        """Record that the loop limit forced a final answer."""
+        self.forced_final = True
+        self._count("forced_final")
+
+    def _count(self, kind: str) -> None:
+        if self.labels is not None:
+            metrics.agent_loops.inc(kind=kind, **self.labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Serializable view for SSE events and responses.
+
+        Returns:
+            Dictionary with 'repeated_calls' and 'forced_final'
+        """
+        return {
+            "repeated_calls": self.repeated_calls,
+            "forced_final": self.forced_final,
+        }
+
+
+_current_loop_stats: contextvars.ContextVar[Optional[LoopStats]] = (
+    contextvars.ContextVar("_current_loop_stats", default=None)
+)
+
+
+def set_loop_stats(stats: Optional[LoopStats]) -> None:
+    """Collect loop detection stats of the current request context into ``stats``."""
+    _current_loop_stats.set(stats)
+
+
+def get_loop_stats() -> Optional[LoopStats]:
+    """Get the stats collector of the current request context, if any."""
+    return _current_loop_stats.get()
+
+
+def clear_loop_stats() -> None:
+    """Stop collecting after the turn completes."""
+    _current_loop_stats.set(None)
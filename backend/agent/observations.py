@@ -0,0 +1,189 @@
+"""Observation size control for the agent scratchpad.
+
+Tool observations are re-sent to the model on every later iteration of the
+agent loop, so one large search result is paid for several times. Before each
+planning call the executor passes the observations through
+``compact_observations``, which keeps each one within a per-tool token budget:
+
+- Result lists (Tavily, local search) keep the title, URL/source and a short
+  snippet of the top results, drop raw content and other fields, and cut off
+  trailing results that do not fit.
+- Other observations are cut to the budget with a marker saying how much
+  was omitted.
+
+Only the prompt sees the compacted form. The executor still records the full
+observation, so SSE events and ``ToolStep`` rows keep the complete output.
+Tokens saved are collected per turn in an ``ObservationStats`` held in a
+context variable, like the turn budget.
+"""
+
+import contextvars
+import math
+import re
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from langchain_core.agents import AgentAction
+from langchain_core.tools import BaseTool
+
+# Fields kept for each search result; everything else (raw_content, score,
+# images...) is dropped once an observation is over budget.
+RESULT_FIELDS = ("title", "url", "source", "doc_id")
+SNIPPET_FIELDS = ("content", "snippet")
+SNIPPET_CHARS = 300
+
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: one per CJK character, one per 4 other characters."""
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def _clip(text: str, max_chars: int) -> str:
+    return text if len(text) <= max_chars else text[:max_chars].rstrip() + "..."
+
+
+def _compact_result(item: Mapping[str, Any], snippet_chars: int) -> Dict[str, Any]:
+    compact = {field: item[field] for field in RESULT_FIELDS if item.get(field)}
+    for field in SNIPPET_FIELDS:
+        if item.get(field):
+            compact[field] = _clip(str(item[field]), snippet_chars)
+            break
+    return compact
+
+
+def _truncate_results(results: List[Any], budget: int) -> List[Any]:
+    compacted = [
+        _compact_result(item, SNIPPET_CHARS) if isinstance(item, Mapping) else item
+        for item in results
+    ]
+    kept: List[Any] = []
+    used = 0
+    for item in compacted:
+        cost = estimate_tokens(str(item))
+        if used + cost > budget:
+            break
+        kept.append(item)
+        used += cost
+
+    if not kept and compacted:
+        # Not even the first result fits: shrink its snippet instead
+        first = compacted[0]
+        if isinstance(first, Mapping):
+            overhead = estimate_tokens(str(_compact_result(first, 0)))
+            first = _compact_result(results[0], max(0, (budget - overhead) * 2))
+        else:
+            first = _truncate_text(str(first), budget)
+        kept = [first]
+
+    omitted = len(results) - len(kept)
+    if omitted:
+        kept.append({"note": f"{omitted} more results omitted"})
+    return kept
+
+
+def _truncate_text(text: str, budget: int) -> str:
+    tokens = estimate_tokens(text)
+    if tokens <= budget:
+        return text
+    keep_chars = int(len(text) * budget / tokens)
+    omitted = tokens - estimate_tokens(text[:keep_chars])
+    return f"{text[:keep_chars]}\n...[truncated, about {omitted} tokens omitted]"
+
+
+def truncate_observation(observation: Any, budget: int) -> Tuple[Any, int]:
+    """Fit ``observation`` into ``budget`` tokens.
+
+    Args:
+        observation: Tool output as returned by the tool
+        budget: Maximum estimated tokens for the observation in the prompt
+
+    Returns:
+        Tuple of the (possibly) compacted observation and the number of
+        tokens saved. Observations already within budget are returned as is.
+    """
+    full_tokens = estimate_tokens(str(observation))
+    if budget <= 0 or full_tokens <= budget:
+        return observation, 0
+    if isinstance(observation, list):
+        compacted: Any = _truncate_results(observation, budget)
+    else:
+        compacted = _truncate_text(str(observation), budget)
+    return compacted, max(0, full_tokens - estimate_tokens(str(compacted)))
+
+
+class ObservationStats:
+    """Per-turn record of observation truncation."""
+
+    def __init__(self) -> None:
+        self.tokens_saved = 0
+        self.scratchpad_tokens_saved = 0
+        self._truncated_steps: set = set()
+
+    def record(self, step_index: int, tokens_saved: int) -> None:
+        """Record savings for one observation in one planning call."""
+        if tokens_saved:
+            self.tokens_saved += tokens_saved
+            self._truncated_steps.add(step_index)
+
+    def record_compaction(self, tokens_saved: int) -> None:
+        """Record savings from scratchpad compaction in one planning call."""
+        self.scratchpad_tokens_saved += tokens_saved
+
+    def snapshot(self) -> Dict[str, int]:
+        """Serializable view for SSE events and responses.
+
+        Returns:
+            Dictionary with 'truncated_observations', 'tokens_saved' (summed
+            over every planning call that re-sent an observation) and
+            'scratchpad_tokens_saved' (from scratchpad compaction).
+        """
+        return {
+            "truncated_observations": len(self._truncated_steps),
+            "tokens_saved": self.tokens_saved,
+            "scratchpad_tokens_saved": self.scratchpad_tokens_saved,
+        }
+
+
+_current_observation_stats: contextvars.ContextVar[Optional[ObservationStats]] = (
+    contextvars.ContextVar("_current_observation_stats", default=None)
+)
+
+
+def set_observation_stats(stats: Optional[ObservationStats]) -> None:
+    """Collect truncation stats of the current request context into ``stats``."""
+    _current_observation_stats.set(stats)
+
+
+def get_observation_stats() -> Optional[ObservationStats]:
+    """Get the stats collector of the current request context, if any."""
+    return _current_observation_stats.get()
+
+
+def clear_observation_stats() -> None:
+    """Stop collecting after the turn completes."""
+    _current_observation_stats.set(None)
+
+
+def compact_observations(
+    intermediate_steps: List[Tuple[AgentAction, Any]],
+    name_to_tool_map: Mapping[str, BaseTool],
+    default_budget: int,
+) -> List[Tuple[AgentAction, Any]]:
+    """Apply each tool's observation budget to the scratchpad steps.
+
+    Tools can override ``default_budget`` with
+    ``metadata["observation_token_budget"]``.
+    """
+    stats = get_observation_stats()
+    compacted = []
+    for index, (action, observation) in enumerate(intermediate_steps):
+        tool = name_to_tool_map.get(action.tool)
+        metadata = (tool.metadata if tool is not None else None) or {}
+        budget = metadata.get("observation_token_budget", default_budget)
+        observation, saved = truncate_observation(observation, budget)
+        if stats is not None:
+            stats.record(index, saved)
+        compacted.append((action, observation))
+    return compacted
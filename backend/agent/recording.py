@@ -0,0 +1,181 @@
+"""Cassette recording of chat turns.
+
+``CassetteRecorder`` is a callback handler created for one chat turn when
+``CASSETTE_RECORD`` is on. It records every LLM call of the turn (prompt,
+response, the offset of each streamed chunk, usage or error) and every tool
+call (input, output, duration) into a ``Cassette``, which is also set as the
+turn's current cassette so the search tools add their API requests to it.
+The chat service saves the cassette when the turn ends.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from backend.agent.token_usage import extract_token_usage
+from backend.config import settings
+from backend.utils.cassettes import (
+    Cassette,
+    clear_cassette,
+    set_cassette,
+    to_jsonable,
+)
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+
+logger = logging.getLogger(__name__)
+
+# Turns ending otherwise (cancelled, disconnected) are not worth replaying
+SAVED_STATUSES = ("completed", "error")
+
+
+def _elapsed_ms(started: float) -> int:
+    return int((time.perf_counter() - started) * 1000)
+
+
+def _error(error: BaseException) -> Dict[str, Any]:
+    response = getattr(error, "response", None)
+    return {
+        "type": type(error).__name__,
+        "message": str(error),
+        "status": getattr(response, "status_code", None),
+    }
+
+
+class CassetteRecorder(AsyncCallbackHandler):
+    """Records the LLM and tool calls of one turn into a cassette."""
+
+    def __init__(self, cassette: Cassette) -> None:
+        super().__init__()
+        self.cassette = cassette
+        self._llm_calls: Dict[UUID, tuple] = {}
+        self._tool_calls: Dict[UUID, tuple] = {}
+
+    async def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[BaseMessage]],
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> None:
+        prompt = [
+            {"role": message.type, "content": str(message.content)}
+            for message in messages[0]
+        ]
+        self._start_llm(run_id, prompt, kwargs)
+
+    async def on_llm_start(
+        self,
+        serialized: Dict[str, Any],
+        prompts: List[str],
+        *,
+        run_id: UUID,
+        **kwargs: Any,
+    ) -> None:
+        self._start_llm(run_id, [{"role": "human", "content": prompts[0]}], kwargs)
+
+    def _start_llm(
+        self, run_id: UUID, prompt: List[Dict[str, str]], kwargs: Dict[str, Any]
+    ) -> None:
+        params = kwargs.get("invocation_params") or {}
+        call = {
+            "model": params.get("model") or params.get("model_name"),
+            "prompt": prompt,
+            "response": "",
+            "chunks": [],
+            "duration_ms": None,
+            "usage": None,
+            "error": None,
+        }
+        self._llm_calls[run_id] = (time.perf_counter(), call)
+
+    async def on_llm_new_token(
+        self, token: str, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        if token and run_id in self._llm_calls:
+            started, call = self._llm_calls[run_id]
+            call["chunks"].append([_elapsed_ms(started), token])
+
+    async def on_llm_end(
+        self, response: LLMResult, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        if run_id not in self._llm_calls:
+            return
+        started, call = self._llm_calls.pop(run_id)
+        generations = response.generations[0] if response.generations else []
+        call["response"] = generations[0].text if generations else ""
+        call["duration_ms"] = _elapsed_ms(started)
+        call["usage"] = extract_token_usage(response)
+        self.cassette.llm_calls.append(call)
+
+    async def on_llm_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        if run_id not in self._llm_calls:
+            return
+        started, call = self._llm_calls.pop(run_id)
+        call["duration_ms"] = _elapsed_ms(started)
+        call["error"] = _error(error)
+        self.cassette.llm_calls.append(call)
+
+    async def on_tool_start(
+        self,
+        serialized: Dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        inputs: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        call = {
+            "tool": (serialized or {}).get("name") or kwargs.get("name", "unknown"),
+            "input": to_jsonable(inputs) if inputs else input_str,
+            "output": None,
+            "duration_ms": None,
+            "error": None,
+        }
+        self._tool_calls[run_id] = (time.perf_counter(), call)
+
+    async def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        if run_id not in self._tool_calls:
+            return
+        started, call = self._tool_calls.pop(run_id)
+        call["output"] = to_jsonable(output)
+        call["duration_ms"] = _elapsed_ms(started)
+        self.cassette.tool_calls.append(call)
+
+    async def on_tool_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        if run_id not in self._tool_calls:
+            return
+        started, call = self._tool_calls.pop(run_id)
+        call["duration_ms"] = _elapsed_ms(started)
+        call["error"] = _error(error)
+        self.cassette.tool_calls.append(call)
+
+    async def finish(self, status: str) -> None:
+        """End recording and save the cassette if the turn is worth replaying."""
+        clear_cassette()
+        if status not in SAVED_STATUSES or not self.cassette.llm_calls:
+            return
+        self.cassette.status = status
+        try:
+            path = await asyncio.to_thread(self.cassette.save, settings.CASSETTE_DIR)
+        except OSError as e:
+            logger.warning(f"Could not save cassette: {e}")
+            return
+        logger.debug(f"Saved cassette {path}")
+
+
+def start_recording(question: str, streaming: bool) -> Optional[CassetteRecorder]:
+    """A recorder for this turn if ``CASSETTE_RECORD`` is on, else None."""
+    if not settings.CASSETTE_RECORD:
+        return None
+    cassette = Cassette(question, streaming)
+    set_cassette(cassette)
+    return CassetteRecorder(cassette)
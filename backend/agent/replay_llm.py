@@ -0,0 +1,149 @@
+"""Chat model played back from recorded cassettes.
+
+Selected with ``LLM_PROVIDER=replay``. Every LLM call recorded in
+``CASSETTE_DIR`` (``backend/utils/cassettes.py``) is indexed by what its
+prompt asks for: the answer format, the user's question and how many agent
+steps were already done (``read_prompt``). A call is answered with the
+recorded call of the same turn and step:
+
+- the turn is the recording of the same question in the same format, or
+  else one picked by a hash of the question, so a question always replays
+  the same recording
+- past the recorded steps, the turn's last call is replayed
+
+The response is streamed in the recorded chunks at their recorded offsets,
+times ``time_scale`` (0 replays without delays), with the recorded usage;
+recorded errors are raised again. Tool inputs in the responses are the
+recorded ones, so searches hit the recordings of ``SEARCH_PROVIDER=replay``.
+"""
+
+import threading
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.agent.fake_llm import FAKE_API_URL, PlaybackChatModel, read_prompt
+from backend.config import settings
+from backend.utils.cassettes import CassetteLibrary, cassette_library
+from backend.utils.simulation import http_status_error
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+)
+from pydantic import Field, PrivateAttr
+
+_MESSAGE_TYPES = {"system": SystemMessage, "human": HumanMessage, "ai": AIMessage}
+
+# Recorded turns by answer format: (question, recorded calls by step)
+_Index = Dict[str, List[Tuple[str, Dict[int, Dict[str, Any]]]]]
+
+
+class ReplayChatModel(PlaybackChatModel):
+    """Chat model answering with recorded responses and timings."""
+
+    library: CassetteLibrary = Field(default_factory=lambda: cassette_library)
+    time_scale: float = 1.0
+
+    _index: Optional[_Index] = PrivateAttr(default=None)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @classmethod
+    def from_settings(cls, **kwargs: Any) -> "ReplayChatModel":
+        """A replayer configured by the ``CASSETTE_*`` settings."""
+        return cls(
+            model=settings.MODEL_NAME,
+            library=cassette_library,
+            time_scale=settings.CASSETTE_TIME_SCALE,
+            **kwargs,
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay-chat-model"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model": self.model, "cassette_dir": self.library.directory}
+
+    def _turns(self) -> _Index:
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = self._build_index()
+        return self._index
+
+    def _build_index(self) -> _Index:
+        index: _Index = {}
+        for cassette in self.library.cassettes():
+            turns: Dict[Tuple[str, str], Dict[int, Dict[str, Any]]] = {}
+            for call in cassette.llm_calls:
+                messages = [
+                    _MESSAGE_TYPES.get(message["role"], HumanMessage)(
+                        content=message["content"]
+                    )
+                    for message in call["prompt"]
+                ]
+                answer_format, question, steps = read_prompt(messages)
+                # A retried step keeps its first recording
+                turns.setdefault((answer_format, question), {}).setdefault(
+                    steps, call
+                )
+            for (answer_format, question), calls in turns.items():
+                index.setdefault(answer_format, []).append((question, calls))
+        return index
+
+    def choose_call(self, messages: List[BaseMessage]) -> Dict[str, Any]:
+        """The recorded call to replay for this point of the turn.
+
+        Raises:
+            RuntimeError: If no call was recorded in the prompt's format
+        """
+        answer_format, question, steps = read_prompt(messages)
+        turns = self._turns().get(answer_format)
+        if not turns:
+            raise RuntimeError(
+                f"No {answer_format} LLM calls recorded in {self.library.directory}"
+            )
+        calls = next(
+            (calls for recorded, calls in turns if recorded == question),
+            None,
+        )
+        if calls is None:
+            calls = turns[zlib.crc32(question.encode("utf-8")) % len(turns)][1]
+        return calls.get(steps) or calls[max(calls)]
+
+    def _plan(
+        self, messages: List[BaseMessage], stop: Optional[List[str]]
+    ) -> Tuple[List[Tuple[float, str]], Dict[str, int], Optional[Exception]]:
+        call = self.choose_call(messages)
+        scale = self.time_scale / 1000
+        duration = (call["duration_ms"] or 0) * scale
+        error = call["error"]
+        if error:
+            if error["status"]:
+                fault: Exception = http_status_error(
+                    error["status"], FAKE_API_URL, "replayed"
+                )
+            else:
+                fault = RuntimeError(f"{error['type']}: {error['message']}")
+            return [(duration, "")], {}, fault
+
+        chunks = call["chunks"]
+        if chunks and "".join(text for _, text in chunks) == call["response"]:
+            pieces = []
+            previous = 0
+            for offset, text in chunks:
+                pieces.append(((offset - previous) * scale, text))
+                previous = offset
+        else:
+            pieces = [(duration, call["response"])]
+
+        usage = call["usage"] or {}
+        if usage:
+            usage = {
+                "input_tokens": usage["prompt_tokens"],
+                "output_tokens": usage["completion_tokens"],
+                "total_tokens": usage["total_tokens"],
+            }
+        return pieces, usage, None
@@ -0,0 +1,97 @@
+"""Scratchpad compaction across agent iterations.
+
+Every planning call re-sends all earlier thoughts, actions and observations,
+so prompt tokens grow quadratically with the number of iterations. Once the
+scratchpad passes a token threshold, ``compact_scratchpad`` replaces the
+oldest steps with short digests, oldest first, until it fits again:
+
+- the thought is cut to its first line, the action and input are kept
+- a result list becomes the titles of its results
+- any other observation becomes its first few hundred characters
+
+The latest step is always kept verbatim, since the model is reasoning about
+it right now. Like observation truncation, this only changes the prompt.
+"""
+
+from typing import Any, List, Mapping, Tuple
+
+from backend.agent.observations import estimate_tokens, get_observation_stats
+from langchain_core.agents import AgentAction
+
+DIGEST_CHARS = 200
+DIGEST_TITLES = 5
+
+
+def _step_tokens(action: AgentAction, observation: Any) -> int:
+    return estimate_tokens(action.log) + estimate_tokens(str(observation))
+
+
+def _digest_action(action: AgentAction) -> AgentAction:
+    """Shorten a ReAct log to its first thought line plus the action."""
+    if "Action:" not in action.log:
+        # JSON agents log the tool call itself, which is already short
+        return action
+    thought = action.log.split("Action:", 1)[0].strip()
+    thought = thought.removeprefix("Thought:").strip().split("\n", 1)[0]
+    if len(thought) > DIGEST_CHARS:
+        thought = thought[:DIGEST_CHARS] + "..."
+    log = f"{thought}\nAction: {action.tool}\nAction Input: {action.tool_input}\n"
+    return AgentAction(tool=action.tool, tool_input=action.tool_input, log=log)
+
+
+def _digest_observation(observation: Any) -> str:
+    if isinstance(observation, list):
+        titles = [
+            str(item.get("title") or item.get("url") or item.get("source"))
+            for item in observation
+            if isinstance(item, Mapping)
+            and (item.get("title") or item.get("url") or item.get("source"))
+        ]
+        if titles:
+            shown = "; ".join(titles[:DIGEST_TITLES])
+            more = len(observation) - min(len(titles), DIGEST_TITLES)
+            suffix = f" (+{more} more)" if more > 0 else ""
+            return f"[digest] {len(observation)} results: {shown}{suffix}"
+    text = " ".join(str(observation).split())
+    if len(text) > DIGEST_CHARS:
+        text = text[:DIGEST_CHARS] + "..."
+    return f"[digest] {text}"
+
+
+def compact_scratchpad(
+    intermediate_steps: List[Tuple[AgentAction, Any]], threshold: int
+) -> List[Tuple[AgentAction, Any]]:
+    """Digest the oldest steps until the scratchpad fits ``threshold`` tokens.
+
+    Args:
+        intermediate_steps: Steps as they will be rendered into the prompt
+        threshold: Estimated token threshold; 0 disables compaction
+
+    Returns:
+        New list of steps; the latest step is never changed
+    """
+    if threshold <= 0 or len(intermediate_steps) < 2:
+        return intermediate_steps
+    sizes = [_step_tokens(action, obs) for action, obs in intermediate_steps]
+    total = sum(sizes)
+    if total <= threshold:
+        return intermediate_steps
+
+    steps = list(intermediate_steps)
+    saved = 0
+    for index in range(len(steps) - 1):
+        if total <= threshold:
+            break
+        action, observation = steps[index]
+        digest = (_digest_action(action), _digest_observation(observation))
+        digest_size = _step_tokens(*digest)
+        if digest_size >= sizes[index]:
+            continue
+        steps[index] = digest
+        saved += sizes[index] - digest_size
+        total -= sizes[index] - digest_size
+
+    stats = get_observation_stats()
+    if stats is not None:
+        stats.record_compaction(saved)
+    return steps
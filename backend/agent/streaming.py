@@ -0,0 +1,121 @@
+"""Early final-answer streaming for the ReAct agent.
+
+The ReAct agent's last LLM call produces ``Thought: ... Final Answer: ...``,
+but ``AgentExecutor.astream`` only yields the parsed ``output`` after the call
+finishes. ``FinalAnswerStreamParser`` watches the raw token stream instead:
+text before the ``Final Answer:`` marker is reported as reasoning, and every
+token after it is forwarded as answer text right away.
+"""
+
+import asyncio
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+THOUGHT_PREFIX = "Thought:"
+ACTION_PREFIX = "Action:"
+
+
+class FinalAnswerStreamParser:
+    """Incremental parser for one ReAct LLM call.
+
+    ``feed`` returns a list of ``(kind, text)`` events where ``kind`` is
+    ``"thought"`` (the full reasoning so far, emitted when a line completes)
+    or ``"answer"`` (a new piece of the final answer).
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._last_thought = ""
+        self._in_answer = False
+        self._answer_started = False
+
+    @property
+    def in_answer(self) -> bool:
+        """Whether the ``Final Answer:`` marker has been seen."""
+        return self._in_answer
+
+    def feed(self, token: str) -> List[Tuple[str, str]]:
+        """Consume a token and return the events it produces."""
+        if self._in_answer:
+            return self._answer_events(token)
+
+        self._buffer += token
+        index = self._buffer.find(FINAL_ANSWER_MARKER)
+        if index >= 0:
+            events = self._thought_events(self._buffer[:index])
+            self._in_answer = True
+            rest = self._buffer[index + len(FINAL_ANSWER_MARKER) :]
+            self._buffer = ""
+            return events + self._answer_events(rest)
+
+        if "\n" in token:
+            return self._thought_events(self._buffer)
+        return []
+
+    def flush(self) -> List[Tuple[str, str]]:
+        """Emit any reasoning still buffered when the LLM call ends."""
+        if self._in_answer:
+            return []
+        return self._thought_events(self._buffer)
+
+    def _answer_events(self, text: str) -> List[Tuple[str, str]]:
+        if not self._answer_started:
+            text = text.lstrip()
+            if not text:
+                return []
+            self._answer_started = True
+        return [("answer", text)] if text else []
+
+    def _thought_events(self, text: str) -> List[Tuple[str, str]]:
+        thought = _extract_thought(text)
+        if not thought or thought == self._last_thought:
+            return []
+        self._last_thought = thought
+        return [("thought", thought)]
+
+
+def _extract_thought(text: str) -> str:
+    """Strip the ``Thought:`` prefix and anything from ``Action:`` onwards."""
+    thought = text.split(ACTION_PREFIX, 1)[0].strip()
+    if thought.startswith(THOUGHT_PREFIX):
+        thought = thought[len(THOUGHT_PREFIX) :].strip()
+    return thought
+
+
+class FinalAnswerStreamHandler(AsyncCallbackHandler):
+    """Callback handler that feeds LLM tokens through the parser.
+
+    A fresh parser is started for every LLM call. Parsed events are put on
+    ``queue`` as ``{"thought": ...}`` / ``{"answer_delta": ...}`` chunks so
+    they can be merged with the executor's own stream.
+    """
+
+    def __init__(self, queue: "asyncio.Queue[Any]") -> None:
+        super().__init__()
+        self.queue = queue
+        self._parser: Optional[FinalAnswerStreamParser] = None
+
+    async def on_llm_start(self, serialized: Any, prompts: Any, **kwargs: Any) -> None:
+        self._parser = FinalAnswerStreamParser()
+
+    async def on_chat_model_start(
+        self, serialized: Any, messages: Any, **kwargs: Any
+    ) -> None:
+        self._parser = FinalAnswerStreamParser()
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if self._parser is None:
+            self._parser = FinalAnswerStreamParser()
+        self._put(self._parser.feed(token))
+
+    async def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        if self._parser is not None:
+            self._put(self._parser.flush())
+        self._parser = None
+
+    def _put(self, events: List[Tuple[str, str]]) -> None:
+        for kind, text in events:
+            key = "answer_delta" if kind == "answer" else "thought"
+            self.queue.put_nowait({key: text})
@@ -0,0 +1,133 @@
+"""Per-turn token usage ledger.
+
+``TokenLedger`` is a callback handler created for one chat turn and passed
+in the run config, so every LLM call of that turn - one per agent iteration,
+plus any made inside tools - is recorded on the turn's own ledger. Nothing
+is shared between concurrent requests.
+
+The ledger reports the turn totals (stored as ``Message.tokens_used``) and a
+per-call breakdown (stored as ``Message.token_usage``).
+"""
+
+import time
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+
+TOKEN_FIELDS = ("prompt_tokens", "completion_tokens", "total_tokens")
+
+
+def extract_token_usage(response: LLMResult) -> Optional[Dict[str, int]]:
+    """Token counts reported for one LLM call, or None if not reported.
+
+    Providers put usage in different places: ``generation_info``,
+    ``llm_output`` or the message's ``usage_metadata`` (streamed calls).
+    """
+    for generations in response.generations:
+        for generation in generations:
+            info = generation.generation_info or {}
+            if info.get("token_usage"):
+                return _normalize(info["token_usage"])
+
+    llm_output = response.llm_output or {}
+    if llm_output.get("token_usage"):
+        return _normalize(llm_output["token_usage"])
+    if "prompt_tokens" in llm_output or "completion_tokens" in llm_output:
+        return _normalize(llm_output)
+
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if metadata:
+                return _normalize(
+                    {
+                        "prompt_tokens": metadata.get("input_tokens", 0),
+                        "completion_tokens": metadata.get("output_tokens", 0),
+                        "total_tokens": metadata.get("total_tokens", 0),
+                    }
+                )
+    return None
+
+
+class TokenLedger(AsyncCallbackHandler):
+    """Collects the token usage of every LLM call in one turn."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: List[Dict[str, Any]] = []
+        self._started: Dict[UUID, tuple] = {}
+        self._first_token: Dict[UUID, float] = {}
+
+    async def on_llm_start(
+        self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._start(run_id, kwargs)
+
+    async def on_chat_model_start(
+        self, serialized: Dict[str, Any], messages: List[Any], *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        self._start(run_id, kwargs)
+
+    def _start(self, run_id: UUID, kwargs: Dict[str, Any]) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name")
+        self._started[run_id] = (time.perf_counter(), model)
+
+    async def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        if run_id not in self._first_token:
+            self._first_token[run_id] = time.perf_counter()
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        started, model = self._started.pop(run_id, (None, None))
+        first_token = self._first_token.pop(run_id, None)
+        usage = extract_token_usage(response)
+        call: Dict[str, Any] = {
+            "iteration": len(self.calls) + 1,
+            "model": model,
+            "duration_ms": int((time.perf_counter() - started) * 1000)
+            if started is not None
+            else None,
+            # Streamed calls only
+            "ttft_ms": int((first_token - started) * 1000)
+            if started is not None and first_token is not None
+            else None,
+        }
+        for field in TOKEN_FIELDS:
+            call[field] = usage[field] if usage else None
+        self.calls.append(call)
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started.pop(run_id, None)
+        self._first_token.pop(run_id, None)
+
+    def totals(self) -> Optional[Dict[str, int]]:
+        """Summed token counts of the calls that reported usage.
+
+        Returns:
+            Dictionary with 'prompt_tokens', 'completion_tokens',
+            'total_tokens', or None if no call reported usage.
+        """
+        reported = [call for call in self.calls if call["total_tokens"] is not None]
+        if not reported:
+            return None
+        return {field: sum(call[field] for call in reported) for field in TOKEN_FIELDS}
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Totals plus the per-call breakdown, for storage and SSE events."""
+        return {
+            **(self.totals() or {field: None for field in TOKEN_FIELDS}),
+            "calls": len(self.calls),
+            "unreported_calls": sum(
+                1 for call in self.calls if call["total_tokens"] is None
+            ),
+            "iterations": list(self.calls),
+        }
+
+
+def _normalize(usage: Dict[str, Any]) -> Dict[str, int]:
+    prompt = int(usage.get("prompt_tokens") or 0)
+    completion = int(usage.get("completion_tokens") or 0)
+    total = int(usage.get("total_tokens") or prompt + completion)
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": total}
@@ -0,0 +1,519 @@
+"""Off-loop execution of synchronous tools.
+
+Synchronous tools run inside the asyncio process by default and can block it
+or take it down. Each tool declares an execution class in its ``metadata``:
+
+- ``"inline"``: run on the event loop (tools with a native coroutine)
+- ``"thread"``: I/O-bound sync tools, run in a shared thread pool
+- ``"process"``: CPU-bound or untrusted tools, run in worker processes
+
+Tools may also set ``metadata["timeout"]`` (seconds) and, for process tools,
+``metadata["memory_limit_mb"]``. A process worker that exceeds its timeout
+is killed and replaced; a thread cannot be killed, so a timed-out thread call
+only stops being waited for.
+
+``ToolRegistry.register_tool`` wraps sync tools in ``PooledTool`` so the agent
+executor's ``arun`` goes through the pool.
+"""
+
+import asyncio
+import contextvars
+import importlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set
+
+from backend.config import settings
+from backend.utils import metrics, turn_timing
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForToolRun,
+    CallbackManagerForToolRun,
+)
+from langchain_core.tools import BaseTool, StructuredTool
+from pydantic import ConfigDict
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+EXECUTION_INLINE = "inline"
+EXECUTION_THREAD = "thread"
+EXECUTION_PROCESS = "process"
+
+# Prefix of observations for failures returned instead of raised, so the
+# agent can recover
+TOOL_ERROR_PREFIX = "Tool error: "
+
+
+class ToolTimeoutError(RuntimeError):
+    """Raised when a tool exceeds its timeout."""
+
+
+class ToolWorkerError(RuntimeError):
+    """Raised when a process worker fails or dies while running a tool."""
+
+
+def _worker_main(conn) -> None:
+    """Process worker loop: run ``(entrypoint, kwargs, memory_limit)`` tasks."""
+    tools: Dict[str, BaseTool] = {}
+    hard_limit = None
+    if resource is not None:
+        _, hard_limit = resource.getrlimit(resource.RLIMIT_AS)
+
+    while True:
+        try:
+            entrypoint, kwargs, memory_limit_mb = conn.recv()
+        except EOFError:
+            return
+        try:
+            if resource is not None and memory_limit_mb:
+                resource.setrlimit(
+                    resource.RLIMIT_AS, (memory_limit_mb * 1024 * 1024, hard_limit)
+                )
+            tool = tools.get(entrypoint)
+            if tool is None:
+                module_name, attr = entrypoint.split(":")
+                tool = getattr(importlib.import_module(module_name), attr)
+                tools[entrypoint] = tool
+            conn.send(("ok", tool.invoke(kwargs)))
+        except MemoryError:
+            conn.send(("error", f"memory limit of {memory_limit_mb} MB exceeded"))
+        except Exception as exc:
+            conn.send(("error", f"{type(exc).__name__}: {exc}"))
+        finally:
+            if resource is not None and memory_limit_mb:
+                resource.setrlimit(resource.RLIMIT_AS, (hard_limit, hard_limit))
+
+
+class _ProcessWorker:
+    """One worker process connected through a pipe."""
+
+    def __init__(self, context, nice: int = 0) -> None:
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn,), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        if nice and hasattr(os, "setpriority"):
+            # Set right after spawn, so the worker's own start-up imports
+            # already run at the lower priority
+            os.setpriority(os.PRIO_PROCESS, self.process.pid, nice)
+
+    async def call(
+        self,
+        entrypoint: str,
+        kwargs: Dict[str, Any],
+        timeout: float,
+        memory_limit_mb: Optional[int],
+    ) -> Any:
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        fd = self.conn.fileno()
+        loop.add_reader(fd, lambda: ready.done() or ready.set_result(None))
+        try:
+            self.conn.send((entrypoint, kwargs, memory_limit_mb))
+            await asyncio.wait_for(ready, timeout)
+            status, payload = self.conn.recv()
+        except EOFError as exc:
+            raise ToolWorkerError("tool worker exited unexpectedly") from exc
+        finally:
+            loop.remove_reader(fd)
+        if status == "error":
+            raise ToolWorkerError(payload)
+        return payload
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class ToolExecutionPool:
+    """Runs sync tools in a thread pool or in killable worker processes.
+
+    Per-tool queue depth, running count, timeouts, failures and run times are
+    kept in ``stats()``.
+    """
+
+    def __init__(
+        self,
+        thread_workers: int,
+        process_workers: int,
+        default_timeout: float,
+        default_memory_limit_mb: int,
+        process_nice: int = 0,
+    ) -> None:
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.default_timeout = default_timeout
+        self.default_memory_limit_mb = default_memory_limit_mb
+        self.process_nice = process_nice
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._idle_workers: Optional[asyncio.Queue] = None
+        self._all_workers: List[_ProcessWorker] = []
+        self._replacements: Set[asyncio.Task] = set()
+        self._context = multiprocessing.get_context("spawn")
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        # Thread calls move from queued to running on a pool thread
+        self._stats_lock = threading.Lock()
+
+    async def run(
+        self, tool: BaseTool, kwargs: Dict[str, Any], execution: Optional[str] = None
+    ) -> Any:
+        """Run ``tool`` with parsed arguments according to its execution class.
+
+        Tools with a native coroutine that only off-load some calls pass
+        ``execution`` to override the class they would default to.
+        """
+        execution = execution or get_execution_class(tool)
+        timeout = (tool.metadata or {}).get("timeout", self.default_timeout)
+        stats = self._tool_stats(tool.name, execution)
+
+        with self._stats_lock:
+            stats["queued"] += 1
+        try:
+            if execution == EXECUTION_PROCESS:
+                result = await self._run_in_process(tool, kwargs, timeout, stats)
+            else:
+                result = await self._run_in_thread(tool, kwargs, timeout, stats)
+            stats["completed"] += 1
+            return result
+        except ToolTimeoutError:
+            stats["timeouts"] += 1
+            raise
+        except Exception:
+            stats["failures"] += 1
+            raise
+
+    async def _run_in_process(
+        self,
+        tool: BaseTool,
+        kwargs: Dict[str, Any],
+        timeout: float,
+        stats: Dict[str, Any],
+    ) -> Any:
+        queued = time.perf_counter()
+        try:
+            worker = await self._acquire_worker()
+        except BaseException:
+            with self._stats_lock:
+                stats["queued"] -= 1
+            raise
+        started = time.perf_counter()
+        with self._stats_lock:
+            stats["queued"] -= 1
+            stats["running"] += 1
+        metrics.tool_queue_wait_seconds.observe(
+            started - queued, tool=tool.name, execution=EXECUTION_PROCESS
+        )
+        turn_timing.record("tool_queue", started - queued)
+        try:
+            return await self._run_in_worker(worker, tool, kwargs, timeout)
+        finally:
+            with self._stats_lock:
+                self._finish_run(stats, started)
+
+    async def _run_in_thread(
+        self,
+        tool: BaseTool,
+        kwargs: Dict[str, Any],
+        timeout: float,
+        stats: Dict[str, Any],
+    ) -> Any:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(
+                max_workers=self.thread_workers, thread_name_prefix="tool"
+            )
+        context = contextvars.copy_context()
+        timing = turn_timing.current_turn_timing()
+        submitted = time.perf_counter()
+        # "queued" until a pool thread picks the call up, then "running";
+        # "abandoned" if the caller stopped waiting before that
+        state = {"status": "queued"}
+
+        def call() -> Any:
+            with self._stats_lock:
+                if state["status"] == "abandoned":
+                    return None
+                state["status"] = "running"
+                stats["queued"] -= 1
+                stats["running"] += 1
+            started = time.perf_counter()
+            # Recorded from the pool thread once one is free
+            metrics.tool_queue_wait_seconds.observe(
+                started - submitted, tool=tool.name, execution=EXECUTION_THREAD
+            )
+            if timing is not None:
+                timing.add("tool_queue", started - submitted)
+            try:
+                return context.run(tool.invoke, kwargs)
+            finally:
+                with self._stats_lock:
+                    self._finish_run(stats, started)
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(self._threads, call), timeout
+            )
+        except asyncio.TimeoutError as exc:
+            raise ToolTimeoutError(
+                f"{tool.name} timed out after {timeout:.0f}s"
+            ) from exc
+        finally:
+            with self._stats_lock:
+                if state["status"] == "queued":
+                    state["status"] = "abandoned"
+                    stats["queued"] -= 1
+
+    @staticmethod
+    def _finish_run(stats: Dict[str, Any], started: float) -> None:
+        stats["running"] -= 1
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        stats["total_run_ms"] += elapsed_ms
+        stats["max_run_ms"] = max(stats["max_run_ms"], elapsed_ms)
+
+    async def _run_in_worker(
+        self,
+        worker: _ProcessWorker,
+        tool: BaseTool,
+        kwargs: Dict[str, Any],
+        timeout: float,
+    ) -> Any:
+        memory_limit_mb = (tool.metadata or {}).get(
+            "memory_limit_mb", self.default_memory_limit_mb
+        )
+        try:
+            result = await worker.call(
+                _process_entrypoint(tool), kwargs, timeout, memory_limit_mb
+            )
+        except asyncio.TimeoutError as exc:
+            self._replace_worker(worker)
+            raise ToolTimeoutError(
+                f"{tool.name} timed out after {timeout:.0f}s"
+            ) from exc
+        except ToolWorkerError:
+            # The worker answered with an error, or died
+            if worker.is_alive():
+                self._idle_workers.put_nowait(worker)
+            else:
+                self._replace_worker(worker)
+            raise
+        except BaseException:
+            # Cancelled mid-call: the reply may still arrive and would be read
+            # by the next caller, so the worker is not reused
+            self._replace_worker(worker)
+            raise
+        self._idle_workers.put_nowait(worker)
+        return result
+
+    def start(self) -> None:
+        """Spawn the process workers ahead of the first tool call.
+
+        Worker start-up imports LangChain core and takes a few hundred
+        milliseconds; called from the app lifespan so that cost is not paid
+        by the first tool call.
+        """
+        if self._idle_workers is None:
+            self._idle_workers = asyncio.Queue()
+            for _ in range(self.process_workers):
+                self._spawn_worker()
+
+    async def _acquire_worker(self) -> _ProcessWorker:
+        self.start()
+        return await self._idle_workers.get()
+
+    def _spawn_worker(self) -> None:
+        worker = _ProcessWorker(self._context, self.process_nice)
+        self._all_workers.append(worker)
+        self._idle_workers.put_nowait(worker)
+
+    def _replace_worker(self, worker: _ProcessWorker) -> None:
+        # Killing waits for the process to exit and spawning starts a new
+        # interpreter; both run in a thread so the event loop never waits.
+        # Callers queue for the next idle worker meanwhile
+        self._all_workers.remove(worker)
+        task = asyncio.create_task(self._respawn(worker, self._idle_workers))
+        self._replacements.add(task)
+        task.add_done_callback(self._replacements.discard)
+
+    async def _respawn(self, worker: _ProcessWorker, idle_workers: asyncio.Queue):
+        await asyncio.to_thread(worker.kill)
+        try:
+            replacement = await asyncio.to_thread(
+                _ProcessWorker, self._context, self.process_nice
+            )
+        except Exception as e:
+            logger.warning(f"Failed to replace tool worker: {e}")
+            return
+        if self._idle_workers is not idle_workers:
+            # The pool was shut down meanwhile
+            await asyncio.to_thread(replacement.kill)
+            return
+        self._all_workers.append(replacement)
+        idle_workers.put_nowait(replacement)
+
+    def _tool_stats(self, name: str, execution: str) -> Dict[str, Any]:
+        if name not in self._stats:
+            self._stats[name] = {
+                "execution": execution,
+                "queued": 0,
+                "running": 0,
+                "completed": 0,
+                "failures": 0,
+                "timeouts": 0,
+                "total_run_ms": 0.0,
+                "max_run_ms": 0.0,
+            }
+        return self._stats[name]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-tool queue depth and run time statistics."""
+        result = {}
+        for name, stats in self._stats.items():
+            finished = stats["completed"] + stats["failures"] + stats["timeouts"]
+            result[name] = {
+                **stats,
+                "avg_run_ms": stats["total_run_ms"] / finished if finished else 0.0,
+            }
+        return result
+
+    def shutdown(self) -> None:
+        """Stop all workers. Called on application shutdown."""
+        for worker in self._all_workers:
+            worker.kill()
+        self._all_workers.clear()
+        self._idle_workers = None
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+
+
+def get_execution_class(tool: BaseTool) -> str:
+    """Execution class declared by ``tool``, defaulting by its capabilities.
+
+    Tools with a native coroutine run inline; other sync tools default to
+    the thread pool. Process execution needs an importable entrypoint.
+    """
+    metadata = tool.metadata or {}
+    execution = metadata.get("execution")
+    if execution is None:
+        execution = EXECUTION_INLINE if _has_native_async(tool) else EXECUTION_THREAD
+    if execution == EXECUTION_PROCESS and _process_entrypoint(tool) is None:
+        execution = EXECUTION_THREAD
+    return execution
+
+
+def _has_native_async(tool: BaseTool) -> bool:
+    if isinstance(tool, StructuredTool):
+        return tool.coroutine is not None
+    return type(tool)._arun is not BaseTool._arun
+
+
+def _process_entrypoint(tool: BaseTool) -> Optional[str]:
+    """``module:attribute`` a worker process can import the tool from."""
+    func = getattr(tool, "func", None)
+    if func is None:
+        return None
+    module_name = getattr(func, "__module__", None)
+    attr = getattr(func, "__name__", None)
+    if not module_name or not attr or module_name == "__main__":
+        return None
+    return f"{module_name}:{attr}"
+
+
+class PooledTool(BaseTool):
+    """Wrapper that routes a sync tool's async calls through the pool.
+
+    Name, description and schema are the wrapped tool's, so prompts are
+    unaffected. Synchronous ``run`` still calls the tool directly.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: BaseTool
+
+    @classmethod
+    def wrap(cls, tool: BaseTool) -> "PooledTool":
+        return cls(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            metadata=tool.metadata,
+            inner=tool,
+        )
+
+    def _tool_kwargs(self, args: tuple, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        # String input arrives positionally; map it back to the schema fields
+        return {**dict(zip(self.inner.args, args)), **kwargs}
+
+    def _run(
+        self,
+        *args: Any,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+        **kwargs: Any,
+    ) -> Any:
+        return self.inner.invoke(self._tool_kwargs(args, kwargs))
+
+    async def _arun(
+        self,
+        *args: Any,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+        **kwargs: Any,
+    ) -> Any:
+        try:
+            return await tool_pool.run(self.inner, self._tool_kwargs(args, kwargs))
+        except (ToolTimeoutError, ToolWorkerError) as exc:
+            # Returned as the observation so the agent can recover
+            return f"{TOOL_ERROR_PREFIX}{exc}"
+
+
+def wrap_for_execution(tool: BaseTool) -> BaseTool:
+    """Wrap ``tool`` in PooledTool unless it runs inline."""
+    if isinstance(tool, PooledTool) or get_execution_class(tool) == EXECUTION_INLINE:
+        return tool
+    return PooledTool.wrap(tool)
+
+
+tool_pool = ToolExecutionPool(
+    thread_workers=settings.TOOL_THREAD_WORKERS,
+    process_workers=settings.TOOL_PROCESS_WORKERS,
+    default_timeout=settings.TOOL_TIMEOUT_SECONDS,
+    default_memory_limit_mb=settings.TOOL_PROCESS_MEMORY_LIMIT_MB,
+    process_nice=settings.TOOL_PROCESS_NICE,
+)
+
+
+def _pool_gauge(field: str):
+    def read() -> Dict[tuple, int]:
+        return {
+            (name, stats["execution"]): stats[field]
+            for name, stats in tool_pool.stats().items()
+        }
+
+    return read
+
+
+metrics.registry.gauge(
+    "tool_pool_queued",
+    "Tool calls waiting for a pool thread or process",
+    ("tool", "execution"),
+    function=_pool_gauge("queued"),
+)
+metrics.registry.gauge(
+    "tool_pool_running",
+    "Tool calls running in the pool",
+    ("tool", "execution"),
+    function=_pool_gauge("running"),
+)
@@ -0,0 +1,187 @@
+"""Relevance-based tool selection.
+
+Every tool description is rendered into the agent prompt through ``{tools}``
+and ``{tool_names}``. With many registered tools most of that text is
+irrelevant to the question. ``ToolSelector`` ranks the registered tools
+against the question with a small in-memory BM25 index over tool names and
+descriptions, and the top-k become the turn's ``ToolSelection``.
+
+The agents built by ``AgentFactory`` are cached, so instead of building an
+agent per tool subset, ``bind_tool_selection`` turns the ``tools`` and
+``tool_names`` prompt variables into callables. They render the selection
+of the current request context (a context variable, like the turn budget)
+and fall back to all tools when no selection is active. The executor still
+knows every tool, so a call to an unselected tool keeps working.
+"""
+
+import contextvars
+import math
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from backend.agent.observations import estimate_tokens
+from backend.retrieval.text import tokenize
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable, RunnableSequence
+from langchain_core.tools import BaseTool, render_text_description
+
+K1 = 1.2
+B = 0.75
+
+
+class ToolSelection:
+    """Tools chosen for one turn, plus what choosing them saved."""
+
+    def __init__(
+        self, tools: List[BaseTool], available: int, latency_ms: float, tokens_saved: int
+    ) -> None:
+        self.tools = tools
+        self.available = available
+        self.latency_ms = latency_ms
+        self.tokens_saved_per_prompt = tokens_saved
+        self.prompts = 0
+
+    def render_tools(self) -> str:
+        """Render the selected tools; called once per planning prompt."""
+        self.prompts += 1
+        return render_text_description(self.tools)
+
+    def render_tool_names(self) -> str:
+        return ", ".join(tool.name for tool in self.tools)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Serializable view for SSE events and responses.
+
+        Returns:
+            Dictionary with 'selected' tool names, 'available' tool count,
+            'latency_ms' of the selection and 'tokens_saved' over all
+            planning prompts of the turn.
+        """
+        return {
+            "selected": [tool.name for tool in self.tools],
+            "available": self.available,
+            "latency_ms": round(self.latency_ms, 3),
+            "tokens_saved": self.tokens_saved_per_prompt * self.prompts,
+        }
+
+
+class ToolSelector:
+    """Ranks tools against a question with BM25 over their descriptions.
+
+    The index is rebuilt only when the set of tools changes.
+    """
+
+    def __init__(self) -> None:
+        self._key: Optional[Tuple[Tuple[str, str], ...]] = None
+        self._term_counts: List[Counter] = []
+        self._lengths: List[int] = []
+        self._df: Counter = Counter()
+
+    def _index(self, tools: Sequence[BaseTool]) -> None:
+        key = tuple((tool.name, tool.description) for tool in tools)
+        if key == self._key:
+            return
+        self._term_counts = []
+        self._lengths = []
+        self._df = Counter()
+        for tool in tools:
+            name_terms = tokenize(tool.name.replace("_", " "))
+            terms = name_terms * 2 + tokenize(tool.description)
+            counts = Counter(terms)
+            self._term_counts.append(counts)
+            self._lengths.append(len(terms))
+            self._df.update(counts.keys())
+        self._key = key
+
+    def rank(self, question: str, tools: Sequence[BaseTool]) -> List[Tuple[float, int]]:
+        """Return ``(score, tool index)`` pairs, best first."""
+        self._index(tools)
+        count = len(tools)
+        avg_length = sum(self._lengths) / count if count else 0.0
+        query_terms = set(tokenize(question))
+        scores = []
+        for index, counts in enumerate(self._term_counts):
+            score = 0.0
+            norm = K1 * (1 - B + B * self._lengths[index] / (avg_length or 1.0))
+            for term in query_terms:
+                tf = counts.get(term)
+                if tf:
+                    df = self._df[term]
+                    idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                    score += idf * tf * (K1 + 1) / (tf + norm)
+            scores.append((score, index))
+        # Stable for ties: registry order decides between equal scores
+        scores.sort(key=lambda pair: (-pair[0], pair[1]))
+        return scores
+
+    def select(self, question: str, tools: Sequence[BaseTool], k: int) -> ToolSelection:
+        """Choose the ``k`` most relevant tools for ``question``.
+
+        Tools without any matching term still fill up the remaining slots in
+        registry order, so small registries are never trimmed.
+        """
+        started = time.perf_counter()
+        if k <= 0 or len(tools) <= k:
+            selected = list(tools)
+        else:
+            top = sorted(index for _, index in self.rank(question, tools)[:k])
+            selected = [tools[index] for index in top]
+        latency_ms = (time.perf_counter() - started) * 1000
+        saved = estimate_tokens(render_text_description(list(tools))) - estimate_tokens(
+            render_text_description(selected)
+        )
+        return ToolSelection(selected, len(tools), latency_ms, saved)
+
+
+tool_selector = ToolSelector()
+
+_current_tool_selection: contextvars.ContextVar[Optional[ToolSelection]] = (
+    contextvars.ContextVar("_current_tool_selection", default=None)
+)
+
+
+def set_tool_selection(selection: Optional[ToolSelection]) -> None:
+    """Make ``selection`` the tools rendered for the current request context."""
+    _current_tool_selection.set(selection)
+
+
+def get_tool_selection() -> Optional[ToolSelection]:
+    """Get the tool selection of the current request context, if any."""
+    return _current_tool_selection.get()
+
+
+def clear_tool_selection() -> None:
+    """Go back to rendering all tools after the turn completes."""
+    _current_tool_selection.set(None)
+
+
+def bind_tool_selection(agent: Runnable, tools: List[BaseTool]) -> Runnable:
+    """Make the agent's prompt render the per-turn tool selection.
+
+    ``create_react_agent`` and ``create_json_chat_agent`` fill ``tools`` and
+    ``tool_names`` with fixed strings; this replaces them with callables
+    evaluated on every prompt format.
+    """
+
+    def render_tools() -> str:
+        selection = get_tool_selection()
+        if selection is None:
+            return render_text_description(tools)
+        return selection.render_tools()
+
+    def render_tool_names() -> str:
+        selection = get_tool_selection()
+        if selection is None:
+            return ", ".join(tool.name for tool in tools)
+        return selection.render_tool_names()
+
+    if not isinstance(agent, RunnableSequence):
+        return agent
+    steps = [
+        step.partial(tools=render_tools, tool_names=render_tool_names)
+        if isinstance(step, BasePromptTemplate)
+        else step
+        for step in agent.steps
+    ]
+    return RunnableSequence(*steps)
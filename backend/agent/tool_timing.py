@@ -0,0 +1,139 @@
+"""Tool run timing from LangChain callbacks.
+
+``ToolTimingHandler`` records the start and end of every tool run of a turn
+by callback run ID, so durations are measured where the tool actually runs
+rather than when the chat service gets to see the step.
+
+Runs are matched to agent steps by the ``AgentAction`` that started them:
+``ChatAgentExecutor._aperform_agent_action`` sets the action in a context
+variable, and ``on_tool_start`` picks it up. Repeated calls answered from the
+turn memo never start a tool, so they have no run.
+"""
+
+import contextvars
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from backend.agent.tool_pool import TOOL_ERROR_PREFIX
+from backend.utils import metrics
+from langchain_core.agents import AgentAction
+from langchain_core.callbacks import AsyncCallbackHandler
+
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+_current_action: contextvars.ContextVar[Optional[AgentAction]] = (
+    contextvars.ContextVar("_current_action", default=None)
+)
+
+
+def set_current_action(action: Optional[AgentAction]) -> None:
+    """Mark ``action`` as the one whose tool starts next in this context."""
+    _current_action.set(action)
+
+
+class ToolRun:
+    """Timing and outcome of one tool run."""
+
+    def __init__(self, run_id: UUID, tool_name: str, action: Optional[AgentAction]):
+        self.run_id = run_id
+        self.tool_name = tool_name
+        self.action = action
+        self.started_at = _utcnow()
+        self.completed_at: Optional[datetime] = None
+        self.status = STATUS_RUNNING
+        self.error: Optional[str] = None
+        self._started = time.perf_counter()
+        self._duration_ms: Optional[float] = None
+
+    @property
+    def duration_ms(self) -> int:
+        """Run time in milliseconds; measured so far while still running."""
+        if self._duration_ms is None:
+            return int((time.perf_counter() - self._started) * 1000)
+        return int(self._duration_ms)
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        self._duration_ms = (time.perf_counter() - self._started) * 1000
+        self.completed_at = _utcnow()
+        self.status = status
+        self.error = error
+        metrics.tool_calls.inc(tool=self.tool_name, status=status)
+        metrics.tool_seconds.observe(self._duration_ms / 1000, tool=self.tool_name)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Serializable view for SSE events."""
+        return {
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "completed_at": self.completed_at.isoformat()
+            if self.completed_at
+            else None,
+            "error": self.error,
+        }
+
+
+class ToolTimingHandler(AsyncCallbackHandler):
+    """Per-turn collector of tool runs, keyed by callback run ID.
+
+    Tools called from inside another tool (``multi_search`` calling the
+    search tool) are nested runs and are not recorded separately.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.runs: Dict[UUID, ToolRun] = {}
+        self._nested: set = set()
+
+    async def on_tool_start(
+        self,
+        serialized: Dict[str, Any],
+        input_str: str,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        **kwargs: Any,
+    ) -> None:
+        if parent_run_id in self.runs or parent_run_id in self._nested:
+            self._nested.add(run_id)
+            return
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        self.runs[run_id] = ToolRun(run_id, name, _current_action.get())
+
+    async def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self.runs.get(run_id)
+        if run is None:
+            return
+        content = getattr(output, "content", output)
+        if isinstance(content, str) and content.startswith(TOOL_ERROR_PREFIX):
+            run.finish(STATUS_FAILED, content[len(TOOL_ERROR_PREFIX) :])
+        else:
+            run.finish(STATUS_COMPLETED)
+
+    async def on_tool_error(
+        self, error: BaseException, *, run_id: UUID, **kwargs: Any
+    ) -> None:
+        run = self.runs.get(run_id)
+        if run is not None:
+            run.finish(STATUS_FAILED, f"{type(error).__name__}: {error}")
+
+    def run_for(self, action: AgentAction) -> Optional[ToolRun]:
+        """The run started by ``action``, or None if no tool ran for it."""
+        for run in self.runs.values():
+            if run.action is action:
+                return run
+        return None
+
+    def unfinished(self) -> List[ToolRun]:
+        """Runs that have started but not ended, e.g. after a cancel."""
+        return [run for run in self.runs.values() if run.status == STATUS_RUNNING]
+
+
+def _utcnow() -> datetime:
+    # Naive UTC, like the other timestamps stored by the repositories
+    return datetime.now(timezone.utc).replace(tzinfo=None)
@@ -2,12 +2,36 @@
 
 This module provides a centralized tool registry for the chatbot.
 Tools can be dynamically registered and discovered without modifying chatbot_engine.py.
+
+Tools are declared by import path (``"module:attribute"``), like Python entry
+points, and only imported when the tool list is first requested. Other
+packages can add tools through the ``langchain_chatbot.tools`` entry point
+group.
 """
 
-from typing import Callable, List
+import asyncio
+import logging
+import threading
+from importlib.metadata import EntryPoint, entry_points
+from typing import Dict, Iterable, List
 
 from langchain_core.tools import BaseTool
 
+from .tool_pool import wrap_for_execution
+
+logger = logging.getLogger(__name__)
+
+TOOL_ENTRY_POINT_GROUP = "langchain_chatbot.tools"
+
+# Same declarations as the entry points in pyproject.toml, so the built-in
+# tools resolve when running from a checkout that is not installed
+BUILTIN_TOOLS: Dict[str, str] = {
+    "calculator": "backend.tools.calculator:calculator",
+    "tavily_search": "backend.tools.tavily_search:tavily_search",
+    "multi_search": "backend.tools.multi_search:multi_search",
+    "local_search": "backend.tools.local_search:local_search",
+}
+
 
 class ToolRegistry:
     """Centralized registry for LangChain tools.
@@ -22,25 +46,95 @@ class ToolRegistry:
     """
 
     _tools: List[BaseTool] = []
+    _declared: Dict[str, str] = {}
+    _lock = threading.Lock()
 
     @classmethod
     def register_tool(cls, tool: BaseTool):
         """Register a tool class for use by the agent.
 
+        Sync tools are wrapped so they run in the tool execution pool
+        according to the execution class in their metadata.
+
         Args:
             tool_class: Tool class constructor
         """
+        tool = wrap_for_execution(tool)
         ToolRegistry._tools.append(tool)
-        print(f"Registered tool: {tool.name}")
-        print(f"{len(ToolRegistry._tools)} tools available now.")
-        print(f"{ToolRegistry._tools}")
+        logger.info(f"Registered tool: {tool.name}")
+        logger.debug(
+            f"{len(ToolRegistry._tools)} tools available now: "
+            f"{[registered.name for registered in ToolRegistry._tools]}"
+        )
         return tool
 
+    @classmethod
+    def declare_tool(cls, name: str, target: str) -> None:
+        """Declare a tool to be imported and registered on first use.
+
+        Args:
+            name: Declaration key; declaring a name again replaces it
+            target: Import path of a BaseTool, as ``"module:attribute"``
+        """
+        ToolRegistry._declared[name] = target
+
+    @classmethod
+    def discover_tools(cls, exclude: Iterable[str] = ()) -> List[str]:
+        """Declare the built-in tools and those of installed entry points.
+
+        Nothing is imported here; see ``get_tools``.
+
+        Args:
+            exclude: Declaration keys to skip, e.g. disabled tools
+
+        Returns:
+            The declared keys
+        """
+        declared = dict(BUILTIN_TOOLS)
+        for entry_point in entry_points(group=TOOL_ENTRY_POINT_GROUP):
+            declared[entry_point.name] = entry_point.value
+        excluded = set(exclude)
+        names = [name for name in declared if name not in excluded]
+        for name in names:
+            cls.declare_tool(name, declared[name])
+        return names
+
     @classmethod
     def get_tools(cls) -> List[BaseTool]:
         """Get all registered tools including any custom ones.
 
+        Declared tools are imported and registered on the first call, which
+        blocks; async callers use ``aget_tools``.
+
         Returns:
             List of all available LangChain tools
         """
+        if ToolRegistry._declared:
+            cls._load_declared()
+        return list(ToolRegistry._tools)
+
+    @classmethod
+    async def aget_tools(cls) -> List[BaseTool]:
+        """``get_tools`` with the tool imports run off the event loop."""
+        if ToolRegistry._declared:
+            await asyncio.to_thread(cls._load_declared)
         return list(ToolRegistry._tools)
+
+    @classmethod
+    def _load_declared(cls) -> None:
+        # Held while importing, so concurrent callers wait for the full list
+        with ToolRegistry._lock:
+            while ToolRegistry._declared:
+                name, target = next(iter(ToolRegistry._declared.items()))
+                entry_point = EntryPoint(
+                    name=name, value=target, group=TOOL_ENTRY_POINT_GROUP
+                )
+                try:
+                    tool = entry_point.load()
+                except Exception:
+                    logger.exception(f"Failed to load tool {name!r} from {target}")
+                else:
+                    cls.register_tool(tool)
+                # Only dropped once registered: callers that see no
+                # declarations without taking the lock get the full list
+                del ToolRegistry._declared[name]
@@ -4,12 +4,25 @@ This package contains modularized API routes extracted from main.py:
 - general: Health check, config, and root endpoints
 - sessions: Session CRUD operations
 - chat: Chat endpoints and message retrieval
+- documents: Local document index ingestion
+- profiles: Stored per-request profiles
+- usage: Token usage reports
 """
 
 from fastapi import APIRouter
 
 from backend.api.chat import router as chat_router
+from backend.api.documents import router as documents_router
 from backend.api.general import router as general_router
+from backend.api.profiles import router as profiles_router
 from backend.api.sessions import router as sessions_router
+from backend.api.usage import router as usage_router
 
-__all__ = ["chat_router", "general_router", "sessions_router"]
+__all__ = [
+    "chat_router",
+    "documents_router",
+    "general_router",
+    "profiles_router",
+    "sessions_router",
+    "usage_router",
+]
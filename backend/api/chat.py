@@ -1,6 +1,8 @@
 """Chat API routes - streaming, non-streaming, and message retrieval."""
 
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, Response
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -10,36 +12,75 @@ from backend.chat_service import (
 )
 from backend.db.base import get_db
 from backend.models import ChatRequest, ChatResponse
+from backend.utils import tracing
+from backend.utils.profiler import request_profiler, should_profile
+from backend.utils.turn_timing import server_timing
 
 router = APIRouter()
 
 
+def _profile_meta(endpoint: str, request: ChatRequest) -> dict:
+    return request_profiler.new_profile(
+        endpoint,
+        session_id=request.sessionId,
+        request_id=tracing.current_request_id(),
+        enable_tools=request.options.enableToolCalls,
+        enable_memory=request.options.enableMemory,
+    )
+
+
 @router.post("/api/stream-chat")
-async def stream_chat(request: ChatRequest, db: AsyncSession = Depends(get_db)):
+async def stream_chat(
+    request: ChatRequest,
+    db: AsyncSession = Depends(get_db),
+    profile_token: Optional[str] = Header(None, alias="X-Profile-Token"),
+):
     """Real streaming chat endpoint using async_chat_stream."""
-    return StreamingResponse(
-        chat_stream_generator(
-            request.sessionId,
-            request.message,
-            db,
-            request.options.enableToolCalls,
-            request.options.enableMemory,
-        ),
-        media_type="text/event-stream",
+    stream = chat_stream_generator(
+        request.sessionId,
+        request.message,
+        db,
+        request.options.enableToolCalls,
+        request.options.enableMemory,
+        request.options.turnTimeoutSeconds,
+        request.options.bypassSearchCache,
     )
+    headers = None
+    if should_profile(request.sessionId, profile_token):
+        meta = _profile_meta("POST /api/stream-chat", request)
+        stream = request_profiler.profile_stream(stream, meta)
+        headers = {"X-Profile-ID": meta["id"]}
+    return StreamingResponse(stream, media_type="text/event-stream", headers=headers)
 
 
 @router.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest, db: AsyncSession = Depends(get_db)):
+async def chat(
+    request: ChatRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    profile_token: Optional[str] = Header(None, alias="X-Profile-Token"),
+):
     """Handle non-streaming chat endpoint.
 
     Follows the same pattern as stream_chat but returns a single
-    ChatResponse instead of streaming SSE events.
+    ChatResponse instead of streaming SSE events, with the turn's time
+    breakdown in a ``Server-Timing`` header.
     """
-    return await chat_generator(
+    turn = chat_generator(
         request.sessionId,
         request.message,
         db,
         request.options.enableToolCalls,
         request.options.enableMemory,
+        request.options.turnTimeoutSeconds,
+        request.options.bypassSearchCache,
     )
+    if should_profile(request.sessionId, profile_token):
+        meta = _profile_meta("POST /api/chat", request)
+        response.headers["X-Profile-ID"] = meta["id"]
+        result = await request_profiler.profile_call(turn, meta)
+    else:
+        result = await turn
+    if result.timing:
+        response.headers["Server-Timing"] = server_timing(result.timing)
+    return result
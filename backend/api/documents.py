@@ -0,0 +1,66 @@
+"""Local document index API routes."""
+
+import asyncio
+
+from backend.models import DocumentIngestRequest, DocumentIngestResponse
+from backend import retrieval
+from fastapi import APIRouter, HTTPException, UploadFile, status
+
+router = APIRouter()
+
+
+@router.get("/api/documents")
+async def list_documents():
+    """List indexed documents and index statistics."""
+    documents = await asyncio.to_thread(retrieval.document_index.list_documents)
+    return {"documents": documents, "stats": retrieval.document_index.stats()}
+
+
+@router.post(
+    "/api/documents",
+    response_model=DocumentIngestResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def add_documents(request: DocumentIngestRequest):
+    """Chunk and index documents. Existing documents with the same id are replaced."""
+    documents = [doc.model_dump(exclude_none=True) for doc in request.documents]
+    chunks = await asyncio.to_thread(retrieval.document_index.add_documents, documents)
+    return DocumentIngestResponse(documents=len(documents), chunks=chunks)
+
+
+@router.post(
+    "/api/documents/upload",
+    response_model=DocumentIngestResponse,
+    status_code=status.HTTP_201_CREATED,
+)
+async def upload_documents(files: list[UploadFile]):
+    """Index uploaded text files, using the file name as the document id."""
+    documents = []
+    for file in files:
+        try:
+            text = (await file.read()).decode("utf-8")
+        except UnicodeDecodeError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{file.filename} is not UTF-8 text",
+            )
+        documents.append(
+            {"id": file.filename, "text": text, "source": file.filename}
+        )
+    chunks = await asyncio.to_thread(retrieval.document_index.add_documents, documents)
+    return DocumentIngestResponse(documents=len(documents), chunks=chunks)
+
+
+@router.delete("/api/documents/{doc_id:path}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_document(doc_id: str):
+    if not await asyncio.to_thread(retrieval.document_index.delete, doc_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Document not found"
+        )
+
+
+@router.post("/api/documents/compact")
+async def compact_documents():
+    """Merge index segments and drop deleted documents."""
+    chunks = await asyncio.to_thread(retrieval.document_index.compact)
+    return {"chunks": chunks}
@@ -1,13 +1,23 @@
 """General API routes - health check, config, and root endpoints."""
 
+from datetime import datetime, timedelta
 from typing import Optional
 
-from fastapi import APIRouter, Header
+from fastapi import APIRouter, Header, Query
+from fastapi.responses import PlainTextResponse
 
 from backend.agent import ToolRegistry
+from backend.agent.tool_pool import tool_pool
 from backend.config import settings
 from backend.db.base import async_session_maker
-from backend.db.repositories import SessionRepository
+from backend.db.repositories import (
+    MessageRepository,
+    SessionRepository,
+    ToolStepRepository,
+)
+from backend.tools.search_cache import get_search_cache_stats
+from backend.utils.loop_monitor import loop_monitor
+from backend.utils.metrics import registry
 
 router = APIRouter()
 
@@ -22,6 +32,14 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Get latency, token and queueing metrics in the Prometheus text format."""
+    return PlainTextResponse(
+        registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @router.get("/api/config")
 async def get_config(session_id: Optional[str] = Header(None, alias="X-Session-ID")):
     """Get public configuration information.
@@ -31,7 +49,7 @@ async def get_config(session_id: Optional[str] = Header(None, alias="X-Session-I
 
     Optionally accepts a session_id parameter to include session metadata.
     """
-    tools = ToolRegistry.get_tools()
+    tools = await ToolRegistry.aget_tools()
     config = {
         "modelName": settings.MODEL_NAME,
         "temperature": settings.TEMPERATURE,
@@ -53,3 +71,56 @@ async def get_config(session_id: Optional[str] = Header(None, alias="X-Session-I
                 }
 
     return config
+
+
+@router.get("/api/tools/cache-stats")
+async def get_tool_cache_stats():
+    """Get hit rates and saved latency of the search result caches."""
+    return get_search_cache_stats(await ToolRegistry.aget_tools())
+
+
+@router.get("/api/tools/pool-stats")
+async def get_tool_pool_stats():
+    """Get queue depth, timeouts and run times of pooled tool executions."""
+    return tool_pool.stats()
+
+
+@router.get("/api/debug/event-loop")
+async def get_event_loop_stats(
+    top: int = Query(20, ge=1, le=100, description="Call sites returned"),
+):
+    """Get event loop lag and the call sites that blocked the loop longest."""
+    return loop_monitor.stats(top=top)
+
+
+@router.get("/api/debug/slow-turns")
+async def get_slow_turns(
+    min_ms: float = Query(5000, ge=0, description="Minimum server time of a turn"),
+    hours: Optional[float] = Query(24, gt=0, description="Look-back window"),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """Get the slowest recent turns with their server time breakdown."""
+    since = datetime.utcnow() - timedelta(hours=hours) if hours else None
+    async with async_session_maker() as db:
+        messages = await MessageRepository.list_slow_turns(
+            db, min_total_ms=min_ms, since=since, limit=limit
+        )
+    return [
+        {
+            "message_id": message.id,
+            "session_id": message.session_id,
+            "created_at": message.created_at.isoformat(),
+            "timing": message.timing,
+        }
+        for message in messages
+    ]
+
+
+@router.get("/api/tools/latency")
+async def get_tool_latency(
+    hours: Optional[float] = Query(24, gt=0, description="Look-back window"),
+):
+    """Get per-tool latency percentiles of recorded tool steps."""
+    since = datetime.utcnow() - timedelta(hours=hours) if hours else None
+    async with async_session_maker() as db:
+        return await ToolStepRepository.latency_percentiles(db, since=since)
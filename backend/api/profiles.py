@@ -0,0 +1,47 @@
+"""Request profile API routes - list and download stored profiles."""
+
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import FileResponse
+
+from backend.utils.profiler import is_profile_token, request_profiler
+
+router = APIRouter()
+
+_MEDIA_TYPES = {
+    "folded": "text/plain; charset=utf-8",
+    "pstats": "application/octet-stream",
+}
+
+
+def _require_token(token: Optional[str]) -> None:
+    # Profiles show code paths and request metadata; without a configured
+    # token the endpoints do not exist
+    if not is_profile_token(token):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+
+@router.get("/api/profiles")
+async def list_profiles(
+    profile_token: Optional[str] = Header(None, alias="X-Profile-Token"),
+):
+    """List stored request profiles, newest first."""
+    _require_token(profile_token)
+    return request_profiler.store.list()
+
+
+@router.get("/api/profiles/{profile_id}/{fmt}")
+async def download_profile(
+    profile_id: str,
+    fmt: Literal["folded", "pstats"],
+    profile_token: Optional[str] = Header(None, alias="X-Profile-Token"),
+):
+    """Download a profile as collapsed stacks or a pstats file."""
+    _require_token(profile_token)
+    path = request_profiler.store.path(profile_id, fmt)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found"
+        )
+    return FileResponse(path, media_type=_MEDIA_TYPES[fmt], filename=path.name)
@@ -93,8 +93,17 @@ async def clear_session(session_id: str, db: AsyncSession = Depends(get_db)):
 @router.post("/api/sessions/{session_id}/cancel")
 async def cancel_session(session_id: str):
     """Cancel an ongoing AI generation task for the specified session."""
-    success = cancel_manager.stop_session(session_id)
+    success = await cancel_manager.stop_session(session_id)
     if success:
         return {"success": True, "message": "Session cancelled"}
     else:
         return {"success": False, "message": "Session not found or not running"}
+
+
+@router.get("/api/sessions/{session_id}/generation")
+async def get_generation_state(session_id: str):
+    """Whether a generation is running for the session, in any worker."""
+    state = await cancel_manager.generation_state(session_id)
+    if state is None:
+        return {"running": False}
+    return {"running": True, **state}
@@ -0,0 +1,43 @@
+"""Token usage report API routes."""
+
+from datetime import date
+from typing import Literal, Optional
+
+from backend.db.base import async_session_maker
+from backend.db.repositories import TokenUsageRepository
+from fastapi import APIRouter, Query
+
+router = APIRouter()
+
+
+@router.get("/api/usage")
+async def get_token_usage(
+    group_by: Literal["session", "user", "day"] = Query(
+        "day", description="Aggregate per session, user or UTC day"
+    ),
+    since: Optional[date] = Query(None, description="First day to include"),
+    until: Optional[date] = Query(None, description="Last day to include"),
+    session_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+):
+    """Get token usage totals from the per-session daily rollups."""
+    async with async_session_maker() as db:
+        groups = await TokenUsageRepository.aggregate(
+            db,
+            group_by=group_by,
+            since=since,
+            until=until,
+            session_id=session_id,
+            user_id=user_id,
+        )
+    totals = {
+        name: sum(group[name] for group in groups)
+        for name in (
+            "prompt_tokens",
+            "completion_tokens",
+            "total_tokens",
+            "llm_calls",
+            "messages",
+        )
+    }
+    return {"group_by": group_by, "groups": groups, "totals": totals}
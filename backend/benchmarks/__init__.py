@@ -0,0 +1,6 @@
+"""Performance benchmarks for the chatbot backend.
+
+Each module is a standalone script, run from the repository root:
+
+    python -m backend.benchmarks.bench_calculator
+"""
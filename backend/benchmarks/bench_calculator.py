@@ -0,0 +1,85 @@
+"""Benchmark the calculator expression engine against bare ``eval``.
+
+Usage:
+    python -m backend.benchmarks.bench_calculator [--repeat N]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.tools.expression_engine import ExpressionEngine
+
+EXPRESSIONS = [
+    "2 + 2",
+    "3.5 * (4 - 1) / 7",
+    "2**10 + 17 % 5",
+    "sqrt(16) + log(10) * sin(0.5)",
+    "(1 + 2) * (3 + 4) * (5 + 6) / 7.0",
+]
+
+BATCH = [f"{i} / {i + 1} * 1.5 + 0.25" for i in range(10_000)]
+
+
+def _time(func, repeat: int) -> float:
+    """Return the best per-call time in microseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1e6
+
+
+def _eval_env():
+    import math
+
+    return {"__builtins__": {}, "sqrt": math.sqrt, "log": math.log, "sin": math.sin}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    env = _eval_env()
+    print(f"{'expression':<40}{'eval':>10}{'cold':>10}{'cached':>10}  (us/call)")
+    for source in EXPRESSIONS:
+        eval_us = _time(lambda: eval(source, env), args.repeat)
+
+        def cold():
+            ExpressionEngine(cache_size=0).evaluate(source)
+
+        warm = ExpressionEngine()
+        warm.evaluate(source)
+        cold_us = _time(cold, args.repeat)
+        cached_us = _time(lambda: warm.evaluate(source), args.repeat)
+        print(f"{source:<40}{eval_us:>10.1f}{cold_us:>10.1f}{cached_us:>10.1f}")
+
+    repeat = max(3, args.repeat // 50)
+    eval_batch_ms = _time(lambda: [eval(s, env) for s in BATCH], repeat) / 1000
+
+    engine = ExpressionEngine(cache_size=len(BATCH))
+    engine.evaluate_batch(BATCH)
+    scalar_ms = _time(lambda: [engine.evaluate(s) for s in BATCH], repeat) / 1000
+    batch_ms = _time(lambda: engine.evaluate_batch(BATCH), repeat) / 1000
+
+    print()
+    print(f"batch of {len(BATCH)} expressions (ms)")
+    print(f"  eval loop              {eval_batch_ms:>8.2f}")
+    print(f"  engine scalar (cached) {scalar_ms:>8.2f}")
+    print(f"  engine evaluate_batch  {batch_ms:>8.2f}")
+
+    guard = ExpressionEngine()
+    started = time.perf_counter()
+    try:
+        guard.evaluate("9**9**9")
+    except ValueError as exc:
+        print(f"\n9**9**9 rejected in {(time.perf_counter() - started) * 1e6:.0f} us: {exc}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Benchmark cancel-to-stop latency across server processes.
+
+A worker process starts generations and waits on their stop events, like a
+uvicorn worker streaming a reply. The benchmark process sends the cancel
+request through its own ``CancelManager``, like a second uvicorn worker
+handling ``POST /api/sessions/{id}/cancel``. Latency is measured from the
+cancel call to the stop event being set in the worker.
+
+The in-process memory backend is measured as the single-worker reference.
+Redis is included when ``--redis-url`` is given and the redis package is
+installed.
+
+Usage:
+    python -m backend.benchmarks.bench_cancel [--trials 200]
+        [--poll-intervals 0.01,0.05] [--redis-url redis://localhost:6379/0]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.utils.cancel_backends import (
+    MemoryCancelBackend,
+    RedisCancelBackend,
+    SQLiteCancelBackend,
+)
+from backend.utils.cancel_manager import CancelManager
+
+
+def _make_backend(kind: str, target: str):
+    if kind == "sqlite":
+        return SQLiteCancelBackend(target, ttl_seconds=600)
+    return RedisCancelBackend(url=target, ttl_seconds=600)
+
+
+def _worker(conn, kind: str, target: str, poll_interval: float, trials: int) -> None:
+    async def run() -> None:
+        manager = CancelManager(
+            _make_backend(kind, target), poll_interval=poll_interval, owner="worker"
+        )
+        for trial in range(trials):
+            session_id = f"session-{trial}"
+            stop_event = await manager.start_generation(session_id)
+            conn.send(session_id)
+            await stop_event.wait()
+            conn.send(time.time())
+            await manager.cleanup(session_id)
+        await manager.close()
+
+    asyncio.run(run())
+
+
+async def _cross_process(kind: str, target: str, poll_interval: float, trials: int):
+    context = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = context.Pipe()
+    worker = context.Process(
+        target=_worker, args=(child_conn, kind, target, poll_interval, trials)
+    )
+    worker.start()
+    manager = CancelManager(
+        _make_backend(kind, target), poll_interval=poll_interval, owner="api"
+    )
+    latencies = []
+    try:
+        for _ in range(trials):
+            session_id = await asyncio.to_thread(parent_conn.recv)
+            # Cancel at a random point of the worker's poll cycle
+            await asyncio.sleep(random.uniform(0, 2 * poll_interval))
+            started = time.time()
+            if not await manager.stop_session(session_id):
+                raise RuntimeError(f"{session_id} not found by the cancelling side")
+            stopped = await asyncio.to_thread(parent_conn.recv)
+            latencies.append((stopped - started) * 1000)
+    finally:
+        await manager.close()
+        worker.join(timeout=10)
+    return latencies
+
+
+async def _in_process(trials: int):
+    manager = CancelManager(MemoryCancelBackend(ttl_seconds=600))
+    latencies = []
+    for trial in range(trials):
+        session_id = f"session-{trial}"
+        stop_event = await manager.start_generation(session_id)
+        waiter = asyncio.create_task(stop_event.wait())
+        await asyncio.sleep(0)
+        started = time.time()
+        await manager.stop_session(session_id)
+        await waiter
+        latencies.append((time.time() - started) * 1000)
+        await manager.cleanup(session_id)
+    return latencies
+
+
+def _report(label: str, latencies) -> None:
+    latencies = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+    print(
+        f"{label:<28} p50 {percentile(0.50):7.2f} ms  p95 {percentile(0.95):7.2f} ms"
+        f"  p99 {percentile(0.99):7.2f} ms  max {latencies[-1]:7.2f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trials", type=int, default=200)
+    parser.add_argument("--poll-intervals", default="0.01,0.05")
+    parser.add_argument("--redis-url", default="")
+    args = parser.parse_args()
+    intervals = [float(value) for value in args.poll_intervals.split(",")]
+
+    _report("memory, same process", await _in_process(args.trials))
+    with tempfile.TemporaryDirectory() as tmp:
+        for interval in intervals:
+            latencies = await _cross_process(
+                "sqlite", f"{tmp}/generations-{interval}.db", interval, args.trials
+            )
+            _report(f"sqlite, poll {interval * 1000:.0f} ms", latencies)
+    if args.redis_url:
+        for interval in intervals:
+            latencies = await _cross_process(
+                "redis", args.redis_url, interval, args.trials
+            )
+            _report(f"redis, poll {interval * 1000:.0f} ms", latencies)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,337 @@
+"""Load test /api/stream-chat and /api/chat at a target concurrency.
+
+Each of ``--concurrency`` virtual users opens a session and sends questions
+back to back until ``--requests`` turns are done, or ``--duration`` seconds
+have passed. For each endpoint the script prints throughput, errors and
+latency percentiles; for the stream endpoint also time to first token
+(TTFT), the time until the first thought or message event arrives. Errors
+are broken down by kind: HTTP status, ``error`` event or exception.
+
+With ``--serve`` the backend is started in a subprocess on a free port,
+with the fake LLM and search providers (``LLM_PROVIDER=fake``,
+``SEARCH_PROVIDER=fake``) and a throwaway database, so no network or API
+keys are needed. ``FAKE_*`` settings in the environment are passed on, e.g.
+``FAKE_LLM_THROTTLE_RATE=0.05``. Without it, point ``--url`` at a running
+server.
+
+``--replay DIR`` serves like ``--serve`` but with the replay providers,
+which play back the turns recorded to DIR with ``CASSETTE_RECORD=true``
+with their recorded timings (scaled by ``CASSETTE_TIME_SCALE`` from the
+environment), and asks the recorded questions. This benchmarks the backend
+against real traffic shapes with no network.
+
+Usage:
+    python -m backend.benchmarks.bench_load --serve [--endpoint both]
+        [--concurrency 20] [--requests 200] [--duration 60] [--unique]
+    python -m backend.benchmarks.bench_load --replay backend/data/cassettes
+    python -m backend.benchmarks.bench_load --url http://127.0.0.1:8000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+
+ROOT = Path(__file__).parent.parent.parent
+
+ENDPOINTS = {"stream": "/api/stream-chat", "chat": "/api/chat"}
+
+# Covers the branches of the fake LLM's built-in script: a calculation, a
+# direct answer, one and two searches
+QUESTIONS = [
+    "What is (1234 + 5678) * 3 / 7?",
+    "What are the latest developments in battery technology?",
+    "Explain the difference between a process and a thread.",
+    "Who won the most recent Formula 1 race?",
+    "计算 250 * 12 + 8",
+    "Summarise the news about renewable energy this week.",
+    "How does HTTP/2 multiplexing work?",
+    "What is the weather forecast for Beijing tomorrow?",
+]
+
+
+class Result:
+    """Outcome of one chat turn as seen by the client."""
+
+    def __init__(
+        self, latency_ms: float, ttft_ms: Optional[float], error: str = ""
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.ttft_ms = ttft_ms
+        self.error = error
+
+
+async def _stream_turn(
+    client: httpx.AsyncClient, session_id: str, question: str
+) -> Result:
+    started = time.perf_counter()
+    ttft_ms = None
+    error = "incomplete stream"
+    try:
+        async with client.stream(
+            "POST",
+            ENDPOINTS["stream"],
+            json={"sessionId": session_id, "message": question},
+        ) as response:
+            if response.status_code != 200:
+                error = f"HTTP {response.status_code}"
+            else:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    event = json.loads(line[6:])
+                    if ttft_ms is None and event["type"] in ("thought", "message"):
+                        ttft_ms = (time.perf_counter() - started) * 1000
+                    elif event["type"] == "error":
+                        error = f"error event: {event.get('message', '')[:60]}"
+                    elif event["type"] == "done":
+                        error = ""
+    except httpx.HTTPError as e:
+        error = type(e).__name__
+    return Result((time.perf_counter() - started) * 1000, ttft_ms, error)
+
+
+async def _chat_turn(
+    client: httpx.AsyncClient, session_id: str, question: str
+) -> Result:
+    started = time.perf_counter()
+    try:
+        response = await client.post(
+            ENDPOINTS["chat"], json={"sessionId": session_id, "message": question}
+        )
+        error = (
+            "" if response.status_code == 200 else f"HTTP {response.status_code}"
+        )
+    except httpx.HTTPError as e:
+        error = type(e).__name__
+    return Result((time.perf_counter() - started) * 1000, None, error)
+
+
+async def _run_endpoint(
+    url: str,
+    endpoint: str,
+    concurrency: int,
+    requests: int,
+    duration: Optional[float],
+    unique: bool,
+    questions: List[str],
+) -> Dict:
+    turn = _stream_turn if endpoint == "stream" else _chat_turn
+    limits = httpx.Limits(max_connections=concurrency + 1)
+    timeout = httpx.Timeout(300.0, connect=10.0)
+    client = httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout)
+    async with client:
+
+        async def new_session() -> str:
+            response = await client.post(
+                "/api/sessions", json={"user_id": "load-test"}
+            )
+            response.raise_for_status()
+            return response.json()["id"]
+
+        # Sessions are opened one by one up front, and a first turn builds
+        # the agent; neither is measured
+        sessions = [await new_session() for _ in range(concurrency)]
+        await turn(client, sessions[0], questions[0])
+
+        results: List[Result] = []
+        issued = 0
+        deadline = time.perf_counter() + duration if duration else None
+
+        async def user(session_id: str) -> None:
+            nonlocal issued
+            while issued < requests and (
+                deadline is None or time.perf_counter() < deadline
+            ):
+                question = questions[issued % len(questions)]
+                if unique:
+                    # Distinct search queries, so the search cache misses
+                    question = f"{question} (#{issued})"
+                issued += 1
+                results.append(await turn(client, session_id, question))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user(session_id) for session_id in sessions))
+        wall = time.perf_counter() - started
+
+    def percentiles(values: List[float]) -> List[Optional[float]]:
+        values = sorted(values)
+        if not values:
+            return [None, None, None]
+        return [
+            values[min(len(values) - 1, int(len(values) * p))]
+            for p in (0.5, 0.95, 0.99)
+        ]
+
+    ok = [result for result in results if not result.error]
+    return {
+        "requests": len(results),
+        "errors": Counter(result.error for result in results if result.error),
+        "throughput": len(ok) / wall if wall else 0.0,
+        "latency": percentiles([result.latency_ms for result in ok]),
+        "ttft": percentiles([r.ttft_ms for r in ok if r.ttft_ms is not None]),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _recorded_questions(cassette_dir: str) -> List[str]:
+    # The backend settings require the API keys, which replay doesn't use
+    os.environ.setdefault("ZHIPUAI_API_KEY", "load-test")
+    os.environ.setdefault("TAVILY_API_KEY", "load-test")
+    sys.path.insert(0, str(ROOT))
+    from backend.utils.cassettes import CassetteLibrary
+
+    questions = CassetteLibrary(cassette_dir).questions()
+    if not questions:
+        raise SystemExit(f"No cassettes in {cassette_dir}")
+    return questions
+
+
+def _serve(data_dir: str, cassette_dir: Optional[str] = None) -> tuple:
+    """Start the backend on a free port; returns (process, url).
+
+    It uses the replay providers for ``cassette_dir`` if given, else the
+    fake ones.
+    """
+    port = _free_port()
+    provider = "replay" if cassette_dir else "fake"
+    replay = {"CASSETTE_DIR": cassette_dir, "CASSETTE_RECORD": "false"}
+    env = {
+        **os.environ,
+        **(replay if cassette_dir else {}),
+        "LLM_PROVIDER": provider,
+        "SEARCH_PROVIDER": provider,
+        "ZHIPUAI_API_KEY": os.environ.get("ZHIPUAI_API_KEY", "load-test"),
+        "TAVILY_API_KEY": os.environ.get("TAVILY_API_KEY", "load-test"),
+        "DATABASE_URL": f"sqlite+aiosqlite:///{data_dir}/chatbot.db",
+        "CANCEL_SQLITE_PATH": f"{data_dir}/generations.db",
+        "DEBUG": "false",
+        "LOG_LEVEL": "WARNING",
+        "STARTUP_PREWARM": "false",
+        "PYTHONPATH": os.pathsep.join(
+            filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])
+        ),
+    }
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "backend.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ],
+        cwd=ROOT / "backend",
+        env=env,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited with status {process.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=1).status_code == 200:
+                return process, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("Server did not start within 60s")
+
+
+def _ms(value: Optional[float]) -> str:
+    return f"{value:>8.0f}" if value is not None else f"{'-':>8}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="start a backend with the fake providers instead of using --url",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="DIR",
+        help="start a backend replaying the cassettes in DIR instead of using --url",
+    )
+    parser.add_argument(
+        "--endpoint", choices=["stream", "chat", "both"], default="both"
+    )
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument(
+        "--duration", type=float, help="stop after this many seconds per endpoint"
+    )
+    parser.add_argument(
+        "--unique", action="store_true", help="make every question distinct"
+    )
+    args = parser.parse_args()
+
+    endpoints = ["stream", "chat"] if args.endpoint == "both" else [args.endpoint]
+    cassette_dir = os.path.abspath(args.replay) if args.replay else None
+    questions = _recorded_questions(cassette_dir) if cassette_dir else QUESTIONS
+    with tempfile.TemporaryDirectory() as data_dir:
+        process = None
+        url = args.url
+        if args.serve or cassette_dir:
+            process, url = _serve(data_dir, cassette_dir)
+        try:
+            print(
+                f"{url}: {args.concurrency} users, up to {args.requests} turns"
+                + (f" or {args.duration:.0f}s" if args.duration else "")
+                + " per endpoint"
+            )
+            print(
+                f"{'endpoint':>8} {'turns':>6} {'errors':>6} {'turns/s':>8} "
+                f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+                f"{'ttft p50':>8} {'ttft p95':>8} {'ttft p99':>8}"
+            )
+            for endpoint in endpoints:
+                result = asyncio.run(
+                    _run_endpoint(
+                        url,
+                        endpoint,
+                        args.concurrency,
+                        args.requests,
+                        args.duration,
+                        args.unique,
+                        questions,
+                    )
+                )
+                errors = sum(result["errors"].values())
+                print(
+                    f"{endpoint:>8} {result['requests']:>6} {errors:>6} "
+                    f"{result['throughput']:>8.2f} "
+                    + " ".join(_ms(ms) for ms in result["latency"] + result["ttft"])
+                )
+                for error, count in result["errors"].most_common():
+                    print(f"{'':>8} {count:>6} x {error}")
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Benchmark the local BM25 document index.
+
+Builds a synthetic corpus with a Zipf-distributed vocabulary (one chunk per
+document), then reports open time, query latency percentiles for rare,
+medium and common terms, and incremental add/delete latency.
+
+Usage:
+    python -m backend.benchmarks.bench_local_search [--chunks 1000000]
+        [--index-dir PATH] [--queries 200]
+
+An existing ``--index-dir`` is reused instead of rebuilt.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.retrieval.index import DocumentIndex
+
+VOCABULARY = 50_000
+TOKENS_PER_CHUNK = 40
+BATCH = 100_000
+
+
+def _corpus(count: int, start: int, rng: np.random.Generator):
+    words = np.minimum(
+        rng.zipf(1.2, size=(count, TOKENS_PER_CHUNK)), VOCABULARY
+    ).astype(np.int64)
+    for i, row in enumerate(words):
+        yield {
+            "id": f"doc{start + i}",
+            "text": " ".join(f"w{w}" for w in row),
+        }
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return pick(0.5), pick(0.95), pick(0.99)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=1_000_000)
+    parser.add_argument("--index-dir", default=None)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    index_dir = Path(args.index_dir or tempfile.mkdtemp(prefix="bm25-bench-"))
+    rng = np.random.default_rng(0)
+    index = DocumentIndex(str(index_dir), chunk_size=10_000)
+
+    if not (index_dir / "manifest.json").exists():
+        started = time.perf_counter()
+        for start in range(0, args.chunks, BATCH):
+            count = min(BATCH, args.chunks - start)
+            index.add_documents(list(_corpus(count, start, rng)))
+        index.compact()
+        print(f"built {args.chunks} chunks in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    index = DocumentIndex(str(index_dir))
+    stats = index.stats()
+    print(f"opened {stats['chunks']} chunks in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    print(f"\n{'query':<28}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+    for label, low, high in [
+        ("rare terms (w5000+)", 5000, VOCABULARY),
+        ("medium terms (w100-1000)", 100, 1000),
+        ("common terms (w1-10)", 1, 10),
+    ]:
+        samples = []
+        for _ in range(args.queries):
+            terms = rng.integers(low, high, size=rng.integers(1, 4))
+            query = " ".join(f"w{t}" for t in terms)
+            started = time.perf_counter()
+            index.search(query, k=5)
+            samples.append((time.perf_counter() - started) * 1000)
+        p50, p95, p99 = _percentiles(samples)
+        print(f"{label:<28}{p50:>9.2f}{p95:>9.2f}{p99:>9.2f}")
+
+    started = time.perf_counter()
+    index.add_documents(list(_corpus(100, args.chunks, rng)))
+    add_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    index.delete("doc0")
+    delete_ms = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    index.search("w1 w2", k=5)
+    refresh_ms = (time.perf_counter() - started) * 1000
+    print(f"\nadd 100 docs {add_ms:.1f} ms, delete {delete_ms:.1f} ms, "
+          f"first query after change {refresh_ms:.1f} ms")
+    print(f"index: {index_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""Benchmark event loop lag and throughput of agent turns with logging.
+
+Runs concurrent ReAct turns (fake LLM with model latency, one tool call
+each) with the detailed LLM callback handler attached, while a probe task
+measures how late the event loop wakes it up. Modes:
+
+- off: no LLM callback logging
+- sync: every body in full through a synchronous text handler, with the
+  handler dispatched to a thread per event (the previous setup)
+- queue: JSON records through the queue pipeline, bodies sampled and capped
+
+Logs are written to a named pipe drained at ``--reader-kib-per-s``, like
+stdout read by a terminal or log shipper that falls behind: once the pipe
+buffer is full, writes block.
+
+Usage:
+    python -m backend.benchmarks.bench_logging [--turns 200] [--concurrency 20]
+        [--reader-kib-per-s 1024] [--sample-rate 0.1]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.agent.callback_handler import LLMDetailedCallbackHandler
+from backend.agent.executor import ChatAgentExecutor
+from backend.utils.log_pipeline import TextFormatter, log_pipeline
+from langchain_classic.agents import create_react_agent
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.prompts import PromptTemplate
+from langchain_core.tools import tool
+
+# Long enough to resemble a real ReAct prompt with tool descriptions
+REACT_TEMPLATE = (
+    "You are a helpful assistant. " * 150
+    + """Tools: {tools} [{tool_names}]
+Question: {input}
+Thought:{agent_scratchpad}"""
+)
+
+PROBE_INTERVAL = 0.005
+
+
+class SlowReader(threading.Thread):
+    """Drains a named pipe at a limited rate."""
+
+    def __init__(self, path: str, kib_per_s: float) -> None:
+        super().__init__(daemon=True)
+        self.path = path
+        self.chunk_delay = 4 / kib_per_s
+        self.received = 0
+
+    def run(self) -> None:
+        with open(self.path, "rb", buffering=0) as pipe:
+            while chunk := pipe.read(4096):
+                self.received += len(chunk)
+                time.sleep(self.chunk_delay * len(chunk) / 4096)
+
+
+class NetworkLLM(FakeListLLM):
+    """Fake LLM that waits like a remote model before answering."""
+
+    latency: float = 0.05
+
+    async def _acall(self, prompt, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return await super()._acall(prompt, stop, run_manager, **kwargs)
+
+
+@tool
+async def lookup(query: str) -> str:
+    """Look something up."""
+    return f"result for {query} " * 50
+
+
+def _executor(handler):
+    llm = NetworkLLM(
+        responses=[
+            "Thought: check\nAction: lookup\nAction Input: x",
+            "Thought: done\nFinal Answer: " + "answer " * 100,
+        ]
+    )
+    agent = create_react_agent(
+        llm=llm, tools=[lookup], prompt=PromptTemplate.from_template(REACT_TEMPLATE)
+    )
+    return ChatAgentExecutor(
+        agent=agent,
+        tools=[lookup],
+        max_iterations=4,
+        callbacks=[handler] if handler else None,
+    )
+
+
+async def _probe(lags, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append((time.perf_counter() - started - PROBE_INTERVAL) * 1000)
+
+
+async def _run(handler, turns, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def turn():
+        async with semaphore:
+            # A fresh executor per turn, since the fake LLM cycles responses
+            await _executor(handler).ainvoke({"input": "q"})
+
+    lags = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(turn() for _ in range(turns)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    return turns / elapsed, sorted(lags)
+
+
+def _setup(mode, path, sample_rate):
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    if mode == "off":
+        return None
+    if mode == "sync":
+        handler = logging.FileHandler(path, encoding="utf-8")
+        handler.setFormatter(TextFormatter())
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        callback = LLMDetailedCallbackHandler(body_sample_rate=1.0, body_max_chars=0)
+        callback.run_inline = False
+        return callback
+    log_pipeline.start(level="INFO", routes=f"DEBUG={path}", fmt="json")
+    return LLMDetailedCallbackHandler(body_sample_rate=sample_rate)
+
+
+def _teardown() -> None:
+    log_pipeline.stop()
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+        existing.close()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--reader-kib-per-s", type=float, default=1024)
+    parser.add_argument("--sample-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    print(
+        f"{args.turns} turns, concurrency {args.concurrency}, "
+        f"log reader {args.reader_kib_per_s:.0f} KiB/s"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("off", "sync", "queue"):
+            path = f"{tmp}/{mode}.log"
+            os.mkfifo(path)
+            reader = SlowReader(path, args.reader_kib_per_s)
+            reader.start()
+            callback = _setup(mode, path, args.sample_rate)
+            throughput, lags = await _run(callback, args.turns, args.concurrency)
+            dropped = log_pipeline.stats()["dropped"] if mode == "queue" else 0
+            _teardown()
+            if mode == "off":
+                # Nothing opened the pipe; let the reader finish
+                open(path, "wb").close()
+            reader.join()
+
+            def percentile(p: float) -> float:
+                return lags[min(len(lags) - 1, int(len(lags) * p))]
+
+            print(
+                f"{mode:<6} {throughput:7.1f} turns/s  loop lag p50 "
+                f"{percentile(0.50):6.2f} ms  p99 {percentile(0.99):6.2f} ms  "
+                f"max {lags[-1]:7.2f} ms  logged {reader.received / 1024:7.0f} KiB"
+                f"  dropped {dropped}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
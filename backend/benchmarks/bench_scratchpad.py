@@ -0,0 +1,100 @@
+"""Benchmark prompt tokens per agent iteration with scratchpad compaction.
+
+Runs a scripted ReAct agent (fake LLM, fake search tool) for the full
+iteration budget and prints the estimated prompt tokens of every planning
+call with compaction off and on.
+
+Usage:
+    python -m backend.benchmarks.bench_scratchpad [--iterations 5]
+        [--threshold 1500] [--result-chars 1500]
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.agent.executor import ChatAgentExecutor
+from backend.agent.observations import estimate_tokens
+from langchain_classic.agents import create_react_agent
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.prompts import PromptTemplate
+from langchain_core.tools import tool
+
+TEMPLATE = """Answer the question using the tools.
+
+Tools: {tools}
+Tool names: {tool_names}
+
+Question: {input}
+Thought:{agent_scratchpad}"""
+
+RESULT_CHARS = 1500
+
+
+@tool
+def search(query: str) -> list:
+    """Search the web."""
+    return [
+        {
+            "title": f"{query} result {i}",
+            "url": f"https://example.com/{query}/{i}",
+            "content": (f"{query} details " * RESULT_CHARS)[:RESULT_CHARS],
+        }
+        for i in range(3)
+    ]
+
+
+class PromptRecorder(FakeListLLM):
+    prompts: list = []
+
+    async def _acall(self, prompt, stop=None, run_manager=None, **kwargs):
+        self.prompts.append(prompt)
+        return await super()._acall(prompt, stop=stop, run_manager=run_manager, **kwargs)
+
+
+async def _run(iterations: int, threshold: int) -> list:
+    responses = [
+        f"Thought: I should look up part {i} of the question.\n"
+        f"Action: search\nAction Input: topic{i}"
+        for i in range(iterations - 1)
+    ]
+    responses.append("Thought: I have enough.\nFinal Answer: done")
+    llm = PromptRecorder(responses=responses, prompts=[])
+    agent = create_react_agent(
+        llm=llm, tools=[search], prompt=PromptTemplate.from_template(TEMPLATE)
+    )
+    executor = ChatAgentExecutor(
+        agent=agent,
+        tools=[search],
+        max_iterations=iterations,
+        scratchpad_token_threshold=threshold,
+    )
+    await executor.ainvoke({"input": "compare the topics"})
+    return [estimate_tokens(prompt) for prompt in llm.prompts]
+
+
+def main() -> None:
+    global RESULT_CHARS
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--threshold", type=int, default=1500)
+    parser.add_argument("--result-chars", type=int, default=RESULT_CHARS)
+    args = parser.parse_args()
+    RESULT_CHARS = args.result_chars
+
+    off = asyncio.run(_run(args.iterations, 0))
+    on = asyncio.run(_run(args.iterations, args.threshold))
+
+    print(f"{'iteration':<12}{'off':>10}{'on':>10}  (estimated prompt tokens)")
+    for i, (a, b) in enumerate(zip(off, on), 1):
+        print(f"{i:<12}{a:>10}{b:>10}")
+    print(f"{'total':<12}{sum(off):>10}{sum(on):>10}")
+    print(f"\nsaved {1 - sum(on) / sum(off):.0%} of prompt tokens "
+          f"(threshold {args.threshold})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Benchmark backend cold start against a time budget.
+
+Each run starts a fresh interpreter and measures:
+
+- import: ``import backend.main``, plus every host lookup / socket
+  connection attempted while importing (recorded with an audit hook)
+- lifespan: application startup (tool declaration, worker pool, database)
+- first request: ``GET /api/config`` through the ASGI app, which loads the
+  declared tools
+- agent ready: building the streaming tool-using agent, which is what the
+  first chat request does before it calls the model
+
+Time to first request is the sum of the four. The process exits with status
+1 if its median exceeds ``--budget-ms``. Startup prewarming is disabled
+unless ``--prewarm`` is given, so the deferred imports are charged to the
+first request rather than racing it.
+
+Usage:
+    python -m backend.benchmarks.bench_startup [--runs 5] [--budget-ms 2500]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent.parent
+
+PHASES = ["import_ms", "lifespan_ms", "first_request_ms", "agent_ready_ms"]
+
+CHILD = """
+import asyncio, json, sys, time
+
+network = []
+
+def audit(event, args):
+    if event == "socket.getaddrinfo":
+        network.append(f"lookup {args[0]}")
+    elif event == "socket.connect":
+        network.append(f"connect {args[1]}")
+
+sys.addaudithook(audit)
+started = time.perf_counter()
+try:
+    import backend.main
+except Exception as exc:
+    print("RESULT " + json.dumps({"error": f"{type(exc).__name__}: {exc}"[:200]}))
+    raise SystemExit(0)
+result = {"import_ms": (time.perf_counter() - started) * 1000}
+result["import_network"] = list(network)
+
+
+async def run():
+    import httpx
+
+    app = backend.main.app
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        result["lifespan_ms"] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+            response = await client.get("/api/config")
+            response.raise_for_status()
+        result["first_request_ms"] = (time.perf_counter() - started) * 1000
+        result["tools"] = response.json()["tools"]
+
+        started = time.perf_counter()
+        from backend.agent import AgentFactory
+
+        AgentFactory.get_executor(streaming=True, enable_tools=True)
+        result["agent_ready_ms"] = (time.perf_counter() - started) * 1000
+
+
+asyncio.run(run())
+print("RESULT " + json.dumps(result))
+"""
+
+
+def _run_once(prewarm: bool, timeout: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "ZHIPUAI_API_KEY": os.environ.get("ZHIPUAI_API_KEY", "bench"),
+            "TAVILY_API_KEY": os.environ.get("TAVILY_API_KEY", "bench"),
+            "DATABASE_URL": f"sqlite+aiosqlite:///{tmp}/bench.db",
+            "LOCAL_SEARCH_INDEX_DIR": f"{tmp}/doc_index",
+            "PROMPT_CACHE_PATH": f"{tmp}/prompt_bundle.json",
+            "PROMPT_REFRESH_ENABLED": "false",
+            "STARTUP_PREWARM": str(prewarm).lower(),
+            "LOG_LEVEL": "WARNING",
+            "PYTHONDONTWRITEBYTECODE": "1",
+        }
+        started = time.perf_counter()
+        try:
+            proc = subprocess.run(
+                [sys.executable, "-c", CHILD],
+                cwd=ROOT,
+                env=env,
+                capture_output=True,
+                text=True,
+                timeout=timeout,
+            )
+        except subprocess.TimeoutExpired:
+            return {"error": f"timed out after {timeout:.0f}s"}
+        process_ms = (time.perf_counter() - started) * 1000
+    for line in proc.stdout.splitlines():
+        if line.startswith("RESULT "):
+            result = json.loads(line[len("RESULT ") :])
+            result["process_ms"] = process_ms
+            return result
+    last = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+    return {"error": last[:200]}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=2500)
+    parser.add_argument("--prewarm", action="store_true")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    results = [_run_once(args.prewarm, args.timeout) for _ in range(args.runs)]
+    failures = [r["error"] for r in results if "error" in r]
+    results = [r for r in results if "error" not in r]
+    if failures:
+        print(f"{len(failures)} failed run(s): {failures[0]}")
+    if not results:
+        return 1
+
+    print(f"{len(results)} runs, medians:")
+    for phase in PHASES:
+        median = statistics.median(r[phase] for r in results)
+        print(f"  {phase[:-3]:<16} {median:8.0f} ms")
+    total = statistics.median(sum(r[phase] for phase in PHASES) for r in results)
+    process = statistics.median(r["process_ms"] for r in results)
+    print(f"  {'process wall':<16} {process:8.0f} ms (with interpreter start/exit)")
+    print(f"tools: {', '.join(results[0]['tools'])}")
+
+    network = results[0]["import_network"]
+    print(f"network calls during import: {len(network)}")
+    for call in network[:10]:
+        print(f"  {call}")
+
+    within = total <= args.budget_ms
+    print(
+        f"time to first request: {total:.0f} ms "
+        f"({'within' if within else 'OVER'} budget of {args.budget_ms:.0f} ms)"
+    )
+    return 0 if within else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
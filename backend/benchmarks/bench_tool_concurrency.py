@@ -0,0 +1,144 @@
+"""Benchmark concurrent tool-using turns with sync vs native async tools.
+
+Each simulated turn calls the search tool and then the calculator, the way
+an agent turn would. A local HTTP server stands in for the Tavily API with a
+fixed latency. Two modes are compared:
+
+- ``sync``: the tools' sync paths in the default thread executor, which is
+  what ``AgentExecutor`` does for tools without a coroutine
+- ``async``: the native coroutines (shared HTTP client, inline math)
+
+For each mode the script prints wall time, peak thread count and turn
+latency percentiles.
+
+Usage:
+    python -m backend.benchmarks.bench_tool_concurrency [--turns 100]
+        [--latency-ms 200] [--max-connections 20]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+os.environ.setdefault("TAVILY_API_KEY", "bench")
+
+from aiohttp import web
+from backend.tools.calculator import calculator
+from backend.tools.http_client import http_client
+from backend.tools.tavily_search import AsyncTavilySearchResults
+from langchain_community.utilities import tavily_search as tavily_utilities
+
+
+async def _start_server(latency_ms: float) -> tuple:
+    async def search(request):
+        body = await request.json()
+        await asyncio.sleep(latency_ms / 1000)
+        return web.json_response(
+            {
+                "results": [
+                    {
+                        "title": body["query"],
+                        "url": "https://example.com",
+                        "content": "result text " * 20,
+                        "score": 0.9,
+                    }
+                ]
+            }
+        )
+
+    app = web.Application()
+    app.router.add_post("/search", search)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def _sample_threads(peak: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        peak[0] = max(peak[0], threading.active_count())
+        await asyncio.sleep(0.005)
+
+
+async def _run_mode(mode: str, turns: int, latency_ms: float) -> dict:
+    runner, url = await _start_server(latency_ms)
+    # The sync path posts to the module-level URL of the upstream wrapper
+    tavily_utilities.TAVILY_API_URL = url
+    search = AsyncTavilySearchResults(api_url=url, max_results=1)
+    loop = asyncio.get_running_loop()
+
+    async def turn(i: int) -> float:
+        started = time.perf_counter()
+        query = {"query": f"question {i}"}
+        expression = {"expression": f"{i} * 3 + sqrt({i})"}
+        if mode == "sync":
+            await loop.run_in_executor(None, search.invoke, query)
+            await loop.run_in_executor(None, calculator.invoke, expression)
+        else:
+            await search.ainvoke(query)
+            await calculator.ainvoke(expression)
+        return (time.perf_counter() - started) * 1000
+
+    peak = [threading.active_count()]
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(_sample_threads(peak, stop))
+    started = time.perf_counter()
+    latencies = sorted(await asyncio.gather(*(turn(i) for i in range(turns))))
+    wall_ms = (time.perf_counter() - started) * 1000
+    stop.set()
+    await sampler
+    await http_client.aclose()
+    await runner.cleanup()
+
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+    return {
+        "wall_ms": wall_ms,
+        "threads": peak[0],
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=http_client.max_connections,
+        help="connection pool size of the shared HTTP client",
+    )
+    args = parser.parse_args()
+    http_client.max_connections = args.max_connections
+
+    print(
+        f"{args.turns} concurrent turns, search latency {args.latency_ms:.0f} ms, "
+        f"default executor size {min(32, (os.cpu_count() or 1) + 4)}, "
+        f"HTTP pool size {args.max_connections}"
+    )
+    print(
+        f"{'mode':>6} {'wall ms':>9} {'threads':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    for mode in ("sync", "async"):
+        # A fresh loop per mode, so the default executor starts empty
+        result = asyncio.run(_run_mode(mode, args.turns, args.latency_ms))
+        print(
+            f"{mode:>6} {result['wall_ms']:>9.0f} {result['threads']:>8} "
+            f"{result['p50']:>8.0f} {result['p95']:>8.0f} {result['p99']:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Benchmark relevance-based tool selection as the registry grows.
+
+Registers synthetic tools with realistic descriptions next to the built-in
+ones and prints, per registry size, the selection latency and the prompt
+tokens saved by rendering only the top-k tools.
+
+Usage:
+    python -m backend.benchmarks.bench_tool_selection [--top-k 5]
+        [--sizes 5,20,50,100] [--queries 200]
+"""
+
+import argparse
+import statistics
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from backend.agent.observations import estimate_tokens
+from backend.agent.tool_selection import ToolSelector
+from langchain_core.tools import StructuredTool, render_text_description
+
+TOPICS = [
+    ("weather", "Get the current weather forecast, temperature and wind for a city"),
+    ("stock_price", "Look up the latest stock price and market cap of a company"),
+    ("translate", "Translate text between languages such as English and French"),
+    ("currency", "Convert an amount of money between currencies at today's rate"),
+    ("calendar", "List, create or move events in the user's calendar"),
+    ("email", "Search the mailbox or send an email to a contact"),
+    ("maps", "Find directions, travel time and distance between two places"),
+    ("news", "Fetch recent news headlines about a topic"),
+    ("wiki", "Look up an encyclopedia article and return its summary"),
+    ("recipes", "Find cooking recipes by ingredient or dish name"),
+]
+
+QUERIES = [
+    "what is the weather in Berlin tomorrow",
+    "how much is 100 dollars in euros",
+    "translate good morning into French",
+    "latest news about electric cars",
+    "directions from the airport to the hotel",
+    "a recipe with chicken and rice",
+]
+
+
+def _make_tools(count: int) -> list:
+    tools = []
+    for i in range(count):
+        name, description = TOPICS[i % len(TOPICS)]
+        tools.append(
+            StructuredTool.from_function(
+                func=lambda query: query,
+                name=f"{name}_{i}",
+                description=f"{description}. Variant {i}; input is a plain query.",
+            )
+        )
+    return tools
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--sizes", default="5,20,50,100")
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'tools':>6} {'all tok':>8} {'saved':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        tools = _make_tools(size)
+        selector = ToolSelector()
+        selector.select(QUERIES[0], tools, args.top_k)  # build the index
+        latencies, saved = [], []
+        for i in range(args.queries):
+            selection = selector.select(QUERIES[i % len(QUERIES)], tools, args.top_k)
+            latencies.append(selection.latency_ms)
+            saved.append(selection.tokens_saved_per_prompt)
+        latencies.sort()
+        all_tokens = estimate_tokens(render_text_description(tools))
+        print(
+            f"{size:>6} {all_tokens:>8} {int(statistics.mean(saved)):>7} "
+            f"{statistics.median(latencies):>8.3f} "
+            f"{latencies[int(len(latencies) * 0.95) - 1]:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,52 @@ from __future__ import annotations
 
 import asyncio
 import json
-from typing import AsyncGenerator, List, Optional
+import logging
+import time
+from typing import Any, AsyncGenerator, List, Optional, Tuple
 from sqlalchemy import update
 
+from backend.agent.budget import TurnBudget
 from backend.agent.callback_handler import (
     clear_session_id_for_logging,
-    get_last_token_usage,
+    get_tracing_callbacks,
     set_session_id_for_logging,
 )
 from backend.agent.engine import chat_async, chat_async_stream
+from backend.agent.loop_guard import LoopStats, clear_loop_stats, set_loop_stats
+from backend.agent.recording import start_recording
+from backend.agent.tool_selection import (
+    ToolSelection,
+    clear_tool_selection,
+    set_tool_selection,
+    tool_selector,
+)
+from backend.agent.tool_pool import TOOL_ERROR_PREFIX
+from backend.agent.tool_timing import (
+    STATUS_CANCELLED,
+    STATUS_FAILED,
+    STATUS_RUNNING,
+    ToolRun,
+    ToolTimingHandler,
+)
+from backend.agent.token_usage import TokenLedger
+from backend.agent.tools import ToolRegistry
+from backend.agent.observations import (
+    ObservationStats,
+    clear_observation_stats,
+    set_observation_stats,
+)
 from backend.config import settings
 from backend.db.repositories import (
     MessageRepository,
     SessionRepository,
+    TokenUsageRepository,
     ToolStepRepository,
 )
+from backend.tools.search_cache import set_search_cache_bypass
+from backend.utils import tracing, turn_timing
+from backend.utils.metrics import TurnRecorder
+from backend.utils.turn_timing import TurnTiming, clear_turn_timing, set_turn_timing
 from backend.models import (
     ChatResponse,
     MessageResponse,
@@ -25,6 +56,7 @@ from backend.models import (
 from backend.db.models import Message
 from backend.utils import MessageConverter, cancel_manager
 from fastapi import HTTPException, status
+from langchain_core.agents import AgentAction
 from langchain_core.messages import BaseMessage
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
@@ -34,6 +66,8 @@ __all__ = [
     "chat_generator",
 ]
 
+logger = logging.getLogger(__name__)
+
 
 class MemoryManager:
     """Manages conversation memory by loading history from database.
@@ -61,10 +95,31 @@ async def chat_stream_generator(
     db: AsyncSession,
     enable_tools: bool = True,
     enable_memory: bool = False,
+    turn_timeout_seconds: Optional[float] = None,
+    bypass_search_cache: bool = False,
 ) -> AsyncGenerator[str, None]:
     """Stream chat responses while emitting structured SSE events."""
-    stop_event = cancel_manager.get_stop_event(session_id)
+    recorder = TurnRecorder(True, enable_tools, enable_memory)
+    turn_timer = TurnTiming(tracing.request_received_at())
+    set_turn_timing(turn_timer)
+    # Until the done event is sent; a client disconnect ends the generator
+    turn_status = "disconnected"
+    ledger = TokenLedger()
+    cassette_recorder = start_recording(message, streaming=True)
+    budget = _create_turn_budget(turn_timeout_seconds)
+    stop_event = await cancel_manager.start_generation(
+        session_id, ttl_seconds=_registration_ttl(budget)
+    )
     set_session_id_for_logging(session_id)
+    set_search_cache_bypass(bypass_search_cache)
+    observation_stats = ObservationStats()
+    set_observation_stats(observation_stats)
+    loop_stats = LoopStats(recorder.labels)
+    set_loop_stats(loop_stats)
+    tool_selection = await _select_tools(message, enable_tools)
+    timing = ToolTimingHandler()
+    # Tool steps persisted on tool_start, waiting for their result
+    pending_steps: List[Tuple[AgentAction, int]] = []
 
     try:
         await MessageRepository.create(
@@ -93,16 +148,26 @@ async def chat_stream_generator(
             model=settings.MODEL_NAME,
         )
 
-        tool_actions: List[tuple] = []
+        step_number = 0
 
         full_output = ""
+        streamed_answer = ""
+        streamed_thought = False
         async for chunk in chat_async_stream(
             message,
             enable_tools=enable_tools,
             enable_memory=enable_memory,
             chat_history=chat_history,
+            budget=budget,
+            callbacks=[
+                timing,
+                ledger,
+                *([cassette_recorder] if cassette_recorder else []),
+                *get_tracing_callbacks(),
+            ],
         ):
             if stop_event.is_set():
+                turn_status = "cancelled"
                 yield _format_event(
                     {"type": "cancelled", "message": "Generation cancelled by user"}
                 )
@@ -111,6 +176,27 @@ async def chat_stream_generator(
             if not isinstance(chunk, dict):
                 continue
 
+            # Tokens parsed from the ReAct LLM stream before the executor
+            # returns its final output
+            if chunk.get("thought"):
+                streamed_thought = True
+                yield _format_event({"type": "thought", "content": chunk["thought"]})
+                continue
+
+            if chunk.get("answer_reset"):
+                # The streamed text was not the final answer after all
+                streamed_answer = ""
+                yield _format_event({"type": "replace", "content": ""})
+                continue
+
+            if chunk.get("answer_delta"):
+                recorder.first_token()
+                streamed_answer += chunk["answer_delta"]
+                yield _format_event(
+                    {"type": "message", "content": chunk["answer_delta"]}
+                )
+                continue
+
             for action in chunk.get("actions", []) or []:
                 tool_name = getattr(action, "tool", None)
                 if not tool_name:
@@ -123,13 +209,23 @@ async def chat_stream_generator(
                     else {"input": tool_input}
                 )
 
-                tool_actions.append((tool_name, tool_input_normalized))
+                step_number += 1
+                tool_step = await ToolStepRepository.create(
+                    db,
+                    message_id=assistant_message.id,
+                    step_number=step_number,
+                    tool_name=tool_name,
+                    tool_input=tool_input_normalized,
+                )
+                pending_steps.append((action, tool_step.id))
 
                 yield _format_event(
                     {
                         "type": "tool_start",
                         "tool": tool_name,
                         "input": tool_input_normalized,
+                        "step_number": step_number,
+                        "budget": budget.snapshot(),
                     }
                 )
 
@@ -137,21 +233,29 @@ async def chat_stream_generator(
                 observation = getattr(step, "observation", None)
                 if observation is None:
                     continue
+                tool_step_id = _pop_pending_step(pending_steps, step.action)
+                if tool_step_id is None:
+                    # Parse failures come back as steps without an action
+                    continue
 
-                obs_str = (
-                    json.dumps(observation, ensure_ascii=False)
-                    if isinstance(observation, list)
-                    else str(observation)
-                )
+                # The full output is kept here even when the prompt only
+                # saw a truncated observation
+                obs_str = _observation_text(observation)
+                run = timing.run_for(step.action)
+                await _finish_tool_step(db, tool_step_id, obs_str, run)
                 yield _format_event(
                     {
                         "type": "tool_result",
+                        "tool": step.action.tool,
                         "result": obs_str,
-                        "duration_ms": 100,
+                        **_run_timing(run),
+                        "budget": budget.snapshot(),
                     }
                 )
 
             for msg in chunk.get("messages", []) or []:
+                if streamed_thought:
+                    break
                 content = getattr(msg, "content", None)
                 if not isinstance(content, str):
                     continue
@@ -169,49 +273,86 @@ async def chat_stream_generator(
                 else:
                     full_output = output
 
-                async for event in _stream_text(full_output):
-                    yield event
+                remaining_text = _unstreamed_suffix(full_output, streamed_answer)
+                if remaining_text is None:
+                    # Forced finishes and fallbacks differ from what was
+                    # streamed; the client replaces its text
+                    recorder.first_token()
+                    yield _format_event({"type": "replace", "content": full_output})
+                elif remaining_text:
+                    recorder.first_token()
+                    async for event in _stream_text(remaining_text):
+                        yield event
+
+        for action, tool_step_id in pending_steps:
+            await _finish_tool_step(
+                db,
+                tool_step_id,
+                "",
+                timing.run_for(action),
+                cancelled=True,
+            )
 
+        if ledger.calls:
+            await TokenUsageRepository.record(
+                db, session_id, ledger.totals(), len(ledger.calls)
+            )
+        # Up to the final write; tokens spent before a cancel are recorded too
+        timing_snapshot = turn_timer.snapshot(ledger.calls, timing.runs.values())
+        values = {
+            "tokens_used": ledger.totals(),
+            "token_usage": ledger.snapshot(),
+            "turn_budget": budget.snapshot(),
+            "timing": timing_snapshot,
+        }
         if full_output:
-            token_usage_data = get_last_token_usage()
-            tokens_used: Optional[dict[str, int]] = None
-
-            if token_usage_data:
-                tokens_used = {
-                    "prompt_tokens": token_usage_data.get("prompt_tokens", 0),
-                    "completion_tokens": token_usage_data.get("completion_tokens", 0),
-                    "total_tokens": token_usage_data.get("total_tokens", 0),
-                }
-
+            values["content"] = full_output
+        elif streamed_answer:
+            # Cancelled while the answer was streaming
+            values["content"] = streamed_answer.strip()
+        with turn_timer.measure("db_write"):
             await db.execute(
                 update(Message)
                 .where(Message.id == assistant_message.id)
-                .values(content=full_output, tokens_used=tokens_used)
+                .values(**values)
             )
             await db.flush()
-
-            for i, (tool_name, tool_input) in enumerate(tool_actions, 1):
-                await ToolStepRepository.create(
-                    db,
-                    message_id=assistant_message.id,
-                    step_number=i,
-                    tool_name=tool_name,
-                    tool_input=tool_input,
-                )
-
             await db.refresh(assistant_message)
 
         done_event = _format_event(
-            {"type": "done", "tokens_used": assistant_message.tokens_used}
+            {
+                "type": "done",
+                "tokens_used": assistant_message.tokens_used,
+                "token_usage": assistant_message.token_usage,
+                "budget": budget.snapshot(),
+                "observations": observation_stats.snapshot(),
+                "loops": loop_stats.snapshot(),
+                "tool_selection": tool_selection.snapshot()
+                if tool_selection
+                else None,
+                "timing": timing_snapshot,
+            }
         )
+        if turn_status != "cancelled":
+            turn_status = "completed"
         yield done_event
 
     except Exception as exc:
+        turn_status = "error"
+        await _fail_pending_steps(db, pending_steps, timing, str(exc))
         error_event = {"type": "error", "message": str(exc)}
         yield _format_event(error_event)
     finally:
+        recorder.finish(turn_status, ledger.totals(), len(ledger.calls))
+        if cassette_recorder:
+            await cassette_recorder.finish(turn_status)
+        clear_turn_timing()
         clear_session_id_for_logging()
-        cancel_manager.cleanup(session_id)
+        set_search_cache_bypass(False)
+        clear_observation_stats()
+        clear_loop_stats()
+        clear_tool_selection()
+        await cancel_manager.cleanup(session_id)
 
 
 async def chat_generator(
@@ -220,14 +361,32 @@ async def chat_generator(
     db: AsyncSession,
     enable_tools: bool = True,
     enable_memory: bool = False,
+    turn_timeout_seconds: Optional[float] = None,
+    bypass_search_cache: bool = False,
 ) -> ChatResponse:
     """Generate chat response for non-streaming endpoint.
 
     Follows same pattern as chat_stream_generator but returns
     a single ChatResponse instead of streaming SSE events.
     """
-    stop_event = cancel_manager.get_stop_event(session_id)
+    recorder = TurnRecorder(False, enable_tools, enable_memory)
+    turn_timer = TurnTiming(tracing.request_received_at())
+    set_turn_timing(turn_timer)
+    turn_status = "error"
+    budget = _create_turn_budget(turn_timeout_seconds)
+    stop_event = await cancel_manager.start_generation(
+        session_id, ttl_seconds=_registration_ttl(budget)
+    )
     set_session_id_for_logging(session_id)
+    set_search_cache_bypass(bypass_search_cache)
+    observation_stats = ObservationStats()
+    set_observation_stats(observation_stats)
+    loop_stats = LoopStats(recorder.labels)
+    set_loop_stats(loop_stats)
+    tool_selection = await _select_tools(message, enable_tools)
+    timing = ToolTimingHandler()
+    ledger = TokenLedger()
+    cassette_recorder = start_recording(message, streaming=False)
 
     try:
         session = await SessionRepository.get_by_id(db, session_id)
@@ -260,6 +419,13 @@ async def chat_generator(
             enable_memory=enable_memory,
             chat_history=chat_history,
             stop_event=stop_event,
+            budget=budget,
+            callbacks=[
+                timing,
+                ledger,
+                *([cassette_recorder] if cassette_recorder else []),
+                *get_tracing_callbacks(),
+            ],
         )
 
         # 如果 result["output"] 是 AIMessage 对象，提取其 content
@@ -267,135 +433,55 @@ async def chat_generator(
         if hasattr(output, "content"):
             output = output.content
 
-        token_usage_data = get_last_token_usage()
-        tokens_used: Optional[dict[str, int]] = None
-
-        if token_usage_data:
-            tokens_used = {
-                "prompt_tokens": token_usage_data.get("prompt_tokens", 0),
-                "completion_tokens": token_usage_data.get("completion_tokens", 0),
-                "total_tokens": token_usage_data.get("total_tokens", 0),
-            }
-
         assistant_message = await MessageRepository.create(
             db,
             session_id=session_id,
             role="assistant",
             content=output,
             model=settings.MODEL_NAME,
-            tokens_used=tokens_used,
+            tokens_used=ledger.totals(),
+            turn_budget=budget.snapshot(),
+            token_usage=ledger.snapshot(),
         )
+        if ledger.calls:
+            await TokenUsageRepository.record(
+                db, session_id, ledger.totals(), len(ledger.calls)
+            )
 
         await db.refresh(assistant_message)
-        tokens_used = assistant_message.tokens_used
-
-        if result.get("intermediate_steps"):
-            for i, step in enumerate(result["intermediate_steps"]):
-                if len(step) >= 2:
-                    action, observation = step[0], step[1]
-
-                    tool_input = (
-                        action.tool_input
-                        if isinstance(action.tool_input, dict)
-                        else {"input": action.tool_input}
-                    )
-
-                    tool_step = await ToolStepRepository.create(
-                        db,
-                        message_id=assistant_message.id,
-                        step_number=i + 1,
-                        tool_name=action.tool,
-                        tool_input=tool_input,
-                    )
-
-                    obs_str = str(observation)
-                    await ToolStepRepository.complete(
-                        db, tool_step_id=tool_step.id, output=obs_str, duration_ms=120
-                    )
 
-        tool_steps = []
-        for tool_step in await ToolStepRepository.get_by_message_id(
-            db, assistant_message.id
-        ):
-            tool_steps.append(
-                ToolStepResponse(
-                    id=tool_step.id,
-                    message_id=tool_step.message_id,
-                    step_number=tool_step.step_number,
-                    tool_name=tool_step.tool_name,
-                    tool_input=tool_step.tool_input,
-                    tool_output=tool_step.tool_output,
-                    tool_error=tool_step.tool_error,
-                    started_at=tool_step.started_at,
-                    completed_at=tool_step.completed_at,
-                    duration_ms=tool_step.duration_ms,
-                    status=tool_step.status,
-                )
+        for i, step in enumerate(result.get("intermediate_steps") or [], 1):
+            if len(step) < 2:
+                continue
+            action, observation = step[0], step[1]
+            tool_input = (
+                action.tool_input
+                if isinstance(action.tool_input, dict)
+                else {"input": action.tool_input}
+            )
+            tool_step = await ToolStepRepository.create(
+                db,
+                message_id=assistant_message.id,
+                step_number=i,
+                tool_name=action.tool,
+                tool_input=tool_input,
+            )
+            await _finish_tool_step(
+                db,
+                tool_step.id,
+                _observation_text(observation),
+                timing.run_for(action),
             )
 
-            if hasattr(result["output"], "response_metadata"):
-                metadata = result["output"].response_metadata
-                if "token_usage" in metadata:
-                    token_usage_metadata = metadata["token_usage"]
-                    tokens_used = {
-                        "prompt_tokens": token_usage_metadata.get("prompt_tokens", 0),
-                        "completion_tokens": token_usage_metadata.get(
-                            "completion_tokens", 0
-                        ),
-                        "total_tokens": token_usage_metadata.get("total_tokens", 0),
-                    }
-                    logger.info(
-                        f"[INFO] Found token_usage in response_metadata: {tokens_used}"
-                    )
-
-                    from backend.agent.callback_handler import _token_usage_cache
-
-                    _token_usage_cache[session_id] = tokens_used
-                    logger.info(f"[INFO] Token usage cached for session {session_id}")
-                    logger.info(
-                        f"[INFO] Found token_usage in response_metadata: {tokens_used}"
-                    )
+        timing_snapshot = turn_timer.snapshot(ledger.calls, timing.runs.values())
+        await MessageRepository.set_timing(db, assistant_message.id, timing_snapshot)
 
-        assistant_message = await MessageRepository.create(
-            db,
-            session_id=session_id,
-            role="assistant",
-            content=output,
-            model=settings.MODEL_NAME,
-            tokens_used=tokens_used,
+        stored_steps = await ToolStepRepository.get_by_message_id(
+            db, assistant_message.id
         )
-
-        await db.refresh(assistant_message)
-        tokens_used = assistant_message.tokens_used
-
-        if result.get("intermediate_steps"):
-            for i, step in enumerate(result["intermediate_steps"]):
-                if len(step) >= 2:
-                    action, observation = step[0], step[1]
-
-                    tool_input = (
-                        action.tool_input
-                        if isinstance(action.tool_input, dict)
-                        else {"input": action.tool_input}
-                    )
-
-                    tool_step = await ToolStepRepository.create(
-                        db,
-                        message_id=assistant_message.id,
-                        step_number=i + 1,
-                        tool_name=action.tool,
-                        tool_input=tool_input,
-                    )
-
-                    obs_str = str(observation)
-                    await ToolStepRepository.complete(
-                        db, tool_step_id=tool_step.id, output=obs_str, duration_ms=120
-                    )
-
+        serialization_started = time.perf_counter()
         tool_steps = []
-        for tool_step in await ToolStepRepository.get_by_message_id(
-            db, assistant_message.id
-        ):
+        for tool_step in stored_steps:
             tool_steps.append(
                 ToolStepResponse(
                     id=tool_step.id,
@@ -421,23 +507,185 @@ async def chat_generator(
             created_at=assistant_message.created_at,
             model=assistant_message.model,
             tokens_used=assistant_message.tokens_used,
+            turn_budget=assistant_message.turn_budget,
+            token_usage=assistant_message.token_usage,
+            timing=timing_snapshot,
             tool_steps=[],
         )
+        turn_timer.add("serialization", time.perf_counter() - serialization_started)
 
+        turn_status = "completed"
+        # The response carries the final breakdown; the stored one ends at
+        # the write above
         return ChatResponse(
             output=output,
             intermediate_steps=[],
             tool_steps=tool_steps,
             message=message_response,
+            observations=observation_stats.snapshot(),
+            loops=loop_stats.snapshot(),
+            tool_selection=tool_selection.snapshot() if tool_selection else None,
+            timing=turn_timer.snapshot(ledger.calls, timing.runs.values()),
         )
     except asyncio.CancelledError:
+        turn_status = "cancelled"
         raise HTTPException(
             status_code=499,
             detail="Request cancelled by user",
         )
     finally:
+        recorder.finish(turn_status, ledger.totals(), len(ledger.calls))
+        if cassette_recorder:
+            await cassette_recorder.finish(turn_status)
+        clear_turn_timing()
         clear_session_id_for_logging()
-        cancel_manager.cleanup(session_id)
+        set_search_cache_bypass(False)
+        clear_observation_stats()
+        clear_loop_stats()
+        clear_tool_selection()
+        await cancel_manager.cleanup(session_id)
+
+
+def _create_turn_budget(timeout_seconds: Optional[float]) -> TurnBudget:
+    # Clients may ask for a shorter budget, never a longer one
+    return TurnBudget(
+        timeout_seconds=min(
+            timeout_seconds or settings.TURN_TIMEOUT_SECONDS,
+            settings.TURN_TIMEOUT_SECONDS,
+        ),
+        reserve_seconds=settings.TURN_FINALIZE_RESERVE_SECONDS,
+    )
+
+
+def _registration_ttl(budget: TurnBudget) -> float:
+    # Headroom for the finalize call and persisting after the deadline
+    return 2 * budget.timeout_seconds
+
+
+async def _select_tools(message: str, enable_tools: bool) -> Optional[ToolSelection]:
+    """Pick the tools rendered into this turn's prompt."""
+    if not enable_tools:
+        return None
+    selection = tool_selector.select(
+        message, await ToolRegistry.aget_tools(), settings.TOOL_SELECTION_TOP_K
+    )
+    set_tool_selection(selection)
+    return selection
+
+
+def _pop_pending_step(
+    pending_steps: List[Tuple[AgentAction, int]], action: AgentAction
+) -> Optional[int]:
+    """Remove and return the tool step id persisted for ``action``."""
+    for index, (pending_action, tool_step_id) in enumerate(pending_steps):
+        if pending_action is action:
+            del pending_steps[index]
+            return tool_step_id
+    return None
+
+
+async def _finish_tool_step(
+    db: AsyncSession,
+    tool_step_id: int,
+    output: str,
+    run: Optional[ToolRun],
+    cancelled: bool = False,
+) -> None:
+    """Store the outcome and real timing of a tool step.
+
+    Without a run the call was answered from the turn memo (or never
+    started before a cancel), so it took no tool time.
+    """
+    if run is not None and run.status == STATUS_RUNNING and not cancelled:
+        # The executor stopped waiting for it at the turn deadline
+        run.finish(STATUS_FAILED, output.removeprefix(TOOL_ERROR_PREFIX))
+    timing = _run_timing(run)
+    started_at = run.started_at if run else None
+    completed_at = run.completed_at if run else None
+    if cancelled:
+        await ToolStepRepository.fail(
+            db,
+            tool_step_id=tool_step_id,
+            error="Cancelled before the tool finished",
+            duration_ms=timing["duration_ms"],
+            started_at=started_at,
+            status=STATUS_CANCELLED,
+        )
+    elif (run is not None and run.status == STATUS_FAILED) or output.startswith(
+        TOOL_ERROR_PREFIX
+    ):
+        await ToolStepRepository.fail(
+            db,
+            tool_step_id=tool_step_id,
+            error=(run.error if run is not None else None) or output,
+            duration_ms=timing["duration_ms"],
+            started_at=started_at,
+            completed_at=completed_at,
+        )
+    else:
+        await ToolStepRepository.complete(
+            db,
+            tool_step_id=tool_step_id,
+            output=output,
+            duration_ms=timing["duration_ms"],
+            started_at=started_at,
+            completed_at=completed_at,
+        )
+
+
+async def _fail_pending_steps(
+    db: AsyncSession,
+    pending_steps: List[Tuple[AgentAction, int]],
+    timing: ToolTimingHandler,
+    error: str,
+) -> None:
+    """Mark tool steps still waiting for a result failed when the turn fails."""
+    try:
+        for action, tool_step_id in pending_steps:
+            run = timing.run_for(action)
+            await ToolStepRepository.fail(
+                db,
+                tool_step_id=tool_step_id,
+                error=f"Turn failed before the tool finished: {error}",
+                duration_ms=_run_timing(run)["duration_ms"],
+                started_at=run.started_at if run else None,
+            )
+    except Exception:
+        # The turn's error event still goes out if the session is unusable
+        logger.exception("Could not mark pending tool steps failed")
+    pending_steps.clear()
+
+
+def _run_timing(run: Optional[ToolRun]) -> dict:
+    """Timing fields of a tool_result event."""
+    if run is None:
+        return {
+            "duration_ms": 0,
+            "status": "completed",
+            "started_at": None,
+            "completed_at": None,
+            "error": None,
+        }
+    return run.snapshot()
+
+
+def _observation_text(observation: Any) -> str:
+    if isinstance(observation, list):
+        return json.dumps(observation, ensure_ascii=False)
+    return str(observation)
+
+
+def _unstreamed_suffix(output: str, streamed: str) -> Optional[str]:
+    """Return the part of ``output`` the client has not received yet.
+
+    None if ``output`` does not continue the streamed text.
+    """
+    if not streamed:
+        return output
+    streamed = streamed.strip()
+    if output.startswith(streamed):
+        return output[len(streamed) :]
+    return None
 
 
 async def _stream_text(text: str) -> AsyncGenerator[str, None]:
@@ -447,4 +695,7 @@ async def _stream_text(text: str) -> AsyncGenerator[str, None]:
 
 
 def _format_event(payload: dict) -> str:
-    return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    started = time.perf_counter()
+    event = f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+    turn_timing.record("serialization", time.perf_counter() - started)
+    return event
@@ -6,7 +6,35 @@ class Settings(BaseSettings):
     TAVILY_API_KEY: str
     LANGSMITH_API_KEY: str = ""
 
+    # Hub prompts ship in backend/prompts/bundle.json; refreshed copies
+    # pulled from LangSmith are written here and take precedence
+    PROMPT_CACHE_PATH: str = "./data/prompt_bundle.json"
+    # Pull newer prompt revisions from LangSmith in the background at startup
+    PROMPT_REFRESH_ENABLED: bool = False
+
     TAVILY_MAX_RESULTS: int = 1
+    TAVILY_API_URL: str = "https://api.tavily.com"
+
+    # Shared async HTTP client used by network-bound tools
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_TIMEOUT_SECONDS: float = 20.0
+
+    SEARCH_CACHE_ENABLED: bool = True
+    SEARCH_CACHE_TTL_SECONDS: float = 600.0
+    SEARCH_CACHE_MAX_ENTRIES: int = 512
+    # Empty keeps the cache in memory only
+    SEARCH_CACHE_DB_PATH: str = ""
+
+    # multi_search: TAVILY_MAX_RESULTS applies per query, this caps the merge
+    MULTI_SEARCH_ENABLED: bool = True
+    MULTI_SEARCH_MAX_QUERIES: int = 5
+    MULTI_SEARCH_MAX_RESULTS: int = 10
+
+    LOCAL_SEARCH_ENABLED: bool = True
+    LOCAL_SEARCH_INDEX_DIR: str = "./data/doc_index"
+    LOCAL_SEARCH_TOP_K: int = 3
+    LOCAL_SEARCH_CHUNK_SIZE: int = 800
+    LOCAL_SEARCH_CHUNK_OVERLAP: int = 100
 
     DATABASE_URL: str = "sqlite+aiosqlite:///./data/chatbot.db"
 
@@ -15,13 +43,115 @@ class Settings(BaseSettings):
     CORS_ORIGINS: str = "http://localhost:5173,http://localhost:3000"
 
     MODEL_NAME: str = "glm-4"
+    # "zhipuai" / "tavily" call the real services; "fake" uses scripted
+    # stand-ins (backend/agent/fake_llm.py, backend/tools/fake_search.py)
+    # for load tests without network or API quota; "replay" plays back
+    # recorded cassettes (backend/utils/cassettes.py)
+    LLM_PROVIDER: str = "zhipuai"
+    SEARCH_PROVIDER: str = "tavily"
+    # Fakes: latencies are "fixed|uniform|lognormal:<median ms>[:<spread>]";
+    # error and throttle rates are the share of calls failing with HTTP 500
+    # and 429. FAKE_LLM_SCRIPT is a JSON script of turns (empty: built-in)
+    FAKE_LLM_SCRIPT: str = ""
+    FAKE_LLM_TOKENS_PER_SECOND: float = 50.0
+    FAKE_LLM_LATENCY: str = "lognormal:400:0.5"
+    FAKE_LLM_ERROR_RATE: float = 0.0
+    FAKE_LLM_THROTTLE_RATE: float = 0.0
+    FAKE_SEARCH_LATENCY: str = "lognormal:300:0.4"
+    FAKE_SEARCH_ERROR_RATE: float = 0.0
+    FAKE_SEARCH_THROTTLE_RATE: float = 0.0
+    FAKE_SEED: int = 0
+    # Record each turn's LLM calls, tool calls and searches, secrets
+    # stripped, to gzipped JSON cassettes in CASSETTE_DIR; the replay
+    # providers serve them with their recorded timings times
+    # CASSETTE_TIME_SCALE (0: no delays)
+    CASSETTE_RECORD: bool = False
+    CASSETTE_DIR: str = "./data/cassettes"
+    CASSETTE_TIME_SCALE: float = 1.0
     TEMPERATURE: float = 0.01
     MAX_ITERATIONS: int = 5
+    TURN_TIMEOUT_SECONDS: float = 90.0
+    TURN_FINALIZE_RESERVE_SECONDS: float = 15.0
+    # Estimated tokens per tool observation re-sent in the agent prompt;
+    # 0 disables truncation
+    OBSERVATION_TOKEN_BUDGET: int = 800
+    # Estimated scratchpad tokens above which older agent steps are
+    # compacted into digests; 0 disables compaction
+    SCRATCHPAD_COMPACTION_THRESHOLD: int = 1500
+    # Repeated identical tool calls in a turn before a final answer is
+    # forced; 0 only answers repeats from the memo
+    LOOP_MAX_REPEATS: int = 2
+    # Tools rendered into the prompt per turn, ranked by relevance to the
+    # question; 0 renders every registered tool
+    TOOL_SELECTION_TOP_K: int = 5
+
+    TOOL_TIMEOUT_SECONDS: float = 30.0
+    TOOL_THREAD_WORKERS: int = 8
+    TOOL_PROCESS_WORKERS: int = 2
+    TOOL_PROCESS_MEMORY_LIMIT_MB: int = 1024
+    # Scheduling niceness of process workers, so their start-up and CPU-bound
+    # tool runs do not starve the event loop on small machines; 0 disables
+    TOOL_PROCESS_NICE: int = 10
 
     SESSION_EXPIRE_HOURS: int = 24
 
+    # Where running generations are recorded so cancel requests reach the
+    # worker running them: memory (single process), sqlite (workers on one
+    # host) or redis (several hosts, needs the redis package)
+    CANCEL_BACKEND: str = "sqlite"
+    CANCEL_SQLITE_PATH: str = "./data/generations.db"
+    CANCEL_REDIS_URL: str = "redis://localhost:6379/0"
+    # How often a worker checks the shared backend for stop requests
+    CANCEL_POLL_INTERVAL_SECONDS: float = 0.05
+
     APP_NAME: str = "LangChain Chatbot API"
     DEBUG: bool = True
+    LOG_LEVEL: str = "DEBUG"
+    # Log records are written by a background thread as JSON lines ("json")
+    # or plain text ("text"); records beyond LOG_QUEUE_SIZE waiting to be
+    # written are dropped rather than blocking requests
+    LOG_FORMAT: str = "json"
+    LOG_QUEUE_SIZE: int = 10000
+    # Where each level range goes: LEVEL=stdout|stderr|file path, e.g.
+    # "INFO=./data/app.log,WARNING=stderr"
+    LOG_ROUTES: str = "DEBUG=stdout,WARNING=stderr"
+    # Share of LLM, chain and tool runs whose prompt and response bodies are
+    # logged, and the longest body logged before it is cut (0: no limit)
+    LOG_BODY_SAMPLE_RATE: float = 1.0
+    LOG_BODY_MAX_CHARS: int = 2000
+    # Request tracing: spans of API requests, repository calls, LLM calls
+    # and tool calls in the OpenTelemetry OTLP/JSON format, written to
+    # TRACE_FILE_PATH ("file") or POSTed to TRACE_OTLP_ENDPOINT ("otlp")
+    TRACING_ENABLED: bool = False
+    TRACE_EXPORTER: str = "file"
+    TRACE_FILE_PATH: str = "./data/traces.jsonl"
+    TRACE_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    TRACE_SERVICE_NAME: str = "langchain-chatbot"
+    # Share of requests traced; requests with a sampled traceparent header
+    # are always traced
+    TRACE_SAMPLE_RATE: float = 1.0
+    # Finished spans waiting for export before new ones are dropped
+    TRACE_QUEUE_SIZE: int = 2048
+    # Per-request profiling of /api/chat and /api/stream-chat: requests
+    # sending an X-Profile-Token header equal to PROFILE_TOKEN, or for one of
+    # PROFILE_SESSION_IDS (comma-separated), are sampled every
+    # PROFILE_INTERVAL_MS. The newest PROFILE_KEEP profiles are kept in
+    # PROFILE_DIR and served at /api/profiles to holders of the token.
+    # An empty PROFILE_TOKEN disables the header and the endpoints
+    PROFILE_TOKEN: str = ""
+    PROFILE_SESSION_IDS: str = ""
+    PROFILE_INTERVAL_MS: float = 10
+    PROFILE_DIR: str = "./data/profiles"
+    PROFILE_KEEP: int = 50
+    # Event loop lag is measured every LOOP_MONITOR_INTERVAL_MS; lag above
+    # LOOP_BLOCK_THRESHOLD_MS counts as a stall and the blocking stack is
+    # recorded (see /metrics and /api/debug/event-loop)
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_MS: float = 50
+    LOOP_BLOCK_THRESHOLD_MS: float = 100
+    # Import the agent stack and load tools in the background after startup,
+    # so the first chat request does not pay for it
+    STARTUP_PREWARM: bool = True
 
     model_config = {"env_file": ".env"}
 
@@ -49,10 +49,39 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
 async def create_db_and_tables():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await _add_missing_columns(conn)
 
         await _enable_wal_mode(conn)
 
 
+# Columns added to existing tables after their first release, as
+# (table, column); create_all only creates missing tables, so databases
+# created before a column was added get it from _add_missing_columns
+ADDED_COLUMNS = [
+    ("messages", "turn_budget"),
+    ("messages", "token_usage"),
+    ("messages", "timing"),
+]
+
+
+async def _add_missing_columns(conn):
+    """Add the ADDED_COLUMNS an older database does not have yet."""
+    existing = {}
+    for table_name, column_name in ADDED_COLUMNS:
+        if table_name not in existing:
+            rows = await conn.execute(text(f"PRAGMA table_info({table_name})"))
+            existing[table_name] = {row[1] for row in rows}
+        table = Base.metadata.tables.get(table_name)
+        if table is None or column_name in existing[table_name]:
+            continue
+        column = table.c[column_name]
+        column_type = column.type.compile(dialect=conn.dialect)
+        await conn.execute(
+            text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}")
+        )
+        existing[table_name].add(column_name)
+
+
 async def _enable_wal_mode(conn):
     """Enable Write-Ahead Logging mode for better concurrency."""
     await conn.execute(text("PRAGMA journal_mode=WAL"))
@@ -1,8 +1,9 @@
-from datetime import datetime
+from datetime import date, datetime
 from sqlalchemy import (
     Column,
     String,
     Integer,
+    Date,
     DateTime,
     Text,
     ForeignKey,
@@ -64,6 +65,11 @@ class Message(Base):
     )
     tokens_used: Mapped[dict | None] = mapped_column(JSON, nullable=True)
     model: Mapped[str | None] = mapped_column(String(50), nullable=True)
+    turn_budget: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # Per-LLM-call breakdown of tokens_used, see TokenLedger.snapshot()
+    token_usage: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+    # Server time breakdown of the turn, see TurnTiming.snapshot()
+    timing: Mapped[dict | None] = mapped_column(JSON, nullable=True)
 
     session: Mapped["Session"] = relationship("Session", back_populates="messages")
     tool_steps: Mapped[list["ToolStep"]] = relationship(
@@ -98,3 +104,24 @@ class ToolStep(Base):
     status: Mapped[str] = mapped_column(String(20), nullable=False, default="pending")
 
     message: Mapped["Message"] = relationship("Message", back_populates="tool_steps")
+
+
+class TokenUsageRollup(Base):
+    """Token usage per session and UTC day, incremented after every turn.
+
+    Usage reports aggregate these rows instead of scanning messages. There
+    is no foreign key to sessions, so usage stays accounted for after a
+    session is deleted.
+    """
+
+    __tablename__ = "token_usage_rollups"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    session_id: Mapped[str] = mapped_column(String(36), primary_key=True)
+    user_id: Mapped[str | None] = mapped_column(String(255), nullable=True, index=True)
+
+    prompt_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    completion_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    total_tokens: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    llm_calls: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    messages: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -1,11 +1,14 @@
 from typing import List, Optional, Dict, Any
 from sqlalchemy import select, update, delete, func
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.sqlite import insert
 from sqlalchemy.orm import selectinload
-from datetime import datetime, timedelta
-from backend.db.models import Session, Message, ToolStep
+from datetime import date, datetime, timedelta
+from backend.db.models import Session, Message, ToolStep, TokenUsageRollup
+from backend.utils.metrics import instrument_repository
 
 
+@instrument_repository
 class SessionRepository:
     @staticmethod
     async def create(
@@ -69,6 +72,7 @@ class SessionRepository:
         return result.rowcount > 0
 
 
+@instrument_repository
 class MessageRepository:
     @staticmethod
     async def create(
@@ -79,6 +83,9 @@ class MessageRepository:
         tool_calls: Optional[Dict[str, Any]] = None,
         model: Optional[str] = None,
         tokens_used: Optional[dict[str, int]] = None,
+        turn_budget: Optional[Dict[str, Any]] = None,
+        token_usage: Optional[Dict[str, Any]] = None,
+        timing: Optional[Dict[str, Any]] = None,
     ) -> Message:
         message = Message(
             session_id=session_id,
@@ -87,6 +94,9 @@ class MessageRepository:
             tool_calls=tool_calls,
             model=model,
             tokens_used=tokens_used,
+            turn_budget=turn_budget,
+            token_usage=token_usage,
+            timing=timing,
         )
         session.add(message)
         await session.flush()
@@ -107,6 +117,32 @@ class MessageRepository:
         )
         return list(result.scalars().all())
 
+    @staticmethod
+    async def set_timing(
+        session: AsyncSession, message_id: int, timing: Dict[str, Any]
+    ) -> None:
+        await session.execute(
+            update(Message).where(Message.id == message_id).values(timing=timing)
+        )
+        await session.flush()
+
+    @staticmethod
+    async def list_slow_turns(
+        session: AsyncSession,
+        min_total_ms: float,
+        since: Optional[datetime] = None,
+        limit: int = 50,
+    ) -> List[Message]:
+        """Assistant messages whose turn took at least ``min_total_ms``."""
+        total_ms = func.json_extract(Message.timing, "$.total_ms")
+        query = select(Message).where(
+            Message.role == "assistant", total_ms >= min_total_ms
+        )
+        if since is not None:
+            query = query.where(Message.created_at >= since)
+        result = await session.execute(query.order_by(total_ms.desc()).limit(limit))
+        return list(result.scalars().all())
+
     @staticmethod
     async def delete_by_session_id(session: AsyncSession, session_id: str) -> int:
         result = await session.execute(
@@ -116,6 +152,7 @@ class MessageRepository:
         return result.rowcount
 
 
+@instrument_repository
 class ToolStepRepository:
     @staticmethod
     async def create(
@@ -139,17 +176,25 @@ class ToolStepRepository:
 
     @staticmethod
     async def complete(
-        session: AsyncSession, tool_step_id: int, output: str, duration_ms: int
+        session: AsyncSession,
+        tool_step_id: int,
+        output: str,
+        duration_ms: int,
+        started_at: Optional[datetime] = None,
+        completed_at: Optional[datetime] = None,
     ) -> Optional[ToolStep]:
+        values: Dict[str, Any] = {
+            "tool_output": output,
+            "completed_at": completed_at or datetime.utcnow(),
+            "duration_ms": duration_ms,
+            "status": "completed",
+        }
+        if started_at is not None:
+            values["started_at"] = started_at
         result = await session.execute(
             update(ToolStep)
             .where(ToolStep.id == tool_step_id)
-            .values(
-                tool_output=output,
-                completed_at=datetime.utcnow(),
-                duration_ms=duration_ms,
-                status="completed",
-            )
+            .values(**values)
             .returning(ToolStep)
         )
         await session.flush()
@@ -157,22 +202,81 @@ class ToolStepRepository:
 
     @staticmethod
     async def fail(
-        session: AsyncSession, tool_step_id: int, error: str, duration_ms: int
+        session: AsyncSession,
+        tool_step_id: int,
+        error: str,
+        duration_ms: int,
+        started_at: Optional[datetime] = None,
+        completed_at: Optional[datetime] = None,
+        status: str = "failed",
     ) -> Optional[ToolStep]:
+        values: Dict[str, Any] = {
+            "tool_error": error,
+            "completed_at": completed_at or datetime.utcnow(),
+            "duration_ms": duration_ms,
+            "status": status,
+        }
+        if started_at is not None:
+            values["started_at"] = started_at
         result = await session.execute(
             update(ToolStep)
             .where(ToolStep.id == tool_step_id)
-            .values(
-                tool_error=error,
-                completed_at=datetime.utcnow(),
-                duration_ms=duration_ms,
-                status="failed",
-            )
+            .values(**values)
             .returning(ToolStep)
         )
         await session.flush()
         return result.scalar_one_or_none()
 
+    @staticmethod
+    async def latency_percentiles(
+        session: AsyncSession,
+        since: Optional[datetime] = None,
+        percentiles: tuple = (50, 95, 99),
+    ) -> Dict[str, Dict[str, Any]]:
+        """Per-tool latency percentiles over finished tool steps.
+
+        SQLite has no percentile aggregate, so durations are loaded sorted
+        per tool and ranked here (nearest-rank method).
+
+        Args:
+            session: Database session
+            since: Only include steps started at or after this time
+            percentiles: Percentiles to report
+
+        Returns:
+            Dictionary of tool name -> {"count", "failed", "p50_ms", ...,
+            "max_ms"}
+        """
+        query = select(ToolStep.tool_name, ToolStep.duration_ms, ToolStep.status).where(
+            ToolStep.duration_ms.is_not(None),
+            ToolStep.status.in_(("completed", "failed")),
+        )
+        if since is not None:
+            query = query.where(ToolStep.started_at >= since)
+        result = await session.execute(
+            query.order_by(ToolStep.tool_name, ToolStep.duration_ms)
+        )
+
+        durations: Dict[str, List[int]] = {}
+        failed: Dict[str, int] = {}
+        for tool_name, duration_ms, status in result.all():
+            durations.setdefault(tool_name, []).append(duration_ms)
+            if status == "failed":
+                failed[tool_name] = failed.get(tool_name, 0) + 1
+
+        stats: Dict[str, Dict[str, Any]] = {}
+        for tool_name, values in durations.items():
+            entry: Dict[str, Any] = {
+                "count": len(values),
+                "failed": failed.get(tool_name, 0),
+            }
+            for p in percentiles:
+                rank = max(1, -(-p * len(values) // 100))
+                entry[f"p{p}_ms"] = values[rank - 1]
+            entry["max_ms"] = values[-1]
+            stats[tool_name] = entry
+        return stats
+
     @staticmethod
     async def get_by_message_id(
         session: AsyncSession, message_id: int
@@ -183,3 +287,110 @@ class ToolStepRepository:
             .order_by(ToolStep.step_number)
         )
         return list(result.scalars().all())
+
+
+@instrument_repository
+class TokenUsageRepository:
+    GROUP_COLUMNS = {
+        "session": (TokenUsageRollup.session_id, TokenUsageRollup.user_id),
+        "user": (TokenUsageRollup.user_id,),
+        "day": (TokenUsageRollup.day,),
+    }
+
+    @staticmethod
+    async def record(
+        session: AsyncSession,
+        session_id: str,
+        tokens_used: Optional[Dict[str, int]],
+        llm_calls: int,
+        day: Optional[date] = None,
+    ) -> None:
+        """Add one turn's usage to the rollup row of its session and day.
+
+        The row is upserted in a single statement, so concurrent turns of
+        the same session add up instead of overwriting each other.
+
+        Args:
+            session: Database session
+            session_id: Chat session the turn belongs to
+            tokens_used: Turn totals; None if the model reported no usage
+            llm_calls: Number of LLM calls made in the turn
+            day: UTC day to account the turn to, today by default
+        """
+        tokens_used = tokens_used or {}
+        values = {
+            "prompt_tokens": tokens_used.get("prompt_tokens", 0),
+            "completion_tokens": tokens_used.get("completion_tokens", 0),
+            "total_tokens": tokens_used.get("total_tokens", 0),
+            "llm_calls": llm_calls,
+            "messages": 1,
+        }
+        user_id = (
+            select(Session.user_id).where(Session.id == session_id).scalar_subquery()
+        )
+        statement = insert(TokenUsageRollup).values(
+            day=day or datetime.utcnow().date(),
+            session_id=session_id,
+            user_id=user_id,
+            **values,
+        )
+        await session.execute(
+            statement.on_conflict_do_update(
+                index_elements=["day", "session_id"],
+                set_={
+                    name: getattr(TokenUsageRollup, name) + statement.excluded[name]
+                    for name in values
+                },
+            )
+        )
+        await session.flush()
+
+    @staticmethod
+    async def aggregate(
+        session: AsyncSession,
+        group_by: str = "day",
+        since: Optional[date] = None,
+        until: Optional[date] = None,
+        session_id: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Summed token usage per session, user or day.
+
+        Args:
+            session: Database session
+            group_by: "session", "user" or "day"
+            since: First day to include
+            until: Last day to include
+            session_id: Only include this session
+            user_id: Only include this user's sessions
+
+        Returns:
+            One dictionary per group with the group column(s), token sums,
+            "llm_calls" and "messages"; days in order, sessions and users
+            by largest total first
+        """
+        if group_by not in TokenUsageRepository.GROUP_COLUMNS:
+            raise ValueError(f"Cannot group token usage by {group_by!r}")
+        columns = TokenUsageRepository.GROUP_COLUMNS[group_by]
+        sums = [
+            func.sum(getattr(TokenUsageRollup, name)).label(name)
+            for name in (
+                "prompt_tokens",
+                "completion_tokens",
+                "total_tokens",
+                "llm_calls",
+                "messages",
+            )
+        ]
+        query = select(*columns, *sums).group_by(*columns)
+        if since is not None:
+            query = query.where(TokenUsageRollup.day >= since)
+        if until is not None:
+            query = query.where(TokenUsageRollup.day <= until)
+        if session_id is not None:
+            query = query.where(TokenUsageRollup.session_id == session_id)
+        if user_id is not None:
+            query = query.where(TokenUsageRollup.user_id == user_id)
+        order = TokenUsageRollup.day if group_by == "day" else sums[2].desc()
+        result = await session.execute(query.order_by(order))
+        return [dict(row._mapping) for row in result.all()]
@@ -1,33 +1,104 @@
+import asyncio
+import logging
 import sys
 from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import AsyncGenerator
+from typing import AsyncGenerator, List
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from backend.agent.callback_handler import configure_logging, shutdown_logging
+from backend.agent.tool_pool import tool_pool
 from backend.agent.tools import ToolRegistry
-from backend.api import chat_router, general_router, sessions_router
+from backend.api import (
+    chat_router,
+    documents_router,
+    general_router,
+    profiles_router,
+    sessions_router,
+    usage_router,
+)
 from backend.config import settings
 from backend.db.base import create_db_and_tables, dispose_db
-from backend.tools.calculator import calculator
-from backend.tools.tavily_search import tavily_search
+from backend.prompts import prompt_bundle
+from backend.tools.http_client import http_client
+from backend.utils import cancel_manager
+from backend.utils.loop_monitor import loop_monitor
+from backend.utils.tracing import TracingMiddleware, create_exporter, tracer
+
+logger = logging.getLogger(__name__)
+
+
+async def refresh_prompts() -> None:
+    """Pull newer prompt revisions and rebuild agents that use them."""
+    if await prompt_bundle.refresh_in_background():
+        from backend.agent.factory import AgentFactory
+
+        AgentFactory.clear_cache()
+
+
+def prewarm() -> None:
+    """Import the agent stack and load the declared tools.
+
+    Both are otherwise deferred to the first chat request.
+    """
+    try:
+        import backend.agent.factory  # noqa: F401
+
+        ToolRegistry.get_tools()
+    except Exception:
+        logger.exception("Prewarm failed; loading on first request instead")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-    # 注册所有工具
-    ToolRegistry.register_tool(calculator)
-    ToolRegistry.register_tool(tavily_search)
-    print("Tools registered successfully!")
+    configure_logging(settings.LOG_LEVEL)
+    if settings.TRACING_ENABLED:
+        tracer.start(
+            create_exporter(
+                settings.TRACE_EXPORTER,
+                settings.TRACE_FILE_PATH,
+                settings.TRACE_OTLP_ENDPOINT,
+            ),
+            sample_rate=settings.TRACE_SAMPLE_RATE,
+            service_name=settings.TRACE_SERVICE_NAME,
+            queue_size=settings.TRACE_QUEUE_SIZE,
+        )
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+
+    # 声明所有工具，首次使用时才导入
+    disabled = set()
+    if not settings.MULTI_SEARCH_ENABLED:
+        disabled.add("multi_search")
+    if not settings.LOCAL_SEARCH_ENABLED:
+        disabled.add("local_search")
+    declared = ToolRegistry.discover_tools(exclude=disabled)
+    tool_pool.start()
+    logger.info(f"Tools declared successfully: {', '.join(declared)}")
 
     await create_db_and_tables()
-    print("Database initialized successfully!")
+    logger.info("Database initialized successfully!")
+
+    background: List[asyncio.Task] = []
+    if settings.STARTUP_PREWARM:
+        background.append(asyncio.create_task(asyncio.to_thread(prewarm)))
+    if settings.PROMPT_REFRESH_ENABLED:
+        background.append(asyncio.create_task(refresh_prompts()))
     yield
+    for task in background:
+        task.cancel()
+    await loop_monitor.stop()
+    tool_pool.shutdown()
+    await http_client.aclose()
+    await cancel_manager.close()
     await dispose_db()
-    print("Database connections closed!")
+    logger.info("Database connections closed!")
+    tracer.stop()
+    shutdown_logging()
 
 
 app = FastAPI(title=settings.APP_NAME, lifespan=lifespan, version="1.0.0")
@@ -38,11 +109,16 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "X-Profile-ID", "Server-Timing"],
 )
+app.add_middleware(TracingMiddleware)
 
 app.include_router(chat_router)
+app.include_router(documents_router)
 app.include_router(general_router)
+app.include_router(profiles_router)
 app.include_router(sessions_router)
+app.include_router(usage_router)
 
 
 if __name__ == "__main__":
@@ -43,6 +43,9 @@ class MessageResponse(BaseModel):
     created_at: datetime
     model: Optional[str]
     tokens_used: Optional[Dict[str, int]]
+    turn_budget: Optional[Dict[str, Any]] = None
+    token_usage: Optional[Dict[str, Any]] = None
+    timing: Optional[Dict[str, Any]] = None
     tool_steps: List["ToolStepResponse"] = []
 
     class Config:
@@ -77,6 +80,8 @@ class ChatOptions(BaseModel):
 
     enableToolCalls: bool = True
     enableMemory: bool = False
+    turnTimeoutSeconds: Optional[float] = Field(default=None, gt=0)
+    bypassSearchCache: bool = False
 
 
 class ChatRequest(BaseModel):
@@ -94,6 +99,28 @@ class ChatResponse(BaseModel):
     intermediate_steps: List[Dict[str, Any]] = []
     tool_steps: List[ToolStepResponse] = []
     message: MessageResponse
+    observations: Optional[Dict[str, int]] = None
+    loops: Optional[Dict[str, Any]] = None
+    tool_selection: Optional[Dict[str, Any]] = None
+    timing: Optional[Dict[str, Any]] = None
+
+
+class DocumentCreate(BaseModel):
+    """A document to add to the local search index."""
+
+    id: str
+    text: str
+    source: Optional[str] = None
+    title: Optional[str] = None
+
+
+class DocumentIngestRequest(BaseModel):
+    documents: List[DocumentCreate]
+
+
+class DocumentIngestResponse(BaseModel):
+    documents: int
+    chunks: int
 
 
 MessageResponse.model_rebuild()
@@ -1,14 +1,23 @@
 """Prompt templates module."""
 
+from backend.prompts.bundle import get_prompt, prompt_bundle
 from backend.prompts.templates import (
     custom_json_prompt,
     custom_json_prompt_with_memory,
     custom_no_tools_prompt,
     custom_no_tools_prompt_with_memory,
-    json_prompt,
-    react_prompt,
 )
 
+
+def __getattr__(name: str):
+    # react_prompt and json_prompt load from the bundle when first used
+    if name in ("react_prompt", "json_prompt"):
+        from backend.prompts import templates
+
+        return getattr(templates, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 __all__ = [
     "react_prompt",
     "json_prompt",
@@ -16,4 +25,6 @@ __all__ = [
     "custom_json_prompt_with_memory",
     "custom_no_tools_prompt",
     "custom_no_tools_prompt_with_memory",
+    "get_prompt",
+    "prompt_bundle",
 ]
@@ -0,0 +1,277 @@
+"""Versioned local bundle of LangSmith Hub prompts.
+
+The agent prompts pulled from the Hub are shipped in ``bundle.json`` next to
+this module, serialized with ``langchain_core.load``. They are read from disk
+the first time a prompt is needed, so importing the app does no network I/O
+and startup does not depend on LangSmith being reachable.
+
+``PromptBundle.refresh`` pulls the current revisions from LangSmith and
+writes them to ``PROMPT_CACHE_PATH``, which takes precedence over the
+shipped bundle on later loads. With ``PROMPT_REFRESH_ENABLED`` the app runs
+it in the background after startup. To update the shipped bundle itself:
+
+    python -m backend.prompts.bundle refresh --output backend/prompts/bundle.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from backend.config import settings
+from langchain_core._api import suppress_langchain_beta_warning
+from langchain_core.load import dumpd, load
+from langchain_core.prompts import (
+    AIMessagePromptTemplate,
+    BasePromptTemplate,
+    ChatPromptTemplate,
+    HumanMessagePromptTemplate,
+    MessagesPlaceholder,
+    PromptTemplate,
+    SystemMessagePromptTemplate,
+)
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FORMAT = 1
+SHIPPED_BUNDLE_PATH = Path(__file__).parent / "bundle.json"
+
+REACT_PROMPT = "hwchase17/react"
+JSON_CHAT_PROMPT = "hwchase17/react-chat-json"
+HUB_PROMPTS = [REACT_PROMPT, JSON_CHAT_PROMPT]
+
+# Bundles may come from a refresh, so only prompt classes are revived
+_ALLOWED_CLASSES = [
+    PromptTemplate,
+    ChatPromptTemplate,
+    MessagesPlaceholder,
+    SystemMessagePromptTemplate,
+    HumanMessagePromptTemplate,
+    AIMessagePromptTemplate,
+]
+
+
+class PromptBundleError(Exception):
+    """A prompt bundle is missing, malformed or lacks a prompt."""
+
+
+class PromptBundle:
+    """Lazily loaded Hub prompts, preferring a refreshed copy when present.
+
+    Args:
+        path: The bundle shipped with the code
+        cache_path: Where refreshed prompts are written; read first if it
+            exists and is valid
+    """
+
+    def __init__(self, path: Path, cache_path: Optional[Path] = None):
+        self.path = Path(path)
+        self.cache_path = Path(cache_path) if cache_path else None
+        self._prompts: Optional[Dict[str, BasePromptTemplate]] = None
+        self._manifest: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> BasePromptTemplate:
+        """Return prompt ``name``, loading the bundle on first use.
+
+        Raises:
+            PromptBundleError: If no usable bundle contains the prompt
+        """
+        prompts = self._load()
+        if name not in prompts:
+            raise PromptBundleError(f"Prompt {name!r} is not in {self.source}")
+        return prompts[name]
+
+    @property
+    def source(self) -> str:
+        """Path of the bundle the prompts were loaded from."""
+        self._load()
+        return self._manifest.get("source", str(self.path))
+
+    def manifest(self) -> Dict[str, Any]:
+        """Version information of the loaded bundle, without the templates."""
+        self._load()
+        return {
+            "source": self._manifest["source"],
+            "created_at": self._manifest.get("created_at"),
+            "prompts": {
+                name: {"revision": entry["revision"], "commit": entry.get("commit")}
+                for name, entry in self._manifest["prompts"].items()
+            },
+        }
+
+    def _load(self) -> Dict[str, BasePromptTemplate]:
+        if self._prompts is not None:
+            return self._prompts
+        with self._lock:
+            if self._prompts is None:
+                candidates = [self.path]
+                if self.cache_path and self.cache_path.exists():
+                    candidates.insert(0, self.cache_path)
+                for index, path in enumerate(candidates):
+                    try:
+                        self._use(_read_bundle(path), path)
+                        break
+                    except PromptBundleError as e:
+                        if index == len(candidates) - 1:
+                            raise
+                        logger.warning(f"Ignoring prompt bundle {path}: {e}")
+        return self._prompts
+
+    def _use(self, data: Dict[str, Any], path: Path) -> None:
+        prompts = {
+            name: _deserialize(name, entry) for name, entry in data["prompts"].items()
+        }
+        self._manifest = {**data, "source": str(path)}
+        self._prompts = prompts
+
+    def refresh(self, names: Optional[List[str]] = None) -> List[str]:
+        """Pull ``names`` from LangSmith and write them to the cache path.
+
+        Prompts that fail to pull keep their current revision.
+
+        Returns:
+            Names of the prompts whose revision changed
+        """
+        if self.cache_path is None:
+            raise PromptBundleError("No cache path configured for refreshed prompts")
+        current = self._load()
+        data = pull_bundle(names or list(current), base=self._manifest)
+        changed = [
+            name
+            for name, entry in data["prompts"].items()
+            if entry["revision"] != self._manifest["prompts"].get(name, {}).get("revision")
+        ]
+        if changed:
+            write_bundle(data, self.cache_path)
+            with self._lock:
+                self._use(data, self.cache_path)
+        return changed
+
+    async def refresh_in_background(self) -> List[str]:
+        """Run ``refresh`` in a thread, logging instead of raising."""
+        try:
+            changed = await asyncio.to_thread(self.refresh)
+        except Exception as e:
+            logger.warning(f"Prompt refresh from LangSmith failed: {e}")
+            return []
+        if changed:
+            logger.info(f"Refreshed prompts from LangSmith: {', '.join(changed)}")
+        return changed
+
+
+def pull_bundle(
+    names: List[str], base: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Pull ``names`` from LangSmith into bundle data.
+
+    Entries of ``base`` are kept for prompts that fail to pull; without a
+    base, any failure raises.
+    """
+    # Imported here: the client is only needed when refreshing
+    from langsmith import Client
+
+    client = Client(api_key=settings.LANGSMITH_API_KEY or None)
+    prompts = dict((base or {}).get("prompts", {}))
+    for name in names:
+        try:
+            prompt = client.pull_prompt(name)
+        except Exception as e:
+            if name not in prompts:
+                raise PromptBundleError(f"Could not pull {name!r}: {e}") from e
+            logger.warning(f"Keeping bundled {name!r}, pull failed: {e}")
+            continue
+        prompts[name] = _serialize(prompt)
+    return {
+        "format": BUNDLE_FORMAT,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "prompts": prompts,
+    }
+
+
+def write_bundle(data: Dict[str, Any], path: Path) -> None:
+    """Atomically write bundle data to ``path``."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(
+        json.dumps(data, ensure_ascii=False, indent=2, sort_keys=True) + "\n",
+        encoding="utf-8",
+    )
+    os.replace(tmp, path)
+
+
+def _read_bundle(path: Path) -> Dict[str, Any]:
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        raise PromptBundleError(f"Cannot read {path}: {e}") from e
+    if data.get("format") != BUNDLE_FORMAT or not isinstance(data.get("prompts"), dict):
+        raise PromptBundleError(f"{path} is not a format {BUNDLE_FORMAT} bundle")
+    return data
+
+
+def _serialize(prompt: BasePromptTemplate) -> Dict[str, Any]:
+    template = dumpd(prompt)
+    canonical = json.dumps(template, sort_keys=True, ensure_ascii=False)
+    metadata = prompt.metadata or {}
+    return {
+        "revision": hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12],
+        "commit": metadata.get("lc_hub_commit_hash"),
+        "template": template,
+    }
+
+
+def _deserialize(name: str, entry: Dict[str, Any]) -> BasePromptTemplate:
+    try:
+        with suppress_langchain_beta_warning():
+            prompt = load(entry["template"], allowed_objects=_ALLOWED_CLASSES)
+    except Exception as e:
+        raise PromptBundleError(f"Cannot load prompt {name!r}: {e}") from e
+    if not isinstance(prompt, BasePromptTemplate):
+        raise PromptBundleError(f"Prompt {name!r} is a {type(prompt).__name__}")
+    return prompt
+
+
+prompt_bundle = PromptBundle(
+    SHIPPED_BUNDLE_PATH,
+    cache_path=Path(settings.PROMPT_CACHE_PATH) if settings.PROMPT_CACHE_PATH else None,
+)
+
+
+def get_prompt(name: str) -> BasePromptTemplate:
+    """Return a bundled Hub prompt, e.g. ``get_prompt(REACT_PROMPT)``."""
+    return prompt_bundle.get(name)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the local prompt bundle")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("show", help="print the versions of the loaded bundle")
+    refresh = commands.add_parser("refresh", help="pull prompts from LangSmith")
+    refresh.add_argument(
+        "--output",
+        type=Path,
+        help="write a complete bundle here instead of PROMPT_CACHE_PATH",
+    )
+    args = parser.parse_args()
+
+    if args.command == "show":
+        print(json.dumps(prompt_bundle.manifest(), indent=2))
+    elif args.output:
+        write_bundle(pull_bundle(HUB_PROMPTS), args.output)
+        print(f"Wrote {', '.join(HUB_PROMPTS)} to {args.output}")
+    else:
+        changed = prompt_bundle.refresh(HUB_PROMPTS)
+        print(f"Changed: {', '.join(changed) or 'nothing'}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
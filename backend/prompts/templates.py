@@ -1,18 +1,17 @@
 """Prompt templates for LangChain agents."""
 
-from backend.config import settings
+from backend.prompts.bundle import JSON_CHAT_PROMPT, REACT_PROMPT, get_prompt
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langsmith import Client
 
-try:
-    client = Client(api_key=settings.LANGSMITH_API_KEY)
-    # Pull different prompts for different agent types
-    json_prompt = client.pull_prompt("hwchase17/react-chat-json")
-    react_prompt = client.pull_prompt("hwchase17/react")
-except Exception as e:
-    print(f"无法从 LangSmith 获取 prompt: {e}")
-    print("请确保已配置 LANGSMITH_API_KEY 并联网")
-    raise
+# Hub prompts are read from the local bundle on first access, not on import
+_HUB_PROMPTS = {"json_prompt": JSON_CHAT_PROMPT, "react_prompt": REACT_PROMPT}
+
+
+def __getattr__(name: str):
+    if name in _HUB_PROMPTS:
+        return get_prompt(_HUB_PROMPTS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 custom_json_prompt = ChatPromptTemplate.from_messages(
     [
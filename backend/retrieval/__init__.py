@@ -0,0 +1,29 @@
+"""Local document retrieval: a BM25 index over chunked documents."""
+
+from backend.config import settings
+
+_document_index = None
+
+
+def __getattr__(name: str):
+    # The index module needs numpy; tokenizing via ``backend.retrieval.text``
+    # should not pay for it, so the index is created on first access
+    global _document_index
+    if name == "DocumentIndex":
+        from .index import DocumentIndex
+
+        return DocumentIndex
+    if name == "document_index":
+        if _document_index is None:
+            from .index import DocumentIndex
+
+            _document_index = DocumentIndex(
+                settings.LOCAL_SEARCH_INDEX_DIR,
+                chunk_size=settings.LOCAL_SEARCH_CHUNK_SIZE,
+                chunk_overlap=settings.LOCAL_SEARCH_CHUNK_OVERLAP,
+            )
+        return _document_index
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["DocumentIndex", "document_index"]
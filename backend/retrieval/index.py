@@ -0,0 +1,472 @@
+"""BM25 inverted index stored in memory-mapped segment files.
+
+The index is a directory of immutable segments plus a ``manifest.json``.
+Each ``add_documents`` call writes one new segment; ``delete`` records
+tombstones in the manifest; ``compact`` rewrites the live chunks into a
+single segment. Segments replaced by ``compact`` are listed as retired in
+the manifest and only deleted by a write at least ``retire_grace_seconds``
+later, so readers in other processes still working from the previous
+manifest can open them. A segment holds:
+
+- ``terms.npy``: sorted UTF-8 terms (fixed-width bytes, binary searched)
+- ``term_offsets.npy``: start of each term's postings
+- ``postings_chunks.npy`` / ``postings_tf.npy``: chunk ids and term counts
+- ``lengths.npy`` / ``chunk_doc.npy``: token count and document of each chunk
+- ``text.bin`` / ``text_offsets.npy``: chunk text
+- ``docs.jsonl`` / ``doc_offsets.npy``: document ids, sources and titles
+- ``doc_ids.npy``: document ids, for vectorised lookups on delete
+
+All arrays are opened with ``mmap_mode="r"``, so opening an index is instant
+and worker processes share the pages through the OS page cache. Readers
+reload when the manifest is replaced, into a new snapshot; a search keeps
+using the snapshot it started with.
+"""
+
+import json
+import math
+import mmap
+import os
+import shutil
+import threading
+import time
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .text import chunk_text, tokenize
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+K1 = 1.2
+B = 0.75
+
+
+def _write_segment(directory: Path, documents: Iterable[Tuple[Dict, List[str]]]) -> int:
+    """Write one segment from ``(document, chunks)`` pairs.
+
+    Chunks without any terms are skipped. Returns the number of chunks
+    written; no files are created when it is zero.
+    """
+    postings: Dict[bytes, array] = {}
+    lengths = array("I")
+    chunk_doc = array("I")
+    text_offsets = array("q", [0])
+    texts: List[bytes] = []
+    docs: List[bytes] = []
+    doc_ids: List[bytes] = []
+
+    for document, chunks in documents:
+        doc_index = len(docs)
+        chunk_count = 0
+        for chunk in chunks:
+            tokens = tokenize(chunk)
+            if not tokens:
+                continue
+            chunk_id = len(lengths)
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term.encode(), array("I")).extend(
+                    (chunk_id, min(tf, 65535))
+                )
+            lengths.append(len(tokens))
+            chunk_doc.append(doc_index)
+            data = chunk.encode()
+            texts.append(data)
+            text_offsets.append(text_offsets[-1] + len(data))
+            chunk_count += 1
+        if chunk_count:
+            line = json.dumps({**document, "chunks": chunk_count}, ensure_ascii=False)
+            docs.append(line.encode() + b"\n")
+            doc_ids.append(document["id"].encode())
+
+    if not lengths:
+        return 0
+
+    terms = sorted(postings)
+    term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    pairs = []
+    for i, term in enumerate(terms):
+        flat = np.frombuffer(postings[term], dtype=np.uint32)
+        pairs.append(flat)
+        term_offsets[i + 1] = term_offsets[i] + len(flat) // 2
+    flat = np.concatenate(pairs).reshape(-1, 2)
+
+    directory.mkdir(parents=True)
+    np.save(directory / "terms.npy", np.array(terms, dtype=bytes))
+    np.save(directory / "term_offsets.npy", term_offsets)
+    np.save(directory / "postings_chunks.npy", flat[:, 0].copy())
+    np.save(directory / "postings_tf.npy", flat[:, 1].astype(np.uint16))
+    np.save(directory / "lengths.npy", np.frombuffer(lengths, dtype=np.uint32))
+    np.save(directory / "chunk_doc.npy", np.frombuffer(chunk_doc, dtype=np.uint32))
+    np.save(directory / "text_offsets.npy", np.frombuffer(text_offsets, dtype=np.int64))
+    with open(directory / "text.bin", "wb") as f:
+        f.writelines(texts)
+    with open(directory / "docs.jsonl", "wb") as f:
+        f.writelines(docs)
+    doc_offsets = np.cumsum([0] + [len(line) for line in docs], dtype=np.int64)
+    np.save(directory / "doc_offsets.npy", doc_offsets)
+    np.save(directory / "doc_ids.npy", np.array(doc_ids, dtype=bytes))
+    return len(lengths)
+
+
+class _Segment:
+    """Read-only view of one segment directory."""
+
+    def __init__(self, directory: Path) -> None:
+        def load(name: str) -> np.ndarray:
+            return np.load(directory / f"{name}.npy", mmap_mode="r")
+
+        self.terms = load("terms")
+        self.term_offsets = load("term_offsets")
+        self.postings_chunks = load("postings_chunks")
+        self.postings_tf = load("postings_tf")
+        self.lengths = load("lengths")
+        self.chunk_doc = load("chunk_doc")
+        self.text_offsets = load("text_offsets")
+        self.doc_offsets = load("doc_offsets")
+        with open(directory / "text.bin", "rb") as f:
+            self._text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(directory / "docs.jsonl", "rb") as f:
+            self._docs = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def postings(self, term: bytes) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        i = int(np.searchsorted(self.terms, term))
+        if i == len(self.terms) or self.terms[i] != term:
+            return None
+        start, end = self.term_offsets[i], self.term_offsets[i + 1]
+        return self.postings_chunks[start:end], self.postings_tf[start:end]
+
+    def text(self, chunk_id: int) -> str:
+        start, end = self.text_offsets[chunk_id], self.text_offsets[chunk_id + 1]
+        return self._text[start:end].decode()
+
+    def doc(self, doc_index: int) -> Dict[str, Any]:
+        start, end = self.doc_offsets[doc_index], self.doc_offsets[doc_index + 1]
+        return json.loads(self._docs[start:end])
+
+    def iter_docs(self) -> Iterable[Dict[str, Any]]:
+        for line in self._docs[:].splitlines():
+            yield json.loads(line)
+
+    def iter_live_documents(self, deleted: List[int]) -> Iterable[Tuple[Dict, List[str]]]:
+        """Yield ``(document, chunks)`` for documents not in ``deleted``."""
+        deleted = set(deleted)
+        chunk_id = 0
+        for doc_index, document in enumerate(self.iter_docs()):
+            count = document["chunks"]
+            if doc_index not in deleted:
+                meta = {k: v for k, v in document.items() if k != "chunks"}
+                yield meta, [self.text(c) for c in range(chunk_id, chunk_id + count)]
+            chunk_id += count
+
+    def close(self) -> None:
+        self._text.close()
+        self._docs.close()
+
+
+class _LiveSegment:
+    """A segment as of one manifest: its deleted chunks and length norms.
+
+    Built anew on every refresh and never changed once published, so a
+    search still scoring the previous manifest's view is not affected.
+    """
+
+    def __init__(self, name: str, segment: _Segment, deleted: List[int]) -> None:
+        self.name = name
+        self.segment = segment
+        if deleted:
+            self.dead: Optional[np.ndarray] = np.isin(segment.chunk_doc, deleted)
+            self.live_chunks = int((~self.dead).sum())
+            self.live_length = int(segment.lengths[~self.dead].sum())
+        else:
+            self.dead = None
+            self.live_chunks = len(segment.lengths)
+            self.live_length = int(segment.lengths.sum())
+        self.norm: Optional[np.ndarray] = None
+
+
+class _Snapshot:
+    """The segments of one manifest and their collection statistics."""
+
+    def __init__(
+        self,
+        key: Optional[Tuple[int, int]],
+        segments: List[_LiveSegment],
+    ) -> None:
+        self.key = key
+        self.segments = segments
+        self.live_chunks = sum(live.live_chunks for live in segments)
+        live_length = sum(live.live_length for live in segments)
+        self.avg_length = live_length / self.live_chunks if self.live_chunks else 0.0
+        for live in segments:
+            # Per-chunk length normalisation, precomputed once per refresh
+            live.norm = (
+                K1 * (1 - B + B * live.segment.lengths / (self.avg_length or 1.0))
+            ).astype(np.float32)
+
+
+class DocumentIndex:
+    """Local BM25 index with incremental add and delete.
+
+    Documents are dicts with ``id`` and ``text`` and optional ``source`` and
+    ``title``. Adding a document whose id already exists replaces it.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        chunk_size: int = 800,
+        chunk_overlap: int = 100,
+        retire_grace_seconds: float = 300.0,
+    ):
+        self.path = Path(path)
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.retire_grace_seconds = retire_grace_seconds
+        self._lock = threading.Lock()
+        self._snapshot = _Snapshot(None, [])
+
+    # -- reading ---------------------------------------------------------
+
+    @property
+    def _manifest_path(self) -> Path:
+        return self.path / "manifest.json"
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self._manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"segments": [], "deleted": {}, "next_segment": 1}
+
+    def _refresh(self) -> _Snapshot:
+        """The current snapshot, reopened if another writer replaced the manifest.
+
+        Segments dropped from the manifest are not closed: searches that
+        took the previous snapshot may still read them. Their maps are
+        released once no snapshot refers to them any more.
+        """
+        try:
+            stat = os.stat(self._manifest_path)
+            key = (stat.st_ino, stat.st_mtime_ns)
+        except FileNotFoundError:
+            key = None
+        snapshot = self._snapshot
+        if key == snapshot.key:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if key == snapshot.key:
+                return snapshot
+            manifest = self._read_manifest()
+            opened = {live.name: live.segment for live in snapshot.segments}
+            segments = [
+                _LiveSegment(
+                    name,
+                    opened.get(name) or _Segment(self.path / name),
+                    manifest["deleted"].get(name),
+                )
+                for name in manifest["segments"]
+            ]
+            self._snapshot = _Snapshot(key, segments)
+            return self._snapshot
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """Return the ``k`` best chunks for ``query`` by BM25 score.
+
+        Document frequencies include tombstoned chunks until ``compact``
+        runs, as in most segment-based engines.
+        """
+        snapshot = self._refresh()
+        segments = snapshot.segments
+        terms = {term.encode() for term in tokenize(query)}
+        if not segments or not terms or not snapshot.live_chunks:
+            return []
+
+        term_postings = []
+        for term in terms:
+            per_segment = [live.segment.postings(term) for live in segments]
+            df = sum(len(p[0]) for p in per_segment if p is not None)
+            if df:
+                idf = math.log(1 + (snapshot.live_chunks - df + 0.5) / (df + 0.5))
+                term_postings.append((idf, per_segment))
+
+        candidates = []
+        for seg_index, live in enumerate(segments):
+            scores = None
+            for idf, per_segment in term_postings:
+                postings = per_segment[seg_index]
+                if postings is None:
+                    continue
+                if scores is None:
+                    scores = np.zeros(len(live.segment.lengths), dtype=np.float32)
+                chunks, tf = postings
+                tf = tf.astype(np.float32)
+                scores[chunks] += idf * tf * (K1 + 1) / (tf + live.norm[chunks])
+            if scores is None:
+                continue
+            if live.dead is not None:
+                scores[live.dead] = 0
+            hits = np.flatnonzero(scores)
+            if len(hits) > k:
+                hits = hits[np.argpartition(scores[hits], -k)[-k:]]
+            candidates.extend((float(scores[c]), seg_index, int(c)) for c in hits)
+
+        candidates.sort(reverse=True)
+        results = []
+        for score, seg_index, chunk_id in candidates[:k]:
+            segment = segments[seg_index].segment
+            document = segment.doc(int(segment.chunk_doc[chunk_id]))
+            results.append(
+                {
+                    "doc_id": document["id"],
+                    "title": document.get("title", ""),
+                    "source": document.get("source", ""),
+                    "content": segment.text(chunk_id),
+                    "score": round(score, 4),
+                }
+            )
+        return results
+
+    def list_documents(self) -> List[Dict[str, Any]]:
+        """Live documents with their sources and chunk counts."""
+        snapshot = self._refresh()
+        manifest = self._read_manifest()
+        documents = []
+        for live in snapshot.segments:
+            deleted = set(manifest["deleted"].get(live.name, []))
+            documents.extend(
+                doc
+                for i, doc in enumerate(live.segment.iter_docs())
+                if i not in deleted
+            )
+        return documents
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._refresh()
+        return {
+            "segments": len(snapshot.segments),
+            "chunks": snapshot.live_chunks,
+            "avg_chunk_tokens": round(snapshot.avg_length, 1),
+        }
+
+    # -- writing ---------------------------------------------------------
+
+    @contextmanager
+    def _write_lock(self):
+        """Serialise writers across threads and processes."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        with self._lock, open(self.path / ".lock", "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def _write_manifest(self, manifest: Dict[str, Any]) -> None:
+        self._purge_retired(manifest)
+        tmp_path = self.path / "manifest.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self._manifest_path)
+
+    def _purge_retired(self, manifest: Dict[str, Any]) -> None:
+        """Delete retired segments whose grace period has passed."""
+        cutoff = time.time() - self.retire_grace_seconds
+        kept = []
+        for retired in manifest.get("retired", []):
+            if retired["retired_at"] <= cutoff:
+                shutil.rmtree(self.path / retired["name"], ignore_errors=True)
+            else:
+                kept.append(retired)
+        manifest["retired"] = kept
+
+    def _tombstone(self, manifest: Dict[str, Any], doc_ids: set) -> int:
+        """Mark live documents in ``doc_ids`` deleted; return how many."""
+        deleted_count = 0
+        wanted = np.array([doc_id.encode() for doc_id in doc_ids], dtype=bytes)
+        for name in manifest["segments"]:
+            segment_ids = np.load(self.path / name / "doc_ids.npy", mmap_mode="r")
+            deleted = manifest["deleted"].setdefault(name, [])
+            already = set(deleted)
+            for i in np.flatnonzero(np.isin(segment_ids, wanted)).tolist():
+                if i not in already:
+                    deleted.append(i)
+                    deleted_count += 1
+            if not deleted:
+                del manifest["deleted"][name]
+        return deleted_count
+
+    def add_documents(self, documents: List[Dict[str, Any]]) -> int:
+        """Chunk and index ``documents`` as a new segment.
+
+        Returns:
+            Number of chunks added
+        """
+        pairs = [
+            (
+                {
+                    "id": doc["id"],
+                    "source": doc.get("source", ""),
+                    "title": doc.get("title", ""),
+                },
+                chunk_text(doc["text"], self.chunk_size, self.chunk_overlap),
+            )
+            for doc in documents
+        ]
+        with self._write_lock():
+            manifest = self._read_manifest()
+            self._tombstone(manifest, {doc["id"] for doc in documents})
+            name = f"seg_{manifest['next_segment']:06d}"
+            added = _write_segment(self.path / name, pairs)
+            manifest["next_segment"] += 1
+            if added:
+                manifest["segments"].append(name)
+            self._write_manifest(manifest)
+        return added
+
+    def delete(self, doc_id: str) -> bool:
+        """Delete a document. Returns False if it was not indexed."""
+        with self._write_lock():
+            manifest = self._read_manifest()
+            if not self._tombstone(manifest, {doc_id}):
+                return False
+            self._write_manifest(manifest)
+        return True
+
+    def compact(self) -> int:
+        """Merge all segments into one, dropping deleted documents.
+
+        Returns:
+            Number of live chunks in the merged segment
+        """
+        with self._write_lock():
+            manifest = self._read_manifest()
+            old_names = list(manifest["segments"])
+            name = f"seg_{manifest['next_segment']:06d}"
+
+            def live_documents():
+                for old in old_names:
+                    segment = _Segment(self.path / old)
+                    try:
+                        yield from segment.iter_live_documents(
+                            manifest["deleted"].get(old, [])
+                        )
+                    finally:
+                        segment.close()
+
+            chunks = _write_segment(self.path / name, live_documents())
+            manifest["segments"] = [name] if chunks else []
+            manifest["deleted"] = {}
+            manifest["next_segment"] += 1
+            # Purged by a later write, once readers have moved on
+            retired_at = time.time()
+            manifest["retired"] = manifest.get("retired", []) + [
+                {"name": old, "retired_at": retired_at} for old in old_names
+            ]
+            self._write_manifest(manifest)
+        return chunks
@@ -0,0 +1,76 @@
+"""Command line ingestion for the local document index.
+
+Run from the repository root:
+
+    python -m backend.retrieval.ingest add docs/ notes.md
+    python -m backend.retrieval.ingest delete docs/setup.md
+    python -m backend.retrieval.ingest list
+    python -m backend.retrieval.ingest compact
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from backend.retrieval import document_index
+
+TEXT_SUFFIXES = {".txt", ".md", ".markdown", ".rst", ".html", ".csv", ".json"}
+BATCH_SIZE = 500
+
+
+def _iter_files(paths: Iterable[str]) -> Iterable[Path]:
+    for path in map(Path, paths):
+        if path.is_dir():
+            yield from (
+                p for p in sorted(path.rglob("*")) if p.suffix.lower() in TEXT_SUFFIXES
+            )
+        elif path.is_file():
+            yield path
+
+
+def _load(path: Path) -> Dict[str, str]:
+    text = path.read_text(encoding="utf-8", errors="replace")
+    title = next((line.lstrip("# ").strip() for line in text.splitlines() if line.strip()), "")
+    return {"id": str(path), "text": text, "source": str(path), "title": title}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Manage the local document index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="index files or directories")
+    add.add_argument("paths", nargs="+")
+    delete = commands.add_parser("delete", help="remove documents by id")
+    delete.add_argument("doc_ids", nargs="+")
+    commands.add_parser("list", help="list indexed documents")
+    commands.add_parser("compact", help="merge segments and drop deleted documents")
+    args = parser.parse_args(argv)
+
+    if args.command == "add":
+        batch: List[Dict[str, str]] = []
+        total_docs = total_chunks = 0
+        for path in _iter_files(args.paths):
+            batch.append(_load(path))
+            if len(batch) >= BATCH_SIZE:
+                total_chunks += document_index.add_documents(batch)
+                total_docs += len(batch)
+                batch = []
+        if batch:
+            total_chunks += document_index.add_documents(batch)
+            total_docs += len(batch)
+        print(f"Indexed {total_docs} documents ({total_chunks} chunks)")
+    elif args.command == "delete":
+        for doc_id in args.doc_ids:
+            found = document_index.delete(doc_id)
+            print(f"{'Deleted' if found else 'Not found'}: {doc_id}")
+    elif args.command == "list":
+        for doc in document_index.list_documents():
+            print(f"{doc['id']}\t{doc['chunks']} chunks\t{doc.get('title', '')}")
+        print(document_index.stats())
+    elif args.command == "compact":
+        print(f"Compacted index: {document_index.compact()} chunks")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
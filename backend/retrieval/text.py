@@ -0,0 +1,62 @@
+"""Tokenization and chunking for the local document index."""
+
+import re
+import unicodedata
+from typing import List
+
+# Latin words and digits are single tokens; CJK runs are split into
+# overlapping character bigrams since they have no word separators.
+_CJK = r"\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af"
+_TOKEN_RE = re.compile(rf"[0-9a-z_]+|[{_CJK}]+")
+_CJK_RE = re.compile(rf"[{_CJK}]")
+# Terms are stored in fixed-width byte arrays; longer tokens are truncated
+MAX_TERM_BYTES = 64
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lower-cased index terms."""
+    tokens = []
+    for match in _TOKEN_RE.finditer(unicodedata.normalize("NFKC", text).lower()):
+        token = match.group()
+        if _CJK_RE.match(token):
+            if len(token) == 1:
+                tokens.append(token)
+            else:
+                tokens.extend(token[i : i + 2] for i in range(len(token) - 1))
+        else:
+            encoded = token.encode()
+            if len(encoded) > MAX_TERM_BYTES:
+                token = encoded[:MAX_TERM_BYTES].decode(errors="ignore")
+            tokens.append(token)
+    return tokens
+
+
+def chunk_text(text: str, chunk_size: int, overlap: int) -> List[str]:
+    """Split text into chunks of about ``chunk_size`` characters.
+
+    Paragraphs are packed together while they fit; a paragraph longer than
+    ``chunk_size`` is cut into windows that overlap by ``overlap`` characters.
+    """
+    chunks: List[str] = []
+    current = ""
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) > chunk_size:
+            if current:
+                chunks.append(current)
+                current = ""
+            step = max(chunk_size - overlap, 1)
+            for start in range(0, len(paragraph), step):
+                chunks.append(paragraph[start : start + chunk_size])
+                if start + chunk_size >= len(paragraph):
+                    break
+        elif current and len(current) + len(paragraph) + 2 > chunk_size:
+            chunks.append(current)
+            current = paragraph
+        else:
+            current = f"{current}\n\n{paragraph}" if current else paragraph
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,108 @@
+"""Tests for the native async paths of the built-in tools."""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.agent.tool_pool import tool_pool
+from backend.tools.calculator import _is_cheap, calculator
+from backend.tools.http_client import http_client
+from backend.tools.tavily_search import AsyncTavilySearchResults
+
+
+@pytest.fixture
+def pool():
+    yield tool_pool
+    tool_pool.shutdown()
+
+
+def test_cheap_expressions():
+    assert _is_cheap(["2 + 3 * 4", "factorial(20)", "sqrt(2) ** 10"])
+    assert _is_cheap(["not valid ("])
+    assert not _is_cheap(["[1, 2, 3] * 2"])
+    assert not _is_cheap(["sum(arange(1000))"])
+    assert not _is_cheap(["1 + 1"] * 500)
+
+
+@pytest.mark.asyncio
+async def test_scalar_math_runs_inline(pool):
+    assert await calculator.ainvoke({"expression": "2 + 3"}) == "5"
+    assert await calculator.ainvoke({"expression": "1/0"}) == "计算错误: division by zero"
+    assert "calculator" not in pool.stats()
+
+
+@pytest.mark.asyncio
+async def test_array_math_runs_in_worker_process(pool):
+    result = await calculator.ainvoke({"expression": "sum([1, 2, 3]); 2 * 3"})
+    assert result == "sum([1, 2, 3]) = 6.0\n2 * 3 = 6"
+    assert pool.stats()["calculator"]["completed"] == 1
+
+
+@pytest_asyncio.fixture
+async def tavily_server():
+    requests = []
+    connections = set()
+
+    async def search(request):
+        body = await request.json()
+        requests.append(body)
+        connections.add(request.transport.get_extra_info("peername"))
+        if body["query"] == "fail":
+            return web.json_response({"detail": "bad"}, status=500)
+        await asyncio.sleep(0.05)
+        return web.json_response(
+            {
+                "results": [
+                    {
+                        "title": body["query"],
+                        "url": "https://example.com",
+                        "content": "text",
+                        "score": 0.9,
+                    }
+                ]
+            }
+        )
+
+    app = web.Application()
+    app.router.add_post("/search", search)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    yield f"http://127.0.0.1:{port}", requests, connections
+    await http_client.aclose()
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_tavily_uses_shared_client(tavily_server):
+    url, requests, connections = tavily_server
+    search = AsyncTavilySearchResults(
+        api_url=url, tavily_api_key="key", max_results=2
+    )
+
+    results = await asyncio.gather(*(search.ainvoke(f"q{i}") for i in range(10)))
+
+    assert [r[0]["title"] for r in results] == [f"q{i}" for i in range(10)]
+    assert requests[0]["api_key"] == "key" and requests[0]["max_results"] == 2
+    # Keep-alive: later calls reuse the pooled connections
+    opened = len(connections)
+    for _ in range(5):
+        await search.ainvoke("again")
+    assert len(connections) == opened <= 10
+    assert http_client.get() is http_client.get()
+
+
+@pytest.mark.asyncio
+async def test_tavily_errors_become_observation(tavily_server):
+    url, _, _ = tavily_server
+    search = AsyncTavilySearchResults(api_url=url, tavily_api_key="key")
+    result = await search.ainvoke("fail")
+    assert result.startswith("HTTPStatusError(")
@@ -0,0 +1,167 @@
+"""Tests for cross-worker cancellation backends."""
+
+import asyncio
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.utils.cancel_backends import (
+    MemoryCancelBackend,
+    RedisCancelBackend,
+    SQLiteCancelBackend,
+)
+from backend.utils.cancel_manager import CancelManager
+
+
+class FakeRedis:
+    """In-process stand-in for the redis.asyncio commands the backend uses."""
+
+    def __init__(self):
+        self.data = {}
+
+    def _live(self, key):
+        value, expires_at = self.data.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.time():
+            del self.data[key]
+            return None
+        return value
+
+    async def get(self, key):
+        return self._live(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = (str(value), time.time() + ex if ex else None)
+
+    async def mget(self, keys):
+        return [self._live(key) for key in keys]
+
+    async def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+
+def _managers(backend_a, backend_b):
+    # Two managers stand in for two server processes
+    return (
+        CancelManager(backend_a, poll_interval=0.01, owner="worker-a"),
+        CancelManager(backend_b, poll_interval=0.01, owner="worker-b"),
+    )
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def shared_managers(request, tmp_path):
+    if request.param == "sqlite":
+        path = str(tmp_path / "generations.db")
+        return _managers(
+            SQLiteCancelBackend(path, ttl_seconds=60),
+            SQLiteCancelBackend(path, ttl_seconds=60),
+        )
+    redis = FakeRedis()
+    return _managers(
+        RedisCancelBackend(client=redis, ttl_seconds=60),
+        RedisCancelBackend(client=redis, ttl_seconds=60),
+    )
+
+
+@pytest.mark.asyncio
+async def test_stop_reaches_generation_in_other_worker(shared_managers):
+    worker_a, worker_b = shared_managers
+    stop_event = await worker_a.start_generation("s1")
+
+    state = await worker_b.generation_state("s1")
+    assert state["owner"] == "worker-a" and state["stop_requested_at"] is None
+
+    assert await worker_b.stop_session("s1")
+    await asyncio.wait_for(stop_event.wait(), timeout=1)
+    assert (await worker_b.generation_state("s1"))["stop_requested_at"] is not None
+
+    await worker_a.cleanup("s1")
+    assert await worker_b.generation_state("s1") is None
+    assert not await worker_b.stop_session("s1")
+    await worker_a.close()
+    await worker_b.close()
+
+
+@pytest.mark.asyncio
+async def test_other_generations_keep_running(shared_managers):
+    worker_a, worker_b = shared_managers
+    first = await worker_a.start_generation("s1")
+    second = await worker_a.start_generation("s2")
+
+    await worker_b.stop_session("s2")
+    await asyncio.wait_for(second.wait(), timeout=1)
+    await asyncio.sleep(0.05)
+    assert not first.is_set()
+
+    await worker_a.cleanup("s1")
+    await worker_a.cleanup("s2")
+    await worker_a.close()
+    await worker_b.close()
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_stops_local_generations_only():
+    manager = CancelManager(MemoryCancelBackend(ttl_seconds=60))
+    stop_event = await manager.start_generation("s1")
+
+    assert await manager.stop_session("s1")
+    assert stop_event.is_set() and manager.is_session_stopped("s1")
+    await manager.cleanup("s1")
+    assert not await manager.stop_session("s1")
+
+
+@pytest.mark.asyncio
+async def test_stale_registrations_expire(tmp_path):
+    backend = SQLiteCancelBackend(str(tmp_path / "generations.db"), ttl_seconds=60)
+    await backend.register("s1", "dead-worker")
+    backend.ttl_seconds = 0
+
+    assert not await backend.request_stop("s1")
+    assert await backend.state("s1") is None
+    await backend.close()
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCancelBackend(ttl_seconds=60)
+    if request.param == "sqlite":
+        return SQLiteCancelBackend(str(tmp_path / "generations.db"), ttl_seconds=60)
+    return RedisCancelBackend(client=FakeRedis(), ttl_seconds=60)
+
+
+@pytest.mark.asyncio
+async def test_registrations_expire_after_their_own_ttl(backend, monkeypatch):
+    await backend.register("short", "dead-worker", ttl_seconds=5)
+    await backend.register("default", "dead-worker")
+    assert (await backend.state("short"))["ttl_seconds"] == 5
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 10)
+    assert await backend.state("short") is None
+    assert not await backend.request_stop("short")
+    assert (await backend.state("default"))["ttl_seconds"] == 60
+    await backend.close()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_file_from_before_generation_ttls(tmp_path):
+    path = tmp_path / "generations.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE generations (session_id TEXT PRIMARY KEY, owner TEXT NOT NULL,"
+        " started_at REAL NOT NULL, stop_requested_at REAL)"
+    )
+    conn.execute("INSERT INTO generations VALUES ('old', 'w', ?, NULL)", (time.time(),))
+    conn.commit()
+    conn.close()
+
+    backend = SQLiteCancelBackend(str(path), ttl_seconds=60)
+    assert (await backend.state("old"))["ttl_seconds"] == 60
+    await backend.register("new", "w", ttl_seconds=5)
+    assert (await backend.state("new"))["ttl_seconds"] == 5
+    await backend.close()
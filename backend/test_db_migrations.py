@@ -0,0 +1,88 @@
+"""Tests for upgrading databases created before columns were added."""
+
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import select, text, update
+from sqlalchemy.ext.asyncio import create_async_engine
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.db.base import ADDED_COLUMNS, _add_missing_columns
+from backend.db.models import Message
+
+# The schema of the first release, before any ADDED_COLUMNS
+BASELINE_SCHEMA = [
+    """
+    CREATE TABLE sessions (
+        id VARCHAR(36) NOT NULL,
+        user_id VARCHAR(255),
+        title VARCHAR(255),
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+        updated_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+        is_active BOOLEAN NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE messages (
+        id INTEGER NOT NULL,
+        session_id VARCHAR(36) NOT NULL,
+        role VARCHAR(20) NOT NULL,
+        content TEXT,
+        tool_calls JSON,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP NOT NULL,
+        tokens_used JSON,
+        model VARCHAR(50),
+        PRIMARY KEY (id),
+        FOREIGN KEY(session_id) REFERENCES sessions (id) ON DELETE CASCADE
+    )
+    """,
+    "INSERT INTO sessions (id, is_active) VALUES ('s1', 1)",
+    "INSERT INTO messages (session_id, role, content) VALUES ('s1', 'user', 'hi')",
+]
+
+
+@pytest.mark.asyncio
+async def test_baseline_database_gets_the_added_columns(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'old.db'}")
+    try:
+        async with engine.begin() as conn:
+            for statement in BASELINE_SCHEMA:
+                await conn.execute(text(statement))
+
+        # Twice: upgrading an up-to-date database changes nothing
+        for _ in range(2):
+            async with engine.begin() as conn:
+                await _add_missing_columns(conn)
+
+        async with engine.begin() as conn:
+            rows = await conn.execute(text("PRAGMA table_info(messages)"))
+            assert {column for _, column in ADDED_COLUMNS} <= {row[1] for row in rows}
+
+            await conn.execute(
+                update(Message).values(
+                    turn_budget={"elapsed_ms": 12},
+                    token_usage={"calls": []},
+                    timing={"total_ms": 34},
+                )
+            )
+            row = (
+                await conn.execute(
+                    select(
+                        Message.content,
+                        Message.turn_budget,
+                        Message.token_usage,
+                        Message.timing,
+                    )
+                )
+            ).one()
+        assert tuple(row) == (
+            "hi",
+            {"elapsed_ms": 12},
+            {"calls": []},
+            {"total_ms": 34},
+        )
+    finally:
+        await engine.dispose()
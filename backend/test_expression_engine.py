@@ -0,0 +1,140 @@
+"""Tests for the safe calculator expression engine."""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.tools.calculator import calculator
+from backend.tools.expression_engine import (
+    VECTORIZE_MIN_GROUP,
+    ExpressionEngine,
+    ExpressionError,
+)
+
+
+@pytest.fixture
+def engine():
+    return ExpressionEngine()
+
+
+@pytest.mark.parametrize(
+    "source,expected",
+    [
+        ("2 + 3 * 4", 14),
+        ("2**10", 1024),
+        ("7 // 2 + 7 % 2", 4),
+        ("-(3 - 5)", 2),
+        ("sqrt(16)", 4.0),
+        ("math.sqrt(16)", 4.0),
+        ("max(3, 9, 4)", 9),
+        ("round(3.14159, 2)", 3.14),
+    ],
+)
+def test_scalar_expressions(engine, source, expected):
+    assert engine.evaluate(source) == expected
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        "__import__('os').system('ls')",
+        "(1).__class__",
+        "open('x')",
+        "x + 1",
+        "'a' * 3",
+        "[i for i in range(3)]",
+        "lambda: 1",
+    ],
+)
+def test_rejects_unsafe_syntax(engine, source):
+    with pytest.raises(ExpressionError):
+        engine.evaluate(source)
+
+
+def test_huge_power_is_rejected_quickly(engine):
+    started = time.perf_counter()
+    with pytest.raises(ExpressionError):
+        engine.evaluate("9**9**9")
+    assert time.perf_counter() - started < 0.1
+
+
+def test_huge_round_digits_are_rejected_quickly(engine):
+    started = time.perf_counter()
+    for source in ("round(1, -10000000)", "round([1, 2], 10000000)"):
+        with pytest.raises(ExpressionError):
+            engine.evaluate(source)
+    assert time.perf_counter() - started < 0.1
+    assert engine.evaluate("round(1234.5678, -2)") == 1200
+    assert engine.evaluate("round(1234.5678, 2)") == 1234.57
+
+
+def test_operand_and_node_limits(engine):
+    with pytest.raises(ExpressionError):
+        engine.evaluate("(2**4000) * (2**4000)")
+    with pytest.raises(ExpressionError):
+        engine.evaluate("+".join(["1"] * 300))
+    with pytest.raises(ExpressionError):
+        engine.evaluate("arange(10**9)")
+
+
+def test_array_size_is_checked_before_allocation(engine):
+    cube = (
+        "[" + ", ".join(["[[0]]"] * 25) + "] + "
+        "[" + ", ".join(["[0]"] * 25) + "] + [[arange(0, 99999)]]"
+    )
+    with pytest.raises(ExpressionError, match="dimensions"):
+        engine.evaluate(cube)
+    with pytest.raises(ExpressionError, match="elements"):
+        engine.evaluate("[" + ", ".join(["[0]"] * 20) + "] + [arange(0, 99999)]")
+    with pytest.raises(ExpressionError, match="elements"):
+        engine.evaluate("dot([[1], [2]], [arange(0, 99999)])")
+    with pytest.raises(ExpressionError, match="elements"):
+        engine.evaluate("[arange(0, 60000), arange(0, 60000)]")
+    with pytest.raises(ExpressionError, match="scalar"):
+        engine.evaluate("linspace(0, arange(0, 1000), 1000)")
+    assert engine.evaluate("[[1, 2], [3, 4]] * [10, 100]").tolist() == [
+        [10.0, 200.0],
+        [30.0, 400.0],
+    ]
+
+
+def test_compiled_expressions_are_cached(engine):
+    first = engine.compile("1 + 2")
+    assert engine.compile("1 + 2") is first
+
+
+def test_array_expressions(engine):
+    assert list(engine.evaluate("[1, 2, 3] * 2")) == [2.0, 4.0, 6.0]
+    assert engine.evaluate("sum([1, 2, 3])") == 6.0
+    assert engine.evaluate("dot([1, 2], [3, 4])") == 11.0
+
+
+def test_batch_matches_scalar_results(engine):
+    sources = [f"{i} / {i + 3} * 1.5 - 0.25" for i in range(VECTORIZE_MIN_GROUP * 2)]
+    sources += ["2**10", "1/0", "bad name"]
+    results = engine.evaluate_batch(sources)
+
+    for source, result in zip(sources[:-2], results[:-2]):
+        assert result == ExpressionEngine().evaluate(source)
+    assert isinstance(results[-2], ExpressionError)
+    assert isinstance(results[-1], ExpressionError)
+
+
+def test_vectorized_division_by_zero_reports_error(engine):
+    sources = [f"{i} / 0.0" for i in range(VECTORIZE_MIN_GROUP)]
+    assert all(isinstance(r, ExpressionError) for r in engine.evaluate_batch(sources))
+
+
+def test_integer_products_are_not_vectorized(engine):
+    compiled = engine.compile("99999999 * 99999999 / 3")
+    assert not compiled.vectorizable
+
+
+def test_calculator_tool():
+    assert calculator.invoke("2**3\nObservation") == "8"
+    assert calculator.invoke("9**9**9").startswith("计算错误")
+    assert calculator.invoke("1 + 1; 2 * 3") == "1 + 1 = 2\n2 * 3 = 6"
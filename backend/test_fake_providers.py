@@ -0,0 +1,170 @@
+"""Tests for the fake LLM and search providers used for load testing."""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+import httpx
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.agent.executor import ChatAgentExecutor
+from backend.agent.factory import AgentFactory
+from backend.agent.fake_llm import FakeChatModel, ScriptedTurn, read_prompt
+from backend.agent.token_usage import TokenLedger
+from backend.config import settings
+from backend.prompts import custom_json_prompt
+from backend.prompts.bundle import REACT_PROMPT, get_prompt
+from backend.tools.calculator import calculator
+from backend.tools.fake_search import FakeTavilySearchResults
+from backend.utils.simulation import Latency
+from langchain_classic.agents import create_json_chat_agent, create_react_agent
+from langchain_core.messages import HumanMessage
+
+SCRIPT = [
+    ScriptedTurn(
+        match="sum",
+        steps=[{"tool": "calculator", "input": "40 + 2"}],
+        answer="The sum is 42.",
+    ),
+    ScriptedTurn(
+        steps=[
+            {"tool": "tavily_search_results_json", "input": "{question}"},
+            {"tool": "calculator", "input": "2 * 3"},
+        ],
+        answer="Found it: {question}",
+    ),
+]
+
+
+def _search(**kwargs):
+    return FakeTavilySearchResults(max_results=2, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_react_agent_plays_the_script(monkeypatch):
+    monkeypatch.setenv("TAVILY_API_KEY", "test")
+    llm = FakeChatModel(script=SCRIPT, tokens_per_second=0)
+    tools = [calculator, _search()]
+    agent = create_react_agent(llm=llm, tools=tools, prompt=get_prompt(REACT_PROMPT))
+    executor = ChatAgentExecutor(
+        agent=agent, tools=tools, max_iterations=5, return_intermediate_steps=True
+    )
+    ledger = TokenLedger()
+
+    result = await executor.ainvoke({"input": "who won"}, {"callbacks": [ledger]})
+
+    assert result["output"] == "Found it: who won"
+    steps = result["intermediate_steps"]
+    assert [action.tool for action, _ in steps] == [
+        "tavily_search_results_json",
+        "calculator",
+    ]
+    assert steps[0][1][0]["url"] == "https://example.com/who-won/1"
+    assert "6" in str(steps[1][1])
+    assert len(ledger.calls) == 3
+    assert all(call["total_tokens"] > 0 for call in ledger.calls)
+
+
+@pytest.mark.asyncio
+async def test_json_agent_plays_the_script():
+    llm = FakeChatModel(script=SCRIPT, tokens_per_second=0)
+    agent = create_json_chat_agent(llm, [calculator], custom_json_prompt)
+    executor = ChatAgentExecutor(
+        agent=agent,
+        tools=[calculator],
+        max_iterations=5,
+        handle_parsing_errors=True,
+        return_intermediate_steps=True,
+    )
+
+    result = await executor.ainvoke({"input": "the sum please"})
+
+    assert result["output"] == "The sum is 42."
+    ((action, observation),) = result["intermediate_steps"]
+    assert (action.tool, action.tool_input) == ("calculator", "40 + 2")
+    assert "42" in str(observation)
+
+
+def test_same_question_same_turn_and_plain_prompts():
+    llm = FakeChatModel(script=SCRIPT)
+    assert llm.choose_turn("any sum") is SCRIPT[0]
+    assert llm.choose_turn("hello") is llm.choose_turn("hello") is SCRIPT[1]
+    assert read_prompt([HumanMessage("hello")]) == ("text", "hello", 0)
+    assert llm.invoke("hello").content == "Found it: hello"
+
+
+@pytest.mark.asyncio
+async def test_streaming_follows_latency_and_token_rate():
+    llm = FakeChatModel(
+        script=[ScriptedTurn(answer="x" * 80)],
+        latency=Latency("fixed", 50),
+        tokens_per_second=200,
+    )
+    started = time.perf_counter()
+    chunks = []
+    first = None
+    async for chunk in llm.astream("hi"):
+        first = first or time.perf_counter() - started
+        chunks.append(chunk)
+    elapsed = time.perf_counter() - started
+
+    message = sum(chunks[1:], chunks[0])
+    assert message.content == "x" * 80
+    assert len([chunk for chunk in chunks if chunk.content]) == 20
+    assert first >= 0.05
+    assert elapsed >= 0.05 + 19 / 200
+    assert message.usage_metadata["output_tokens"] == 20
+
+
+@pytest.mark.asyncio
+async def test_faults_are_injected_as_http_errors(monkeypatch):
+    llm = FakeChatModel(script=SCRIPT, throttle_rate=1.0)
+    with pytest.raises(httpx.HTTPStatusError) as raised:
+        await llm.ainvoke("hi")
+    assert raised.value.response.status_code == 429
+
+    monkeypatch.setenv("TAVILY_API_KEY", "test")
+    search = _search(error_rate=1.0)
+    observation = await search.ainvoke("query")
+    assert "500 Internal Server Error" in observation
+
+
+def test_runs_repeat_for_a_seed(monkeypatch):
+    def outcomes(seed):
+        llm = FakeChatModel(
+            script=SCRIPT, tokens_per_second=0, throttle_rate=0.3, seed=seed
+        )
+        results = []
+        for _ in range(20):
+            try:
+                llm.invoke("hi")
+                results.append("ok")
+            except httpx.HTTPStatusError:
+                results.append("throttled")
+        return results
+
+    assert outcomes(7) == outcomes(7)
+    assert outcomes(7) != outcomes(8)
+    assert 0 < outcomes(7).count("throttled") < 20
+
+    latency = Latency.parse("uniform:100:0.5")
+    assert all(0.05 <= latency.sample(random.Random(i)) <= 0.15 for i in range(20))
+    with pytest.raises(ValueError):
+        Latency.parse("normal:100")
+
+    monkeypatch.setenv("TAVILY_API_KEY", "test")
+    assert _search().invoke("query") == _search().invoke("query")
+
+
+def test_factory_selects_the_provider(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "fake")
+    llm = AgentFactory.create_llm(streaming=True)
+    assert isinstance(llm, FakeChatModel) and llm.streaming
+    assert llm.model == settings.MODEL_NAME
+
+    monkeypatch.setattr(settings, "LLM_PROVIDER", "openai")
+    with pytest.raises(ValueError):
+        AgentFactory.create_llm()
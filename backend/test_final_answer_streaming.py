@@ -0,0 +1,191 @@
+"""Tests for early final-answer streaming of ReAct agent output."""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend import chat_service
+from backend.agent.engine import _astream_with_final_answer
+from backend.agent.executor import ChatAgentExecutor
+from backend.agent.streaming import FinalAnswerStreamParser
+from backend.chat_service import _unstreamed_suffix
+from backend.db.base import Base
+from backend.db.models import Message, Session
+from backend.utils.cancel_manager import cancel_manager
+from langchain_classic.agents import create_react_agent
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import PromptTemplate
+from langchain_core.tools import tool
+
+
+def _feed_all(parser, tokens):
+    events = []
+    for token in tokens:
+        events.extend(parser.feed(token))
+    events.extend(parser.flush())
+    return events
+
+
+class TestFinalAnswerStreamParser:
+    def test_marker_split_across_tokens(self):
+        parser = FinalAnswerStreamParser()
+        events = _feed_all(
+            parser,
+            [" I know it\n", "Final An", "swer", ": ", "Hel", "lo"],
+        )
+        assert events == [
+            ("thought", "I know it"),
+            ("answer", "Hel"),
+            ("answer", "lo"),
+        ]
+
+    def test_tool_call_produces_only_thought(self):
+        parser = FinalAnswerStreamParser()
+        events = _feed_all(
+            parser,
+            ["Thought: search\n", "Action: tavily\n", "Action Input: x"],
+        )
+        assert events == [("thought", "search")]
+        assert not parser.in_answer
+
+    def test_answer_in_same_token_as_marker(self):
+        parser = FinalAnswerStreamParser()
+        events = _feed_all(parser, ["Done.\nFinal Answer: 42"])
+        assert events == [("thought", "Done."), ("answer", "42")]
+
+
+@tool
+def echo(text: str) -> str:
+    """Echo the input back."""
+    return f"echo: {text}"
+
+
+@pytest.mark.asyncio
+async def test_answer_tokens_arrive_before_output():
+    llm = GenericFakeChatModel(
+        messages=iter(
+            [
+                AIMessage(content="Thought: look\nAction: echo\nAction Input: hi"),
+                AIMessage(content="Thought: done\nFinal Answer: the answer"),
+            ]
+        )
+    )
+    prompt = PromptTemplate.from_template(
+        "{tools} [{tool_names}]\nQuestion: {input}\nThought:{agent_scratchpad}"
+    )
+    agent = create_react_agent(llm=llm, tools=[echo], prompt=prompt)
+    executor = ChatAgentExecutor(agent=agent, tools=[echo], handle_parsing_errors=True)
+
+    chunks = [
+        chunk async for chunk in _astream_with_final_answer(executor, {"input": "q"})
+    ]
+
+    answer = "".join(c["answer_delta"] for c in chunks if "answer_delta" in c)
+    output_index = next(i for i, c in enumerate(chunks) if "output" in c)
+    first_delta = next(i for i, c in enumerate(chunks) if "answer_delta" in c)
+    assert answer == "the answer"
+    assert first_delta < output_index
+    assert chunks[output_index]["output"] == "the answer"
+    assert {"thought": "look"} in chunks
+
+
+@pytest.mark.asyncio
+async def test_streamed_text_is_reset_when_the_call_is_not_final():
+    llm = GenericFakeChatModel(
+        messages=iter(
+            [
+                # Final Answer plus Action fails to parse
+                AIMessage(
+                    content="Thought: hm\nFinal Answer: early\nAction: echo\n"
+                    "Action Input: hi"
+                ),
+                AIMessage(content="Thought: done\nFinal Answer: the answer"),
+            ]
+        )
+    )
+    prompt = PromptTemplate.from_template(
+        "{tools} [{tool_names}]\nQuestion: {input}\nThought:{agent_scratchpad}"
+    )
+    agent = create_react_agent(llm=llm, tools=[echo], prompt=prompt)
+    executor = ChatAgentExecutor(agent=agent, tools=[echo], handle_parsing_errors=True)
+
+    chunks = [
+        chunk async for chunk in _astream_with_final_answer(executor, {"input": "q"})
+    ]
+
+    reset = chunks.index({"answer_reset": True})
+    assert any("answer_delta" in c for c in chunks[:reset])
+    assert "steps" in chunks[reset + 1]
+    answer = "".join(c["answer_delta"] for c in chunks[reset:] if "answer_delta" in c)
+    assert answer == "the answer"
+    assert chunks.count({"answer_reset": True}) == 1
+
+
+def test_unstreamed_suffix():
+    assert _unstreamed_suffix("the answer", "") == "the answer"
+    assert _unstreamed_suffix("the answer", "the ans") == "wer"
+    # A forced finish does not continue the streamed text
+    assert _unstreamed_suffix("抱歉", "the ans") is None
+
+
+async def _stream_turn(monkeypatch, chunks):
+    """Run a streamed turn over ``chunks``; returns its events and message."""
+
+    async def fake_stream(*args, **kwargs):
+        for chunk in chunks:
+            if chunk == "cancel":
+                await cancel_manager.stop_session("s1")
+                chunk = {"thought": "still going"}
+            yield chunk
+
+    monkeypatch.setattr(chat_service, "chat_async_stream", fake_stream)
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_maker() as db:
+        db.add(Session(id="s1"))
+        await db.flush()
+        events = [
+            json.loads(event[len("data: ") :])
+            async for event in chat_service.chat_stream_generator("s1", "hi", db)
+        ]
+        message = (
+            await db.execute(select(Message).where(Message.role == "assistant"))
+        ).scalar_one()
+    await engine.dispose()
+    return events, message
+
+
+@pytest.mark.asyncio
+async def test_output_that_differs_from_the_stream_replaces_it(monkeypatch):
+    events, message = await _stream_turn(
+        monkeypatch,
+        [
+            {"answer_delta": "early"},
+            {"answer_reset": True},
+            {"answer_delta": "the ans"},
+            {"output": "抱歉"},
+        ],
+    )
+
+    replaced = [event["content"] for event in events if event["type"] == "replace"]
+    assert replaced == ["", "抱歉"]
+    assert message.content == "抱歉"
+
+
+@pytest.mark.asyncio
+async def test_cancel_keeps_the_streamed_answer(monkeypatch):
+    events, message = await _stream_turn(
+        monkeypatch, [{"answer_delta": "the "}, {"answer_delta": "ans"}, "cancel"]
+    )
+
+    assert events[-2]["type"] == "cancelled"
+    assert message.content == "the ans"
@@ -0,0 +1,117 @@
+"""Tests for the local BM25 document index and search tool."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.retrieval.index import DocumentIndex
+from backend.retrieval.text import chunk_text, tokenize
+
+DOCS = [
+    {
+        "id": "deploy.md",
+        "title": "Deployment",
+        "source": "docs/deploy.md",
+        "text": "Deploy the backend with uvicorn.\n\nSet DATABASE_URL before starting.",
+    },
+    {
+        "id": "faq.md",
+        "title": "FAQ",
+        "text": "The chatbot supports streaming answers.\n\n如何重置密码？请联系管理员。",
+    },
+    {"id": "empty.md", "text": "!!! ???"},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = DocumentIndex(str(tmp_path / "index"), chunk_size=80, chunk_overlap=10)
+    index.add_documents(DOCS)
+    return index
+
+
+def test_tokenize_latin_and_cjk():
+    assert tokenize("Hello, World!") == ["hello", "world"]
+    assert tokenize("重置密码") == ["重置", "置密", "密码"]
+
+
+def test_chunk_text_packs_paragraphs_and_splits_long_ones():
+    assert chunk_text("a\n\nb\n\n" + "c" * 25, 10, 2) == ["a\n\nb", "c" * 10, "c" * 10, "c" * 9]
+
+
+def test_search_ranks_matching_chunk_first(index):
+    results = index.search("how to deploy with uvicorn", k=2)
+    assert results[0]["doc_id"] == "deploy.md"
+    assert results[0]["title"] == "Deployment"
+    assert "uvicorn" in results[0]["content"]
+    assert index.search("重置密码")[0]["doc_id"] == "faq.md"
+    assert index.search("nonexistent") == []
+
+
+def test_documents_without_terms_are_skipped(index):
+    ids = {doc["id"] for doc in index.list_documents()}
+    assert ids == {"deploy.md", "faq.md"}
+
+
+def test_incremental_add_delete_and_replace(index, tmp_path):
+    index.add_documents([{"id": "new.md", "text": "Kubernetes helm chart"}])
+    assert index.search("helm")[0]["doc_id"] == "new.md"
+
+    assert index.delete("deploy.md")
+    assert not index.delete("deploy.md")
+    assert index.search("uvicorn") == []
+
+    index.add_documents([{"id": "new.md", "text": "Replaced with docker compose"}])
+    assert index.search("helm") == []
+    assert index.search("docker")[0]["doc_id"] == "new.md"
+
+    # A second reader on the same directory sees the writer's changes
+    reader = DocumentIndex(str(tmp_path / "index"))
+    assert reader.search("docker")[0]["doc_id"] == "new.md"
+    assert reader.stats()["segments"] == 3
+
+
+def test_compact_drops_deleted_documents(index):
+    index.add_documents([{"id": "extra.md", "text": "extra words"}])
+    index.delete("faq.md")
+    chunks = index.compact()
+
+    stats = index.stats()
+    assert stats["segments"] == 1
+    assert stats["chunks"] == chunks
+    assert {doc["id"] for doc in index.list_documents()} == {"deploy.md", "extra.md"}
+    assert index.search("uvicorn")[0]["doc_id"] == "deploy.md"
+    assert index.search("streaming") == []
+
+
+def test_compacted_segments_outlive_readers_of_the_old_manifest(index):
+    old_segments = sorted(path.name for path in index.path.glob("seg_*"))
+    index.compact()
+
+    # Still there for readers that loaded the previous manifest
+    assert all((index.path / name / "terms.npy").exists() for name in old_segments)
+
+    index.retire_grace_seconds = 0
+    index.add_documents([{"id": "later.md", "text": "later write"}])
+    assert not any((index.path / name).exists() for name in old_segments)
+    assert index.search("uvicorn")[0]["doc_id"] == "deploy.md"
+
+
+def test_refresh_leaves_the_snapshot_of_running_searches_alone(index):
+    index.add_documents([{"id": "extra.md", "text": "extra words"}])
+    # What a search running in another thread holds
+    before = index._refresh()
+    norms = [live.norm.copy() for live in before.segments]
+
+    index.delete("faq.md")
+    index.compact()
+    assert index.search("uvicorn")[0]["doc_id"] == "deploy.md"
+
+    for live, norm in zip(before.segments, norms):
+        assert live.dead is None
+        assert np.array_equal(live.norm, norm)
+        assert live.segment.text(0) and live.segment.doc(0)["id"]
@@ -0,0 +1,137 @@
+"""Tests for the queue-based log pipeline and LLM callback logging."""
+
+import json
+import logging
+import queue
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.agent.callback_handler import (
+    LLMDetailedCallbackHandler,
+    clear_session_id_for_logging,
+    set_session_id_for_logging,
+)
+from backend.utils.log_pipeline import (
+    DroppingQueueHandler,
+    LogPipeline,
+    parse_routes,
+)
+from langchain_core.outputs import Generation, LLMResult
+
+
+@pytest.fixture
+def pipeline():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    pipeline = LogPipeline()
+    yield pipeline
+    pipeline.stop()
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def _lines(path):
+    return [json.loads(line) for line in Path(path).read_text().splitlines()]
+
+
+def test_levels_are_routed_to_their_destinations(pipeline, tmp_path):
+    info, errors = tmp_path / "info.log", tmp_path / "errors.log"
+    pipeline.start(level="DEBUG", routes=f"WARNING={errors},INFO={info}")
+    log = logging.getLogger("test.routes")
+
+    log.debug("hidden")
+    log.info("llm_start", extra={"fields": {"session_id": "s1", "prompt_chars": 5}})
+    log.warning("slow")
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        log.exception("failed")
+    pipeline.stop()
+
+    info_lines = _lines(info)
+    assert [line["message"] for line in info_lines] == ["llm_start"]
+    assert info_lines[0]["session_id"] == "s1" and info_lines[0]["prompt_chars"] == 5
+    assert info_lines[0]["level"] == "INFO" and info_lines[0]["logger"] == "test.routes"
+
+    error_lines = _lines(errors)
+    assert [line["message"] for line in error_lines] == ["slow", "failed"]
+    assert "RuntimeError: boom" in error_lines[1]["exc_info"]
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=2))
+    record = logging.makeLogRecord({"msg": "x"})
+    for _ in range(5):
+        handler.handle(record)
+    assert handler.queue.qsize() == 2 and handler.dropped == 3
+
+
+def test_parse_routes():
+    assert parse_routes("WARNING=stderr, debug=stdout") == [
+        (logging.DEBUG, "stdout"),
+        (logging.WARNING, "stderr"),
+    ]
+    with pytest.raises(ValueError):
+        parse_routes("LOUD=stdout")
+    with pytest.raises(ValueError):
+        parse_routes("INFO")
+
+
+class _Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def collected():
+    log = logging.getLogger("test.llm")
+    handler = _Collect()
+    log.addHandler(handler)
+    log.setLevel(logging.INFO)
+    yield handler.records
+    log.removeHandler(handler)
+
+
+def test_bodies_are_capped(collected):
+    handler = LLMDetailedCallbackHandler("test.llm", body_max_chars=10)
+    set_session_id_for_logging("s1")
+    try:
+        handler.on_llm_start({}, ["x" * 25], run_id=uuid.uuid4())
+    finally:
+        clear_session_id_for_logging()
+
+    fields = collected[0].fields
+    assert collected[0].getMessage() == "llm_start"
+    assert fields["session_id"] == "s1" and fields["prompt_chars"] == 25
+    assert fields["prompts"] == ["x" * 10 + "... [15 chars truncated]"]
+
+
+def test_bodies_are_sampled_per_run(collected):
+    handler = LLMDetailedCallbackHandler("test.llm", body_sample_rate=0.25)
+    response = LLMResult(generations=[[Generation(text="answer")]])
+    run_ids = [uuid.uuid4() for _ in range(400)]
+    for run_id in run_ids:
+        handler.on_llm_start({}, ["prompt"], run_id=run_id)
+        handler.on_llm_end(response, run_id=run_id)
+
+    starts = {r.fields["run_id"] for r in collected if "prompts" in r.fields}
+    ends = {r.fields["run_id"] for r in collected if "generations" in r.fields}
+    # Every event is logged; bodies only for sampled runs, at start and end
+    assert len(collected) == 800
+    assert starts == ends and 50 < len(starts) < 150
+
+
+def test_disabled_level_skips_work(collected):
+    handler = LLMDetailedCallbackHandler("test.llm")
+    handler.on_chain_start({"name": "agent"}, {"input": "x"}, run_id=uuid.uuid4())
+    assert collected == []
@@ -0,0 +1,163 @@
+"""Tests for loop detection in the agent executor."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.agent.executor import (
+    LOOP_FALLBACK,
+    LOOP_NOTICE,
+    REPEAT_NOTICE,
+    ChatAgentExecutor,
+)
+from backend.agent.loop_guard import (
+    LoopStats,
+    action_key,
+    clear_loop_stats,
+    scan_steps,
+    set_loop_stats,
+)
+from backend.utils import metrics
+from langchain_classic.agents import create_react_agent
+from langchain_core.agents import AgentAction
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.prompts import PromptTemplate
+from langchain_core.tools import tool
+
+REACT_TEMPLATE = """Tools: {tools} [{tool_names}]
+Question: {input}
+Thought:{agent_scratchpad}"""
+
+calls = []
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up."""
+    calls.append(query)
+    return f"result for {query}"
+
+
+class RecordingLLM(FakeListLLM):
+    """FakeListLLM that keeps every prompt it receives."""
+
+    prompts_seen: list = []
+
+    async def _acall(self, prompt, stop=None, run_manager=None, **kwargs):
+        self.prompts_seen.append(prompt)
+        return await super()._acall(
+            prompt, stop=stop, run_manager=run_manager, **kwargs
+        )
+
+
+def _call(query):
+    return f"Thought: check\nAction: lookup\nAction Input: {query}"
+
+
+FINAL = "Thought: done\nFinal Answer: the answer"
+
+
+async def _run(responses, loop_max_repeats=2):
+    calls.clear()
+    llm = RecordingLLM(responses=responses, prompts_seen=[])
+    agent = create_react_agent(
+        llm=llm, tools=[lookup], prompt=PromptTemplate.from_template(REACT_TEMPLATE)
+    )
+    executor = ChatAgentExecutor(
+        agent=agent,
+        tools=[lookup],
+        handle_parsing_errors=True,
+        max_iterations=8,
+        loop_max_repeats=loop_max_repeats,
+        return_intermediate_steps=True,
+    )
+    stats = LoopStats()
+    set_loop_stats(stats)
+    try:
+        result = await executor.ainvoke({"input": "q"})
+    finally:
+        clear_loop_stats()
+    return result, llm, stats
+
+
+def test_action_key_normalizes_input():
+    a = AgentAction(tool="lookup", tool_input="  Paris   Weather ", log="")
+    b = AgentAction(tool="lookup", tool_input="paris weather", log="")
+    assert action_key(a) == action_key(b)
+    assert action_key(a) != action_key(AgentAction("other", "paris weather", ""))
+
+
+def test_scan_steps_counts_oscillation():
+    a = AgentAction(tool="lookup", tool_input="a", log="")
+    b = AgentAction(tool="lookup", tool_input="b", log="")
+    memo, repeats = scan_steps([(a, "ra"), (b, "rb"), (a, "ra2"), (b, "rb2")])
+    assert repeats == 2
+    assert memo[action_key(a)] == "ra"
+
+
+def test_failed_calls_are_not_memoized():
+    a = AgentAction(tool="lookup", tool_input="a", log="")
+    b = AgentAction(tool="lookup", tool_input="b", log="")
+    memo, repeats = scan_steps(
+        [
+            (a, "Tool error: lookup timed out after 10s"),
+            (b, "ConnectTimeout('connection timed out')"),
+            (a, "ra"),
+        ]
+    )
+    assert repeats == 1
+    assert memo == {action_key(a): "ra"}
+
+
+def test_loops_are_counted_under_the_turn_labels():
+    labels = ("stream", "true", "false")
+
+    def counts():
+        values = metrics.agent_loops.values()
+        return [values.get(labels + (kind,), 0) for kind in ("repeat", "forced_final")]
+
+    before = counts()
+    stats = LoopStats(metrics.turn_labels(True, True, False))
+    stats.record_repeat()
+    stats.record_repeat()
+    stats.record_forced_final()
+    LoopStats().record_repeat()
+
+    assert counts() == [before[0] + 2, before[1] + 1]
+
+
+@pytest.mark.asyncio
+async def test_repeated_call_is_answered_from_memo():
+    result, _, stats = await _run([_call("x"), _call(" X "), FINAL])
+
+    assert calls == ["x"]
+    assert result["output"] == "the answer"
+    observation = result["intermediate_steps"][1][1]
+    assert observation.startswith("result for x") and REPEAT_NOTICE in observation
+    assert stats.snapshot() == {"repeated_calls": 1, "forced_final": False}
+
+
+@pytest.mark.asyncio
+async def test_oscillation_forces_final_answer():
+    result, llm, stats = await _run(
+        [_call("a"), _call("b"), _call("a"), _call("b"), _call("a"), FINAL]
+    )
+
+    assert calls == ["a", "b"]
+    assert LOOP_NOTICE in llm.prompts_seen[-1]
+    assert result["output"] == LOOP_FALLBACK
+    assert len(result["intermediate_steps"]) == 4
+    assert stats.snapshot() == {"repeated_calls": 2, "forced_final": True}
+
+
+@pytest.mark.asyncio
+async def test_repeated_parse_failures_force_final_answer():
+    broken = "I am not following the format"
+    result, llm, stats = await _run([broken, broken, broken, FINAL, FINAL])
+
+    assert LOOP_NOTICE in llm.prompts_seen[-1]
+    assert result["output"] == "the answer"
+    assert stats.forced_final
@@ -0,0 +1,76 @@
+"""Tests for the event loop lag monitor."""
+
+import asyncio
+import sys
+import time
+import traceback
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.utils.loop_monitor import (
+    LoopMonitor,
+    call_site,
+    event_loop_lag_seconds,
+    event_loop_stalls,
+)
+
+
+def encode_large_payload():
+    # Stands in for a large json.dumps or eval on the event loop
+    time.sleep(0.3)
+
+
+@pytest.mark.asyncio
+async def test_blocking_call_site_is_recorded():
+    monitor = LoopMonitor(interval=0.01, threshold=0.05)
+    lag_count_before = sum(event_loop_lag_seconds.values().get((), [0])[:-1])
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        encode_large_payload()
+        await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    stats = monitor.stats()
+    assert stats["stalls"] == 1 and not stats["running"]
+    (site,) = stats["sites"]
+    assert site["site"].startswith("backend/test_loop_monitor.py:")
+    assert site["site"].endswith("(encode_large_payload)")
+    assert 0.2 < site["blocked_seconds"] < 1
+    assert site["max_lag_ms"] == stats["lag_ms"]["max"]
+    assert any("time.sleep(0.3)" in frame for frame in site["stack"])
+    assert event_loop_stalls.values()[(site["site"],)] >= 1
+    assert sum(event_loop_lag_seconds.values()[()][:-1]) > lag_count_before
+
+
+@pytest.mark.asyncio
+async def test_awaiting_is_not_a_stall():
+    monitor = LoopMonitor(interval=0.01, threshold=0.05)
+    monitor.start()
+    try:
+        await asyncio.gather(*(asyncio.sleep(0.02) for _ in range(50)))
+        await asyncio.sleep(0.1)
+    finally:
+        await monitor.stop()
+
+    stats = monitor.stats()
+    assert stats["ticks"] > 5
+    assert stats["stalls"] == 0 and stats["sites"] == []
+    assert stats["lag_ms"]["p50"] < 50
+
+
+def test_call_site_skips_library_frames():
+    def inner():
+        return traceback.extract_stack()
+
+    stack = inner()
+    assert call_site(stack).startswith("backend/test_loop_monitor.py:")
+    assert call_site(stack).endswith("(inner)")
+    library_only = traceback.StackSummary.from_list(
+        [("/usr/lib/python3/json/encoder.py", 200, "encode", None)]
+    )
+    assert call_site(library_only) == "/usr/lib/python3/json/encoder.py:200 (encode)"
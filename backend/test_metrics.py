@@ -0,0 +1,116 @@
+"""Tests for the metrics registry and its Prometheus text output."""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.utils import metrics
+from backend.utils.metrics import MetricsRegistry, TurnRecorder, instrument_repository
+
+
+def test_counter_and_gauge_render():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("mode",))
+    active = registry.gauge("active", "Active streams")
+    queued = registry.gauge(
+        "queued", "Queued", ("tool",), function=lambda: {("search",): 3}
+    )
+
+    requests.inc(mode="stream")
+    requests.inc(2, mode="stream")
+    requests.inc(mode='say "hi"')
+    active.inc()
+    active.inc()
+    active.dec()
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{mode="stream"} 3' in text
+    assert 'requests_total{mode="say \\"hi\\""} 1' in text
+    assert "# TYPE active gauge\nactive 1" in text
+    assert 'queued{tool="search"} 3' in text
+    assert queued.values() == {("search",): 3}
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", ("op",), (0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.observe(value, op="read")
+
+    lines = registry.render().splitlines()
+    assert 'latency_seconds_bucket{op="read",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{op="read",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{op="read",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{op="read"} 3.65' in lines
+    assert 'latency_seconds_count{op="read"} 4' in lines
+
+
+def test_threads_record_to_their_own_shards():
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls")
+    latency = registry.histogram("call_seconds", "Calls", buckets=(1,))
+
+    def work():
+        for _ in range(10000):
+            calls.inc()
+            latency.observe(0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert calls.values() == {(): 40000}
+    assert latency.values()[()][:2] == [40000, 0]
+
+
+def test_labels_must_match():
+    registry = MetricsRegistry()
+    counter = registry.counter("x_total", "X", ("mode",))
+    with pytest.raises(ValueError):
+        counter.inc(tool="search")
+    with pytest.raises(ValueError):
+        registry.counter("x_total", "X again")
+
+
+@pytest.mark.asyncio
+async def test_repository_operations_are_timed():
+    @instrument_repository
+    class FakeRepository:
+        @staticmethod
+        async def create(session, value):
+            return value
+
+        @staticmethod
+        async def broken(session):
+            raise RuntimeError("db down")
+
+    assert await FakeRepository.create(None, 5) == 5
+    with pytest.raises(RuntimeError):
+        await FakeRepository.broken(None)
+
+    timings = metrics.db_operation_seconds.values()
+    assert timings[("FakeRepository.create", "ok")][-1] >= 0
+    assert ("FakeRepository.broken", "error") in timings
+
+
+def test_turn_recorder():
+    labels = ("stream", "true", "false")
+    before = metrics.chat_tokens.values().get(labels + ("prompt",), 0)
+
+    recorder = TurnRecorder(True, True, False)
+    assert metrics.chat_active_generations.values()[labels] >= 1
+    recorder.first_token()
+    recorder.first_token()
+    recorder.finish("completed", {"prompt_tokens": 120, "completion_tokens": 30}, 3)
+
+    assert metrics.chat_active_generations.values()[labels] == 0
+    assert metrics.chat_requests.values()[labels + ("completed",)] >= 1
+    assert metrics.chat_tokens.values()[labels + ("prompt",)] == before + 120
+    assert sum(metrics.chat_ttft_seconds.values()[labels][:-1]) >= 1
@@ -0,0 +1,99 @@
+"""Tests for the multi-query search tool."""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.tools.multi_search import MultiSearchTool, merge_results, parse_queries
+from backend.tools.search_cache import CachedSearchTool
+from langchain_core.tools import tool
+
+calls = []
+
+RESULTS = {
+    "python speed": [
+        {"title": "Py bench", "url": "https://a.com/py", "content": "p", "score": 0.5},
+        {"title": "Shared", "url": "https://Shared.com/x/", "content": "s", "score": 0.9},
+    ],
+    "rust speed": [
+        {"title": "Rust bench", "url": "https://b.com/rs", "content": "r", "score": 0.8},
+        {"title": "Shared", "url": "https://shared.com/x#top", "content": "s", "score": 0.7},
+    ],
+}
+
+
+@tool
+async def fake_search(query: str) -> list:
+    """Pretend to search the web."""
+    calls.append(query)
+    await asyncio.sleep(0.1)
+    if query == "broken":
+        return "HTTPError('503')"
+    return RESULTS.get(query, [])
+
+
+@pytest.fixture
+def multi():
+    calls.clear()
+    search = CachedSearchTool.wrap(fake_search, max_entries=16, ttl_seconds=60)
+    return MultiSearchTool(search=search, max_queries=3, max_results=10)
+
+
+def test_parse_queries():
+    assert parse_queries('["a", "b", "A "]', 5) == ["a", "b"]
+    assert parse_queries("a\nb; c；d", 3) == ["a", "b", "c"]
+    assert parse_queries(["x", "y"], 5) == ["x", "y"]
+    assert parse_queries('"a"\nb\nObservation', 5) == ["a", "b"]
+
+
+def test_merge_dedupes_by_url_and_interleaves():
+    queries = ["python speed", "rust speed"]
+    merged = merge_results(
+        queries, [RESULTS["python speed"], RESULTS["rust speed"]], 10
+    )
+
+    assert [r["title"] for r in merged] == ["Shared", "Rust bench", "Py bench"]
+    assert merged[0]["queries"] == ["python speed", "rust speed"]
+    assert merged[1]["queries"] == ["rust speed"]
+
+
+def test_merge_applies_global_cap_and_reports_errors():
+    queries = ["python speed", "rust speed", "broken"]
+    merged = merge_results(
+        queries,
+        [RESULTS["python speed"], RESULTS["rust speed"], "HTTPError('503')"],
+        2,
+    )
+    # One result per query comes first, so neither query is crowded out
+    assert [r.get("title") for r in merged] == ["Shared", "Rust bench", None]
+    assert merged[-1] == {"query": "broken", "error": "HTTPError('503')"}
+
+
+@pytest.mark.asyncio
+async def test_queries_run_concurrently_and_reuse_cache(multi):
+    started = time.perf_counter()
+    merged = await multi.ainvoke({"queries": ["python speed", "rust speed", "broken"]})
+    assert time.perf_counter() - started < 0.25
+    assert len(merged) == 4
+
+    # ReAct passes the list as text; cached queries are not searched again
+    await multi.ainvoke('["Python speed", "rust speed"]')
+    assert sorted(calls) == ["broken", "python speed", "rust speed"]
+    assert multi.search.stats()["hits"] == 2
+
+
+@tool
+def sync_search(query: str) -> list:
+    """Pretend to search the web without a coroutine."""
+    return RESULTS.get(query, [])
+
+
+def test_sync_run():
+    multi = MultiSearchTool(search=sync_search)
+    merged = multi.invoke("python speed\nrust speed")
+    assert {r["url"] for r in merged} >= {"https://a.com/py", "https://b.com/rs"}
@@ -0,0 +1,126 @@
+"""Tests for per-tool observation budgets in the agent scratchpad."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.agent.executor import ChatAgentExecutor
+from backend.agent.observations import (
+    ObservationStats,
+    clear_observation_stats,
+    estimate_tokens,
+    set_observation_stats,
+    truncate_observation,
+)
+from langchain_classic.agents import create_react_agent
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.prompts import PromptTemplate
+from langchain_core.tools import tool
+
+REACT_TEMPLATE = """Tools: {tools} [{tool_names}]
+Question: {input}
+Thought:{agent_scratchpad}"""
+
+RESULTS = [
+    {
+        "title": f"Result {i}",
+        "url": f"https://example.com/{i}",
+        "content": f"snippet {i} " * 100,
+        "raw_content": "raw page text " * 500,
+        "score": 0.9,
+    }
+    for i in range(5)
+]
+
+
+@tool
+def big_search(query: str) -> list:
+    """Search returning large results."""
+    return RESULTS
+
+
+class RecordingLLM(FakeListLLM):
+    """FakeListLLM that keeps every prompt it receives."""
+
+    prompts_seen: list = []
+
+    async def _acall(self, prompt, stop=None, run_manager=None, **kwargs):
+        self.prompts_seen.append(prompt)
+        return await super()._acall(
+            prompt, stop=stop, run_manager=run_manager, **kwargs
+        )
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("北京天气") == 4
+
+
+def test_small_observations_are_untouched():
+    assert truncate_observation("short", 100) == ("short", 0)
+    assert truncate_observation(RESULTS, 0) == (RESULTS, 0)
+
+
+def test_result_lists_keep_titles_and_snippets():
+    compacted, saved = truncate_observation(RESULTS, 300)
+    assert saved > 0
+    assert estimate_tokens(str(compacted)) <= 330
+    first = compacted[0]
+    assert first["title"] == "Result 0"
+    assert first["url"] == "https://example.com/0"
+    assert first["content"].endswith("...")
+    assert "raw_content" not in first and "score" not in first
+    assert compacted[-1] == {"note": f"{len(RESULTS) - len(compacted) + 1} more results omitted"}
+
+
+def test_first_result_shrinks_when_nothing_fits():
+    compacted, _ = truncate_observation(RESULTS, 40)
+    assert compacted[0]["title"] == "Result 0"
+    assert estimate_tokens(str(compacted[0])) <= 45
+
+
+def test_text_is_cut_with_marker():
+    compacted, saved = truncate_observation("word " * 1000, 50)
+    assert "[truncated, about" in compacted
+    assert saved > 1000
+
+
+@pytest.mark.asyncio
+async def test_prompt_sees_truncated_observation_but_steps_keep_full():
+    llm = RecordingLLM(
+        responses=[
+            "Thought: search\nAction: big_search\nAction Input: q",
+            "Thought: search again\nAction: big_search\nAction Input: q2",
+            "Thought: done\nFinal Answer: ok",
+        ],
+        prompts_seen=[],
+    )
+    agent = create_react_agent(
+        llm=llm, tools=[big_search], prompt=PromptTemplate.from_template(REACT_TEMPLATE)
+    )
+    executor = ChatAgentExecutor(
+        agent=agent,
+        tools=[big_search],
+        max_iterations=5,
+        observation_token_budget=200,
+        return_intermediate_steps=True,
+    )
+
+    stats = ObservationStats()
+    set_observation_stats(stats)
+    try:
+        result = await executor.ainvoke({"input": "q"})
+    finally:
+        clear_observation_stats()
+
+    assert result["intermediate_steps"][0][1] == RESULTS
+    assert "raw page text" not in llm.prompts_seen[1]
+    assert "Result 0" in llm.prompts_seen[1]
+    # Step 1 is re-sent in prompts 2 and 3, step 2 in prompt 3
+    snapshot = stats.snapshot()
+    assert snapshot["truncated_observations"] == 2
+    _, saved_once = truncate_observation(RESULTS, 200)
+    assert snapshot["tokens_saved"] == 3 * saved_once
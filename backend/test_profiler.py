@@ -0,0 +1,137 @@
+"""Tests for the per-request sampling profiler and its profile store."""
+
+import asyncio
+import pstats
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.api.profiles import router as profiles_router
+from backend.config import settings
+from backend.utils import profiler
+from backend.utils.profiler import ProfileStore, RequestProfiler, should_profile
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+def burn(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def handle_turn():
+    burn(0.1)
+    await asyncio.sleep(0.1)
+    return "answer"
+
+
+async def stream_turn():
+    for _ in range(3):
+        burn(0.03)
+        yield "event"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProfileStore(str(tmp_path / "profiles"), keep=2)
+
+
+@pytest.mark.asyncio
+async def test_profile_call_samples_cpu_and_awaits(store):
+    request_profiler = RequestProfiler(store, interval=0.002)
+    meta = request_profiler.new_profile("POST /api/chat", session_id="s1")
+
+    assert await request_profiler.profile_call(handle_turn(), meta) == "answer"
+
+    (listed,) = store.list()
+    assert listed["id"] == meta["id"] and listed["session_id"] == "s1"
+    assert listed["samples"] > 10 and listed["duration_ms"] >= 200
+
+    folded = store.path(meta["id"], "folded").read_text().splitlines()
+    counts = {}
+    for line in folded:
+        stack, count = line.rsplit(" ", 1)
+        assert stack.startswith("POST /api/chat;handle_turn (test_profiler.py:")
+        leaf = stack.split(";")[-1]
+        counts[leaf.split(" (")[0]] = counts.get(leaf.split(" (")[0], 0) + int(count)
+    # Both the busy loop and the time suspended in sleep are attributed
+    assert counts.get("burn", 0) > 5
+    assert counts.get("<await Future>", 0) > 5
+
+    stats = pstats.Stats(str(store.path(meta["id"], "pstats")))
+    functions = {name: row for (_, _, name), row in stats.stats.items()}
+    assert functions["handle_turn"][3] >= functions["burn"][3] > 0
+    assert ("~", 0, "<await Future>") in stats.stats
+
+
+@pytest.mark.asyncio
+async def test_profile_stream_records_time_waiting_for_the_client(store):
+    request_profiler = RequestProfiler(store, interval=0.002)
+    meta = request_profiler.new_profile("POST /api/stream-chat")
+
+    events = []
+    async for event in request_profiler.profile_stream(stream_turn(), meta):
+        events.append(event)
+        await asyncio.sleep(0.03)
+
+    assert events == ["event"] * 3
+    folded = store.path(meta["id"], "folded").read_text()
+    assert "stream_turn (test_profiler.py:" in folded
+    assert ";<yield> " in folded and ";burn (" in folded
+
+
+def test_store_keeps_newest_profiles(store):
+    request_profiler = RequestProfiler(store)
+    sampler = profiler.Sampler(handle_turn())
+    ids = []
+    for _ in range(3):
+        meta = request_profiler.new_profile("POST /api/chat", duration_ms=1)
+        store.save(sampler, meta)
+        ids.append(meta["id"])
+    sampler.target.close()
+
+    assert [meta["id"] for meta in store.list()] == ids[:0:-1]
+    assert store.path(ids[0], "pstats") is None
+    assert store.path(ids[2], "pstats") is not None
+    assert store.path("../profiles", "folded") is None
+    assert store.path(ids[2], "json") is None
+
+
+def test_profiling_is_off_by_default(monkeypatch):
+    assert not should_profile("s1", None)
+    assert not should_profile("s1", "guess")
+    monkeypatch.setattr(settings, "PROFILE_TOKEN", "secret")
+    assert should_profile("s1", "secret") and not should_profile("s1", "guess")
+    monkeypatch.setattr(profiler, "_profiled_sessions", frozenset({"s2"}))
+    assert should_profile("s2", None)
+
+
+def test_profile_endpoints_need_the_token(monkeypatch, store):
+    monkeypatch.setattr(profiler.request_profiler, "store", store)
+    request_profiler = RequestProfiler(store)
+    meta = request_profiler.new_profile("POST /api/chat")
+    sampler = profiler.Sampler(handle_turn())
+    store.save(sampler, meta)
+    sampler.target.close()
+
+    app = FastAPI()
+    app.include_router(profiles_router)
+    client = TestClient(app)
+
+    assert client.get("/api/profiles").status_code == 404
+    monkeypatch.setattr(settings, "PROFILE_TOKEN", "secret")
+    headers = {"X-Profile-Token": "secret"}
+    assert client.get("/api/profiles", headers={"X-Profile-Token": "x"}).status_code == 404
+
+    listed = client.get("/api/profiles", headers=headers).json()
+    assert [item["id"] for item in listed] == [meta["id"]]
+    download = client.get(f"/api/profiles/{meta['id']}/pstats", headers=headers)
+    assert download.status_code == 200
+    assert download.headers["content-type"] == "application/octet-stream"
+    assert client.get("/api/profiles/missing/folded", headers=headers).status_code == 404
+    assert client.get(f"/api/profiles/{meta['id']}/json", headers=headers).status_code == 422
@@ -0,0 +1,108 @@
+"""Tests for the local prompt bundle."""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import langsmith
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.prompts.bundle import (
+    JSON_CHAT_PROMPT,
+    REACT_PROMPT,
+    SHIPPED_BUNDLE_PATH,
+    PromptBundle,
+    PromptBundleError,
+)
+from langchain_core.prompts import PromptTemplate
+
+REACT_VARIABLES = ["agent_scratchpad", "input", "tool_names", "tools"]
+
+
+def test_shipped_bundle_loads():
+    bundle = PromptBundle(SHIPPED_BUNDLE_PATH)
+
+    assert sorted(bundle.get(REACT_PROMPT).input_variables) == REACT_VARIABLES
+    assert sorted(bundle.get(JSON_CHAT_PROMPT).input_variables) == REACT_VARIABLES
+    assert set(bundle.manifest()["prompts"]) == {REACT_PROMPT, JSON_CHAT_PROMPT}
+    with pytest.raises(PromptBundleError):
+        bundle.get("someone/else")
+
+
+def test_import_does_no_network_io():
+    # A fresh interpreter, so nothing is imported or cached yet
+    code = """
+import sys
+calls = []
+sys.addaudithook(
+    lambda event, args: calls.append(args[0])
+    if event == "socket.getaddrinfo" else None
+)
+import backend.main
+from backend.agent.factory import AgentFactory
+from backend.agent.tools import ToolRegistry
+from backend.tools.calculator import calculator
+ToolRegistry.register_tool(calculator)
+AgentFactory.get_executor(streaming=True, enable_tools=True)
+print(calls)
+"""
+    env = {**os.environ, "ZHIPUAI_API_KEY": "test", "TAVILY_API_KEY": "test"}
+    env["LANGCHAIN_TRACING_V2"] = "false"
+    env["NO_PROMPT_STUB"] = "1"
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parent.parent,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    assert proc.stdout.strip().splitlines()[-1] == "[]"
+
+
+class FakeClient:
+    pulled = []
+
+    def __init__(self, api_key=None):
+        pass
+
+    def pull_prompt(self, name):
+        FakeClient.pulled.append(name)
+        if name == JSON_CHAT_PROMPT:
+            raise ConnectionError("offline")
+        return PromptTemplate.from_template(
+            "v2 {tools} {tool_names} {input} {agent_scratchpad}"
+        )
+
+
+def test_refresh_writes_cache_that_takes_precedence(tmp_path, monkeypatch):
+    monkeypatch.setattr(langsmith, "Client", FakeClient)
+    cache = tmp_path / "prompts.json"
+    bundle = PromptBundle(SHIPPED_BUNDLE_PATH, cache_path=cache)
+    shipped_json = bundle.get(JSON_CHAT_PROMPT)
+
+    # The failed pull keeps the bundled revision
+    assert bundle.refresh() == [REACT_PROMPT]
+    assert bundle.get(REACT_PROMPT).template.startswith("v2 ")
+    assert bundle.get(JSON_CHAT_PROMPT) == shipped_json
+
+    reloaded = PromptBundle(SHIPPED_BUNDLE_PATH, cache_path=cache)
+    assert reloaded.get(REACT_PROMPT).template.startswith("v2 ")
+    assert reloaded.source == str(cache)
+
+    # Same revision again: nothing changes
+    assert bundle.refresh() == []
+
+
+def test_broken_cache_falls_back_to_shipped_bundle(tmp_path):
+    cache = tmp_path / "prompts.json"
+    cache.write_text(json.dumps({"format": 99, "prompts": {}}))
+    bundle = PromptBundle(SHIPPED_BUNDLE_PATH, cache_path=cache)
+
+    assert sorted(bundle.get(REACT_PROMPT).input_variables) == REACT_VARIABLES
+    assert bundle.source == str(SHIPPED_BUNDLE_PATH)
@@ -0,0 +1,58 @@
+"""Tests for scratchpad compaction across agent iterations."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.agent.observations import (
+    ObservationStats,
+    clear_observation_stats,
+    set_observation_stats,
+)
+from backend.agent.scratchpad import compact_scratchpad
+from langchain_core.agents import AgentAction
+
+
+def _step(i, observation):
+    log = f"Thought: step {i} reasoning\nmore detail\nAction: search\nAction Input: q{i}"
+    return AgentAction(tool="search", tool_input=f"q{i}", log=log), observation
+
+
+RESULTS = [{"title": f"T{i}", "content": "x" * 2000} for i in range(3)]
+
+
+def test_below_threshold_is_unchanged():
+    steps = [_step(0, "short"), _step(1, "short")]
+    assert compact_scratchpad(steps, 1000) is steps
+    # A lone step is the latest step, so it is never digested
+    single = [_step(0, "x" * 10000)]
+    assert compact_scratchpad(single, 10) == single
+
+
+def test_older_steps_become_digests_and_latest_stays_verbatim():
+    steps = [_step(i, RESULTS) for i in range(3)]
+    compacted = compact_scratchpad(steps, 2000)
+
+    action, observation = compacted[0]
+    assert observation == "[digest] 3 results: T0; T1; T2"
+    assert action.log == "step 0 reasoning\nAction: search\nAction Input: q0\n"
+    assert action.tool_input == "q0"
+    assert compacted[-1] == steps[-1]
+
+
+def test_compaction_stops_once_under_threshold():
+    steps = [_step(0, "a" * 4000), _step(1, "b" * 4000), _step(2, "c" * 4000)]
+    compacted = compact_scratchpad(steps, 2200)
+    assert compacted[0][1].startswith("[digest] aaa")
+    assert compacted[1] == steps[1]
+
+
+def test_savings_are_recorded():
+    stats = ObservationStats()
+    set_observation_stats(stats)
+    try:
+        compact_scratchpad([_step(0, "a" * 4000), _step(1, "b")], 100)
+    finally:
+        clear_observation_stats()
+    assert stats.snapshot()["scratchpad_tokens_saved"] > 900
@@ -0,0 +1,112 @@
+"""Tests for the search result cache wrapper."""
+
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.tools.search_cache import (
+    CachedSearchTool,
+    TTLCache,
+    get_search_cache_stats,
+    normalize_query,
+    set_search_cache_bypass,
+)
+from langchain_core.tools import tool
+
+calls = []
+
+
+@tool
+def fake_search(query: str) -> list:
+    """Pretend to search the web."""
+    calls.append(query)
+    return [{"url": "https://example.com", "content": query}]
+
+
+@pytest.fixture
+def cached_search():
+    calls.clear()
+    yield CachedSearchTool.wrap(fake_search, max_entries=2, ttl_seconds=60)
+    set_search_cache_bypass(False)
+
+
+def test_normalize_query():
+    assert normalize_query("  What's the  Weather?? ") == "what's the weather"
+    assert normalize_query("北京　天气？") == "北京 天气"
+    assert normalize_query("“ＦＡＳＴＡＰＩ 教程”。") == "fastapi 教程"
+
+
+@pytest.mark.parametrize(
+    "query, other",
+    [
+        ("C#", "C"),
+        ("C++", "C"),
+        ("3.14", "3 14"),
+        ("what's new", "what s new"),
+        ("node.js", "node js"),
+    ],
+)
+def test_punctuation_inside_queries_keeps_them_apart(query, other):
+    assert normalize_query(query) != normalize_query(other)
+
+
+def test_ttl_cache_expiry_and_lru():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1, 10)
+    cache.set("b", 2, 10)
+    cache.get("a")
+    cache.set("c", 3, 10)
+    assert cache.get("b") is None
+    assert cache.get("a") == (1, 10)
+
+    cache.set("old", 4, 10, expires_at=time.time() - 1)
+    assert cache.get("old") is None
+
+
+def test_wrapper_keeps_tool_identity(cached_search):
+    assert cached_search.name == "fake_search"
+    assert cached_search.description == fake_search.description
+
+
+def test_normalized_queries_hit_cache(cached_search):
+    first = cached_search.invoke("Weather in Paris?")
+    second = cached_search.invoke("weather   in paris")
+    assert first == second
+    assert calls == ["Weather in Paris?"]
+
+    stats = get_search_cache_stats([cached_search])["fake_search"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_async_path_and_bypass(cached_search):
+    await cached_search.ainvoke("news")
+    await cached_search.ainvoke("news")
+    assert calls == ["news"]
+
+    set_search_cache_bypass(True)
+    await cached_search.ainvoke("news")
+    assert calls == ["news", "news"]
+    assert cached_search.stats()["bypassed"] == 1
+
+
+def test_persistence_survives_new_wrapper(tmp_path):
+    calls.clear()
+    db_path = str(tmp_path / "cache.db")
+    first = CachedSearchTool.wrap(
+        fake_search, max_entries=8, ttl_seconds=60, persist_path=db_path
+    )
+    first.invoke("persisted query")
+
+    second = CachedSearchTool.wrap(
+        fake_search, max_entries=8, ttl_seconds=60, persist_path=db_path
+    )
+    result = second.invoke("Persisted query!")
+    assert result == [{"url": "https://example.com", "content": "persisted query"}]
+    assert calls == ["persisted query"]
@@ -0,0 +1,172 @@
+"""Tests for the per-turn token ledger and usage rollups."""
+
+import asyncio
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.agent.executor import ChatAgentExecutor
+from backend.agent.token_usage import TokenLedger, extract_token_usage
+from backend.db.base import Base
+from backend.db.models import Session
+from backend.db.repositories import TokenUsageRepository
+from langchain_classic.agents import create_react_agent
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.prompts import PromptTemplate
+from langchain_core.tools import tool
+
+REACT_TEMPLATE = """Tools: {tools} [{tool_names}]
+Question: {input}
+Thought:{agent_scratchpad}"""
+
+
+class UsageReportingLLM(FakeListLLM):
+    """Fake LLM reporting 100 prompt and 10 completion tokens per call."""
+
+    async def _agenerate(self, prompts, stop=None, run_manager=None, **kwargs):
+        # Interleave with the other turns running concurrently
+        await asyncio.sleep(0.01)
+        result = await super()._agenerate(prompts, stop, run_manager, **kwargs)
+        result.llm_output = {
+            "token_usage": {"prompt_tokens": 100, "completion_tokens": 10}
+        }
+        return result
+
+
+@tool
+async def lookup(query: str) -> str:
+    """Look something up."""
+    return f"result for {query}"
+
+
+def _call(query):
+    return f"Thought: check\nAction: lookup\nAction Input: {query}"
+
+
+FINAL = "Thought: done\nFinal Answer: ok"
+
+
+async def _turn(tool_calls):
+    llm = UsageReportingLLM(responses=[_call(i) for i in range(tool_calls)] + [FINAL])
+    agent = create_react_agent(
+        llm=llm, tools=[lookup], prompt=PromptTemplate.from_template(REACT_TEMPLATE)
+    )
+    executor = ChatAgentExecutor(
+        agent=agent, tools=[lookup], max_iterations=6, return_intermediate_steps=True
+    )
+    ledger = TokenLedger()
+    await executor.ainvoke({"input": "q"}, {"callbacks": [ledger]})
+    return ledger
+
+
+@pytest.mark.asyncio
+async def test_every_iteration_is_counted():
+    ledger = await _turn(tool_calls=2)
+
+    assert ledger.totals() == {
+        "prompt_tokens": 300,
+        "completion_tokens": 30,
+        "total_tokens": 330,
+    }
+    snapshot = ledger.snapshot()
+    assert snapshot["calls"] == 3 and snapshot["unreported_calls"] == 0
+    assert [call["iteration"] for call in snapshot["iterations"]] == [1, 2, 3]
+    assert all(call["duration_ms"] >= 0 for call in snapshot["iterations"])
+
+
+@pytest.mark.asyncio
+async def test_concurrent_turns_keep_their_own_usage():
+    ledgers = await asyncio.gather(*(_turn(tool_calls=n) for n in (0, 3, 1)))
+
+    assert [ledger.totals()["total_tokens"] for ledger in ledgers] == [110, 440, 220]
+
+
+def test_usage_without_report():
+    ledger = TokenLedger()
+    assert ledger.totals() is None
+    assert ledger.snapshot()["total_tokens"] is None
+
+
+def test_usage_from_streamed_message_metadata():
+    message = AIMessage(
+        content="hi",
+        usage_metadata={"input_tokens": 7, "output_tokens": 3, "total_tokens": 10},
+    )
+    response = LLMResult(generations=[[ChatGeneration(message=message)]])
+    assert extract_token_usage(response) == {
+        "prompt_tokens": 7,
+        "completion_tokens": 3,
+        "total_tokens": 10,
+    }
+
+
+@pytest.mark.asyncio
+async def test_rollups_aggregate_by_session_user_and_day():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    def usage(total):
+        return {
+            "prompt_tokens": total - 10,
+            "completion_tokens": 10,
+            "total_tokens": total,
+        }
+
+    async with session_maker() as db:
+        db.add_all(
+            [
+                Session(id="s1", user_id="alice"),
+                Session(id="s2", user_id="alice"),
+                Session(id="s3", user_id="bob"),
+            ]
+        )
+        await db.flush()
+
+        day1, day2 = date(2024, 5, 1), date(2024, 5, 2)
+        await TokenUsageRepository.record(db, "s1", usage(100), 2, day=day1)
+        await TokenUsageRepository.record(db, "s1", usage(50), 1, day=day1)
+        await TokenUsageRepository.record(db, "s2", usage(30), 1, day=day2)
+        await TokenUsageRepository.record(db, "s3", usage(500), 4, day=day2)
+        # No usage reported by the model: the turn is still counted
+        await TokenUsageRepository.record(db, "s3", None, 1, day=day2)
+
+        by_session = await TokenUsageRepository.aggregate(db, group_by="session")
+        assert [(g["session_id"], g["total_tokens"]) for g in by_session] == [
+            ("s3", 500),
+            ("s1", 150),
+            ("s2", 30),
+        ]
+        s1 = by_session[1]
+        assert s1["user_id"] == "alice"
+        assert (s1["llm_calls"], s1["messages"], s1["prompt_tokens"]) == (3, 2, 130)
+
+        by_user = await TokenUsageRepository.aggregate(db, group_by="user")
+        assert {g["user_id"]: g["total_tokens"] for g in by_user} == {
+            "alice": 180,
+            "bob": 500,
+        }
+
+        by_day = await TokenUsageRepository.aggregate(
+            db, group_by="day", user_id="alice"
+        )
+        assert [(g["day"], g["total_tokens"]) for g in by_day] == [
+            (day1, 150),
+            (day2, 30),
+        ]
+
+        recent = await TokenUsageRepository.aggregate(db, group_by="user", since=day2)
+        assert {g["user_id"]: g["messages"] for g in recent} == {"alice": 1, "bob": 2}
+
+        with pytest.raises(ValueError):
+            await TokenUsageRepository.aggregate(db, group_by="model")
+
+    await engine.dispose()
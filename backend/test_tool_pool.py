@@ -0,0 +1,199 @@
+"""Tests for the off-loop tool execution pool."""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.agent.tool_pool import (
+    EXECUTION_INLINE,
+    EXECUTION_PROCESS,
+    EXECUTION_THREAD,
+    PooledTool,
+    ToolExecutionPool,
+    ToolTimeoutError,
+    ToolWorkerError,
+    _ProcessWorker,
+    get_execution_class,
+    wrap_for_execution,
+)
+from backend.tools.calculator import calculator
+from langchain_core.tools import tool
+
+
+@tool
+def blocking_lookup(query: str) -> str:
+    """Sync I/O-bound tool."""
+    time.sleep(0.2)
+    return f"{query} from {threading.current_thread().name}"
+
+
+@tool
+def worker_pid(query: str) -> str:
+    """Report the process the tool ran in."""
+    if query == "hang":
+        time.sleep(60)
+    if query == "allocate":
+        bytearray(512 * 1024 * 1024)
+    if query == "slow":
+        time.sleep(0.5)
+        return "result-for-slow"
+    return str(os.getpid())
+
+
+worker_pid.metadata = {"execution": "process", "timeout": 5, "memory_limit_mb": 256}
+
+
+@tool
+async def native_async(query: str) -> str:
+    """Tool with its own coroutine."""
+    return query
+
+
+@pytest.fixture
+def pool():
+    pool = ToolExecutionPool(
+        thread_workers=4,
+        process_workers=1,
+        default_timeout=5,
+        default_memory_limit_mb=512,
+    )
+    yield pool
+    pool.shutdown()
+
+
+def test_execution_classes():
+    assert get_execution_class(native_async) == EXECUTION_INLINE
+    assert get_execution_class(blocking_lookup) == EXECUTION_THREAD
+    assert get_execution_class(worker_pid) == EXECUTION_PROCESS
+    # The calculator evaluates scalar math in its own coroutine
+    assert get_execution_class(calculator) == EXECUTION_INLINE
+    assert wrap_for_execution(native_async) is native_async
+    assert wrap_for_execution(calculator) is calculator
+
+    wrapped = wrap_for_execution(blocking_lookup)
+    assert isinstance(wrapped, PooledTool)
+    assert wrapped.name == blocking_lookup.name
+    assert wrapped.args == blocking_lookup.args
+
+
+@pytest.mark.asyncio
+async def test_thread_tools_do_not_block_loop(pool):
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(pool.run(blocking_lookup, {"query": str(i)}) for i in range(4))
+    )
+    assert time.perf_counter() - started < 0.6
+    assert all("tool" in result for result in results)
+
+    stats = pool.stats()["blocking_lookup"]
+    assert stats["completed"] == 4
+    assert stats["queued"] == 0 and stats["running"] == 0
+    assert stats["avg_run_ms"] >= 200
+
+
+@pytest.mark.asyncio
+async def test_process_tool_runs_out_of_process(pool):
+    result = await pool.run(
+        calculator, {"expression": "2 + 3"}, execution=EXECUTION_PROCESS
+    )
+    assert result == "5"
+    assert await pool.run(worker_pid, {"query": "x"}) != str(os.getpid())
+
+
+@pytest.mark.asyncio
+async def test_hung_worker_is_replaced(pool):
+    pid = await pool.run(worker_pid, {"query": "x"})
+    worker_pid.metadata["timeout"] = 0.5
+    try:
+        with pytest.raises(ToolTimeoutError):
+            await pool.run(worker_pid, {"query": "hang"})
+    finally:
+        worker_pid.metadata["timeout"] = 5
+
+    assert await pool.run(worker_pid, {"query": "x"}) != pid
+    assert pool.stats()["worker_pid"]["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_workers_are_replaced_off_the_loop(pool, monkeypatch):
+    kill_threads = []
+    kill = _ProcessWorker.kill
+
+    def slow_kill(worker):
+        kill_threads.append(threading.current_thread())
+        time.sleep(0.5)  # a worker slow to exit
+        kill(worker)
+
+    monkeypatch.setattr(_ProcessWorker, "kill", slow_kill)
+    await pool.run(worker_pid, {"query": "x"})
+    worker_pid.metadata["timeout"] = 0.2
+    try:
+        started = time.perf_counter()
+        with pytest.raises(ToolTimeoutError):
+            await pool.run(worker_pid, {"query": "hang"})
+        assert time.perf_counter() - started < 0.5
+    finally:
+        worker_pid.metadata["timeout"] = 5
+
+    assert (await pool.run(worker_pid, {"query": "x"})).isdigit()
+    assert kill_threads and threading.main_thread() not in kill_threads
+
+
+@pytest.mark.asyncio
+async def test_cancelled_call_does_not_leak_into_the_next(pool):
+    pid = await pool.run(worker_pid, {"query": "x"})
+    slow = asyncio.create_task(pool.run(worker_pid, {"query": "slow"}))
+    await asyncio.sleep(0.2)
+    slow.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await slow
+
+    # The busy worker was replaced rather than handed to the next caller
+    assert await pool.run(worker_pid, {"query": "x"}) not in (pid, "result-for-slow")
+    await asyncio.sleep(0.5)
+    assert (await pool.run(worker_pid, {"query": "x"})).isdigit()
+
+
+@pytest.mark.asyncio
+async def test_thread_queue_depth_counts_waiting_calls():
+    pool = ToolExecutionPool(
+        thread_workers=1,
+        process_workers=0,
+        default_timeout=5,
+        default_memory_limit_mb=512,
+    )
+    try:
+        calls = [
+            asyncio.create_task(pool.run(blocking_lookup, {"query": str(i)}))
+            for i in range(3)
+        ]
+        await asyncio.sleep(0.1)
+        stats = pool.stats()["blocking_lookup"]
+        assert (stats["queued"], stats["running"]) == (2, 1)
+        await asyncio.gather(*calls)
+        stats = pool.stats()["blocking_lookup"]
+        assert (stats["queued"], stats["running"]) == (0, 0)
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_memory_limit_is_enforced(pool):
+    with pytest.raises(ToolWorkerError, match="memory limit"):
+        await pool.run(worker_pid, {"query": "allocate"})
+    # The worker survives and serves the next call
+    assert await pool.run(worker_pid, {"query": "x"})
+
+
+@pytest.mark.asyncio
+async def test_pooled_tool_accepts_string_input():
+    wrapped = wrap_for_execution(blocking_lookup)
+    assert (await wrapped.ainvoke("weather")).startswith("weather from tool")
+    assert wrapped.invoke({"query": "news"}).startswith("news from")
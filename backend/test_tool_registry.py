@@ -0,0 +1,121 @@
+"""Tests for lazy tool declaration and deferred imports."""
+
+import os
+import subprocess
+import sys
+import threading
+from importlib.metadata import EntryPoint
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.agent.tools import BUILTIN_TOOLS, ToolRegistry
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(ToolRegistry, "_tools", [])
+    monkeypatch.setattr(ToolRegistry, "_declared", {})
+    return ToolRegistry
+
+
+def test_declared_tools_load_on_first_use(registry):
+    registry.declare_tool("calculator", "backend.tools.calculator:calculator")
+    assert registry._tools == []
+
+    tools = registry.get_tools()
+    assert [tool.name for tool in tools] == ["calculator"]
+    # Loaded once
+    assert registry.get_tools() == tools
+
+
+def test_broken_declaration_is_skipped(registry):
+    registry.declare_tool("missing", "backend.tools.nope:tool")
+    registry.declare_tool("calculator", "backend.tools.calculator:calculator")
+
+    assert [tool.name for tool in registry.get_tools()] == ["calculator"]
+
+
+def test_callers_wait_while_the_last_tool_imports(registry, monkeypatch):
+    importing = threading.Event()
+    release = threading.Event()
+    load = EntryPoint.load
+
+    def slow_load(self):
+        importing.set()
+        release.wait(5)
+        return load(self)
+
+    monkeypatch.setattr(EntryPoint, "load", slow_load)
+    registry.declare_tool("calculator", "backend.tools.calculator:calculator")
+    results = []
+    loader = threading.Thread(target=lambda: results.append(registry.get_tools()))
+    loader.start()
+    assert importing.wait(5)
+
+    waiter = threading.Thread(target=lambda: results.append(registry.get_tools()))
+    waiter.start()
+    waiter.join(0.2)
+    # Not handed a list without the tool still importing
+    assert waiter.is_alive()
+    release.set()
+    loader.join(5)
+    waiter.join(5)
+    assert [[tool.name for tool in tools] for tools in results] == [
+        ["calculator"],
+        ["calculator"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_async_callers_load_tools_off_the_loop(registry):
+    registry.declare_tool("calculator", "backend.tools.calculator:calculator")
+    loop_thread = threading.get_ident()
+    threads = []
+    register = registry.register_tool.__func__
+
+    def recording_register(cls, tool):
+        threads.append(threading.get_ident())
+        return register(cls, tool)
+
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(ToolRegistry, "register_tool", classmethod(recording_register))
+        tools = await registry.aget_tools()
+
+    assert [tool.name for tool in tools] == ["calculator"]
+    assert threads and loop_thread not in threads
+
+
+def test_discover_excludes_disabled_tools(registry):
+    names = registry.discover_tools(exclude={"local_search"})
+
+    assert names == [name for name in BUILTIN_TOOLS if name != "local_search"]
+    assert "local_search" not in registry._declared
+
+
+def test_import_defers_agent_stack():
+    code = """
+import sys
+import backend.main
+heavy = [
+    "langchain_classic.agents",
+    "langchain_community.chat_models.zhipuai",
+    "backend.agent.factory",
+    "backend.tools.tavily_search",
+    "numpy",
+]
+print([name for name in heavy if name in sys.modules])
+"""
+    env = {**os.environ, "ZHIPUAI_API_KEY": "test", "TAVILY_API_KEY": "test"}
+    proc = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).parent.parent,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    assert proc.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,130 @@
+"""Tests for relevance-based tool selection."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.agent.executor import ChatAgentExecutor
+from backend.agent.tool_selection import (
+    ToolSelector,
+    bind_tool_selection,
+    clear_tool_selection,
+    set_tool_selection,
+)
+from langchain_classic.agents import create_react_agent
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.prompts import PromptTemplate
+from langchain_core.tools import tool
+
+REACT_TEMPLATE = """Tools: {tools} [{tool_names}]
+Question: {input}
+Thought:{agent_scratchpad}"""
+
+
+@tool
+def calculator(expression: str) -> str:
+    """Evaluate a mathematical expression such as 2 + 3 * 4."""
+    return "14"
+
+
+@tool
+def weather(city: str) -> str:
+    """Get the current weather forecast and temperature for a city."""
+    return "sunny"
+
+
+@tool
+def translate(text: str) -> str:
+    """Translate text between languages, e.g. English to French."""
+    return "bonjour"
+
+
+@tool
+def stock_price(ticker: str) -> str:
+    """Look up the latest stock price of a listed company by ticker."""
+    return "42"
+
+
+TOOLS = [calculator, weather, translate, stock_price]
+
+
+class RecordingLLM(FakeListLLM):
+    """FakeListLLM that keeps every prompt it receives."""
+
+    prompts_seen: list = []
+
+    async def _acall(self, prompt, stop=None, run_manager=None, **kwargs):
+        self.prompts_seen.append(prompt)
+        return await super()._acall(
+            prompt, stop=stop, run_manager=run_manager, **kwargs
+        )
+
+
+def _executor(llm):
+    agent = create_react_agent(
+        llm=llm, tools=TOOLS, prompt=PromptTemplate.from_template(REACT_TEMPLATE)
+    )
+    return ChatAgentExecutor(
+        agent=bind_tool_selection(agent, TOOLS),
+        tools=TOOLS,
+        handle_parsing_errors=True,
+        max_iterations=4,
+    )
+
+
+def test_rank_prefers_matching_tools():
+    selector = ToolSelector()
+    ranked = selector.rank("what is the weather in Paris", TOOLS)
+    assert TOOLS[ranked[0][1]] is weather
+
+    ranked = selector.rank("stock price of ACME", TOOLS)
+    assert TOOLS[ranked[0][1]] is stock_price
+
+
+def test_select_keeps_registry_order_and_fills_up():
+    selector = ToolSelector()
+    selection = selector.select("translate this to French", TOOLS, 2)
+    # translate matches; the free slot goes to the first tool in the registry
+    assert [t.name for t in selection.tools] == ["calculator", "translate"]
+    assert selection.available == 4
+    assert selection.tokens_saved_per_prompt > 0
+
+
+def test_small_registry_or_disabled_selects_everything():
+    selector = ToolSelector()
+    assert selector.select("weather", TOOLS, 0).tools == TOOLS
+    assert selector.select("weather", TOOLS, 10).tools == TOOLS
+    assert selector.select("weather", TOOLS, 0).tokens_saved_per_prompt == 0
+
+
+@pytest.mark.asyncio
+async def test_prompt_renders_only_selected_tools():
+    llm = RecordingLLM(
+        responses=["Thought: done\nFinal Answer: sunny"], prompts_seen=[]
+    )
+    executor = _executor(llm)
+    selection = ToolSelector().select("weather forecast in Paris", TOOLS, 1)
+    set_tool_selection(selection)
+    try:
+        result = await executor.ainvoke({"input": "weather forecast in Paris"})
+    finally:
+        clear_tool_selection()
+
+    assert result["output"] == "sunny"
+    prompt = llm.prompts_seen[0]
+    assert "weather(city: str)" in prompt and "[weather]" in prompt
+    assert "calculator" not in prompt and "stock_price" not in prompt
+    snapshot = selection.snapshot()
+    assert snapshot["selected"] == ["weather"]
+    assert snapshot["tokens_saved"] == selection.tokens_saved_per_prompt > 0
+
+
+@pytest.mark.asyncio
+async def test_without_selection_all_tools_are_rendered():
+    llm = RecordingLLM(responses=["Thought: done\nFinal Answer: ok"], prompts_seen=[])
+    await _executor(llm).ainvoke({"input": "anything"})
+    prompt = llm.prompts_seen[0]
+    assert all(t.name in prompt for t in TOOLS)
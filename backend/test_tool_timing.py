@@ -0,0 +1,213 @@
+"""Tests for callback-based tool timing and latency percentiles."""
+
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend import chat_service
+from backend.agent.executor import ChatAgentExecutor
+from backend.agent.tool_timing import (
+    STATUS_COMPLETED,
+    STATUS_FAILED,
+    ToolRun,
+    ToolTimingHandler,
+)
+from backend.db.base import Base
+from backend.db.models import Message, Session, ToolStep
+from backend.db.repositories import ToolStepRepository
+from langchain_classic.agents import create_react_agent
+from langchain_core.agents import AgentAction
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.prompts import PromptTemplate
+from langchain_core.tools import tool
+
+REACT_TEMPLATE = """Tools: {tools} [{tool_names}]
+Question: {input}
+Thought:{agent_scratchpad}"""
+
+
+@tool
+async def slow_lookup(query: str) -> str:
+    """Look something up slowly."""
+    await asyncio.sleep(0.1)
+    return f"result for {query}"
+
+
+@tool
+async def flaky(query: str) -> str:
+    """Fails the way pooled tools report failures."""
+    return "Tool error: flaky timed out after 1s"
+
+
+@tool
+async def wrapper(query: str) -> str:
+    """Calls another tool, like multi_search does."""
+    return await slow_lookup.ainvoke(query)
+
+
+TOOLS = [slow_lookup, flaky, wrapper]
+
+
+def _call(tool_name, query):
+    return f"Thought: check\nAction: {tool_name}\nAction Input: {query}"
+
+
+async def _run(responses):
+    llm = FakeListLLM(responses=responses)
+    agent = create_react_agent(
+        llm=llm, tools=TOOLS, prompt=PromptTemplate.from_template(REACT_TEMPLATE)
+    )
+    executor = ChatAgentExecutor(
+        agent=agent,
+        tools=TOOLS,
+        max_iterations=6,
+        loop_max_repeats=3,
+        return_intermediate_steps=True,
+    )
+    timing = ToolTimingHandler()
+    result = await executor.ainvoke({"input": "q"}, {"callbacks": [timing]})
+    return result, timing
+
+
+FINAL = "Thought: done\nFinal Answer: ok"
+
+
+@pytest.mark.asyncio
+async def test_runs_are_timed_and_matched_to_actions():
+    result, timing = await _run(
+        [_call("slow_lookup", "a"), _call("flaky", "b"), _call("slow_lookup", "a"), FINAL]
+    )
+    steps = result["intermediate_steps"]
+
+    lookup = timing.run_for(steps[0][0])
+    assert lookup.tool_name == "slow_lookup"
+    assert lookup.status == STATUS_COMPLETED
+    assert lookup.duration_ms >= 100
+    assert lookup.completed_at >= lookup.started_at
+
+    failed = timing.run_for(steps[1][0])
+    assert failed.status == STATUS_FAILED
+    assert failed.error == "flaky timed out after 1s"
+
+    # Answered from the turn memo, so no tool ran
+    assert timing.run_for(steps[2][0]) is None
+    assert len(timing.runs) == 2 and not timing.unfinished()
+
+
+@pytest.mark.asyncio
+async def test_nested_tool_runs_are_not_recorded():
+    result, timing = await _run([_call("wrapper", "x"), FINAL])
+
+    assert len(timing.runs) == 1
+    run = timing.run_for(result["intermediate_steps"][0][0])
+    assert run.tool_name == "wrapper" and run.duration_ms >= 100
+
+
+@pytest.mark.asyncio
+async def test_latency_percentiles():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with session_maker() as db:
+        db.add(Session(id="s1"))
+        message = Message(session_id="s1", role="assistant", content="")
+        db.add(message)
+        await db.flush()
+
+        old = datetime.utcnow() - timedelta(days=2)
+        for i, duration in enumerate([10, 20, 30, 40, 1000], 1):
+            step = await ToolStepRepository.create(
+                db, message.id, i, "search", {"input": str(i)}
+            )
+            if duration == 1000:
+                await ToolStepRepository.fail(db, step.id, "boom", duration)
+            else:
+                await ToolStepRepository.complete(db, step.id, "ok", duration)
+        step = await ToolStepRepository.create(db, message.id, 6, "calculator", {})
+        await ToolStepRepository.complete(db, step.id, "5", 3, started_at=old)
+        # Still running: no duration yet, not counted
+        await ToolStepRepository.create(db, message.id, 7, "search", {})
+
+        stats = await ToolStepRepository.latency_percentiles(db)
+        assert stats["search"] == {
+            "count": 5,
+            "failed": 1,
+            "p50_ms": 30,
+            "p95_ms": 1000,
+            "p99_ms": 1000,
+            "max_ms": 1000,
+        }
+        assert stats["calculator"]["p50_ms"] == 3
+
+        recent = await ToolStepRepository.latency_percentiles(
+            db, since=datetime.utcnow() - timedelta(hours=1)
+        )
+        assert "calculator" not in recent
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_failed_turn_fails_pending_tool_steps(monkeypatch):
+    async def failing_stream(*args, **kwargs):
+        yield {"actions": [AgentAction("search", "q", "")]}
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(chat_service, "chat_async_stream", failing_stream)
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with session_maker() as db:
+        db.add(Session(id="s1"))
+        await db.flush()
+        events = [
+            event
+            async for event in chat_service.chat_stream_generator("s1", "hi", db)
+        ]
+
+        assert '"type": "error"' in events[-1]
+        (step,) = (await db.execute(select(ToolStep))).scalars()
+        assert step.status == STATUS_FAILED
+        assert "model unavailable" in step.tool_error
+
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_tool_cut_off_at_the_deadline_is_stored_as_failed():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with session_maker() as db:
+        db.add(Session(id="s1"))
+        db.add(Message(id=1, session_id="s1", role="assistant"))
+        await db.flush()
+        step = await ToolStepRepository.create(
+            db, message_id=1, step_number=1, tool_name="search", tool_input={}
+        )
+        # The executor gave up waiting, so the tool run never ended
+        run = ToolRun(uuid4(), "search", None)
+        await chat_service._finish_tool_step(
+            db, step.id, "Tool error: search did not finish in time", run
+        )
+
+        assert run.status == STATUS_FAILED
+        await db.refresh(step)
+        assert step.status == STATUS_FAILED
+        assert step.tool_error == "search did not finish in time"
+
+    await engine.dispose()
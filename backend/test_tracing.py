@@ -0,0 +1,244 @@
+"""Tests for request tracing and the OTLP/JSON span exporters."""
+
+import json
+import sys
+import threading
+import uuid
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.agent.callback_handler import (
+    TracingCallbackHandler,
+    clear_session_id_for_logging,
+    get_tracing_callbacks,
+    set_session_id_for_logging,
+)
+from backend.db.base import Base
+from backend.db.repositories import MessageRepository, SessionRepository
+from backend.utils.trace_collector import TraceCollector, iter_spans
+from backend.utils.tracing import (
+    FileSpanExporter,
+    OtlpHttpSpanExporter,
+    Tracer,
+    TracingMiddleware,
+    parse_traceparent,
+    tracer,
+)
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.outputs import Generation, LLMResult
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+
+class _Collect:
+    def __init__(self):
+        self.payloads = []
+
+    def export(self, payload):
+        self.payloads.append(payload)
+
+    @property
+    def spans(self):
+        return [span for payload in self.payloads for span in iter_spans(payload)]
+
+
+@pytest.fixture
+def exported():
+    collect = _Collect()
+    tracer.start(collect, flush_interval=0.05)
+    yield collect
+    tracer.stop()
+
+
+def _attributes(span):
+    return {
+        item["key"]: next(iter(item["value"].values())) for item in span["attributes"]
+    }
+
+
+def test_spans_nest_and_carry_request_context(exported):
+    with tracer.span("request") as root:
+        set_session_id_for_logging("s1")
+        try:
+            with tracer.span("child"):
+                pass
+            with pytest.raises(RuntimeError):
+                with tracer.span("failing"):
+                    raise RuntimeError("boom")
+        finally:
+            clear_session_id_for_logging()
+    tracer.stop()
+
+    spans = {span["name"]: span for span in exported.spans}
+    assert set(spans) == {"request", "child", "failing"}
+    trace_id = f"{root.trace_id:032x}"
+    assert all(span["traceId"] == trace_id for span in spans.values())
+    assert "parentSpanId" not in spans["request"]
+    assert spans["child"]["parentSpanId"] == spans["request"]["spanId"]
+    assert _attributes(spans["child"])["session.id"] == "s1"
+    assert _attributes(spans["request"])["session.id"] == "s1"
+    assert spans["failing"]["status"] == {"code": 2, "message": "boom"}
+    assert int(spans["child"]["endTimeUnixNano"]) >= int(
+        spans["child"]["startTimeUnixNano"]
+    )
+
+
+def test_sampling_decides_whole_traces():
+    collect = _Collect()
+    sampled = Tracer()
+    sampled.start(collect, sample_rate=0.25, flush_interval=0.05)
+    for _ in range(400):
+        with sampled.span("request"):
+            with sampled.span("child"):
+                pass
+    sampled.stop()
+
+    names = [span["name"] for span in collect.spans]
+    assert names.count("request") == names.count("child")
+    assert 50 < names.count("request") < 150
+
+    unsampled = Tracer()
+    unsampled.start(collect, sample_rate=0)
+    with unsampled.span("request") as span:
+        assert span is None
+        assert unsampled.start_span("child") is None
+    unsampled.stop()
+
+
+def test_traceparent_continues_the_callers_trace(exported):
+    header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+    assert parse_traceparent("garbage") is None
+    with tracer.span("request", remote_parent=parse_traceparent(header)):
+        pass
+    with tracer.span(
+        "request", remote_parent=parse_traceparent(header[:-2] + "00")
+    ) as span:
+        assert span is None
+    tracer.stop()
+
+    (span,) = exported.spans
+    assert span["traceId"] == "4bf92f3577b34da6a3ce929d0e0e4736"
+    assert span["parentSpanId"] == "00f067aa0ba902b7"
+
+
+def test_llm_and_tool_calls_become_spans(exported):
+    assert get_tracing_callbacks() == []
+    response = LLMResult(
+        generations=[[Generation(text="answer")]],
+        llm_output={"token_usage": {"prompt_tokens": 12, "completion_tokens": 3}},
+    )
+    tool_run, llm_run = uuid.uuid4(), uuid.uuid4()
+    with tracer.span("request"):
+        (handler,) = get_tracing_callbacks()
+        assert isinstance(handler, TracingCallbackHandler)
+        handler.on_tool_start({"name": "search"}, "q", run_id=tool_run)
+        # A model called from inside the tool nests under the tool's span
+        handler.on_llm_start(
+            {},
+            ["prompt"],
+            run_id=llm_run,
+            parent_run_id=tool_run,
+            invocation_params={"model": "glm-4"},
+        )
+        handler.on_llm_new_token("a", run_id=llm_run)
+        handler.on_llm_end(response, run_id=llm_run)
+        handler.on_tool_error(RuntimeError("timeout"), run_id=tool_run)
+    tracer.stop()
+
+    spans = {span["name"]: span for span in exported.spans}
+    llm, tool = spans["chat glm-4"], spans["execute_tool search"]
+    assert llm["parentSpanId"] == tool["spanId"]
+    assert tool["parentSpanId"] == spans["request"]["spanId"]
+    assert _attributes(llm)["gen_ai.usage.input_tokens"] == "12"
+    assert "llm.time_to_first_token_ms" in _attributes(llm)
+    assert tool["status"]["code"] == 2
+
+
+@pytest.mark.asyncio
+async def test_repository_calls_are_spans(exported):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async with session_factory() as db:
+        with tracer.span("request"):
+            session = await SessionRepository.create(db, "traced")
+            await MessageRepository.create(
+                db, session_id=session.id, role="user", content="hi"
+            )
+    await engine.dispose()
+    tracer.stop()
+
+    spans = {span["name"]: span for span in exported.spans}
+    create = spans["MessageRepository.create"]
+    assert create["kind"] == 3
+    assert create["parentSpanId"] == spans["request"]["spanId"]
+    assert _attributes(create)["db.system"] == "sqlite"
+
+
+def test_middleware_traces_api_requests(exported):
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.get("/api/ping")
+    async def ping():
+        with tracer.span("work"):
+            return {"ok": True}
+
+    @app.get("/health")
+    async def health():
+        return {"ok": True}
+
+    with TestClient(app) as client:
+        response = client.get("/api/ping", headers={"X-Request-ID": "req-1"})
+        assert response.headers["x-request-id"] == "req-1"
+        assert client.get("/api/ping").headers["x-request-id"]
+        client.get("/health")
+    tracer.stop()
+
+    roots = [span for span in exported.spans if span["name"] == "GET /api/ping"]
+    assert len(roots) == 2
+    first = _attributes(roots[0])
+    assert first["request.id"] == "req-1"
+    assert first["http.response.status_code"] == "200"
+    work = [span for span in exported.spans if span["name"] == "work"]
+    assert _attributes(work[0])["request.id"] == "req-1"
+    assert not any(span["name"].endswith("/health") for span in exported.spans)
+
+
+def test_exporters_write_otlp_json(tmp_path):
+    collector = TraceCollector(("127.0.0.1", 0), str(tmp_path / "received.jsonl"), True)
+    thread = threading.Thread(target=collector.serve_forever, daemon=True)
+    thread.start()
+    endpoint = f"http://127.0.0.1:{collector.server_address[1]}/v1/traces"
+    try:
+        for exporter in (
+            FileSpanExporter(tmp_path / "traces.jsonl"),
+            OtlpHttpSpanExporter(endpoint),
+        ):
+            local = Tracer()
+            local.start(exporter, service_name="test-service")
+            with local.span("request", attributes={"attempt": 1, "ok": True}):
+                pass
+            local.stop()
+            assert local.stats()["exported"] == 1
+    finally:
+        collector.shutdown()
+        collector.server_close()
+
+    written = json.loads((tmp_path / "traces.jsonl").read_text())
+    received = json.loads((tmp_path / "received.jsonl").read_text())
+    for payload in (written, received):
+        resource = payload["resourceSpans"][0]["resource"]
+        assert resource["attributes"] == [
+            {"key": "service.name", "value": {"stringValue": "test-service"}}
+        ]
+        (span,) = iter_spans(payload)
+        assert span["attributes"] == [
+            {"key": "attempt", "value": {"intValue": "1"}},
+            {"key": "ok", "value": {"boolValue": True}},
+        ]
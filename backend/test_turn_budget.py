@@ -0,0 +1,189 @@
+"""Tests for the turn-level time budget in the agent loop."""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.agent.budget import (
+    TurnBudget,
+    clear_turn_budget,
+    get_turn_budget,
+    set_turn_budget,
+)
+from backend.agent.executor import BUDGET_FALLBACK, BUDGET_NOTICE, ChatAgentExecutor
+from backend.agent.tool_pool import TOOL_ERROR_PREFIX
+from backend.chat_service import _create_turn_budget
+from backend.config import settings
+from langchain_classic.agents import create_react_agent
+from langchain_core.language_models.fake import FakeListLLM
+from langchain_core.prompts import PromptTemplate
+from langchain_core.tools import tool
+
+REACT_TEMPLATE = """Tools: {tools} [{tool_names}]
+Question: {input}
+Thought:{agent_scratchpad}"""
+
+
+@tool
+def echo(text: str) -> str:
+    """Echo the input back."""
+    return f"echo: {text}"
+
+
+@tool
+async def slow_echo(text: str) -> str:
+    """Echo the input back, slowly."""
+    await asyncio.sleep(5)
+    return f"echo: {text}"
+
+
+class RecordingLLM(FakeListLLM):
+    """FakeListLLM that keeps every prompt it receives."""
+
+    prompts_seen: list = []
+
+    def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+        self.prompts_seen.append(prompt)
+        return super()._call(prompt, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _acall(self, prompt, stop=None, run_manager=None, **kwargs):
+        self.prompts_seen.append(prompt)
+        return await super()._acall(
+            prompt, stop=stop, run_manager=run_manager, **kwargs
+        )
+
+
+class SlowLLM(RecordingLLM):
+    """RecordingLLM that takes longer than any test budget to answer."""
+
+    async def _acall(self, prompt, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(5)
+        return await super()._acall(
+            prompt, stop=stop, run_manager=run_manager, **kwargs
+        )
+
+
+def _build_executor(responses, tools=(echo,), llm_class=RecordingLLM):
+    tools = list(tools)
+    llm = llm_class(responses=responses, prompts_seen=[])
+    agent = create_react_agent(
+        llm=llm, tools=tools, prompt=PromptTemplate.from_template(REACT_TEMPLATE)
+    )
+    executor = ChatAgentExecutor(
+        agent=agent,
+        tools=tools,
+        handle_parsing_errors=True,
+        max_iterations=5,
+        return_intermediate_steps=True,
+    )
+    return executor, llm
+
+
+TOOL_CALL = "Thought: look it up\nAction: echo\nAction Input: hi"
+FINAL = "Thought: done\nFinal Answer: the answer"
+
+
+class TestTurnBudget:
+    def test_snapshot_fields(self):
+        budget = TurnBudget(timeout_seconds=10, reserve_seconds=2)
+        snapshot = budget.snapshot()
+        assert snapshot["budget_ms"] == 10000
+        assert 0 < snapshot["remaining_ms"] <= 10000
+        assert snapshot["finalized"] is False
+        assert snapshot["expired"] is False
+
+    def test_reserve_capped_at_half(self):
+        budget = TurnBudget(timeout_seconds=4, reserve_seconds=30)
+        assert budget.reserve_seconds == 2
+        assert not budget.should_finalize()
+
+    def test_requested_timeout_is_capped_by_the_server(self):
+        limit = settings.TURN_TIMEOUT_SECONDS
+        assert _create_turn_budget(None).timeout_seconds == limit
+        assert _create_turn_budget(limit / 2).timeout_seconds == limit / 2
+        assert _create_turn_budget(limit * 100).timeout_seconds == limit
+
+    def test_context_isolation(self):
+        budget = TurnBudget(timeout_seconds=10)
+        set_turn_budget(budget)
+        assert get_turn_budget() is budget
+        clear_turn_budget()
+        assert get_turn_budget() is None
+
+
+class TestBudgetedExecutor:
+    @pytest.mark.asyncio
+    async def test_runs_normally_without_budget(self):
+        executor, _ = _build_executor([TOOL_CALL, FINAL])
+        result = await executor.ainvoke({"input": "q"})
+        assert result["output"] == "the answer"
+        assert len(result["intermediate_steps"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_finalizes_when_budget_is_low(self):
+        executor, llm = _build_executor([TOOL_CALL, FINAL])
+        budget = TurnBudget(timeout_seconds=10, reserve_seconds=5)
+        budget.deadline = budget.started_at + 1  # leave less than the reserve
+        set_turn_budget(budget)
+        try:
+            result = await executor.ainvoke({"input": "q"})
+        finally:
+            clear_turn_budget()
+
+        assert result["output"] == "the answer"
+        assert budget.finalized
+        assert BUDGET_NOTICE in llm.prompts_seen[-1]
+
+    @pytest.mark.asyncio
+    async def test_does_not_run_tool_after_finalize(self):
+        executor, _ = _build_executor([TOOL_CALL, TOOL_CALL, FINAL])
+        budget = TurnBudget(timeout_seconds=10, reserve_seconds=5)
+        budget.deadline = budget.started_at + 1
+        set_turn_budget(budget)
+        try:
+            result = await executor.ainvoke({"input": "q"})
+        finally:
+            clear_turn_budget()
+
+        assert len(result["intermediate_steps"]) == 1
+        # The raw tool result is not passed off as the answer
+        assert result["output"] == BUDGET_FALLBACK
+
+    @pytest.mark.asyncio
+    async def test_slow_tool_is_cut_off_before_the_reserve(self):
+        executor, llm = _build_executor(
+            [TOOL_CALL.replace("echo", "slow_echo"), FINAL], tools=[slow_echo]
+        )
+        budget = TurnBudget(timeout_seconds=1, reserve_seconds=0.5)
+        set_turn_budget(budget)
+        started = time.monotonic()
+        try:
+            result = await executor.ainvoke({"input": "q"})
+        finally:
+            clear_turn_budget()
+
+        assert time.monotonic() - started < 1
+        [(_, observation)] = result["intermediate_steps"]
+        assert observation.startswith(TOOL_ERROR_PREFIX)
+        assert result["output"] == "the answer"
+        assert BUDGET_NOTICE in llm.prompts_seen[-1]
+
+    @pytest.mark.asyncio
+    async def test_slow_planning_call_is_cut_off_at_the_deadline(self):
+        executor, _ = _build_executor([FINAL], llm_class=SlowLLM)
+        budget = TurnBudget(timeout_seconds=0.5)
+        set_turn_budget(budget)
+        started = time.monotonic()
+        try:
+            result = await executor.ainvoke({"input": "q"})
+        finally:
+            clear_turn_budget()
+
+        assert time.monotonic() - started < 1
+        assert result["output"] == BUDGET_FALLBACK
+        assert budget.finalized
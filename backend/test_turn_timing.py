@@ -0,0 +1,112 @@
+"""Tests for the per-turn server time breakdown."""
+
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backend.agent.token_usage import TokenLedger
+from backend.db.base import Base
+from backend.db.models import Session
+from backend.db.repositories import MessageRepository
+from backend.utils import turn_timing
+from backend.utils.turn_timing import TurnTiming, server_timing
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+
+@pytest_asyncio.fixture
+async def session_maker():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_repository_calls_are_split_by_phase(session_maker):
+    timing = TurnTiming(received=time.perf_counter() - 0.05)
+    turn_timing.set_turn_timing(timing)
+    try:
+        async with session_maker() as db:
+            db.add(Session(id="s1"))
+            await db.flush()
+            await MessageRepository.create(db, "s1", "user", "hi")
+            await MessageRepository.get_by_session_id(db, "s1")
+            await MessageRepository.list_slow_turns(db, 0)
+    finally:
+        turn_timing.clear_turn_timing()
+
+    assert timing.seconds["queue"] >= 0.05
+    for phase in ("db_write", "history", "db_read"):
+        assert timing.seconds[phase] > 0
+    # Outside a turn nothing is recorded
+    turn_timing.record("serialization", 1.0)
+    assert timing.seconds["serialization"] == 0
+
+
+def test_snapshot_and_server_timing_header():
+    timing = TurnTiming()
+    timing.add("tool_queue", 0.0125)
+    with timing.measure("serialization"):
+        time.sleep(0.01)
+    llm_calls = [
+        {"model": "glm-4", "duration_ms": 800, "ttft_ms": 120.5},
+        {"model": None, "duration_ms": None, "ttft_ms": None},
+    ]
+    tool_runs = [SimpleNamespace(tool_name="search", duration_ms=300, status="ok")]
+
+    snapshot = timing.snapshot(llm_calls, tool_runs)
+    assert snapshot["tool_queue_ms"] == 12.5
+    assert snapshot["serialization_ms"] >= 10
+    assert snapshot["total_ms"] >= snapshot["serialization_ms"]
+    assert (snapshot["llm_ms"], snapshot["tool_ms"]) == (800, 300)
+    assert snapshot["llm_calls"][0] == llm_calls[0]
+    assert snapshot["tool_calls"] == [
+        {"tool": "search", "duration_ms": 300, "status": "ok"}
+    ]
+
+    entries = server_timing(snapshot).split(", ")
+    assert entries[0].startswith("total;dur=")
+    assert "tool-queue;dur=12.5" in entries
+    assert 'llm;dur=800;desc="2 calls"' in entries
+    assert 'llm-1;dur=800;desc="glm-4 ttft=120.5ms"' in entries
+    assert 'llm-2;dur=0;desc="unknown"' in entries
+    assert 'tool-1;dur=300;desc="search ok"' in entries
+
+
+@pytest.mark.asyncio
+async def test_ledger_records_time_to_first_token():
+    llm = GenericFakeChatModel(messages=iter([AIMessage(content="one two three")]))
+    ledger = TokenLedger()
+
+    async for _ in llm.astream("hi", config={"callbacks": [ledger]}):
+        pass
+
+    (call,) = ledger.calls
+    assert call["ttft_ms"] is not None
+    assert 0 <= call["ttft_ms"] <= call["duration_ms"]
+
+
+@pytest.mark.asyncio
+async def test_slow_turns_are_listed_slowest_first(session_maker):
+    async with session_maker() as db:
+        db.add(Session(id="s1"))
+        await db.flush()
+        ids = []
+        for total in (500, 3000, 1500):
+            message = await MessageRepository.create(db, "s1", "assistant", "a")
+            await MessageRepository.set_timing(db, message.id, {"total_ms": total})
+            ids.append(message.id)
+        await MessageRepository.create(db, "s1", "assistant", "no timing")
+
+        slow = await MessageRepository.list_slow_turns(db, 1000)
+        assert [message.id for message in slow] == [ids[1], ids[2]]
+        assert slow[0].timing == {"total_ms": 3000}
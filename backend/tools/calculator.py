@@ -1,16 +1,92 @@
+from typing import List
+
+from backend.tools.expression_engine import ExpressionError, engine, format_result
 from langchain_core.tools import tool
 
+# Scalar expressions up to this total length are evaluated on the event loop
+INLINE_MAX_CHARS = 2000
+
 
 @tool
 def calculator(expression: str) -> str:
-    """执行数学表达式计算。输入一个数学表达式字符串，返回计算结果。"""
+    """执行数学表达式计算。输入一个数学表达式字符串，返回计算结果。支持 sqrt、log、sin 等数学函数和 [1, 2, 3] 形式的数组；多个表达式可用换行或分号分隔，一次计算。"""
+    return _calculate(_split_expressions(expression))
+
+
+async def _acalculator(expression: str) -> str:
+    """Evaluate cheap math inline; send array work to a worker process."""
+    expressions = _split_expressions(expression)
+    if _is_cheap(expressions):
+        return _calculate(expressions)
+
+    # Imported here so worker processes, which only run the sync path, do
+    # not import the agent package
+    from backend.agent.tool_pool import (
+        EXECUTION_PROCESS,
+        TOOL_ERROR_PREFIX,
+        ToolTimeoutError,
+        ToolWorkerError,
+        tool_pool,
+    )
+
+    try:
+        return await tool_pool.run(
+            calculator, {"expression": expression}, execution=EXECUTION_PROCESS
+        )
+    except (ToolTimeoutError, ToolWorkerError) as exc:
+        return f"{TOOL_ERROR_PREFIX}{exc}"
+
+
+def _split_expressions(expression: str) -> List[str]:
+    # GitHub Issue #12645: "MRKL agent is passing 'Observation' text to tools when using non-OpenAI LLMs"
+    # Fix: Non-OpenAI LLMs (ZhipuAI) may include "Observation" in tool input
+    parts = expression.split("\n")
+    if len(parts) > 1 and "Observation:".startswith(parts[-1]):
+        expression = "\n".join(parts[:-1])
+
+    return [
+        part.strip()
+        for line in expression.split("\n")
+        for part in line.split(";")
+        if part.strip()
+    ]
+
+
+def _is_cheap(expressions: List[str]) -> bool:
+    """Whether evaluating ``expressions`` is bounded to scalar arithmetic.
+
+    Integer size, factorials, rounding digits and node counts are already
+    capped by the engine, so only array expressions can take noticeable CPU time.
+    """
+    if sum(len(source) for source in expressions) > INLINE_MAX_CHARS:
+        return False
+    for source in expressions:
+        try:
+            if not engine.compile(source).scalar:
+                return False
+        except ExpressionError:
+            # Rejected expressions fail again, just as fast, when evaluated
+            continue
+    return True
+
+
+def _calculate(expressions: List[str]) -> str:
+    if len(expressions) > 1:
+        lines = []
+        for source, result in zip(expressions, engine.evaluate_batch(expressions)):
+            if isinstance(result, ExpressionError):
+                lines.append(f"{source} = 计算错误: {result}")
+            else:
+                lines.append(f"{source} = {format_result(result)}")
+        return "\n".join(lines)
+
     try:
-        # GitHub Issue #12645: "MRKL agent is passing 'Observation' text to tools when using non-OpenAI LLMs"
-        # Fix: Non-OpenAI LLMs (ZhipuAI) may include "Observation" in tool input
-        parts = expression.split("\n")
-        if len(parts) > 1 and "Observation:".startswith(parts[-1]):
-            expression = "\n".join(parts[:-1])
-        result = eval(expression)
-        return str(result)
-    except Exception as e:
+        return format_result(engine.evaluate(expressions[0] if expressions else ""))
+    except ExpressionError as e:
         return f"计算错误: {str(e)}"
+
+
+# Scalar math runs inline in the coroutine; array expressions are CPU-bound
+# and untrusted, so they run in a worker process and cannot stall the loop.
+calculator.coroutine = _acalculator
+calculator.metadata = {"timeout": 10}
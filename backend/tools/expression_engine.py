@@ -0,0 +1,564 @@
+"""Safe expression engine for the calculator tool.
+
+Expressions are parsed with ``ast`` and only a whitelist of nodes is accepted:
+numeric constants, arithmetic operators, a fixed set of math functions and
+list literals (evaluated as NumPy arrays). Every accepted expression is
+compiled once into a tree of closures and cached, so repeated expressions
+skip parsing and validation.
+
+Limits keep a single expression from stalling the process:
+
+- expression length and AST node count (the step limit, since there are no
+  loops every node is evaluated at most once)
+- integer operand size: ``9**9**9`` is rejected before it is computed
+- ``round`` digits, since ``round(1, -n)`` computes ``10**n``
+- array element count, checked before NumPy allocates a result, and
+  arrays of at most two dimensions
+
+``evaluate_batch`` evaluates many expressions in one call. Expressions that
+share the same shape and only differ in their constants (``1/3``, ``2/7``,
+...) are evaluated together as NumPy vectors when the result is a float.
+"""
+
+import ast
+import copy
+import math
+import operator
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy ships with the backend deps
+    np = None
+
+MAX_EXPRESSION_LENGTH = 1000
+MAX_NODES = 200
+MAX_INT_BITS = 4096
+MAX_ARRAY_ELEMENTS = 100_000
+MAX_ARRAY_DIMENSIONS = 2
+MAX_FACTORIAL = 1000
+# round(x, -n) computes 10**n; float64 has no digits beyond this
+MAX_ROUND_DIGITS = 308
+VECTORIZE_MIN_GROUP = 8
+
+# Integers beyond this cannot be represented exactly as float64
+_FLOAT_EXACT_INT = 2**53
+
+
+class ExpressionError(ValueError):
+    """Raised when an expression is rejected or fails to evaluate."""
+
+
+Evaluator = Callable[[], Any]
+
+
+def _is_array(value: Any) -> bool:
+    return np is not None and isinstance(value, np.ndarray)
+
+
+def _check_int(value: Any) -> Any:
+    if isinstance(value, int) and value.bit_length() > MAX_INT_BITS:
+        raise ExpressionError(f"result exceeds {MAX_INT_BITS} bits")
+    if _is_array(value) and value.size > MAX_ARRAY_ELEMENTS:
+        raise ExpressionError(f"array exceeds {MAX_ARRAY_ELEMENTS} elements")
+    return value
+
+
+def _check_size(shape: Tuple[int, ...]) -> None:
+    if math.prod(shape) > MAX_ARRAY_ELEMENTS:
+        raise ExpressionError(f"array exceeds {MAX_ARRAY_ELEMENTS} elements")
+
+
+def _checked_bin_op(op: Callable[[Any, Any], Any]) -> Callable[[Any, Any], Any]:
+    """``op`` that rejects array operands broadcasting to too many elements."""
+
+    def apply(left: Any, right: Any) -> Any:
+        if _is_array(left) or _is_array(right):
+            try:
+                shape = np.broadcast_shapes(np.shape(left), np.shape(right))
+            except ValueError as exc:
+                raise ExpressionError(str(exc)) from exc
+            _check_size(shape)
+        return op(left, right)
+
+    return apply
+
+
+def _dot_shape(left: Any, right: Any) -> Tuple[int, ...]:
+    left_shape, right_shape = np.shape(left), np.shape(right)
+    if not left_shape or not right_shape:
+        return np.broadcast_shapes(left_shape, right_shape)
+    if len(right_shape) == 1:
+        return left_shape[:-1]
+    return left_shape[:-1] + right_shape[:-2] + right_shape[-1:]
+
+
+def _safe_dot(*args: Any) -> Any:
+    if len(args) == 2:
+        _check_size(_dot_shape(*args))
+    return _array_function("dot", pack_scalars=False)(*args)
+
+
+def _safe_pow(base: Any, exponent: Any) -> Any:
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0:
+        if base.bit_length() * exponent > MAX_INT_BITS + exponent:
+            raise ExpressionError(f"result exceeds {MAX_INT_BITS} bits")
+    return operator.pow(base, exponent)
+
+
+def _safe_mul(left: Any, right: Any) -> Any:
+    if isinstance(left, int) and isinstance(right, int):
+        if left.bit_length() + right.bit_length() > MAX_INT_BITS + 1:
+            raise ExpressionError(f"result exceeds {MAX_INT_BITS} bits")
+    return operator.mul(left, right)
+
+
+def _safe_lshift(left: Any, right: Any) -> Any:
+    if isinstance(left, int) and isinstance(right, int):
+        if right > MAX_INT_BITS:
+            raise ExpressionError(f"result exceeds {MAX_INT_BITS} bits")
+    return operator.lshift(left, right)
+
+
+def _safe_factorial(value: Any) -> int:
+    if not isinstance(value, int) or value > MAX_FACTORIAL:
+        raise ExpressionError(f"factorial needs an integer <= {MAX_FACTORIAL}")
+    return math.factorial(value)
+
+
+def _numeric_function(math_func: Callable, numpy_name: str) -> Callable:
+    """Use ``math`` for scalars and the NumPy ufunc for arrays."""
+
+    def apply(*args: Any) -> Any:
+        if any(_is_array(arg) for arg in args):
+            return getattr(np, numpy_name)(*args)
+        return math_func(*args)
+
+    return apply
+
+
+def _array_function(
+    numpy_name: str,
+    builtin: Optional[Callable] = None,
+    pack_scalars: bool = True,
+) -> Callable:
+    """Use ``builtin`` for scalars and NumPy for arrays.
+
+    Without a builtin, scalar arguments are packed into one array, so
+    ``mean(1, 2, 3)`` behaves like ``mean([1, 2, 3])``.
+    """
+
+    def apply(*args: Any) -> Any:
+        has_array = any(_is_array(arg) for arg in args)
+        if builtin is not None and not has_array:
+            return builtin(*args)
+        if np is None:
+            raise ExpressionError(f"{numpy_name} needs numpy")
+        if pack_scalars and not has_array:
+            args = (np.array(args, dtype=float),)
+        result = getattr(np, numpy_name)(*args)
+        return result.item() if isinstance(result, np.generic) else result
+
+    return apply
+
+
+def _sized_array_function(numpy_name: str, size_of: Callable[..., float]) -> Callable:
+    def apply(*args: Any) -> Any:
+        if np is None:
+            raise ExpressionError(f"{numpy_name} needs numpy")
+        if any(_is_array(arg) for arg in args):
+            raise ExpressionError(f"{numpy_name} needs scalar arguments")
+        if size_of(*args) > MAX_ARRAY_ELEMENTS:
+            raise ExpressionError(f"array exceeds {MAX_ARRAY_ELEMENTS} elements")
+        return getattr(np, numpy_name)(*args).astype(float)
+
+    return apply
+
+
+def _arange_size(*args: Any) -> float:
+    start, stop, step = (0, args[0], 1) if len(args) == 1 else (*args, 1)[:3]
+    return (stop - start) / step if step else math.inf
+
+
+_BIN_OPS: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: _safe_mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+    ast.Pow: _safe_pow,
+    ast.LShift: _safe_lshift,
+    ast.RShift: operator.rshift,
+    ast.BitAnd: operator.and_,
+    ast.BitOr: operator.or_,
+    ast.BitXor: operator.xor,
+}
+
+_UNARY_OPS: Dict[type, Callable[[Any], Any]] = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+    ast.Invert: operator.invert,
+}
+
+_round = _array_function("round", round)
+
+
+def _safe_round(value: Any, ndigits: Any = None) -> Any:
+    if ndigits is None:
+        return _round(value)
+    if not isinstance(ndigits, int) or abs(ndigits) > MAX_ROUND_DIGITS:
+        raise ExpressionError(f"round needs integer digits <= {MAX_ROUND_DIGITS}")
+    return _round(value, ndigits)
+
+
+_FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "sqrt": _numeric_function(math.sqrt, "sqrt"),
+    "exp": _numeric_function(math.exp, "exp"),
+    "log": _numeric_function(math.log, "log"),
+    "log2": _numeric_function(math.log2, "log2"),
+    "log10": _numeric_function(math.log10, "log10"),
+    "sin": _numeric_function(math.sin, "sin"),
+    "cos": _numeric_function(math.cos, "cos"),
+    "tan": _numeric_function(math.tan, "tan"),
+    "asin": _numeric_function(math.asin, "arcsin"),
+    "acos": _numeric_function(math.acos, "arccos"),
+    "atan": _numeric_function(math.atan, "arctan"),
+    "floor": _numeric_function(math.floor, "floor"),
+    "ceil": _numeric_function(math.ceil, "ceil"),
+    "fabs": _numeric_function(math.fabs, "fabs"),
+    "abs": _numeric_function(abs, "abs"),
+    "round": _safe_round,
+    "factorial": _safe_factorial,
+    "sum": _array_function("sum", lambda *xs: sum(xs)),
+    "min": _array_function("min", min),
+    "max": _array_function("max", max),
+    "mean": _array_function("mean"),
+    "std": _array_function("std"),
+    "dot": _safe_dot,
+    "linspace": _sized_array_function("linspace", lambda start, stop, num=50: num),
+    "arange": _sized_array_function("arange", _arange_size),
+}
+
+_CONSTANTS: Dict[str, float] = {
+    "pi": math.pi,
+    "e": math.e,
+    "tau": math.tau,
+    "inf": math.inf,
+}
+
+# Functions that build arrays from scalar arguments
+_ARRAY_CONSTRUCTORS = {"linspace", "arange"}
+
+# ``math.sqrt(2)`` and ``np.sqrt(x)`` are accepted as plain ``sqrt``
+_MODULE_PREFIXES = {"math", "np", "numpy"}
+
+# Node shapes that give bit-identical results in float64 vector form
+_VECTOR_BIN_OPS = (ast.Add, ast.Sub, ast.Mult, ast.Div)
+_VECTOR_UNARY_OPS = (ast.UAdd, ast.USub)
+_VECTOR_FUNCTIONS = {"sqrt": np.sqrt, "fabs": np.fabs, "abs": np.abs} if np else {}
+
+
+class CompiledExpression:
+    """A validated expression ready for repeated evaluation."""
+
+    def __init__(
+        self,
+        source: str,
+        tree: ast.AST,
+        evaluator: Evaluator,
+        constants: Tuple[Any, ...],
+        scalar: bool = True,
+    ) -> None:
+        self.source = source
+        self.tree = tree
+        self.constants = constants
+        # Without list literals or array constructors evaluation stays on
+        # bounded scalars and takes microseconds
+        self.scalar = scalar
+        self.vectorizable = _vector_kind(tree) == "float"
+        self.template = (
+            ast.dump(_ConstantTemplate().visit(copy.deepcopy(tree)))
+            if self.vectorizable
+            else ""
+        )
+        self._evaluator = evaluator
+
+    def evaluate(self) -> Any:
+        """Evaluate the expression, raising ExpressionError on failure."""
+        try:
+            return _check_int(self._evaluator())
+        except ExpressionError:
+            raise
+        except (ArithmeticError, ValueError, TypeError) as exc:
+            raise ExpressionError(str(exc)) from exc
+
+
+class _Compiler:
+    """Turns a parsed expression into closures, enforcing the whitelist."""
+
+    def __init__(self) -> None:
+        self.nodes = 0
+        self.constants: List[Any] = []
+        self.arrays = False
+
+    def compile(self, node: ast.AST) -> Evaluator:
+        self.nodes += 1
+        if self.nodes > MAX_NODES:
+            raise ExpressionError(f"expression has more than {MAX_NODES} nodes")
+
+        if isinstance(node, ast.Constant):
+            return self._constant(node.value)
+        if isinstance(node, ast.BinOp):
+            return self._bin_op(node)
+        if isinstance(node, ast.UnaryOp):
+            return self._unary_op(node)
+        if isinstance(node, ast.Name):
+            return self._name(node.id)
+        if isinstance(node, ast.Call):
+            return self._call(node)
+        if isinstance(node, (ast.List, ast.Tuple)):
+            return self._array(node)
+        raise ExpressionError(f"unsupported syntax: {type(node).__name__}")
+
+    def _constant(self, value: Any) -> Evaluator:
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ExpressionError(f"unsupported constant: {value!r}")
+        _check_int(value)
+        self.constants.append(value)
+        return lambda: value
+
+    def _bin_op(self, node: ast.BinOp) -> Evaluator:
+        op = _BIN_OPS.get(type(node.op))
+        if op is None:
+            raise ExpressionError(f"unsupported operator: {type(node.op).__name__}")
+        op = _checked_bin_op(op) if np is not None else op
+        left = self.compile(node.left)
+        right = self.compile(node.right)
+        return lambda: _check_int(op(left(), right()))
+
+    def _unary_op(self, node: ast.UnaryOp) -> Evaluator:
+        op = _UNARY_OPS.get(type(node.op))
+        if op is None:
+            raise ExpressionError(f"unsupported operator: {type(node.op).__name__}")
+        operand = self.compile(node.operand)
+        return lambda: op(operand())
+
+    def _name(self, name: str) -> Evaluator:
+        if name not in _CONSTANTS:
+            raise ExpressionError(f"unknown name: {name}")
+        value = _CONSTANTS[name]
+        return lambda: value
+
+    def _call(self, node: ast.Call) -> Evaluator:
+        name = _function_name(node.func)
+        func = _FUNCTIONS.get(name) if name else None
+        if func is None:
+            raise ExpressionError(f"unknown function: {ast.unparse(node.func)}")
+        if node.keywords:
+            raise ExpressionError("keyword arguments are not supported")
+        if name in _ARRAY_CONSTRUCTORS:
+            self.arrays = True
+        args = [self.compile(arg) for arg in node.args]
+        return lambda: func(*(arg() for arg in args))
+
+    def _array(self, node: ast.AST) -> Evaluator:
+        if np is None:
+            raise ExpressionError("array expressions need numpy")
+        self.arrays = True
+        elements = [self.compile(element) for element in node.elts]
+
+        def build() -> Any:
+            values = [element() for element in elements]
+            # Checked before np.array copies the elements together
+            if any(np.ndim(value) >= MAX_ARRAY_DIMENSIONS for value in values):
+                raise ExpressionError(
+                    f"arrays have at most {MAX_ARRAY_DIMENSIONS} dimensions"
+                )
+            if sum(np.size(value) for value in values) > MAX_ARRAY_ELEMENTS:
+                raise ExpressionError(f"array exceeds {MAX_ARRAY_ELEMENTS} elements")
+            return np.array(values, dtype=float)
+
+        return build
+
+
+def _function_name(func: ast.AST) -> Optional[str]:
+    if isinstance(func, ast.Name):
+        return func.id
+    if (
+        isinstance(func, ast.Attribute)
+        and isinstance(func.value, ast.Name)
+        and func.value.id in _MODULE_PREFIXES
+    ):
+        return func.attr
+    return None
+
+
+class _ConstantTemplate(ast.NodeTransformer):
+    """Replace numeric constants with placeholders to group similar shapes."""
+
+    def visit_Constant(self, node: ast.Constant) -> ast.AST:
+        return ast.copy_location(ast.Name(id="_", ctx=ast.Load()), node)
+
+
+def _vector_kind(node: ast.AST) -> Optional[str]:
+    """Classify a subtree for float64 vector evaluation.
+
+    Returns ``"float"`` or ``"int"`` when NumPy float64 arithmetic gives
+    exactly the same result as Python for this subtree, or None when it may
+    not. Python only does exact integer arithmetic when both operands of an
+    operator are integers, so any such operator (other than ``/``) rules the
+    subtree out.
+    """
+    if isinstance(node, ast.Constant):
+        if isinstance(node.value, float):
+            return "float"
+        if abs(node.value) < _FLOAT_EXACT_INT:
+            return "int"
+        return None
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, _VECTOR_UNARY_OPS):
+        return _vector_kind(node.operand)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, _VECTOR_BIN_OPS):
+        left, right = _vector_kind(node.left), _vector_kind(node.right)
+        if left is None or right is None:
+            return None
+        if isinstance(node.op, ast.Div):
+            return "float"
+        return None if left == right == "int" else "float"
+    if isinstance(node, ast.Call) and len(node.args) == 1 and not node.keywords:
+        name = _function_name(node.func)
+        kind = _vector_kind(node.args[0])
+        if name not in _VECTOR_FUNCTIONS or kind is None:
+            return None
+        return kind if name == "abs" else "float"
+    return None
+
+
+def _vector_evaluator(tree: ast.AST, columns: List[Any]) -> Evaluator:
+    """Compile a vectorizable tree so constants are read from ``columns``."""
+    position = iter(range(len(columns)))
+
+    def build(node: ast.AST) -> Evaluator:
+        if isinstance(node, ast.Constant):
+            column = columns[next(position)]
+            return lambda: column
+        if isinstance(node, ast.BinOp):
+            op = _BIN_OPS[type(node.op)]
+            left, right = build(node.left), build(node.right)
+            return lambda: op(left(), right())
+        if isinstance(node, ast.UnaryOp):
+            op = _UNARY_OPS[type(node.op)]
+            operand = build(node.operand)
+            return lambda: op(operand())
+        func = _VECTOR_FUNCTIONS[_function_name(node.func)]
+        arg = build(node.args[0])
+        return lambda: func(arg())
+
+    return build(tree)
+
+
+class ExpressionEngine:
+    """Whitelisted expression evaluator with a compiled-expression cache.
+
+    Example:
+        engine = ExpressionEngine()
+        engine.evaluate("sqrt(16) + 2**10")       # 1028.0
+        engine.evaluate("[1, 2, 3] * 2")          # array([2., 4., 6.])
+        engine.evaluate_batch(["1/3", "2/3"])     # [0.333..., 0.666...]
+    """
+
+    def __init__(self, cache_size: int = 1024) -> None:
+        self.compile = lru_cache(maxsize=cache_size)(self._compile)
+
+    def _compile(self, source: str) -> CompiledExpression:
+        """Parse and validate ``source``. Results are cached by source text."""
+        if len(source) > MAX_EXPRESSION_LENGTH:
+            raise ExpressionError(
+                f"expression longer than {MAX_EXPRESSION_LENGTH} characters"
+            )
+        try:
+            tree = ast.parse(source.strip(), mode="eval")
+        except SyntaxError as exc:
+            raise ExpressionError(f"invalid syntax: {exc.msg}") from exc
+
+        compiler = _Compiler()
+        evaluator = compiler.compile(tree.body)
+        return CompiledExpression(
+            source=source,
+            tree=tree.body,
+            evaluator=evaluator,
+            constants=tuple(compiler.constants),
+            scalar=not compiler.arrays,
+        )
+
+    def evaluate(self, source: str) -> Any:
+        """Compile (or fetch from cache) and evaluate one expression."""
+        return self.compile(source).evaluate()
+
+    def evaluate_batch(self, sources: Sequence[str]) -> List[Any]:
+        """Evaluate many expressions in one call.
+
+        Returns:
+            One entry per expression: the result, or the ExpressionError
+            instance describing why that expression failed.
+        """
+        results: List[Any] = [None] * len(sources)
+        groups: Dict[str, List[Tuple[int, CompiledExpression]]] = defaultdict(list)
+
+        for index, source in enumerate(sources):
+            try:
+                compiled = self.compile(source)
+            except ExpressionError as exc:
+                results[index] = exc
+                continue
+            if compiled.vectorizable:
+                groups[compiled.template].append((index, compiled))
+            else:
+                results[index] = self._evaluate_one(compiled)
+
+        for members in groups.values():
+            if len(members) < VECTORIZE_MIN_GROUP:
+                for index, compiled in members:
+                    results[index] = self._evaluate_one(compiled)
+                continue
+            self._evaluate_vectorized(members, results)
+
+        return results
+
+    def _evaluate_one(self, compiled: CompiledExpression) -> Any:
+        try:
+            return compiled.evaluate()
+        except ExpressionError as exc:
+            return exc
+
+    def _evaluate_vectorized(
+        self,
+        members: List[Tuple[int, CompiledExpression]],
+        results: List[Any],
+    ) -> None:
+        columns = [
+            np.array(column, dtype=float)
+            for column in zip(*(compiled.constants for _, compiled in members))
+        ]
+        evaluator = _vector_evaluator(members[0][1].tree, columns)
+        with np.errstate(all="ignore"):
+            values = np.broadcast_to(evaluator(), (len(members),))
+        for (index, compiled), value in zip(members, values):
+            # Division by zero and domain errors become inf/nan in NumPy;
+            # re-run those scalars so they raise the same error as usual.
+            if math.isfinite(value):
+                results[index] = float(value)
+            else:
+                results[index] = self._evaluate_one(compiled)
+
+
+def format_result(value: Any) -> str:
+    """Format an evaluation result for the agent."""
+    if _is_array(value):
+        return np.array2string(value, separator=", ", threshold=50)
+    return str(value)
+
+
+engine = ExpressionEngine()
@@ -0,0 +1,116 @@
+"""Deterministic stand-in for Tavily search, for load tests without network.
+
+Selected with ``SEARCH_PROVIDER=fake``. It has the Tavily tool's name,
+description and input, and returns results in the same shape, so the search
+cache, ``multi_search`` and observation truncation treat it like the real
+thing. Results are generated from the query, so a query always gets the
+same results; latency and failures follow the ``FAKE_SEARCH_*`` settings.
+"""
+
+import asyncio
+import random
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from backend.config import settings
+from backend.utils.cassettes import record_search
+from backend.utils.simulation import Latency, injected_fault
+from langchain_community.tools.tavily_search import TavilySearchResults
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForToolRun,
+    CallbackManagerForToolRun,
+)
+from pydantic import ConfigDict, Field, PrivateAttr
+
+_WORDS = (
+    "agent model latency search result update release report analysis data "
+    "market policy research team product service network cache index query "
+    "source answer summary context benchmark throughput request response"
+).split()
+
+
+def fake_results(query: str, max_results: int, content_words: int = 60) -> Dict:
+    """The raw Tavily response for ``query``, the same on every call."""
+    rng = random.Random(zlib.crc32(query.encode("utf-8")))
+    slug = "-".join(query.lower().split())[:40] or "query"
+    results = []
+    for rank in range(max_results):
+        content = " ".join(rng.choice(_WORDS) for _ in range(content_words))
+        results.append(
+            {
+                "title": f"{query} - result {rank + 1}",
+                "url": f"https://example.com/{slug}/{rank + 1}",
+                "content": f"{query}: {content}.",
+                "score": round(0.95 - rank * 0.1 - rng.random() * 0.05, 4),
+                "raw_content": None,
+            }
+        )
+    return {"query": query, "results": results, "response_time": 0.0}
+
+
+class FakeTavilySearchResults(TavilySearchResults):
+    """Tavily search answering from ``fake_results`` after a simulated delay."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    latency: Latency = Field(default_factory=lambda: Latency("fixed", 0))
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    seed: int = 0
+
+    _rng: random.Random = PrivateAttr()
+
+    def model_post_init(self, context: Any) -> None:
+        super().model_post_init(context)
+        self._rng = random.Random(self.seed)
+
+    @classmethod
+    def from_settings(cls, **kwargs: Any) -> "FakeTavilySearchResults":
+        """A fake configured by the ``FAKE_SEARCH_*`` settings."""
+        return cls(
+            latency=Latency.parse(settings.FAKE_SEARCH_LATENCY),
+            error_rate=settings.FAKE_SEARCH_ERROR_RATE,
+            throttle_rate=settings.FAKE_SEARCH_THROTTLE_RATE,
+            seed=settings.FAKE_SEED,
+            **kwargs,
+        )
+
+    def _respond(self, query: str) -> Tuple[float, Union[List[Dict], str], Dict]:
+        delay = self.latency.sample(self._rng)
+        fault = injected_fault(
+            self._rng,
+            f"{settings.TAVILY_API_URL}/search",
+            self.error_rate,
+            self.throttle_rate,
+        )
+        if fault is not None:
+            # Same contract as the real tool: errors become the observation
+            return delay, repr(fault), {}
+        raw_results = fake_results(query, self.max_results)
+        results = self.api_wrapper.clean_results(raw_results["results"])
+        return delay, results, raw_results
+
+    def _run(
+        self,
+        query: str,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+    ) -> Tuple[Union[List[Dict[str, str]], str], Dict]:
+        delay, results, raw_results = self._respond(query)
+        time.sleep(delay)
+        return results, raw_results
+
+    async def _arun(
+        self,
+        query: str,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> Tuple[Union[List[Dict[str, str]], str], Dict]:
+        started = time.perf_counter()
+        delay, results, raw_results = self._respond(query)
+        await asyncio.sleep(delay)
+        # Recorded like the real tool's requests
+        if raw_results:
+            record_search(query, raw_results, started)
+        else:
+            record_search(query, None, started, error=results)
+        return results, raw_results
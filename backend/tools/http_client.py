@@ -0,0 +1,53 @@
+"""Shared async HTTP client for network-bound tools.
+
+Opening a client per call pays DNS, TCP and TLS setup on every tool call.
+``http_client.get()`` returns one ``httpx.AsyncClient`` with a bounded
+keep-alive pool that all tools share; the lifespan closes it on shutdown.
+
+An ``AsyncClient`` belongs to the event loop it was first used on, so a call
+from another loop (tests, benchmarks) gets a fresh client.
+"""
+
+import asyncio
+from typing import Optional
+
+import httpx
+
+from backend.config import settings
+
+
+class SharedHTTPClient:
+    """Lazily created ``httpx.AsyncClient`` bound to the running loop."""
+
+    def __init__(self, max_connections: int, timeout: float) -> None:
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def get(self) -> httpx.AsyncClient:
+        """Return the client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                timeout=self.timeout,
+            )
+            self._loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the client; the next ``get()`` opens a new one."""
+        if self._client is not None and self._loop is asyncio.get_running_loop():
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
+
+http_client = SharedHTTPClient(
+    max_connections=settings.HTTP_MAX_CONNECTIONS,
+    timeout=settings.HTTP_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,13 @@
+from backend.config import settings
+from backend.retrieval import document_index
+from langchain_core.tools import tool
+
+
+@tool
+def local_search(query: str) -> list:
+    """搜索本地知识库中的内部文档。输入搜索关键词，返回最相关的文档片段，包含标题、来源和内容。内部资料、项目文档等问题应优先使用此工具。"""
+    return document_index.search(query, k=settings.LOCAL_SEARCH_TOP_K)
+
+
+# BM25 scoring is numpy work over memory-mapped files; keep it off the loop
+local_search.metadata = {"execution": "thread", "timeout": 10}
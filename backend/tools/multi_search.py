@@ -0,0 +1,178 @@
+"""Multi-query web search.
+
+Comparison questions ("A vs B") otherwise take one search per agent
+iteration, each costing an LLM round trip. ``multi_search`` takes several
+queries in one action and runs them concurrently through the regular search
+tool, so the search cache and the shared HTTP client are reused.
+
+Results are merged round-robin by per-query rank, so each query keeps its
+best results under the global cap, and de-duplicated by URL. A result found
+by several queries lists all of them in ``queries``.
+"""
+
+import asyncio
+import json
+import re
+from typing import Any, Dict, List, Optional, Type, Union
+from urllib.parse import urlsplit, urlunsplit
+
+from backend.config import settings
+from backend.tools.search_cache import normalize_query
+from backend.tools.tavily_search import tavily_search
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForToolRun,
+    CallbackManagerForToolRun,
+)
+from langchain_core.tools import BaseTool
+from pydantic import BaseModel, ConfigDict, Field
+
+_QUERY_SEPARATORS = re.compile(r"[\n;；]")
+
+
+class MultiSearchInput(BaseModel):
+    queries: Union[List[str], str] = Field(
+        description="搜索词列表（JSON 数组），或每行一个搜索词"
+    )
+
+
+def parse_queries(queries: Union[List[str], str], limit: int) -> List[str]:
+    """Turn the tool input into at most ``limit`` distinct queries."""
+    if isinstance(queries, str):
+        text = queries.strip()
+        # Non-OpenAI LLMs (ZhipuAI) may append "Observation" to the input,
+        # see the calculator tool
+        lines = text.split("\n")
+        if len(lines) > 1 and "Observation:".startswith(lines[-1].strip()):
+            text = "\n".join(lines[:-1]).strip()
+        parsed: Any = None
+        if text.startswith("["):
+            try:
+                parsed = json.loads(text)
+            except json.JSONDecodeError:
+                parsed = None
+        if isinstance(parsed, list):
+            queries = [str(query) for query in parsed]
+        else:
+            queries = _QUERY_SEPARATORS.split(text)
+
+    distinct: List[str] = []
+    seen = set()
+    for query in queries:
+        query = query.strip().strip("\"'")
+        key = normalize_query(query)
+        if key and key not in seen:
+            seen.add(key)
+            distinct.append(query)
+    return distinct[:limit]
+
+
+def _url_key(url: str) -> str:
+    """Dedupe key: scheme and host are case-insensitive, fragments ignored."""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/")
+    return urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), path, parts.query, "")
+    )
+
+
+def merge_results(
+    queries: List[str], results: List[Any], max_results: int
+) -> List[Dict[str, Any]]:
+    """Merge per-query result lists into one de-duplicated, ranked list.
+
+    Args:
+        queries: The queries, in input order
+        results: Per query, the search tool's result list, an error string
+            or an exception
+        max_results: Global cap on merged results
+
+    Returns:
+        Results interleaved by per-query rank (each query's results ordered
+        by score), each with the ``queries`` that found it, followed by one
+        ``{"query", "error"}`` entry per failed query.
+    """
+    ranked: List[List[Dict[str, Any]]] = []
+    errors = []
+    for query, result in zip(queries, results):
+        if isinstance(result, list):
+            ranked.append(
+                sorted(
+                    (item for item in result if isinstance(item, dict)),
+                    key=lambda item: -float(item.get("score") or 0.0),
+                )
+            )
+        else:
+            ranked.append([])
+            errors.append({"query": query, "error": str(result)})
+
+    merged: List[Dict[str, Any]] = []
+    by_url: Dict[str, Dict[str, Any]] = {}
+    for rank in range(max((len(items) for items in ranked), default=0)):
+        for query, items in zip(queries, ranked):
+            if rank >= len(items):
+                continue
+            item = items[rank]
+            key = _url_key(str(item.get("url", ""))) or f"{query}#{rank}"
+            existing = by_url.get(key)
+            if existing is not None:
+                existing["queries"].append(query)
+                continue
+            if len(merged) < max_results:
+                entry = {**item, "queries": [query]}
+                by_url[key] = entry
+                merged.append(entry)
+    return merged + errors
+
+
+class MultiSearchTool(BaseTool):
+    """Runs several queries through ``search`` concurrently and merges them."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    name: str = "multi_search"
+    description: str = (
+        "同时搜索多个查询。输入多个搜索词（JSON 数组，或每行一个），并发搜索后按网址去重、"
+        "合并排序返回结果。比较类问题（如 A 与 B 的区别）应一次给出所有搜索词，而不是逐个搜索。"
+    )
+    args_schema: Type[BaseModel] = MultiSearchInput
+
+    search: BaseTool
+    max_queries: int = 5
+    max_results: int = 10
+
+    def _run(
+        self,
+        queries: Union[List[str], str],
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+    ) -> List[Dict[str, Any]]:
+        parsed = parse_queries(queries, self.max_queries)
+        results = []
+        for query in parsed:
+            try:
+                results.append(self.search.invoke(query))
+            except Exception as exc:
+                results.append(exc)
+        return merge_results(parsed, results, self.max_results)
+
+    async def _arun(
+        self,
+        queries: Union[List[str], str],
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> List[Dict[str, Any]]:
+        parsed = parse_queries(queries, self.max_queries)
+        results = await asyncio.gather(
+            *(self.search.ainvoke(query) for query in parsed),
+            return_exceptions=True,
+        )
+        return merge_results(parsed, list(results), self.max_results)
+
+
+multi_search = MultiSearchTool(
+    search=tavily_search,
+    max_queries=settings.MULTI_SEARCH_MAX_QUERIES,
+    max_results=settings.MULTI_SEARCH_MAX_RESULTS,
+)
+# Several result lists in one observation; allow more than a single search
+multi_search.metadata = {
+    "observation_token_budget": 2 * settings.OBSERVATION_TOKEN_BUDGET
+}
@@ -0,0 +1,75 @@
+"""Tavily search played back from recorded cassettes.
+
+Selected with ``SEARCH_PROVIDER=replay``. Each query is answered with the
+response recorded for it in ``CASSETTE_DIR`` (``backend/utils/cassettes.py``)
+after its recorded duration times ``CASSETTE_TIME_SCALE``; a query recorded
+several times gets its recordings in turn. Queries never recorded fall back
+to ``fake_results`` with no delay, so a replayed turn that strays from the
+recording still completes.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from backend.config import settings
+from backend.tools.fake_search import fake_results
+from backend.utils.cassettes import CassetteLibrary, cassette_library
+from langchain_community.tools.tavily_search import TavilySearchResults
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForToolRun,
+    CallbackManagerForToolRun,
+)
+from pydantic import ConfigDict, Field
+
+logger = logging.getLogger(__name__)
+
+
+class ReplayTavilySearchResults(TavilySearchResults):
+    """Tavily search answering with recorded responses and timings."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    library: CassetteLibrary = Field(default_factory=lambda: cassette_library)
+    time_scale: float = 1.0
+
+    @classmethod
+    def from_settings(cls, **kwargs: Any) -> "ReplayTavilySearchResults":
+        """A replayer configured by the ``CASSETTE_*`` settings."""
+        return cls(
+            library=cassette_library, time_scale=settings.CASSETTE_TIME_SCALE, **kwargs
+        )
+
+    def _respond(self, query: str) -> Tuple[float, Union[List[Dict], str], Dict]:
+        recorded = self.library.search(query)
+        if recorded is None:
+            logger.debug(f"No recorded search for {query!r}, using fake results")
+            raw_results = fake_results(query, self.max_results)
+            results = self.api_wrapper.clean_results(raw_results["results"])
+            return 0.0, results, raw_results
+        delay = recorded["duration_ms"] / 1000 * self.time_scale
+        if recorded["error"] or not recorded["results"]:
+            # Same contract as the real tool: errors become the observation
+            return delay, recorded["error"] or "No results", {}
+        raw_results = recorded["results"]
+        results = self.api_wrapper.clean_results(raw_results["results"])
+        return delay, results, raw_results
+
+    def _run(
+        self,
+        query: str,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+    ) -> Tuple[Union[List[Dict[str, str]], str], Dict]:
+        delay, results, raw_results = self._respond(query)
+        time.sleep(delay)
+        return results, raw_results
+
+    async def _arun(
+        self,
+        query: str,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> Tuple[Union[List[Dict[str, str]], str], Dict]:
+        delay, results, raw_results = self._respond(query)
+        await asyncio.sleep(delay)
+        return results, raw_results
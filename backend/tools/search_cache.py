@@ -0,0 +1,321 @@
+"""TTL result cache for search tools.
+
+``CachedSearchTool`` wraps any search tool that takes a single ``query``
+argument. Queries are normalized (case, width, whitespace, punctuation at
+the ends) before the lookup, results are kept in a bounded LRU with a TTL,
+and can optionally be written through to a local SQLite table so they
+survive restarts.
+
+The cache can be bypassed for a single request with
+``set_search_cache_bypass(True)``; the flag lives in a context variable so it
+only affects the current request.
+"""
+
+import asyncio
+import contextvars
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForToolRun,
+    CallbackManagerForToolRun,
+)
+from langchain_core.tools import BaseTool
+from pydantic import ConfigDict, PrivateAttr
+
+_WHITESPACE_RE = re.compile(r"\s+")
+# Sentence punctuation and quotes around a query; "#", "+" and inner dots
+# are part of terms like "C#", "C++" and "node.js"
+_EDGE_PUNCTUATION = "\"'.,;:!?…“”‘’、。「」"
+
+_search_cache_bypass: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "_search_cache_bypass", default=False
+)
+
+
+def set_search_cache_bypass(bypass: bool) -> None:
+    """Skip cached search results for the current request context."""
+    _search_cache_bypass.set(bypass)
+
+
+def is_search_cache_bypassed() -> bool:
+    """Whether the current request asked to bypass the search cache."""
+    return _search_cache_bypass.get()
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query for use as a cache key.
+
+    Applies Unicode NFKC folding (full-width characters become ASCII),
+    lower-cases, collapses whitespace and strips sentence punctuation from
+    both ends. Punctuation inside the query is kept, so "C#" and "C", or
+    "3.14" and "3 14", stay different queries.
+    """
+    text = unicodedata.normalize("NFKC", query).lower()
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    return text.strip(_EDGE_PUNCTUATION + " ")
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after ``ttl_seconds``.
+
+    Each entry stores the value together with the latency it took to fetch,
+    so hits can report how much time they saved.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[Any, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """Return ``(value, fetch_latency_ms)`` or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, latency_ms, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value, latency_ms
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        latency_ms: float,
+        expires_at: Optional[float] = None,
+    ) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        if expires_at is None:
+            expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (value, latency_ms, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteResultStore:
+    """Write-through persistence of cached results in a local SQLite file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    tool TEXT NOT NULL,
+                    query TEXT NOT NULL,
+                    result TEXT NOT NULL,
+                    latency_ms REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (tool, query)
+                )
+                """
+            )
+
+    def get(self, tool: str, query: str) -> Optional[Tuple[Any, float, float]]:
+        """Return ``(value, latency_ms, expires_at)`` for a live entry."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, latency_ms, expires_at FROM search_cache "
+                "WHERE tool = ? AND query = ? AND expires_at > ?",
+                (tool, query, time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def set(
+        self, tool: str, query: str, value: Any, latency_ms: float, expires_at: float
+    ) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache VALUES (?, ?, ?, ?, ?)",
+                (
+                    tool,
+                    query,
+                    json.dumps(value, ensure_ascii=False),
+                    latency_ms,
+                    expires_at,
+                ),
+            )
+
+    def purge_expired(self) -> int:
+        """Delete expired rows and return how many were removed."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM search_cache WHERE expires_at <= ?", (time.time(),)
+            )
+        return cursor.rowcount
+
+
+class CachedSearchTool(BaseTool):
+    """Caching wrapper around a search tool with a ``query`` argument.
+
+    The wrapper keeps the wrapped tool's name, description and argument
+    schema, so prompts and the agent see no difference.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: BaseTool
+    cache: TTLCache
+    store: Optional[SQLiteResultStore] = None
+
+    _hits: int = PrivateAttr(default=0)
+    _misses: int = PrivateAttr(default=0)
+    _bypassed: int = PrivateAttr(default=0)
+    _saved_ms: float = PrivateAttr(default=0.0)
+
+    @classmethod
+    def wrap(
+        cls,
+        tool: BaseTool,
+        max_entries: int,
+        ttl_seconds: float,
+        persist_path: Optional[str] = None,
+    ) -> "CachedSearchTool":
+        """Wrap ``tool`` with a cache.
+
+        Args:
+            tool: Search tool to wrap
+            max_entries: LRU capacity
+            ttl_seconds: Lifetime of a cached result
+            persist_path: SQLite file for persistence, or None for memory only
+
+        Returns:
+            CachedSearchTool exposing the same name and schema as ``tool``
+        """
+        return cls(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            inner=tool,
+            cache=TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds),
+            store=SQLiteResultStore(persist_path) if persist_path else None,
+        )
+
+    def _run(
+        self,
+        query: str,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+    ) -> Any:
+        key = normalize_query(query)
+        if is_search_cache_bypassed():
+            self._bypassed += 1
+        else:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            self._misses += 1
+
+        started = time.perf_counter()
+        result = self.inner.run(query)
+        self._store(key, result, (time.perf_counter() - started) * 1000)
+        return result
+
+    async def _arun(
+        self,
+        query: str,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> Any:
+        key = normalize_query(query)
+        if is_search_cache_bypassed():
+            self._bypassed += 1
+        else:
+            cached = self.cache.get(key)
+            if cached is None and self.store is not None:
+                cached = await asyncio.to_thread(self._load_persisted, key)
+            if cached is not None:
+                return self._hit(*cached)
+            self._misses += 1
+
+        started = time.perf_counter()
+        result = await self.inner.arun(query)
+        latency_ms = (time.perf_counter() - started) * 1000
+        if self.store is not None:
+            await asyncio.to_thread(self._store, key, result, latency_ms)
+        else:
+            self._store(key, result, latency_ms)
+        return result
+
+    def _lookup(self, key: str) -> Any:
+        cached = self.cache.get(key)
+        if cached is None and self.store is not None:
+            cached = self._load_persisted(key)
+        if cached is None:
+            return None
+        return self._hit(*cached)
+
+    def _load_persisted(self, key: str) -> Optional[Tuple[Any, float]]:
+        row = self.store.get(self.name, key)
+        if row is None:
+            return None
+        value, latency_ms, expires_at = row
+        self.cache.set(key, value, latency_ms, expires_at=expires_at)
+        return value, latency_ms
+
+    def _hit(self, value: Any, latency_ms: float) -> Any:
+        self._hits += 1
+        self._saved_ms += latency_ms
+        return value
+
+    def _store(self, key: str, result: Any, latency_ms: float) -> None:
+        if not _is_cacheable(result):
+            return
+        self.cache.set(key, result, latency_ms)
+        if self.store is not None:
+            self.store.set(
+                self.name,
+                key,
+                result,
+                latency_ms,
+                time.time() + self.cache.ttl_seconds,
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and saved latency for this tool."""
+        lookups = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "bypassed": self._bypassed,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+            "saved_latency_ms": round(self._saved_ms, 1),
+            "entries": len(self.cache),
+            "persistent": self.store is not None,
+        }
+
+
+def _is_cacheable(result: Any) -> bool:
+    """Only cache real result lists; tool errors come back as strings."""
+    return isinstance(result, (list, dict)) and bool(result)
+
+
+def get_search_cache_stats(tools: List[BaseTool]) -> Dict[str, Dict[str, Any]]:
+    """Collect cache statistics for every cached tool in ``tools``."""
+    return {
+        tool.name: tool.stats() for tool in tools if isinstance(tool, CachedSearchTool)
+    }
@@ -1,6 +1,82 @@
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
 from backend.config import settings
+from backend.tools.http_client import http_client
+from backend.tools.search_cache import CachedSearchTool
+from backend.utils.cassettes import record_search
 from langchain_community.tools.tavily_search import TavilySearchResults
+from langchain_core.callbacks import AsyncCallbackManagerForToolRun
+
+
+class AsyncTavilySearchResults(TavilySearchResults):
+    """Tavily search whose async path uses the shared HTTP client.
+
+    The upstream ``_arun`` opens a new aiohttp session, and so a new TLS
+    connection, on every call. This one reuses pooled connections, so
+    concurrent searches only wait on the network and hold no threads.
+    Requests made while a turn is being recorded go into its cassette.
+    """
+
+    api_url: str = settings.TAVILY_API_URL
+
+    async def _arun(
+        self,
+        query: str,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> Tuple[Union[List[Dict[str, str]], str], Dict]:
+        params: Dict[str, Any] = {
+            "api_key": self.api_wrapper.tavily_api_key.get_secret_value(),
+            "query": query,
+            "max_results": self.max_results,
+            "search_depth": self.search_depth,
+            "include_domains": self.include_domains,
+            "exclude_domains": self.exclude_domains,
+            "include_answer": self.include_answer,
+            "include_raw_content": self.include_raw_content,
+            "include_images": self.include_images,
+        }
+        started = time.perf_counter()
+        try:
+            response = await http_client.get().post(
+                f"{self.api_url}/search", json=params
+            )
+            response.raise_for_status()
+            raw_results = response.json()
+        except Exception as e:
+            record_search(query, None, started, error=repr(e))
+            # Same contract as the upstream tool: errors become the observation
+            return repr(e), {}
+        record_search(query, raw_results, started)
+        return self.api_wrapper.clean_results(raw_results["results"]), raw_results
+
+
+if settings.SEARCH_PROVIDER == "fake":
+    from backend.tools.fake_search import FakeTavilySearchResults
+
+    tavily_search = FakeTavilySearchResults.from_settings(
+        max_results=settings.TAVILY_MAX_RESULTS,
+    )
+elif settings.SEARCH_PROVIDER == "replay":
+    from backend.tools.replay_search import ReplayTavilySearchResults
+
+    tavily_search = ReplayTavilySearchResults.from_settings(
+        max_results=settings.TAVILY_MAX_RESULTS,
+    )
+elif settings.SEARCH_PROVIDER == "tavily":
+    tavily_search = AsyncTavilySearchResults(
+        max_results=settings.TAVILY_MAX_RESULTS,
+    )
+else:
+    raise ValueError(
+        f"Unknown search provider {settings.SEARCH_PROVIDER!r}; "
+        "use 'tavily', 'fake' or 'replay'"
+    )
 
-tavily_search = TavilySearchResults(
-    max_results=settings.TAVILY_MAX_RESULTS,
-)
+if settings.SEARCH_CACHE_ENABLED:
+    tavily_search = CachedSearchTool.wrap(
+        tavily_search,
+        max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+        persist_path=settings.SEARCH_CACHE_DB_PATH or None,
+    )
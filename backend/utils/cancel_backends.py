@@ -0,0 +1,365 @@
+"""Shared generation state for cancelling across server processes.
+
+With several uvicorn workers, the cancel request for a session usually
+reaches a worker that is not running its generation. A backend records
+which process owns each running generation and carries stop requests to
+it:
+
+- ``MemoryCancelBackend``: this process only; the single-worker default
+  before shared backends existed
+- ``SQLiteCancelBackend``: a table in a local SQLite file shared by all
+  workers on the host; needs no extra service
+- ``RedisCancelBackend``: keys in Redis (or any server speaking its
+  protocol) for workers spread over several hosts
+
+The owning process polls for stop requests while it has generations
+running, so cross-process cancel-to-stop latency is about the poll
+interval. Registrations expire after ``ttl_seconds`` in case a worker dies
+mid-generation; a generation can register with a shorter TTL derived from
+its own turn budget.
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BACKEND_MEMORY = "memory"
+BACKEND_SQLITE = "sqlite"
+BACKEND_REDIS = "redis"
+
+# Row condition of an unexpired generation; parameters: backend TTL, now
+_SQL_LIVE = "started_at + COALESCE(ttl_seconds, ?) > ?"
+
+
+def default_owner() -> str:
+    """Identifier of this server process."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class CancelBackend:
+    """Where running generations and stop requests are recorded.
+
+    Subclasses set ``shared`` when other processes can see the state; the
+    cancel manager only polls shared backends.
+    """
+
+    shared = False
+
+    def __init__(self, ttl_seconds: float) -> None:
+        self.ttl_seconds = ttl_seconds
+
+    async def register(
+        self, session_id: str, owner: str, ttl_seconds: Optional[float] = None
+    ) -> None:
+        """Record that ``owner`` started generating for ``session_id``.
+
+        The registration expires after ``ttl_seconds``, or the backend's
+        ``ttl_seconds`` when omitted.
+        """
+        raise NotImplementedError
+
+    async def unregister(self, session_id: str, owner: str) -> None:
+        """Forget the generation, unless another owner has taken it over."""
+        raise NotImplementedError
+
+    async def request_stop(self, session_id: str) -> bool:
+        """Ask the owner to stop; False if no generation is running."""
+        raise NotImplementedError
+
+    async def stop_requests(self, owner: str, session_ids: List[str]) -> List[str]:
+        """Which of ``owner``'s ``session_ids`` have a pending stop request."""
+        raise NotImplementedError
+
+    async def state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """``owner``, ``started_at``, ``ttl_seconds`` and ``stop_requested_at``
+        of a running generation, or None."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryCancelBackend(CancelBackend):
+    """Generation state of this process only."""
+
+    def __init__(self, ttl_seconds: float) -> None:
+        super().__init__(ttl_seconds)
+        self._generations: Dict[str, Dict[str, Any]] = {}
+
+    async def register(
+        self, session_id: str, owner: str, ttl_seconds: Optional[float] = None
+    ) -> None:
+        self._generations[session_id] = _new_state(
+            owner, ttl_seconds or self.ttl_seconds
+        )
+
+    async def unregister(self, session_id: str, owner: str) -> None:
+        state = self._generations.get(session_id)
+        if state is not None and state["owner"] == owner:
+            del self._generations[session_id]
+
+    async def request_stop(self, session_id: str) -> bool:
+        state = await self.state(session_id)
+        if state is None:
+            return False
+        state["stop_requested_at"] = time.time()
+        return True
+
+    async def stop_requests(self, owner: str, session_ids: List[str]) -> List[str]:
+        return [
+            session_id
+            for session_id in session_ids
+            if (state := self._generations.get(session_id))
+            and state["owner"] == owner
+            and state["stop_requested_at"] is not None
+        ]
+
+    async def state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        state = self._generations.get(session_id)
+        if state is None or _expired(state):
+            return None
+        return state
+
+
+class SQLiteCancelBackend(CancelBackend):
+    """Generation state in a SQLite file shared by the workers of one host.
+
+    Queries run in a thread; the connection is opened on first use.
+    """
+
+    shared = True
+
+    def __init__(self, path: str, ttl_seconds: float) -> None:
+        super().__init__(ttl_seconds)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=5)
+            # WAL lets pollers read while another worker writes
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS generations (
+                        session_id TEXT PRIMARY KEY,
+                        owner TEXT NOT NULL,
+                        started_at REAL NOT NULL,
+                        stop_requested_at REAL,
+                        ttl_seconds REAL
+                    )
+                    """
+                )
+                columns = {
+                    row[1] for row in conn.execute("PRAGMA table_info(generations)")
+                }
+                if "ttl_seconds" not in columns:
+                    # Files created before per-generation TTLs; NULL means
+                    # the backend's ttl_seconds
+                    try:
+                        conn.execute(
+                            "ALTER TABLE generations ADD COLUMN ttl_seconds REAL"
+                        )
+                    except sqlite3.OperationalError as e:
+                        # Another worker added it first
+                        if "duplicate column" not in str(e):
+                            raise
+            self._conn = conn
+        return self._conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                return conn.execute(sql, params).fetchall()
+
+    async def _run(self, sql: str, params: tuple = ()) -> List[tuple]:
+        return await asyncio.to_thread(self._execute, sql, params)
+
+    async def register(
+        self, session_id: str, owner: str, ttl_seconds: Optional[float] = None
+    ) -> None:
+        now = time.time()
+        await self._run(
+            f"DELETE FROM generations WHERE NOT {_SQL_LIVE}", (self.ttl_seconds, now)
+        )
+        await self._run(
+            "INSERT OR REPLACE INTO generations "
+            "(session_id, owner, started_at, stop_requested_at, ttl_seconds) "
+            "VALUES (?, ?, ?, NULL, ?)",
+            (session_id, owner, now, ttl_seconds),
+        )
+
+    async def unregister(self, session_id: str, owner: str) -> None:
+        await self._run(
+            "DELETE FROM generations WHERE session_id = ? AND owner = ?",
+            (session_id, owner),
+        )
+
+    async def request_stop(self, session_id: str) -> bool:
+        rows = await self._run(
+            "UPDATE generations SET stop_requested_at = ? "
+            f"WHERE session_id = ? AND {_SQL_LIVE} RETURNING session_id",
+            (time.time(), session_id, self.ttl_seconds, time.time()),
+        )
+        return bool(rows)
+
+    async def stop_requests(self, owner: str, session_ids: List[str]) -> List[str]:
+        rows = await self._run(
+            "SELECT session_id FROM generations "
+            "WHERE owner = ? AND stop_requested_at IS NOT NULL",
+            (owner,),
+        )
+        wanted = set(session_ids)
+        return [row[0] for row in rows if row[0] in wanted]
+
+    async def state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        rows = await self._run(
+            "SELECT owner, started_at, stop_requested_at, ttl_seconds "
+            f"FROM generations WHERE session_id = ? AND {_SQL_LIVE}",
+            (session_id, self.ttl_seconds, time.time()),
+        )
+        if not rows:
+            return None
+        owner, started_at, stop_requested_at, ttl_seconds = rows[0]
+        return {
+            "owner": owner,
+            "started_at": started_at,
+            "ttl_seconds": ttl_seconds or self.ttl_seconds,
+            "stop_requested_at": stop_requested_at,
+        }
+
+    async def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class RedisCancelBackend(CancelBackend):
+    """Generation state in Redis, for workers on several hosts.
+
+    Uses only ``get``, ``set`` (with ``ex``), ``mget`` and ``delete`` of a
+    ``redis.asyncio`` client, so any client or server offering those works.
+
+    Args:
+        client: Async Redis client; created from ``url`` when omitted
+        url: Redis URL, used when no client is given
+        ttl_seconds: Expiry of generation and stop keys
+        prefix: Key prefix shared by all workers of the deployment
+    """
+
+    shared = True
+
+    def __init__(
+        self,
+        client: Any = None,
+        url: str = "redis://localhost:6379/0",
+        ttl_seconds: float = 180.0,
+        prefix: str = "chatbot:",
+    ) -> None:
+        super().__init__(ttl_seconds)
+        if client is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError(
+                    "CANCEL_BACKEND=redis needs the redis package: pip install redis"
+                ) from e
+            client = redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.prefix = prefix
+
+    def _generation_key(self, session_id: str) -> str:
+        return f"{self.prefix}generation:{session_id}"
+
+    def _stop_key(self, session_id: str) -> str:
+        return f"{self.prefix}stop:{session_id}"
+
+    @property
+    def _ttl(self) -> int:
+        return max(1, int(self.ttl_seconds))
+
+    async def register(
+        self, session_id: str, owner: str, ttl_seconds: Optional[float] = None
+    ) -> None:
+        state = _new_state(owner, ttl_seconds or self.ttl_seconds)
+        await self.client.delete(self._stop_key(session_id))
+        await self.client.set(
+            self._generation_key(session_id),
+            json.dumps(state),
+            ex=max(1, int(state["ttl_seconds"])),
+        )
+
+    async def unregister(self, session_id: str, owner: str) -> None:
+        state = await self.state(session_id)
+        if state is not None and state["owner"] == owner:
+            await self.client.delete(
+                self._generation_key(session_id), self._stop_key(session_id)
+            )
+
+    async def request_stop(self, session_id: str) -> bool:
+        if await self.client.get(self._generation_key(session_id)) is None:
+            return False
+        await self.client.set(self._stop_key(session_id), time.time(), ex=self._ttl)
+        return True
+
+    async def stop_requests(self, owner: str, session_ids: List[str]) -> List[str]:
+        if not session_ids:
+            return []
+        # Session IDs polled here are this owner's own generations
+        values = await self.client.mget([self._stop_key(sid) for sid in session_ids])
+        return [sid for sid, value in zip(session_ids, values) if value is not None]
+
+    async def state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        raw = await self.client.get(self._generation_key(session_id))
+        if raw is None:
+            return None
+        state = json.loads(raw)
+        stop = await self.client.get(self._stop_key(session_id))
+        state["stop_requested_at"] = float(stop) if stop is not None else None
+        return state
+
+    async def close(self) -> None:
+        close = getattr(self.client, "aclose", None) or getattr(
+            self.client, "close", None
+        )
+        if close is not None:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+
+
+def create_cancel_backend(
+    kind: str, ttl_seconds: float, sqlite_path: str = "", redis_url: str = ""
+) -> CancelBackend:
+    """Backend for ``CANCEL_BACKEND``: memory, sqlite or redis."""
+    if kind == BACKEND_MEMORY:
+        return MemoryCancelBackend(ttl_seconds)
+    if kind == BACKEND_SQLITE:
+        return SQLiteCancelBackend(sqlite_path, ttl_seconds)
+    if kind == BACKEND_REDIS:
+        return RedisCancelBackend(url=redis_url, ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unknown cancel backend {kind!r}")
+
+
+def _new_state(owner: str, ttl_seconds: float) -> Dict[str, Any]:
+    return {
+        "owner": owner,
+        "started_at": time.time(),
+        "ttl_seconds": ttl_seconds,
+        "stop_requested_at": None,
+    }
+
+
+def _expired(state: Dict[str, Any]) -> bool:
+    return state["started_at"] + state["ttl_seconds"] <= time.time()
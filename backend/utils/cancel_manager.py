@@ -3,10 +3,21 @@
 This module provides session-based cancellation support using asyncio events.
 Each session gets its own stop event, allowing independent control over
 multiple concurrent chat sessions.
+
+Running generations are also recorded in a ``CancelBackend``, so a cancel
+request handled by a different server process reaches the one running the
+generation (see ``backend.utils.cancel_backends``).
 """
 
 import asyncio
-from typing import Dict
+import logging
+from typing import Any, Dict, Optional
+
+from backend.config import settings
+
+from .cancel_backends import CancelBackend, create_cancel_backend, default_owner
+
+logger = logging.getLogger(__name__)
 
 
 class CancelManager:
@@ -16,26 +27,63 @@ class CancelManager:
     When a session's stop event is set, all streaming operations for that
     session should check the event and gracefully stop generation.
 
+    Stop requests for generations of this process set the event directly.
+    Otherwise they are recorded in the backend, and the owning process,
+    which polls a shared backend while it has generations running, sets its
+    event.
+
     Example:
-        manager = CancelManager()
+        manager = CancelManager(MemoryCancelBackend(ttl_seconds=180))
 
         # Start generation with stop event
-        stop_event = manager.get_stop_event("session-123")
-        for chunk in generate_response():
+        stop_event = await manager.start_generation("session-123")
+        async for chunk in generate_response():
             if stop_event.is_set():
                 break
             yield chunk
+        await manager.cleanup("session-123")
 
-        # Cancel from another endpoint
-        manager.stop_session("session-123")
+        # Cancel from another endpoint, possibly in another process
+        await manager.stop_session("session-123")
     """
 
-    def __init__(self) -> None:
-        """Initialize the cancel manager with empty stop event registry."""
+    def __init__(
+        self,
+        backend: CancelBackend,
+        poll_interval: float = 0.05,
+        owner: Optional[str] = None,
+    ) -> None:
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.owner = owner or default_owner()
         self._stop_events: Dict[str, asyncio.Event] = {}
+        self._poller: Optional[asyncio.Task] = None
+
+    async def start_generation(
+        self, session_id: str, ttl_seconds: Optional[float] = None
+    ) -> asyncio.Event:
+        """Register a generation for the session and return its stop event.
+
+        Args:
+            session_id: The unique identifier for the chat session.
+            ttl_seconds: How long the registration outlives a worker that
+                dies mid-generation; the backend's TTL when omitted.
+
+        Returns:
+            An asyncio.Event that can be checked during streaming.
+        """
+        stop_event = self.get_stop_event(session_id)
+        try:
+            await self.backend.register(session_id, self.owner, ttl_seconds)
+        except Exception as e:
+            # Cancelling from other processes is lost, the chat still works
+            logger.warning(f"Cancel backend failed to register {session_id}: {e}")
+        if self.backend.shared and (self._poller is None or self._poller.done()):
+            self._poller = asyncio.create_task(self._poll_stop_requests())
+        return stop_event
 
     def get_stop_event(self, session_id: str) -> asyncio.Event:
-        """Get or create a stop event for the given session.
+        """Get or create the local stop event for the given session.
 
         Args:
             session_id: The unique identifier for the chat session.
@@ -47,22 +95,27 @@ class CancelManager:
             self._stop_events[session_id] = asyncio.Event()
         return self._stop_events[session_id]
 
-    def stop_session(self, session_id: str) -> bool:
+    async def stop_session(self, session_id: str) -> bool:
         """Signal to stop generation for the specified session.
 
         Args:
             session_id: The unique identifier for the chat session.
 
         Returns:
-            True if session was found and stopped, False if not found.
+            True if a running generation was found in any process and asked
+            to stop, False if not found.
         """
         if session_id in self._stop_events:
             self._stop_events[session_id].set()
             return True
-        return False
+        try:
+            return await self.backend.request_stop(session_id)
+        except Exception as e:
+            logger.warning(f"Cancel backend failed to stop {session_id}: {e}")
+            return False
 
-    def cleanup(self, session_id: str) -> None:
-        """Remove the stop event for a completed session.
+    async def cleanup(self, session_id: str) -> None:
+        """Remove the stop event and registration of a completed session.
 
         This should be called after a generation completes (successfully or
         via cancellation) to prevent memory leaks.
@@ -70,8 +123,11 @@ class CancelManager:
         Args:
             session_id: The unique identifier for the chat session.
         """
-        if session_id in self._stop_events:
-            del self._stop_events[session_id]
+        self._stop_events.pop(session_id, None)
+        try:
+            await self.backend.unregister(session_id, self.owner)
+        except Exception as e:
+            logger.warning(f"Cancel backend failed to unregister {session_id}: {e}")
 
     def is_session_stopped(self, session_id: str) -> bool:
         """Check if a session has been stopped.
@@ -86,6 +142,39 @@ class CancelManager:
             session_id in self._stop_events and self._stop_events[session_id].is_set()
         )
 
+    async def generation_state(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Owner and timestamps of the session's running generation, if any."""
+        return await self.backend.state(session_id)
+
+    async def close(self) -> None:
+        """Stop polling and release the backend. Called on shutdown."""
+        if self._poller is not None:
+            self._poller.cancel()
+        await self.backend.close()
+
+    async def _poll_stop_requests(self) -> None:
+        # Runs while this process has generations; restarted by the next one
+        while self._stop_events:
+            try:
+                session_ids = await self.backend.stop_requests(
+                    self.owner, list(self._stop_events)
+                )
+            except Exception as e:
+                logger.warning(f"Cancel backend poll failed: {e}")
+                session_ids = []
+            for session_id in session_ids:
+                if session_id in self._stop_events:
+                    self._stop_events[session_id].set()
+            await asyncio.sleep(self.poll_interval)
+
 
 # Global instance for use across the application
-cancel_manager = CancelManager()
+cancel_manager = CancelManager(
+    create_cancel_backend(
+        settings.CANCEL_BACKEND,
+        ttl_seconds=2 * settings.TURN_TIMEOUT_SECONDS,
+        sqlite_path=settings.CANCEL_SQLITE_PATH,
+        redis_url=settings.CANCEL_REDIS_URL,
+    ),
+    poll_interval=settings.CANCEL_POLL_INTERVAL_SECONDS,
+)
@@ -0,0 +1,269 @@
+"""Record-and-replay cassettes of chat turns.
+
+With ``CASSETTE_RECORD`` on, each chat turn records its I/O into a
+``Cassette``:
+
+- every LLM call: the prompt messages, the response with the time each
+  streamed chunk arrived, token usage, or the error
+- every agent tool call: the input, output and duration, which gives the
+  turn's tool mix
+- every search API request under the search tools (cache misses only),
+  via ``record_search``
+
+Secrets (API keys and tokens from the settings, key-like strings, and
+``api_key``/``authorization`` fields) are replaced by ``<redacted>``, and
+the cassette is written as gzipped JSON to ``CASSETTE_DIR``.
+
+``LLM_PROVIDER=replay`` (``backend/agent/replay_llm.py``) and
+``SEARCH_PROVIDER=replay`` (``backend/tools/replay_search.py``) serve the
+cassettes of ``cassette_library`` back with the recorded delays, so backend
+changes can be benchmarked against recorded turns with no network.
+"""
+
+import contextvars
+import gzip
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_FORMAT = 1
+REDACTED = "<redacted>"
+
+SECRET_SETTINGS = (
+    "ZHIPUAI_API_KEY",
+    "TAVILY_API_KEY",
+    "LANGSMITH_API_KEY",
+    "PROFILE_TOKEN",
+)
+# Shorter setting values are test placeholders; replacing them would mangle text
+MIN_SECRET_LENGTH = 8
+
+_SECRET_PATTERN = re.compile(
+    r"tvly-[A-Za-z0-9_-]{8,}"
+    r"|\bsk-[A-Za-z0-9_-]{16,}"
+    r"|\blsv2_[A-Za-z0-9_]{16,}"
+    # ZhipuAI keys: <id>.<secret>
+    r"|\b[0-9a-f]{32}\.[A-Za-z0-9]{16}\b"
+    r"|Bearer\s+[A-Za-z0-9._~+/-]{16,}=*"
+)
+_SECRET_FIELD = re.compile(
+    r"(^|_)(api_?key|authorization|secret|password|access_token|auth_token)$",
+    re.IGNORECASE,
+)
+
+_current_cassette: contextvars.ContextVar[Optional["Cassette"]] = (
+    contextvars.ContextVar("_current_cassette", default=None)
+)
+
+
+def redact(value: Any, secrets: Optional[List[str]] = None) -> Any:
+    """``value`` with secrets replaced, in nested lists and dicts too.
+
+    Args:
+        value: JSON-like value
+        secrets: Literal secrets; defaults to the secret settings
+    """
+    if secrets is None:
+        secrets = [
+            secret
+            for secret in (getattr(settings, name, "") for name in SECRET_SETTINGS)
+            if secret and len(secret) >= MIN_SECRET_LENGTH
+        ]
+    if isinstance(value, str):
+        for secret in secrets:
+            value = value.replace(secret, REDACTED)
+        return _SECRET_PATTERN.sub(REDACTED, value)
+    if isinstance(value, dict):
+        return {
+            key: REDACTED
+            if isinstance(key, str) and _SECRET_FIELD.search(key) and value[key]
+            else redact(item, secrets)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item, secrets) for item in value]
+    return value
+
+
+def to_jsonable(value: Any) -> Any:
+    """A JSON-serializable form of a tool input or output."""
+    value = getattr(value, "content", value)
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _elapsed_ms(started: float) -> int:
+    return int((time.perf_counter() - started) * 1000)
+
+
+class Cassette:
+    """The recorded LLM calls, tool calls and searches of one turn."""
+
+    def __init__(
+        self,
+        question: str,
+        streaming: bool,
+        llm_calls: Optional[List[Dict[str, Any]]] = None,
+        tool_calls: Optional[List[Dict[str, Any]]] = None,
+        search_calls: Optional[List[Dict[str, Any]]] = None,
+        status: str = "",
+        recorded_at: Optional[str] = None,
+    ) -> None:
+        self.question = question
+        self.streaming = streaming
+        self.llm_calls = llm_calls if llm_calls is not None else []
+        self.tool_calls = tool_calls if tool_calls is not None else []
+        self.search_calls = search_calls if search_calls is not None else []
+        self.status = status
+        self.recorded_at = recorded_at or datetime.now(timezone.utc).isoformat()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "format": CASSETTE_FORMAT,
+            "recorded_at": self.recorded_at,
+            "question": self.question,
+            "streaming": self.streaming,
+            "status": self.status,
+            "llm_calls": self.llm_calls,
+            "tool_calls": self.tool_calls,
+            "search_calls": self.search_calls,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Cassette":
+        if data.get("format") != CASSETTE_FORMAT:
+            raise ValueError(f"Unsupported cassette format {data.get('format')!r}")
+        return cls(
+            question=data["question"],
+            streaming=data["streaming"],
+            llm_calls=data["llm_calls"],
+            tool_calls=data["tool_calls"],
+            search_calls=data["search_calls"],
+            status=data.get("status", ""),
+            recorded_at=data.get("recorded_at"),
+        )
+
+    def save(self, directory: str) -> Path:
+        """Write the cassette, secrets stripped, as ``<time>-<id>.json.gz``."""
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        path = path / f"{stamp}-{uuid.uuid4().hex[:8]}.json.gz"
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(
+                redact(self.to_dict()), f, ensure_ascii=False, separators=(",", ":")
+            )
+        return path
+
+    @classmethod
+    def load(cls, path: Path) -> "Cassette":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def set_cassette(cassette: Cassette) -> None:
+    """Set the cassette recording the turn running in this context."""
+    _current_cassette.set(cassette)
+
+
+def clear_cassette() -> None:
+    _current_cassette.set(None)
+
+
+def current_cassette() -> Optional[Cassette]:
+    return _current_cassette.get()
+
+
+def record_search(
+    query: str, results: Any, started: float, error: Optional[str] = None
+) -> None:
+    """Add a search API request to the current turn's cassette, if recording.
+
+    Args:
+        query: Search query sent
+        results: Results returned, or the error observation
+        started: ``time.perf_counter()`` when the request was sent
+        error: Error message if the request failed
+    """
+    cassette = current_cassette()
+    if cassette is None:
+        return
+    cassette.search_calls.append(
+        {
+            "query": query,
+            "results": to_jsonable(results),
+            "duration_ms": _elapsed_ms(started),
+            "error": error,
+        }
+    )
+
+
+def _search_key(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+class CassetteLibrary:
+    """The cassettes of a directory, loaded on first use.
+
+    Args:
+        directory: Directory the cassettes were recorded to
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._cassettes: Optional[List[Cassette]] = None
+        self._searches: Dict[str, List[Dict[str, Any]]] = {}
+        self._served: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def cassettes(self) -> List[Cassette]:
+        if self._cassettes is None:
+            with self._lock:
+                if self._cassettes is None:
+                    self._cassettes = self._load()
+        return self._cassettes
+
+    def _load(self) -> List[Cassette]:
+        cassettes = []
+        for path in sorted(Path(self.directory).glob("*.json.gz")):
+            try:
+                cassettes.append(Cassette.load(path))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Skipping cassette {path}: {e}")
+        for cassette in cassettes:
+            for search in cassette.search_calls:
+                key = _search_key(search["query"])
+                self._searches.setdefault(key, []).append(search)
+        logger.info(f"Loaded {len(cassettes)} cassettes from {self.directory}")
+        return cassettes
+
+    def questions(self) -> List[str]:
+        return [cassette.question for cassette in self.cassettes()]
+
+    def search(self, query: str) -> Optional[Dict[str, Any]]:
+        """A recorded search for ``query``; repeats take turns."""
+        self.cassettes()
+        key = _search_key(query)
+        recorded = self._searches.get(key)
+        if not recorded:
+            return None
+        served = self._served.get(key, 0)
+        self._served[key] = served + 1
+        return recorded[served % len(recorded)]
+
+
+# Global instance for use across the application
+cassette_library = CassetteLibrary(settings.CASSETTE_DIR)
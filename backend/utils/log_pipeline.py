@@ -0,0 +1,212 @@
+"""Non-blocking, structured log output.
+
+Log calls on the event loop only put the record on a bounded queue; a
+background thread formats it and writes it out. When the queue is full the
+record is dropped and counted instead of blocking the caller.
+
+Records are written as one JSON object per line. Structured data passed as
+``extra={"fields": {...}}`` is merged into that object, so callers log an
+event name as the message and keep payloads out of the message text.
+
+Routes send each level range to its own destination, e.g.
+``"DEBUG=stdout,WARNING=stderr"`` writes DEBUG and INFO to stdout and
+WARNING and above to stderr. A destination is ``stdout``, ``stderr`` or a
+file path.
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import metrics
+
+# Attributes of every LogRecord, not to be repeated as fields
+_RECORD_ATTRIBUTES = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a single-line JSON object."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key == "fields" and isinstance(value, dict):
+                entry.update(value)
+            elif key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The plain text format, with any fields appended as JSON."""
+
+    def __init__(self) -> None:
+        super().__init__(
+            fmt="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + json.dumps(fields, ensure_ascii=False, default=str)
+        return text
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when full."""
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only merge args and render tracebacks here; JSON formatting is
+        # left to the listener thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+class _BelowLevel(logging.Filter):
+    """Passes records below ``level``, the start of the next route."""
+
+    def __init__(self, level: int) -> None:
+        super().__init__()
+        self.level = level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno < self.level
+
+
+def parse_routes(routes: str) -> List[Tuple[int, str]]:
+    """Parse ``"LEVEL=destination,..."`` into (level, destination) pairs.
+
+    Raises:
+        ValueError: If a route has no ``=`` or an unknown level
+    """
+    parsed = []
+    for route in filter(None, (part.strip() for part in routes.split(","))):
+        level_name, sep, destination = route.partition("=")
+        level = logging.getLevelName(level_name.strip().upper())
+        if not sep or not isinstance(level, int) or not destination.strip():
+            raise ValueError(f"Invalid log route {route!r}")
+        parsed.append((level, destination.strip()))
+    return sorted(parsed)
+
+
+def _destination_handler(destination: str) -> logging.Handler:
+    if destination == "stdout":
+        return logging.StreamHandler(sys.stdout)
+    if destination == "stderr":
+        return logging.StreamHandler(sys.stderr)
+    Path(destination).parent.mkdir(parents=True, exist_ok=True)
+    return logging.FileHandler(destination, encoding="utf-8")
+
+
+class LogPipeline:
+    """Owns the queue, the listener thread and the route handlers."""
+
+    def __init__(self) -> None:
+        self.queue_handler: Optional[DroppingQueueHandler] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+
+    def start(
+        self,
+        level: str = "INFO",
+        routes: str = "DEBUG=stdout",
+        fmt: str = "json",
+        queue_size: int = 10000,
+    ) -> None:
+        """Install the pipeline as the only handler of the root logger.
+
+        Args:
+            level: Root log level name
+            routes: Level ranges and their destinations, see module docs
+            fmt: "json" or "text"
+            queue_size: Records buffered before new ones are dropped
+        """
+        self.stop()
+        formatter = JsonFormatter() if fmt == "json" else TextFormatter()
+        parsed = parse_routes(routes)
+        handlers = []
+        for index, (route_level, destination) in enumerate(parsed):
+            handler = _destination_handler(destination)
+            handler.setLevel(route_level)
+            handler.setFormatter(formatter)
+            if index + 1 < len(parsed):
+                handler.addFilter(_BelowLevel(parsed[index + 1][0]))
+            handlers.append(handler)
+
+        self.queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        self._listener = logging.handlers.QueueListener(
+            self.queue_handler.queue, *handlers, respect_handler_level=True
+        )
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.queue_handler)
+        root.setLevel(level.upper())
+        self._listener.start()
+
+    def stop(self) -> None:
+        """Write out queued records and remove the pipeline's handlers."""
+        if self._listener is None:
+            return
+        logging.getLogger().removeHandler(self.queue_handler)
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            if getattr(handler, "stream", None) not in (sys.stdout, sys.stderr):
+                handler.close()
+        self._listener = None
+
+    def stats(self) -> Dict[str, int]:
+        """Records waiting in the queue and dropped because it was full."""
+        if self.queue_handler is None:
+            return {"queued": 0, "dropped": 0}
+        return {
+            "queued": self.queue_handler.queue.qsize(),
+            "dropped": self.queue_handler.dropped,
+        }
+
+
+# Global instance for use across the application
+log_pipeline = LogPipeline()
+
+metrics.registry.gauge(
+    "log_records_dropped",
+    "Log records dropped because the log queue was full",
+    function=lambda: log_pipeline.stats()["dropped"],
+)
+metrics.registry.gauge(
+    "log_records_queued",
+    "Log records waiting to be written",
+    function=lambda: log_pipeline.stats()["queued"],
+)
@@ -0,0 +1,222 @@
+"""Event loop lag monitor that finds the code blocking the loop.
+
+A task on the event loop sleeps for ``interval`` and measures how late it
+wakes up; every measurement goes to the ``event_loop_lag_seconds``
+histogram. A watchdog thread checks that the task keeps waking up: once it
+is ``threshold`` overdue, the loop is stuck in synchronous code, and the
+watchdog takes the loop thread's stack right then, while the blocking call
+is still on it.
+
+Each stall is attributed to a call site: the innermost frame of the stack
+inside this repository, so a blocking ``json.dumps`` shows up at the line
+calling it. When the loop resumes, the stall's full lag is added to its
+site. Sites are exposed as ``event_loop_stalls_total`` and
+``event_loop_blocked_seconds_total`` labelled by site, and with an example
+stack at ``/api/debug/event-loop``.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from backend.config import settings
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Distinct call sites tracked; later sites are counted as "other"
+MAX_SITES = 100
+# Frames kept of each example stack
+STACK_DEPTH = 30
+
+_REPO_ROOT = str(Path(__file__).resolve().parent.parent.parent)
+_THIS_FILE = str(Path(__file__).resolve())
+
+event_loop_lag_seconds = metrics.registry.histogram(
+    "event_loop_lag_seconds",
+    "How late the event loop ran a timer due now",
+    buckets=LAG_BUCKETS,
+)
+event_loop_stalls = metrics.registry.counter(
+    "event_loop_stalls_total",
+    "Times the event loop was blocked past the threshold, by blocking call site",
+    ("site",),
+)
+event_loop_blocked_seconds = metrics.registry.counter(
+    "event_loop_blocked_seconds_total",
+    "Event loop lag of stalls, by blocking call site",
+    ("site",),
+)
+
+
+def call_site(stack: traceback.StackSummary) -> str:
+    """The innermost frame of ``stack`` in this repository, as file:line.
+
+    Falls back to the innermost frame when none is in the repository.
+    """
+    for frame in reversed(stack):
+        filename = str(Path(frame.filename).resolve())
+        if (
+            filename.startswith(_REPO_ROOT)
+            and filename != _THIS_FILE
+            and "site-packages" not in filename
+        ):
+            relative = filename[len(_REPO_ROOT) + 1 :]
+            return f"{relative}:{frame.lineno} ({frame.name})"
+    if not stack:
+        return "unknown"
+    frame = stack[-1]
+    return f"{frame.filename}:{frame.lineno} ({frame.name})"
+
+
+class LoopMonitor:
+    """Measures event loop lag and records what blocks the loop.
+
+    Args:
+        interval: Seconds between lag measurements
+        threshold: Lag in seconds from which the loop counts as blocked and
+            the blocking stack is taken
+    """
+
+    def __init__(self, interval: float = 0.05, threshold: float = 0.1) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.ticks = 0
+        self.stalls = 0
+        self.sites: Dict[str, Dict[str, Any]] = {}
+        self._recent_lags: deque = deque(maxlen=2048)
+        # Time the monitor task is due to wake up; None while it is not
+        # waiting, read by the watchdog
+        self._due: Optional[float] = None
+        self._captured_due: Optional[float] = None
+        self._captured_site: Optional[str] = None
+        self._loop_thread_id = 0
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        """Start monitoring the running event loop."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._watchdog.join()
+        self._task = self._watchdog = None
+        self._due = None
+
+    async def _run(self) -> None:
+        while True:
+            due = time.perf_counter() + self.interval
+            self._due = due
+            await asyncio.sleep(self.interval)
+            self._due = None
+            self._record(max(0.0, time.perf_counter() - due), due)
+
+    def _record(self, lag: float, due: float) -> None:
+        self.ticks += 1
+        self._recent_lags.append(lag)
+        event_loop_lag_seconds.observe(lag)
+        if self._captured_due != due:
+            return
+        site = self._captured_site
+        self._captured_due = self._captured_site = None
+        entry = self.sites[site]
+        entry["blocked_seconds"] += lag
+        entry["max_lag_ms"] = max(entry["max_lag_ms"], round(lag * 1000, 2))
+        event_loop_blocked_seconds.inc(lag, site=site)
+        logger.warning(
+            "event_loop_blocked",
+            extra={"fields": {"site": site, "lag_ms": round(lag * 1000, 2)}},
+        )
+
+    def _watch(self) -> None:
+        check = min(self.interval, self.threshold) / 2
+        while not self._stop.wait(check):
+            due = self._due
+            if (
+                due is None
+                or due == self._captured_due
+                or time.perf_counter() - due < self.threshold
+            ):
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            self._capture(traceback.extract_stack(frame, limit=STACK_DEPTH), due)
+
+    def _capture(self, stack: traceback.StackSummary, due: float) -> None:
+        site = call_site(stack)
+        if site not in self.sites and len(self.sites) >= MAX_SITES:
+            site = "other"
+        entry = self.sites.setdefault(
+            site, {"site": site, "stalls": 0, "blocked_seconds": 0.0, "max_lag_ms": 0.0}
+        )
+        entry["stalls"] += 1
+        entry["last_seen"] = time.time()
+        entry["stack"] = stack.format()
+        self.stalls += 1
+        event_loop_stalls.inc(site=site)
+        self._captured_site = site
+        self._captured_due = due
+
+    def stats(self, top: int = 20) -> Dict[str, Any]:
+        """Recent lag percentiles and the sites that blocked the loop longest."""
+        lags = sorted(self._recent_lags)
+
+        def percentile(p: float) -> Optional[float]:
+            if not lags:
+                return None
+            return round(lags[min(len(lags) - 1, int(len(lags) * p))] * 1000, 2)
+
+        sites: List[Dict[str, Any]] = sorted(
+            (dict(entry) for entry in list(self.sites.values())),
+            key=lambda entry: entry["blocked_seconds"],
+            reverse=True,
+        )
+        for entry in sites:
+            entry["blocked_seconds"] = round(entry["blocked_seconds"], 3)
+        return {
+            "running": self._task is not None,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "ticks": self.ticks,
+            "stalls": self.stalls,
+            "lag_ms": {
+                "p50": percentile(0.50),
+                "p99": percentile(0.99),
+                "max": round(lags[-1] * 1000, 2) if lags else None,
+            },
+            "sites": sites[:top],
+        }
+
+
+# Global instance for use across the application
+loop_monitor = LoopMonitor(
+    interval=settings.LOOP_MONITOR_INTERVAL_MS / 1000,
+    threshold=settings.LOOP_BLOCK_THRESHOLD_MS / 1000,
+)
@@ -0,0 +1,415 @@
+"""In-process metrics in the Prometheus text format.
+
+Counters, gauges and histograms are recorded without taking a lock: every
+thread adds to its own shard (a dict reached through ``threading.local``),
+and only the scrape merges the shards. Recording from the event loop thread
+is a dict lookup and an addition.
+
+Labels are passed as keyword arguments with string values and must match
+the metric's label names::
+
+    chat_requests.inc(mode="stream", tools="true", memory="false", status="completed")
+    chat_turn_seconds.observe(1.7, mode="stream", tools="true", memory="false")
+
+``registry.render()`` produces the text served at ``/metrics``.
+"""
+
+import bisect
+import functools
+import inspect
+import math
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from . import turn_timing
+from .tracing import SPAN_KIND_CLIENT, tracer
+
+LabelKey = Tuple[str, ...]
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+QUEUE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+TOKEN_RATE_BUCKETS = (1, 5, 10, 20, 30, 50, 75, 100, 150, 250, 500)
+ITERATION_BUCKETS = (1, 2, 3, 4, 5, 6, 8, 10, 15)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[Dict[LabelKey, Any]] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> Dict[LabelKey, Any]:
+        try:
+            return self._local.values
+        except AttributeError:
+            # First record from this thread
+            values: Dict[LabelKey, Any] = {}
+            with self._shards_lock:
+                self._shards.append(values)
+            self._local.values = values
+            return values
+
+    def _key(self, labels: Dict[str, Any]) -> LabelKey:
+        try:
+            if len(labels) == len(self.labelnames):
+                return tuple(map(labels.__getitem__, self.labelnames))
+        except KeyError:
+            pass
+        raise ValueError(
+            f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}"
+        )
+
+    def _snapshots(self) -> Iterable[Dict[LabelKey, Any]]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        # dict.copy() is atomic, so a shard written meanwhile is read whole
+        return [shard.copy() for shard in shards]
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {_escape_help(self.help)}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def values(self) -> Dict[LabelKey, float]:
+        """Current value per label set."""
+        merged: Dict[LabelKey, float] = {}
+        for shard in self._snapshots():
+            for key, value in shard.items():
+                merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def samples(self):
+        return [
+            (self.name, dict(zip(self.labelnames, key)), value)
+            for key, value in sorted(self.values().items())
+        ]
+
+
+class Gauge(Counter):
+    """Value that goes up and down, or is read from ``function`` on scrape.
+
+    Args:
+        function: Called on every scrape; returns the value, or for labelled
+            gauges a dict of label tuple -> value
+    """
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.function = function
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def values(self) -> Dict[LabelKey, float]:
+        if self.function is None:
+            return super().values()
+        value = self.function()
+        if isinstance(value, dict):
+            return {tuple(map(str, key)): v for key, v in value.items()}
+        return {(): value}
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed buckets."""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels: Any) -> None:
+        shard = self._shard()
+        key = self._key(labels)
+        entry = shard.get(key)
+        if entry is None:
+            # One count per bucket, the +Inf bucket, then the sum
+            entry = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-1] += value
+
+    def values(self) -> Dict[LabelKey, List[float]]:
+        """Per label set: non-cumulative bucket counts followed by the sum."""
+        merged: Dict[LabelKey, List[float]] = {}
+        for shard in self._snapshots():
+            for key, entry in shard.items():
+                entry = list(entry)
+                if key in merged:
+                    merged[key] = [a + b for a, b in zip(merged[key], entry)]
+                else:
+                    merged[key] = entry
+        return merged
+
+    def samples(self):
+        result = []
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for key, entry in sorted(self.values().items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(bounds, entry):
+                cumulative += count
+                result.append((f"{self.name}_bucket", {**labels, "le": bound}, cumulative))
+            result.append((f"{self.name}_sum", labels, entry[-1]))
+            result.append((f"{self.name}_count", labels, cumulative))
+        return result
+
+
+class MetricsRegistry:
+    """Creates metrics and renders all of them for a scrape."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _add(self, metric: _Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], Any]] = None,
+    ) -> Gauge:
+        return self._add(Gauge(name, help, labelnames, function))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def turn_labels(stream: bool, enable_tools: bool, enable_memory: bool) -> Dict[str, str]:
+    """The mode, tools and memory labels of chat turn metrics."""
+    return {
+        "mode": "stream" if stream else "non_stream",
+        "tools": _flag(enable_tools),
+        "memory": _flag(enable_memory),
+    }
+
+
+def instrument_repository(cls: type) -> type:
+    """Class decorator timing every async static method as a DB operation.
+
+    Recorded in ``db_operation_seconds`` labelled ``Class.method``, in the
+    current turn's timing, and as a client span named ``Class.method`` when
+    the request is traced.
+    """
+    for name, attr in list(vars(cls).items()):
+        if isinstance(attr, staticmethod) and inspect.iscoroutinefunction(
+            attr.__func__
+        ):
+            setattr(
+                cls, name, staticmethod(_timed(attr.__func__, f"{cls.__name__}.{name}"))
+            )
+    return cls
+
+
+def _timed(func: Callable, operation: str) -> Callable:
+    span_attributes = {"db.system": "sqlite", "db.operation.name": operation}
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        status = "error"
+        span = tracer.start_span(operation, SPAN_KIND_CLIENT, span_attributes)
+        try:
+            result = await func(*args, **kwargs)
+            status = "ok"
+            return result
+        except BaseException as exc:
+            if span is not None:
+                span.record_error(exc)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            db_operation_seconds.observe(elapsed, operation=operation, status=status)
+            turn_timing.record_db(operation, elapsed)
+            if span is not None:
+                span.end()
+
+    return wrapper
+
+
+def _flag(value: bool) -> str:
+    return "true" if value else "false"
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape_label(value)}"' for name, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int) or (isinstance(value, float) and value.is_integer()):
+        return str(int(value))
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+# Global registry and the application's metrics
+registry = MetricsRegistry()
+
+TURN_LABELS = ("mode", "tools", "memory")
+
+chat_requests = registry.counter(
+    "chat_requests_total", "Chat turns by outcome", TURN_LABELS + ("status",)
+)
+chat_active_generations = registry.gauge(
+    "chat_active_generations", "Chat turns currently generating", TURN_LABELS
+)
+chat_turn_seconds = registry.histogram(
+    "chat_turn_seconds", "Duration of chat turns", TURN_LABELS
+)
+chat_ttft_seconds = registry.histogram(
+    "chat_time_to_first_token_seconds",
+    "Time from request to the first answer text sent to the client",
+    TURN_LABELS,
+)
+chat_tokens = registry.counter(
+    "chat_tokens_total", "Tokens used by chat turns", TURN_LABELS + ("kind",)
+)
+agent_iterations = registry.histogram(
+    "agent_iterations", "LLM calls per chat turn", TURN_LABELS, ITERATION_BUCKETS
+)
+agent_loops = registry.counter(
+    "agent_loops_total",
+    "Loops caught by the agent executor: repeated tool calls and forced answers",
+    TURN_LABELS + ("kind",),
+)
+llm_calls = registry.counter("llm_calls_total", "LLM calls by outcome", ("status",))
+llm_call_seconds = registry.histogram(
+    "llm_call_seconds", "Duration of LLM calls", ("model",)
+)
+llm_ttft_seconds = registry.histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from LLM request to its first streamed token",
+    ("model",),
+)
+llm_tokens_per_second = registry.histogram(
+    "llm_completion_tokens_per_second",
+    "Completion tokens per second of LLM calls that reported usage",
+    ("model",),
+    TOKEN_RATE_BUCKETS,
+)
+tool_calls = registry.counter(
+    "tool_calls_total", "Tool runs by outcome", ("tool", "status")
+)
+tool_seconds = registry.histogram("tool_seconds", "Duration of tool runs", ("tool",))
+tool_queue_wait_seconds = registry.histogram(
+    "tool_pool_queue_wait_seconds",
+    "Time tool calls waited for a pool thread or process",
+    ("tool", "execution"),
+    QUEUE_BUCKETS,
+)
+db_operation_seconds = registry.histogram(
+    "db_operation_seconds",
+    "Duration of repository operations",
+    ("operation", "status"),
+    DB_BUCKETS,
+)
+registry.gauge(
+    "trace_spans_dropped",
+    "Spans dropped because the export queue was full or the export failed",
+    function=lambda: tracer.stats()["dropped"],
+)
+
+
+class TurnRecorder:
+    """Records the metrics of one chat turn.
+
+    Created when the turn starts; ``finish`` is called exactly once.
+    """
+
+    def __init__(self, stream: bool, enable_tools: bool, enable_memory: bool) -> None:
+        self.labels = turn_labels(stream, enable_tools, enable_memory)
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        chat_active_generations.inc(**self.labels)
+
+    def first_token(self) -> None:
+        """Mark the first answer text sent to the client."""
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+            chat_ttft_seconds.observe(self.first_token_at - self.started, **self.labels)
+
+    def finish(
+        self, status: str, tokens_used: Optional[Dict[str, int]], llm_calls: int
+    ) -> None:
+        chat_active_generations.dec(**self.labels)
+        chat_requests.inc(status=status, **self.labels)
+        chat_turn_seconds.observe(time.perf_counter() - self.started, **self.labels)
+        if llm_calls:
+            agent_iterations.observe(llm_calls, **self.labels)
+        for kind in ("prompt", "completion"):
+            if tokens_used:
+                chat_tokens.inc(tokens_used[f"{kind}_tokens"], kind=kind, **self.labels)
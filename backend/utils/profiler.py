@@ -0,0 +1,335 @@
+"""On-demand sampling profiler for single chat requests.
+
+A profiled request runs as usual while a background thread samples, every
+``interval`` seconds, where the request's coroutine is:
+
+- running on the event loop: the Python stack from the request's handler
+  down to the innermost frame
+- suspended: its ``await`` chain, ending in a ``<await Future>``-style
+  frame for what it waits on, or ``<yield>`` when a streaming response
+  waits for the client to take the next event
+
+So the profile covers wall time of this request only; other requests
+sharing the event loop do not show up in it, and nothing is measured for
+requests that are not profiled.
+
+Profiles are written to a rotating directory in two formats: collapsed
+stacks (``.folded``, for flamegraph.pl, speedscope or inferno) and
+``.pstats`` (for ``python -m pstats``, snakeviz), where call counts are
+sample counts.
+"""
+
+import asyncio
+import hmac
+import json
+import logging
+import marshal
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncGenerator, Awaitable, Dict, List, Optional, Tuple
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("folded", "pstats")
+
+_PROFILE_ID = re.compile(r"^[0-9A-Za-z_-]{1,128}$")
+# Deepest await chain followed, against reference cycles
+_MAX_AWAIT_DEPTH = 256
+_AWAITED_NAMES = {"FutureIter": "Future"}
+
+FrameKey = Tuple[str, int, str]
+
+
+def _frame_key(frame: Any) -> FrameKey:
+    code = frame.f_code
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+
+def _pseudo_key(name: str) -> FrameKey:
+    # pstats uses "~" as the file of built-in functions
+    return ("~", 0, name)
+
+
+def _label(key: FrameKey) -> str:
+    filename, line, name = key
+    if filename == "~":
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+def _await_chain(awaitable: Any) -> List[FrameKey]:
+    """Frames of a suspended coroutine or async generator, outermost first."""
+    keys: List[FrameKey] = []
+    current = awaitable
+    for _ in range(_MAX_AWAIT_DEPTH):
+        frame = (
+            getattr(current, "cr_frame", None)
+            or getattr(current, "ag_frame", None)
+            or getattr(current, "gi_frame", None)
+        )
+        if frame is None:
+            break
+        keys.append(_frame_key(frame))
+        awaited = (
+            getattr(current, "cr_await", None)
+            or getattr(current, "ag_await", None)
+            or getattr(current, "gi_yieldfrom", None)
+        )
+        if awaited is None:
+            if hasattr(current, "ag_frame"):
+                keys.append(_pseudo_key("<yield>"))
+            return keys
+        current = awaited
+    if current is not None and keys:
+        # Awaiting a future or task leaves only the future's iterator
+        name = type(current).__name__
+        keys.append(_pseudo_key(f"<await {_AWAITED_NAMES.get(name, name)}>"))
+    return keys
+
+
+class Sampler:
+    """Samples one coroutine or async generator from a background thread.
+
+    Args:
+        target: The request's coroutine or async generator, not yet finished
+        interval: Seconds between samples
+    """
+
+    def __init__(self, target: Any, interval: float = 0.01) -> None:
+        self.target = target
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.started = 0.0
+        self.duration = 0.0
+        self._frame = getattr(target, "cr_frame", None) or getattr(
+            target, "ag_frame", None
+        )
+        self._thread_id = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        """Start sampling. Called on the event loop thread running the target."""
+        self._thread_id = threading.get_ident()
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    def sample(self) -> Optional[Tuple[FrameKey, ...]]:
+        """The target's current stack, outermost first, or None."""
+        if self._frame is None:
+            return None
+        frame = sys._current_frames().get(self._thread_id)
+        running: List[FrameKey] = []
+        while frame is not None:
+            running.append(_frame_key(frame))
+            if frame is self._frame:
+                return tuple(reversed(running))
+            frame = frame.f_back
+        keys = _await_chain(self.target)
+        return tuple(keys) if keys else None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            stack = self.sample()
+            if stack:
+                self.samples[stack] += 1
+
+    def folded(self, root: str) -> str:
+        """Samples as collapsed stacks, one ``a;b;c count`` line each."""
+        lines = []
+        for stack, count in self.samples.most_common():
+            frames = ";".join([root] + [_label(key) for key in stack])
+            lines.append(f"{frames} {count}")
+        return "\n".join(lines) + "\n"
+
+    def pstats(self) -> Dict[FrameKey, tuple]:
+        """Samples as a ``pstats`` stats table.
+
+        Call counts are samples and times are samples times the interval.
+        """
+        # key -> [samples, self time, cumulative time, {caller: [samples, tt, ct]}]
+        table: Dict[FrameKey, list] = {}
+        for stack, count in self.samples.items():
+            seconds = count * self.interval
+            seen = set()
+            for depth, key in enumerate(stack):
+                entry = table.setdefault(key, [0, 0.0, 0.0, {}])
+                leaf = depth == len(stack) - 1
+                if key not in seen:
+                    seen.add(key)
+                    entry[0] += count
+                    entry[2] += seconds
+                if leaf:
+                    entry[1] += seconds
+                if depth:
+                    edge = entry[3].setdefault(stack[depth - 1], [0, 0.0, 0.0])
+                    edge[0] += count
+                    edge[1] += seconds if leaf else 0.0
+                    edge[2] += seconds
+        return {
+            key: (
+                samples,
+                samples,
+                tt,
+                ct,
+                {
+                    caller: (n, n, edge_tt, edge_ct)
+                    for caller, (n, edge_tt, edge_ct) in callers.items()
+                },
+            )
+            for key, (samples, tt, ct, callers) in table.items()
+        }
+
+
+class ProfileStore:
+    """Directory keeping the most recent ``keep`` profiles.
+
+    Each profile is ``<id>.folded``, ``<id>.pstats`` and ``<id>.json`` with
+    its metadata.
+    """
+
+    def __init__(self, directory: str, keep: int = 50) -> None:
+        self.directory = Path(directory)
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def save(self, sampler: Sampler, meta: Dict[str, Any]) -> None:
+        """Write a profile and remove the oldest beyond ``keep``."""
+        profile_id = meta["id"]
+        self.directory.mkdir(parents=True, exist_ok=True)
+        (self.directory / f"{profile_id}.folded").write_text(
+            sampler.folded(meta["endpoint"]), encoding="utf-8"
+        )
+        with open(self.directory / f"{profile_id}.pstats", "wb") as file:
+            marshal.dump(sampler.pstats(), file)
+        # Metadata last: a profile is listed once all its files exist
+        (self.directory / f"{profile_id}.json").write_text(
+            json.dumps(meta), encoding="utf-8"
+        )
+        with self._lock:
+            for old in self.list()[self.keep :]:
+                for suffix in ("json",) + FORMATS:
+                    (self.directory / f"{old['id']}.{suffix}").unlink(missing_ok=True)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Metadata of the stored profiles, newest first."""
+        if not self.directory.is_dir():
+            return []
+        profiles = []
+        for path in self.directory.glob("*.json"):
+            try:
+                profiles.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                continue
+        return sorted(profiles, key=lambda meta: meta["started_at"], reverse=True)
+
+    def path(self, profile_id: str, fmt: str) -> Optional[Path]:
+        """File of a stored profile, or None if there is no such profile."""
+        if fmt not in FORMATS or not _PROFILE_ID.match(profile_id):
+            return None
+        path = self.directory / f"{profile_id}.{fmt}"
+        return path if path.is_file() else None
+
+
+class RequestProfiler:
+    """Profiles chat requests into a ``ProfileStore``.
+
+    Args:
+        store: Where profiles are written
+        interval: Seconds between samples
+    """
+
+    def __init__(self, store: ProfileStore, interval: float = 0.01) -> None:
+        self.store = store
+        self.interval = interval
+
+    def new_profile(self, endpoint: str, **meta: Any) -> Dict[str, Any]:
+        """Metadata of a profile about to be taken, including its ``id``."""
+        now = datetime.now(timezone.utc)
+        return {
+            "id": now.strftime("%Y%m%dT%H%M%S%fZ") + f"-{os.urandom(3).hex()}",
+            "endpoint": endpoint,
+            "started_at": now.isoformat(),
+            **meta,
+        }
+
+    async def _save(self, sampler: Sampler, meta: Dict[str, Any]) -> None:
+        meta.update(
+            duration_ms=round(sampler.duration * 1000, 1),
+            samples=sum(sampler.samples.values()),
+            interval_ms=self.interval * 1000,
+        )
+        try:
+            await asyncio.to_thread(self.store.save, sampler, meta)
+        except OSError:
+            # Never fail the request over its profile
+            logger.exception("profile_save_failed", extra={"fields": {"id": meta["id"]}})
+
+    async def profile_call(self, coro: Awaitable, meta: Dict[str, Any]) -> Any:
+        """Await ``coro`` while sampling it."""
+        sampler = Sampler(coro, self.interval)
+        sampler.start()
+        try:
+            return await coro
+        finally:
+            sampler.stop()
+            await self._save(sampler, meta)
+
+    async def profile_stream(
+        self, stream: AsyncGenerator, meta: Dict[str, Any]
+    ) -> AsyncGenerator:
+        """Yield from ``stream`` while sampling it, until it ends or is closed."""
+        sampler = Sampler(stream, self.interval)
+        sampler.start()
+        try:
+            async for item in stream:
+                yield item
+        finally:
+            sampler.stop()
+            await stream.aclose()
+            await self._save(sampler, meta)
+
+
+_profiled_sessions = frozenset(
+    session_id.strip()
+    for session_id in settings.PROFILE_SESSION_IDS.split(",")
+    if session_id.strip()
+)
+
+
+def is_profile_token(token: Optional[str]) -> bool:
+    """Whether ``token`` is the configured ``PROFILE_TOKEN``."""
+    return bool(token and settings.PROFILE_TOKEN) and hmac.compare_digest(
+        token.encode(), settings.PROFILE_TOKEN.encode()
+    )
+
+
+def should_profile(session_id: str, token: Optional[str]) -> bool:
+    """Whether a chat request is profiled.
+
+    Args:
+        session_id: Session of the request, checked against
+            ``PROFILE_SESSION_IDS``
+        token: The request's ``X-Profile-Token`` header
+    """
+    return session_id in _profiled_sessions or is_profile_token(token)
+
+
+# Global instance for use across the application
+request_profiler = RequestProfiler(
+    ProfileStore(settings.PROFILE_DIR, settings.PROFILE_KEEP),
+    interval=settings.PROFILE_INTERVAL_MS / 1000,
+)
@@ -0,0 +1,99 @@
+"""Latency and fault models for the fake LLM and search providers.
+
+Latencies are configured as ``"<distribution>:<median ms>[:<spread>]"``:
+
+- ``fixed:400``: always 400 ms
+- ``uniform:400:0.5``: evenly between 200 and 600 ms
+- ``lognormal:400:0.5``: median 400 ms with a long tail, sigma 0.5; the
+  usual shape of API latencies
+
+Faults are injected per call with a given probability: an error answers
+HTTP 500, a throttle HTTP 429, raised as the ``httpx.HTTPStatusError`` a
+real client would raise. Everything is drawn from a seeded generator, so a
+run is repeatable for a given seed and order of calls.
+"""
+
+import math
+import random
+from typing import Optional
+
+import httpx
+
+DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+
+
+class Latency:
+    """A latency distribution, sampled in seconds.
+
+    Args:
+        distribution: One of ``DISTRIBUTIONS``
+        median_ms: Median latency
+        spread: Relative half-width (uniform) or sigma (lognormal)
+    """
+
+    def __init__(
+        self, distribution: str = "fixed", median_ms: float = 0, spread: float = 0
+    ) -> None:
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown latency distribution {distribution!r}, "
+                f"expected one of {', '.join(DISTRIBUTIONS)}"
+            )
+        self.distribution = distribution
+        self.median_ms = median_ms
+        self.spread = spread
+
+    @classmethod
+    def parse(cls, spec: str) -> "Latency":
+        """Read a ``"<distribution>:<median ms>[:<spread>]"`` setting."""
+        parts = spec.split(":")
+        if not spec or len(parts) > 3:
+            raise ValueError(f"Invalid latency {spec!r}")
+        try:
+            numbers = [float(part) for part in parts[1:]]
+        except ValueError:
+            raise ValueError(f"Invalid latency {spec!r}") from None
+        return cls(parts[0], *numbers)
+
+    def sample(self, rng: random.Random) -> float:
+        median = self.median_ms / 1000
+        if self.distribution == "uniform":
+            low, high = median * (1 - self.spread), median * (1 + self.spread)
+            return max(0.0, rng.uniform(low, high))
+        if self.distribution == "lognormal":
+            return median * math.exp(rng.gauss(0, self.spread))
+        return median
+
+    def __repr__(self) -> str:
+        return f"Latency({self.distribution}:{self.median_ms:g}:{self.spread:g})"
+
+
+def injected_fault(
+    rng: random.Random, url: str, error_rate: float, throttle_rate: float
+) -> Optional[httpx.HTTPStatusError]:
+    """The error to fail this call with, or None to let it through.
+
+    Args:
+        rng: Generator of the provider
+        url: URL the simulated request went to, for the error message
+        error_rate: Probability of an HTTP 500
+        throttle_rate: Probability of an HTTP 429
+    """
+    draw = rng.random()
+    if draw < throttle_rate:
+        return http_status_error(429, url, "injected")
+    if draw < throttle_rate + error_rate:
+        return http_status_error(500, url, "injected")
+    return None
+
+
+def http_status_error(status: int, url: str, note: str) -> httpx.HTTPStatusError:
+    """The error ``raise_for_status`` raises for ``status``, marked with ``note``."""
+    request = httpx.Request("POST", url)
+    response = httpx.Response(status, request=request, headers={"Retry-After": "1"})
+    kind = "Client error" if status < 500 else "Server error"
+    return httpx.HTTPStatusError(
+        f"{kind} '{status} {response.reason_phrase}' for url '{url}' ({note})",
+        request=request,
+        response=response,
+    )
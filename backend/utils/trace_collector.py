@@ -0,0 +1,117 @@
+"""A local stand-in for an OpenTelemetry Collector receiving traces.
+
+Accepts OTLP/HTTP JSON exports on ``/v1/traces``, appends each to a file in
+the same line format as the file exporter, and prints one line per span so
+the time of a turn can be read off without a tracing backend.
+
+Usage:
+    python -m backend.utils.trace_collector [--port 4318] [--output traces.jsonl]
+
+Then run the backend with ``TRACING_ENABLED=true TRACE_EXPORTER=otlp``.
+"""
+
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+
+def iter_spans(payload: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Every span of an OTLP/JSON ``ExportTraceServiceRequest``."""
+    for resource_spans in payload.get("resourceSpans", []):
+        for scope_spans in resource_spans.get("scopeSpans", []):
+            yield from scope_spans.get("spans", [])
+
+
+def format_span(span: Dict[str, Any]) -> str:
+    """One summary line: trace, duration, name and IDs."""
+    duration_ms = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+    attributes = {
+        item["key"]: next(iter(item["value"].values()))
+        for item in span.get("attributes", [])
+    }
+    status = " ERROR" if span.get("status", {}).get("code") == 2 else ""
+    return (
+        f"{span['traceId'][:8]} {duration_ms:9.1f} ms  {span['name']}{status}"
+        f"  request={attributes.get('request.id', '-')}"
+        f" session={attributes.get('session.id', '-')}"
+    )
+
+
+class TraceCollector(ThreadingHTTPServer):
+    """HTTP server receiving OTLP/HTTP JSON trace exports.
+
+    Args:
+        address: (host, port) to listen on; port 0 picks a free port
+        output: File the received exports are appended to, if any
+        quiet: Don't print received spans
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self, address: tuple, output: Optional[str] = None, quiet: bool = False
+    ) -> None:
+        super().__init__(address, _ExportHandler)
+        self.output = Path(output) if output else None
+        self.quiet = quiet
+        self.payloads: list = []
+        self.lock = threading.Lock()
+
+    def receive(self, payload: Dict[str, Any]) -> None:
+        with self.lock:
+            self.payloads.append(payload)
+            if self.output is not None:
+                with self.output.open("a", encoding="utf-8") as file:
+                    file.write(json.dumps(payload, ensure_ascii=False) + "\n")
+        if not self.quiet:
+            for span in iter_spans(payload):
+                print(format_span(span), flush=True)
+
+
+class _ExportHandler(BaseHTTPRequestHandler):
+    server: TraceCollector
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/v1/traces":
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length))
+        except ValueError:
+            self.send_error(400, "Expected OTLP/JSON")
+            return
+        self.server.receive(payload)
+        body = b"{}"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--output", default=None, help="Append exports to this file")
+    args = parser.parse_args()
+
+    server = TraceCollector((args.host, args.port), args.output)
+    print(f"Receiving traces on http://{args.host}:{args.port}/v1/traces")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,516 @@
+"""Request tracing with spans in the OpenTelemetry format.
+
+Each traced API request gets a root span; repository calls, LLM calls and
+tool calls made while handling it become its child spans, tagged with the
+request ID and the chat session ID. Finished spans are queued and written
+in batches by a background thread, so tracing never blocks a request on
+output; spans beyond the queue size are dropped and counted.
+
+Batches are encoded as OTLP/JSON ``ExportTraceServiceRequest`` objects and
+go to either:
+
+- ``file``: one batch per line, as written by the OpenTelemetry Collector
+  file exporter and read by its ``otlpjsonfile`` receiver
+- ``otlp``: POSTed to an OTLP/HTTP endpoint (a collector, Jaeger, or the
+  stand-in in ``backend.utils.trace_collector``)
+
+Whether a request is traced is decided once, at its root span, from the
+trace ID and ``TRACE_SAMPLE_RATE``. An incoming W3C ``traceparent`` header
+continues the caller's trace and sampling decision instead.
+"""
+
+import contextvars
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+_TRACE_ID_MASK = (1 << 64) - 1
+
+# Marks a context whose trace was not sampled, so nested calls skip spans
+# instead of starting traces of their own
+_NOT_SAMPLED = object()
+
+_current_span: contextvars.ContextVar[Any] = contextvars.ContextVar(
+    "_current_span", default=None
+)
+_current_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "_current_request_id", default=None
+)
+_current_session_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "_current_trace_session_id", default=None
+)
+_current_request_received: contextvars.ContextVar[Optional[float]] = (
+    contextvars.ContextVar("_current_request_received", default=None)
+)
+
+
+class Span:
+    """One timed operation of a trace.
+
+    Created by ``Tracer.start_span`` and exported once ``end`` is called.
+    """
+
+    __slots__ = (
+        "name",
+        "kind",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start_ns",
+        "end_ns",
+        "attributes",
+        "status",
+        "status_message",
+        "_tracer",
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        kind: int,
+        trace_id: int,
+        parent_id: Optional[int],
+        attributes: Optional[Dict[str, Any]],
+    ) -> None:
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = random.getrandbits(64) or 1
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes) if attributes else {}
+        self.status = STATUS_UNSET
+        self.status_message = ""
+        self._tracer = tracer
+
+    @property
+    def traceparent(self) -> str:
+        """The W3C ``traceparent`` value identifying this span."""
+        return f"00-{self.trace_id:032x}-{self.span_id:016x}-01"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        """Mark the span as failed by ``error``."""
+        self.status = STATUS_ERROR
+        self.status_message = str(error) or type(error).__name__
+        self.attributes["error.type"] = type(error).__name__
+
+    def end(self) -> None:
+        """Finish the span and queue it for export. Later calls are ignored."""
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self._tracer._export(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """The span in OTLP/JSON form."""
+        span: Dict[str, Any] = {
+            "traceId": f"{self.trace_id:032x}",
+            "spanId": f"{self.span_id:016x}",
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": otlp_attributes(self.attributes),
+            "status": {"code": self.status},
+        }
+        if self.parent_id is not None:
+            span["parentSpanId"] = f"{self.parent_id:016x}"
+        if self.status_message:
+            span["status"]["message"] = self.status_message
+        return span
+
+
+def otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Encode attributes as OTLP/JSON key-value pairs."""
+    encoded = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            # 64-bit integers are strings in OTLP/JSON
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        encoded.append({"key": key, "value": typed})
+    return encoded
+
+
+def parse_traceparent(header: Optional[str]) -> Optional[tuple]:
+    """Parse a W3C ``traceparent`` header.
+
+    Returns:
+        (trace_id, parent_span_id, sampled), or None if the header is
+        missing or malformed
+    """
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        trace_id, span_id, flags = (int(part, 16) for part in parts[1:4])
+    except ValueError:
+        return None
+    if not trace_id or not span_id:
+        return None
+    return trace_id, span_id, bool(flags & 1)
+
+
+class FileSpanExporter:
+    """Appends each batch to a file as one OTLP/JSON line."""
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        line = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        with self.path.open("a", encoding="utf-8") as file:
+            file.write(line + "\n")
+
+
+class OtlpHttpSpanExporter:
+    """POSTs each batch to an OTLP/HTTP traces endpoint as JSON."""
+
+    def __init__(self, endpoint: str, timeout: float = 10.0) -> None:
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def export(self, payload: Dict[str, Any]) -> None:
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+def create_exporter(kind: str, file_path: str, endpoint: str):
+    """Build the exporter named by ``TRACE_EXPORTER``.
+
+    Raises:
+        ValueError: If ``kind`` is not "file" or "otlp"
+    """
+    if kind == "file":
+        return FileSpanExporter(file_path)
+    if kind == "otlp":
+        return OtlpHttpSpanExporter(endpoint)
+    raise ValueError(f"Unknown trace exporter {kind!r}; use 'file' or 'otlp'")
+
+
+class Tracer:
+    """Creates spans and exports them from a background thread.
+
+    Disabled until ``start`` is called; while disabled every call returns
+    at once without creating spans.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.service_name = "langchain-chatbot"
+        self.batch_size = 512
+        self.flush_interval = 1.0
+        self.dropped = 0
+        self.exported = 0
+        self._exporter = None
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(
+        self,
+        exporter: Any,
+        sample_rate: float = 1.0,
+        service_name: str = "langchain-chatbot",
+        queue_size: int = 2048,
+        flush_interval: float = 1.0,
+    ) -> None:
+        """Enable tracing and start the export thread.
+
+        Args:
+            exporter: Object with an ``export(payload)`` method
+            sample_rate: Share of new traces recorded, from 0.0 to 1.0
+            service_name: ``service.name`` resource attribute
+            queue_size: Finished spans buffered before new ones are dropped
+            flush_interval: Longest wait in seconds before a batch is sent
+        """
+        self.stop()
+        self._exporter = exporter
+        self.sample_rate = sample_rate
+        self.service_name = service_name
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.exported = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(
+            target=self._run, name="span-exporter", daemon=True
+        )
+        self._thread.start()
+        self.enabled = True
+
+    def stop(self) -> None:
+        """Disable tracing and export the spans still queued."""
+        if self._thread is None:
+            return
+        self.enabled = False
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        """Spans waiting for export, exported, and dropped."""
+        return {
+            "queued": self._queue.qsize(),
+            "exported": self.exported,
+            "dropped": self.dropped,
+        }
+
+    def _sampled(self, trace_id: int) -> bool:
+        # Same rule as the OpenTelemetry TraceIdRatioBased sampler
+        return (trace_id & _TRACE_ID_MASK) < self.sample_rate * (1 << 64)
+
+    def start_span(
+        self,
+        name: str,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[Span] = None,
+        remote_parent: Optional[tuple] = None,
+    ) -> Optional[Span]:
+        """Start a span without making it current.
+
+        The parent is ``parent`` if given, else the span current in this
+        context. Without either a new trace is started and sampled.
+
+        Args:
+            name: Span name
+            kind: One of the ``SPAN_KIND_*`` constants
+            attributes: Initial span attributes
+            parent: Explicit parent span
+            remote_parent: Parsed ``traceparent`` of the caller, used for
+                root spans
+
+        Returns:
+            The span, or None if tracing is off or the trace is not sampled
+        """
+        if not self.enabled:
+            return None
+        if parent is None:
+            parent = _current_span.get()
+            if parent is _NOT_SAMPLED:
+                return None
+        if parent is not None:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+        elif remote_parent is not None:
+            trace_id, parent_id, sampled = remote_parent
+            if not sampled:
+                return None
+        else:
+            trace_id, parent_id = random.getrandbits(128) or 1, None
+            if not self._sampled(trace_id):
+                return None
+        span = Span(self, name, kind, trace_id, parent_id, attributes)
+        span.set_attribute("request.id", _current_request_id.get())
+        span.set_attribute("session.id", _current_session_id.get())
+        return span
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        remote_parent: Optional[tuple] = None,
+    ) -> Iterator[Optional[Span]]:
+        """Run a block in a span that is current for everything it calls.
+
+        An exception leaving the block marks the span as failed. Yields None
+        when the trace is not recorded.
+        """
+        if not self.enabled:
+            yield None
+            return
+        span = self.start_span(name, kind, attributes, remote_parent=remote_parent)
+        token = _current_span.set(span if span is not None else _NOT_SAMPLED)
+        try:
+            yield span
+        except BaseException as exc:
+            if span is not None:
+                span.record_error(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            if span is not None:
+                span.end()
+
+    def _export(self, span: Span) -> None:
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _payload(self, spans: List[Span]) -> Dict[str, Any]:
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": otlp_attributes(
+                            {"service.name": self.service_name}
+                        )
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "backend"},
+                            "spans": [span.to_otlp() for span in spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get(
+                        timeout=max(0.0, deadline - time.monotonic())
+                    )
+                except queue.Empty:
+                    break
+                if span is None:
+                    stopping = True
+                    break
+                batch.append(span)
+            if batch:
+                try:
+                    self._exporter.export(self._payload(batch))
+                    self.exported += len(batch)
+                except Exception as exc:
+                    self.dropped += len(batch)
+                    logger.warning(
+                        "span_export_failed",
+                        extra={"fields": {"spans": len(batch), "error": str(exc)}},
+                    )
+
+
+def current_span() -> Optional[Span]:
+    """The recorded span current in this context, if any."""
+    span = _current_span.get()
+    return None if span is _NOT_SAMPLED else span
+
+
+def current_request_id() -> Optional[str]:
+    return _current_request_id.get()
+
+
+def request_received_at() -> Optional[float]:
+    """``time.perf_counter()`` when the current API request arrived."""
+    return _current_request_received.get()
+
+
+def set_request_id(request_id: Optional[str]) -> None:
+    _current_request_id.set(request_id)
+
+
+def set_session_id(session_id: Optional[str]) -> None:
+    """Tag the current span, and spans started after it, with the session."""
+    _current_session_id.set(session_id)
+    span = current_span()
+    if span is not None:
+        span.set_attribute("session.id", session_id)
+
+
+class TracingMiddleware:
+    """ASGI middleware giving each API request an ID and a root span.
+
+    The request ID is taken from the ``X-Request-ID`` header or generated,
+    and returned in the same header. The arrival time is kept for the
+    queue time of chat turns. The span lasts until the response body
+    has been sent, so it covers a whole streamed response.
+
+    Args:
+        app: The wrapped ASGI application
+        path_prefix: Only requests under this path are traced
+    """
+
+    def __init__(self, app: Any, path_prefix: str = "/api/") -> None:
+        self.app = app
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        _current_request_received.set(time.perf_counter())
+        headers = dict(scope.get("headers") or ())
+        request_id = (
+            headers.get(b"x-request-id", b"").decode("latin-1")[:128]
+            or f"{random.getrandbits(64):016x}"
+        )
+        set_request_id(request_id)
+        span_holder: List[Optional[Span]] = [None]
+
+        async def send_with_request_id(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers") or ()) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+                if span_holder[0] is not None:
+                    span_holder[0].set_attribute(
+                        "http.response.status_code", message["status"]
+                    )
+            await send(message)
+
+        method = scope.get("method", "GET")
+        with tracer.span(
+            f"{method} {scope['path']}",
+            SPAN_KIND_SERVER,
+            {"http.request.method": method, "url.path": scope["path"]},
+            remote_parent=parse_traceparent(
+                headers.get(b"traceparent", b"").decode("latin-1")
+            ),
+        ) as span:
+            span_holder[0] = span
+            try:
+                await self.app(scope, receive, send_with_request_id)
+            finally:
+                set_request_id(None)
+                # Routing stores the matched route in the scope; name the
+                # span after its template rather than the concrete path
+                route = getattr(scope.get("route"), "path", None)
+                if span is not None and route:
+                    span.name = f"{method} {route}"
+                    span.set_attribute("http.route", route)
+
+
+# Global instance for use across the application
+tracer = Tracer()
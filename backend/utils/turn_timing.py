@@ -0,0 +1,158 @@
+"""Where the server time of one chat turn went.
+
+A ``TurnTiming`` is created when a turn starts and set in a context
+variable; the code doing the work adds its time to it:
+
+- queue: from the request arriving to the turn starting
+- db_write / db_read / history: repository calls, via
+  ``instrument_repository`` (history is loading the conversation)
+- tool_queue: tool runs waiting for a free pool thread or worker
+- serialization: encoding SSE events and the response
+
+LLM calls (with time to first token) and tool calls come from the turn's
+``TokenLedger`` and ``ToolTimingHandler``. The snapshot is sent on the
+``done`` event and the ``Server-Timing`` header, and stored on the
+assistant message as ``Message.timing``.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+PHASES = ("queue", "db_write", "db_read", "history", "tool_queue", "serialization")
+
+HISTORY_OPERATION = "MessageRepository.get_by_session_id"
+_READ_PREFIXES = ("get", "list", "aggregate", "latency")
+
+_current_turn_timing: contextvars.ContextVar[Optional["TurnTiming"]] = (
+    contextvars.ContextVar("_current_turn_timing", default=None)
+)
+
+
+class TurnTiming:
+    """Time spent per phase of one turn.
+
+    Args:
+        received: ``time.perf_counter()`` when the request arrived, if known
+    """
+
+    def __init__(self, received: Optional[float] = None) -> None:
+        self.started = time.perf_counter()
+        self.seconds: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        if received is not None:
+            self.seconds["queue"] = max(0.0, self.started - received)
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.seconds[phase] += seconds
+
+    @contextmanager
+    def measure(self, phase: str) -> Iterator[None]:
+        """Add the time spent in the block to ``phase``."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[phase] += time.perf_counter() - started
+
+    def snapshot(
+        self, llm_calls: Iterable[Dict[str, Any]] = (), tool_runs: Iterable[Any] = ()
+    ) -> Dict[str, Any]:
+        """Serializable breakdown, for storage, SSE events and the header.
+
+        Args:
+            llm_calls: ``TokenLedger.calls`` of the turn
+            tool_runs: ``ToolRun`` objects of the turn
+        """
+        llm = [
+            {
+                "model": call.get("model"),
+                "duration_ms": call.get("duration_ms"),
+                "ttft_ms": call.get("ttft_ms"),
+            }
+            for call in llm_calls
+        ]
+        tools = [
+            {"tool": run.tool_name, "duration_ms": run.duration_ms, "status": run.status}
+            for run in tool_runs
+        ]
+        snapshot: Dict[str, Any] = {
+            "total_ms": _ms(time.perf_counter() - self.started + self.seconds["queue"])
+        }
+        for phase in PHASES:
+            snapshot[f"{phase}_ms"] = _ms(self.seconds[phase])
+        snapshot["llm_ms"] = sum(call["duration_ms"] or 0 for call in llm)
+        snapshot["tool_ms"] = sum(run["duration_ms"] for run in tools)
+        snapshot["llm_calls"] = llm
+        snapshot["tool_calls"] = tools
+        return snapshot
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 1)
+
+
+def server_timing(snapshot: Dict[str, Any]) -> str:
+    """Format a ``TurnTiming.snapshot()`` as a ``Server-Timing`` header value.
+
+    Phases are named after the snapshot keys (``db-write``, ``history``),
+    followed by ``llm-N`` and ``tool-N`` entries for each call.
+    """
+    entries: List[str] = [f"total;dur={snapshot['total_ms']}"]
+    for phase in PHASES:
+        entries.append(f"{phase.replace('_', '-')};dur={snapshot[f'{phase}_ms']}")
+    entries.append(
+        f'llm;dur={snapshot["llm_ms"]};desc="{len(snapshot["llm_calls"])} calls"'
+    )
+    for index, call in enumerate(snapshot["llm_calls"], 1):
+        desc = call["model"] or "unknown"
+        if call["ttft_ms"] is not None:
+            desc += f" ttft={call['ttft_ms']}ms"
+        entries.append(f'llm-{index};dur={call["duration_ms"] or 0};desc="{_quote(desc)}"')
+    entries.append(
+        f'tool;dur={snapshot["tool_ms"]};desc="{len(snapshot["tool_calls"])} calls"'
+    )
+    for index, run in enumerate(snapshot["tool_calls"], 1):
+        desc = f"{run['tool']} {run['status']}"
+        entries.append(f'tool-{index};dur={run["duration_ms"]};desc="{_quote(desc)}"')
+    return ", ".join(entries)
+
+
+def _quote(text: str) -> str:
+    # Header values are latin-1; desc is a quoted string
+    text = text.replace("\\", "\\\\").replace('"', '\\"')
+    return text.encode("latin-1", "replace").decode("latin-1")
+
+
+def set_turn_timing(timing: TurnTiming) -> None:
+    """Set the timing of the turn running in this context."""
+    _current_turn_timing.set(timing)
+
+
+def clear_turn_timing() -> None:
+    _current_turn_timing.set(None)
+
+
+def current_turn_timing() -> Optional[TurnTiming]:
+    return _current_turn_timing.get()
+
+
+def record(phase: str, seconds: float) -> None:
+    """Add ``seconds`` to ``phase`` of the current turn, if there is one."""
+    timing = _current_turn_timing.get()
+    if timing is not None:
+        timing.seconds[phase] += seconds
+
+
+def record_db(operation: str, seconds: float) -> None:
+    """Add a repository call, named ``Class.method``, to the current turn."""
+    timing = _current_turn_timing.get()
+    if timing is None:
+        return
+    if operation == HISTORY_OPERATION:
+        phase = "history"
+    elif operation.rsplit(".", 1)[-1].startswith(_READ_PREFIXES):
+        phase = "db_read"
+    else:
+        phase = "db_write"
+    timing.seconds[phase] += seconds
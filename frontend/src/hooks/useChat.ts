@@ -169,6 +169,16 @@ export const useChat = () => {
 
                       break
                     }
+                    case 'replace': {
+                      // The streamed text was not the final answer
+                      textBuffer = ''
+                      if (bufferTimeout) {
+                        clearTimeout(bufferTimeout)
+                        bufferTimeout = null
+                      }
+                      setCurrentStreamingMessage(data.content || '')
+                      break
+                    }
                     case 'thought':
                       updateLastAssistantMessage({
                         thought: data.content || '',
@@ -178,7 +188,7 @@ export const useChat = () => {
                       const step: ToolStep = {
                         id: Date.now(),
                         message_id: Date.now(),
-                        step_number: 1,
+                        step_number: data.step_number || 1,
                         tool_name: data.tool || '',
                         tool_input: data.input || {},
                         tool_output: null,
@@ -201,9 +211,11 @@ export const useChat = () => {
                         updatedSteps[updatedSteps.length - 1] = {
                           ...lastStep,
                           tool_output: data.result || '',
-                          completed_at: new Date().toISOString(),
+                          tool_error: data.error || null,
+                          started_at: data.started_at || lastStep.started_at,
+                          completed_at: data.completed_at || new Date().toISOString(),
                           duration_ms: data.duration_ms || 0,
-                          status: 'completed',
+                          status: data.status || 'completed',
                         }
                         console.log('Updating tool steps:', updatedSteps)
                         updateLastAssistantMessage({ tool_steps: updatedSteps })
@@ -228,6 +240,12 @@ export const useChat = () => {
                       if (data.tokens_used !== undefined) {
                         updateLastAssistantMessage({ tokens_used: data.tokens_used })
                       }
+                      if (data.token_usage !== undefined) {
+                        updateLastAssistantMessage({ token_usage: data.token_usage })
+                      }
+                      if (data.timing !== undefined) {
+                        updateLastAssistantMessage({ timing: data.timing })
+                      }
                       completeStreamingMessage()
                       setLoading(false)
                       break
@@ -24,9 +24,71 @@ export interface Message {
     completion_tokens: number
     total_tokens: number
   } | null
+  turn_budget?: TurnBudget | null
+  token_usage?: TokenUsage | null
+  timing?: TurnTiming | null
   tool_steps: ToolStep[]
 }
 
+export interface TokenUsageCall {
+  iteration: number
+  model: string | null
+  duration_ms: number | null
+  ttft_ms?: number | null
+  prompt_tokens: number | null
+  completion_tokens: number | null
+  total_tokens: number | null
+}
+
+export interface TokenUsage {
+  prompt_tokens: number | null
+  completion_tokens: number | null
+  total_tokens: number | null
+  calls: number
+  unreported_calls: number
+  iterations: TokenUsageCall[]
+}
+
+export interface TurnTiming {
+  total_ms: number
+  queue_ms: number
+  db_write_ms: number
+  db_read_ms: number
+  history_ms: number
+  tool_queue_ms: number
+  serialization_ms: number
+  llm_ms: number
+  tool_ms: number
+  llm_calls: { model: string | null; duration_ms: number | null; ttft_ms: number | null }[]
+  tool_calls: { tool: string; duration_ms: number; status: ToolStep['status'] }[]
+}
+
+export interface TurnBudget {
+  budget_ms: number
+  elapsed_ms: number
+  remaining_ms: number
+  finalized: boolean
+  expired: boolean
+}
+
+export interface ObservationStats {
+  truncated_observations: number
+  tokens_saved: number
+  scratchpad_tokens_saved: number
+}
+
+export interface LoopStats {
+  repeated_calls: number
+  forced_final: boolean
+}
+
+export interface ToolSelection {
+  selected: string[]
+  available: number
+  latency_ms: number
+  tokens_saved: number
+}
+
 export interface ToolStep {
   id: number
   message_id: number
@@ -51,18 +113,29 @@ export interface ChatState {
 }
 
 export interface SSEEvent {
-  type: 'message' | 'stream_chunk' | 'thought' | 'tool_start' | 'tool_result' | 'done' | 'error' | 'cancelled'
+  type: 'message' | 'stream_chunk' | 'replace' | 'thought' | 'tool_start' | 'tool_result' | 'done' | 'error' | 'cancelled'
   content?: string
   tool?: string
   input?: Record<string, any>
   result?: string
+  step_number?: number
   duration_ms?: number
+  status?: ToolStep['status']
+  started_at?: string | null
+  completed_at?: string | null
+  error?: string | null
   message?: string
   tokens_used?: {
     prompt_tokens: number
     completion_tokens: number
     total_tokens: number
-  }
+  } | null
+  token_usage?: TokenUsage | null
+  timing?: TurnTiming | null
+  budget?: TurnBudget
+  observations?: ObservationStats
+  loops?: LoopStats
+  tool_selection?: ToolSelection | null
 }
 
 export interface ChatResponse {
@@ -70,6 +143,10 @@ export interface ChatResponse {
   intermediate_steps: any[]
   tool_steps: ToolStepInfo[]
   message: Message
+  observations?: ObservationStats | null
+  loops?: LoopStats | null
+  tool_selection?: ToolSelection | null
+  timing?: TurnTiming | null
 }
 
 export interface ToolStepInfo {